@@ -3,6 +3,7 @@ API Configs
 """
 
 import os
+import tempfile
 
 
 class DBSchema:
@@ -14,6 +15,8 @@ class DBSchema:
         self.PORTFOLIOS = "portfolios"
         self.ORDERS = "orders"
         self.POSITIONS = "positions"
+        self.SNAPSHOTS = "position_snapshots"
+        self.PENDING_ORDERS = "pending_orders"
 
 
 class Config:
@@ -24,8 +27,79 @@ class Config:
         self.SUPABASE_URL = os.getenv("SUPABASE_URL")
         self.SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
         self.SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
+        self.SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+        self.AUTH_JWT_AUDIENCE = os.getenv("AUTH_JWT_AUDIENCE", "authenticated")
+        self.AUTH_JWKS_TTL = float(os.getenv("AUTH_JWKS_TTL", "600"))
+        self.AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096"))
+        self.AUTH_LEEWAY = float(os.getenv("AUTH_LEEWAY", "5"))
+        self.AUTH_TIMEOUT = float(os.getenv("AUTH_TIMEOUT", "5"))
+        # also ask the auth server (revocation), at most every AUTH_REMOTE_TTL per token
+        self.AUTH_REMOTE_CHECK = os.getenv("AUTH_REMOTE_CHECK", "false").lower() in ("1", "true", "yes")
+        self.AUTH_REMOTE_TTL = float(os.getenv("AUTH_REMOTE_TTL", "60"))
         self.DB_SCHEMA = DBSchema()
+        self.DB_BACKEND = os.getenv("DB_BACKEND", "postgrest").lower()  # postgrest | sqlite
+        self.SQLITE_PATH = os.getenv("SQLITE_PATH", "oscillo.db")
+        self.DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
+        self.DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "100"))
+        self.DB_MAX_KEEPALIVE = int(os.getenv("DB_MAX_KEEPALIVE", "20"))
+        self.OWNERSHIP_CACHE_SIZE = int(os.getenv("OWNERSHIP_CACHE_SIZE", "4096"))
+        self.OWNERSHIP_TTL = float(os.getenv("OWNERSHIP_TTL", "60"))
+        self.LEDGER_CACHE_SIZE = int(os.getenv("LEDGER_CACHE_SIZE", "1024"))
+        self.LEDGER_REVALIDATE_SECONDS = float(os.getenv("LEDGER_REVALIDATE_SECONDS", "5"))
+        self.SNAPSHOT_EVERY_ORDERS = int(os.getenv("SNAPSHOT_EVERY_ORDERS", "500"))
+        self.RECONCILE_INTERVAL_SECONDS = float(os.getenv("RECONCILE_INTERVAL_SECONDS", "0"))
+        # long-running servers: import the pandas / yfinance stack at startup
+        # instead of on the first request that needs it (off for serverless)
+        self.PRELOAD_HEAVY_MODULES = os.getenv("PRELOAD_HEAVY_MODULES", "false").lower() in ("1", "true", "yes")
+        # Yahoo chart API compatible base URL (e.g. https://query1.finance.yahoo.com or
+        # a local stand-in); when set, bars / quotes / metadata skip yfinance
+        self.MARKET_DATA_URL = os.getenv("MARKET_DATA_URL")
+        # verified symbols kept per process for bulk orders (see services.market.lookup_tickers)
+        self.TICKER_REGISTRY_SIZE = int(os.getenv("TICKER_REGISTRY_SIZE", "8192"))
+        # (ticker, interval) windows the bar store keeps per process (see services.bars)
+        self.BAR_STORE_SIZE = int(os.getenv("BAR_STORE_SIZE", "2048"))
+        # admin routes, /metrics and on-demand profiling (X-Profile: <ADMIN_TOKEN>); unset disables them
+        self.ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+        self.PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.PROFILE_MIN_MS = float(os.getenv("PROFILE_MIN_MS", "0"))
+        self.PROFILE_MEMORY = os.getenv("PROFILE_MEMORY", "true").lower() in ("1", "true", "yes")
+        self.PROFILE_MEMORY_FRAMES = int(os.getenv("PROFILE_MEMORY_FRAMES", "25"))
+        self.PROFILE_STORE_SIZE = int(os.getenv("PROFILE_STORE_SIZE", "50"))
+        self.PROFILE_TOP = int(os.getenv("PROFILE_TOP", "40"))
         self.LOGGER = 'uvicorn.error'
+        # shared cache tier (see utils.cache): redis://host:6379/0 | memory:// | unset
+        self.CACHE_URL = os.getenv("CACHE_URL")
+        self.CACHE_PREFIX = os.getenv("CACHE_PREFIX", "oscillo:")
+        self.CACHE_TIMEOUT = float(os.getenv("CACHE_TIMEOUT", "0.5"))
+        self.CACHE_POOL_SIZE = int(os.getenv("CACHE_POOL_SIZE", "8"))
+        self.CACHE_RETRY_SECONDS = float(os.getenv("CACHE_RETRY_SECONDS", "30"))
+        # hot bars in shared memory for the workers of one host (see utils.shared_prices)
+        self.PRICE_MATRIX = os.getenv("PRICE_MATRIX", "false").lower() in ("1", "true", "yes")
+        self.PRICE_MATRIX_DIR = os.getenv("PRICE_MATRIX_DIR", os.path.join(tempfile.gettempdir(), "oscillo-prices"))
+        self.PRICE_MATRIX_PREFIX = os.getenv("PRICE_MATRIX_PREFIX", "oscillo-prices")
+        self.PRICE_MATRIX_INTERVALS = [i.strip() for i in os.getenv("PRICE_MATRIX_INTERVALS", "1m,5m").split(",") if i.strip()]
+        self.PRICE_MATRIX_REFRESH = float(os.getenv("PRICE_MATRIX_REFRESH", "30"))
+        self.PRICE_MATRIX_IDLE = float(os.getenv("PRICE_MATRIX_IDLE", "900"))
+        # pending limit / stop orders (see services.matching): seconds between matching
+        # passes, 0 disables; like reconcile, enable it on one instance only
+        self.MATCHING_INTERVAL_SECONDS = float(os.getenv("MATCHING_INTERVAL_SECONDS", "0"))
+        # background jobs (see services.jobs)
+        self.JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+        self.JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "60"))
+        self.JOB_STORE_SIZE = int(os.getenv("JOB_STORE_SIZE", "256"))
+        self.JOB_SYNC_TIMEOUT = float(os.getenv("JOB_SYNC_TIMEOUT", "20"))
+        # what-if simulations (see services.whatif): cached real series per period, orders per request
+        self.WHATIF_BASELINE_TTL = float(os.getenv("WHATIF_BASELINE_TTL", "30"))
+        self.WHATIF_BASELINE_SIZE = int(os.getenv("WHATIF_BASELINE_SIZE", "64"))
+        self.WHATIF_MAX_ORDERS = int(os.getenv("WHATIF_MAX_ORDERS", "50"))
+        # strategy backtests (see services.backtest): sweep processes (0 = one per CPU), runs per sweep
+        self.BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", "0"))
+        self.BACKTEST_MAX_RUNS = int(os.getenv("BACKTEST_MAX_RUNS", "256"))
+        # queued logging (see utils.logger): text | json
+        self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+        self.LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1"))
+        self.LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
 
 
 class DevConfig(Config):
@@ -0,0 +1,52 @@
+"""
+Data access layer
+"""
+
+from typing import Optional
+
+from app.configs import config
+from .base import Repository, RepositoryError, LedgerRejected
+
+
+_repository: Optional[Repository] = None
+
+
+def get_repository() -> Repository:
+    """
+    Process-wide repository (FastAPI dependency), chosen by DB_BACKEND
+    """
+    global _repository
+    if _repository is None and config.DB_BACKEND == "sqlite":
+        from .sqlite import SqliteRepository
+
+        _repository = SqliteRepository(config.SQLITE_PATH, timeout=config.DB_TIMEOUT)
+    elif _repository is None:
+        from .postgrest import PostgrestRepository
+
+        _repository = PostgrestRepository(
+            config.SUPABASE_URL,
+            config.SUPABASE_SERVICE_KEY,
+            timeout=config.DB_TIMEOUT,
+            max_connections=config.DB_MAX_CONNECTIONS,
+            max_keepalive=config.DB_MAX_KEEPALIVE,
+        )
+    return _repository
+
+
+async def close_repository() -> None:
+    """
+    Close pooled connections (app shutdown)
+    """
+    global _repository
+    if _repository is not None:
+        await _repository.close()
+        _repository = None
+
+
+__all__ = [
+    'Repository',
+    'RepositoryError',
+    'LedgerRejected',
+    'get_repository',
+    'close_repository'
+]
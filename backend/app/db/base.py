@@ -0,0 +1,247 @@
+"""
+Repository interface
+
+Every storage operation the services need, as async calls. Services receive
+a Repository instead of binding to a storage client at import time.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class RepositoryError(Exception):
+    """
+    Storage backend failure (transport error or rejected statement)
+    """
+    def __init__(self, message: str, code: Optional[str] = None):
+        super().__init__(message)
+        self.code = code
+
+
+class LedgerRejected(RepositoryError, ValueError):
+    """
+    Order refused by the ledger (insufficient cash / inventory, zero quantity)
+
+    Subclasses ValueError so routers answer 400 like other validation errors.
+    """
+
+
+class Repository(ABC):
+    """
+    Base storage repository
+    """
+    # ---- Portfolios ----
+    @abstractmethod
+    async def get_portfolios(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        All portfolio rows owned by user_id
+        """
+
+    @abstractmethod
+    async def get_portfolio(self, user_id: str, portfolio_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Portfolio row scoped by (user_id, id), or None
+        """
+
+    @abstractmethod
+    async def get_portfolio_ids(self) -> List[str]:
+        """
+        Ids of every portfolio (maintenance jobs)
+        """
+
+    @abstractmethod
+    async def get_ledger_version(self, portfolio_id: str) -> int:
+        """
+        Counter bumped by every order write to a portfolio (0 if unknown)
+        """
+
+    @abstractmethod
+    async def insert_portfolio(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert a portfolio row and return it as stored
+        """
+
+    @abstractmethod
+    async def delete_portfolio(self, user_id: str, portfolio_id: str) -> List[Dict[str, Any]]:
+        """
+        Delete a portfolio scoped by (user_id, id); returns deleted rows
+        """
+
+    # ---- Orders ----
+    @abstractmethod
+    async def get_orders(self, portfolio_id: str, columns: str = "*") -> List[Dict[str, Any]]:
+        """
+        All order rows of a portfolio, projected to columns
+        """
+
+    @abstractmethod
+    async def get_orders_page(
+        self,
+        portfolio_id: str,
+        columns: str = "*",
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 500
+    ) -> List[Dict[str, Any]]:
+        """
+        One page of a portfolio's orders in (timestamp, order_id) order,
+        strictly after the keyset `after` = (timestamp, order_id)
+        """
+
+    @abstractmethod
+    async def insert_order(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert an order row and return it as stored
+        """
+
+    @abstractmethod
+    async def place_order(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Atomically check cash / inventory, insert the order and apply both
+        position deltas; returns the stored order.
+
+        Raises LedgerRejected if the portfolio cannot cover the order.
+        """
+
+    @abstractmethod
+    async def place_orders(self, portfolio_id: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Insert a batch of orders and apply their net position deltas in one
+        transaction; returns the stored orders, each with "ord", its index
+        in rows.
+
+        Raises LedgerRejected if the resulting balances would go negative.
+        """
+
+    @abstractmethod
+    async def delete_orders(self, portfolio_id: str) -> None:
+        """
+        Delete every order of a portfolio
+        """
+
+    # ---- Pending orders ----
+    @abstractmethod
+    async def insert_pending_order(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert a pending (limit / stop) order row and return it as stored
+        """
+
+    @abstractmethod
+    async def get_pending_orders(
+        self,
+        portfolio_id: str,
+        statuses: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Pending order rows of a portfolio (optionally only those in
+        statuses), oldest first
+        """
+
+    @abstractmethod
+    async def get_live_pending_orders(
+        self,
+        after: Optional[Tuple[str, Optional[str]]] = None,
+        limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """
+        One page of the open / triggered pending orders of every portfolio
+        in (created_at, id) order, strictly after the keyset
+        `after` = (created_at, id); id None means created_at or later
+        (matching engine)
+        """
+
+    @abstractmethod
+    async def update_pending_order(
+        self,
+        portfolio_id: str,
+        order_id: str,
+        fields: Dict[str, Any],
+        statuses: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Set fields on a pending order, only while its status is one of
+        statuses (any if None); returns the updated row, or None if no row
+        matched (so concurrent workers can claim an order exactly once)
+        """
+
+    @abstractmethod
+    async def fill_pending_order(
+        self,
+        portfolio_id: str,
+        order_id: str,
+        price: float,
+        statuses: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fill a pending order at price in one transaction: claim it while its
+        status is one of statuses, place its order as place_order does and
+        mark it filled (or rejected, with the error, if the ledger refuses).
+
+        Returns {"pending": updated row, "order": stored order or None}, or
+        None if the pending order was not in one of statuses.
+        """
+
+    # ---- Positions ----
+    @abstractmethod
+    async def get_positions(self, portfolio_id: str) -> List[Dict[str, Any]]:
+        """
+        Position rows of a portfolio
+        """
+
+    @abstractmethod
+    async def get_ledger_positions(self, portfolio_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Positions the order ledgers of several portfolios imply, in one
+        query: {portfolio_id, ticker, quantity} rows, tickers by summed
+        quantity and CA$H by the place_order rule (deposits by quantity,
+        trades by -quantity * price)
+        """
+
+    @abstractmethod
+    async def increment_quantity(
+        self,
+        portfolio_id: str,
+        ticker: str,
+        quantity: float,
+        name: str,
+        sector: str
+    ) -> None:
+        """
+        Atomically add quantity to a position (creating it if needed)
+        """
+
+    @abstractmethod
+    async def reconcile_positions(
+        self,
+        portfolio_id: str,
+        ledger_version: int,
+        quantities: Dict[str, float]
+    ) -> List[Dict[str, Any]]:
+        """
+        Overwrite position quantities, only if the portfolio is still at
+        ledger_version; returns the rewritten rows.
+
+        Raises LedgerRejected if an order landed in between.
+        """
+
+    # ---- Snapshots ----
+    @abstractmethod
+    async def get_snapshot(
+        self,
+        portfolio_id: str,
+        at: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Latest position snapshot whose last_timestamp is at or before `at`
+        (latest overall if None), or None
+        """
+
+    @abstractmethod
+    async def insert_snapshot(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert a position snapshot and return it as stored
+        """
+
+    async def close(self) -> None:
+        """
+        Release pooled connections
+        """
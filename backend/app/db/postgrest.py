@@ -0,0 +1,366 @@
+"""
+Supabase (PostgREST) repository over a shared, pooled async HTTP/2 client
+"""
+
+import httpx
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.configs import config
+from app.utils.metrics import span
+from .base import Repository, RepositoryError, LedgerRejected
+
+# SQLSTATE of a bare RAISE EXCEPTION in a plpgsql function (ledger checks)
+_RAISE_EXCEPTION = "P0001"
+
+# Portfolio model fields; bookkeeping columns (ledger_version) stay server-side
+_PORTFOLIO_COLUMNS = "id,user_id,name,created_at,last_updated"
+
+
+class PostgrestRepository(Repository):
+    """
+    Repository speaking PostgREST to Supabase
+
+    One httpx.AsyncClient (HTTP/2, keep-alive pool, request timeouts) is
+    shared by every request in the worker, so DB calls never block the event
+    loop and many can be in flight at once.
+    """
+    def __init__(
+            self,
+            url: str,
+            service_key: str,
+            timeout: float = 10.0,
+            max_connections: int = 100,
+            max_keepalive: int = 20
+        ):
+        self._base_url = f"{url.rstrip('/')}/rest/v1"
+        self._headers = {
+            "apikey": service_key,
+            "Authorization": f"Bearer {service_key}",
+        }
+        self._timeout = timeout
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Lazily created shared client (first use happens inside the event loop)
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self._base_url,
+                headers=self._headers,
+                http2=True,
+                timeout=self._timeout,
+                limits=self._limits,
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method: str, path: str, **kwargs) -> Any:
+        """
+        Send a PostgREST request; returns decoded JSON (None on empty body)
+        """
+        try:
+            with span("db"):
+                res = await self.client.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            raise RepositoryError(f"{method} {path} failed: {e}") from e
+
+        if res.status_code >= 400:
+            try:
+                body = res.json()
+                detail, code = body.get("message", res.text), body.get("code")
+            except Exception:
+                detail, code = res.text, None
+            raise RepositoryError(detail, code=code)
+
+        return res.json() if res.content else None
+
+    async def _select(self, table: str, columns: str = "*", **filters) -> List[Dict[str, Any]]:
+        params = {"select": columns, **filters}
+        return await self._request("GET", f"/{table}", params=params) or []
+
+    async def _insert(self, table: str, row: Dict[str, Any], columns: str = "*") -> Dict[str, Any]:
+        data = await self._request(
+            "POST", f"/{table}",
+            params={"select": columns},
+            json=row,
+            headers={"Prefer": "return=representation"}
+        )
+        if not data:
+            raise RepositoryError(f"Insert into {table} returned no rows")
+        return data[0]
+
+    async def _delete(self, table: str, **filters) -> List[Dict[str, Any]]:
+        return await self._request(
+            "DELETE", f"/{table}",
+            params=filters,
+            headers={"Prefer": "return=representation"}
+        ) or []
+
+    async def _update(self, table: str, fields: Dict[str, Any], **filters) -> List[Dict[str, Any]]:
+        return await self._request(
+            "PATCH", f"/{table}",
+            params=filters,
+            json=fields,
+            headers={"Prefer": "return=representation"}
+        ) or []
+
+    async def _rpc(self, fn: str, params: Dict[str, Any]) -> Any:
+        return await self._request("POST", f"/rpc/{fn}", json=params)
+
+    # ---- Portfolios ----
+    async def get_portfolios(self, user_id: str) -> List[Dict[str, Any]]:
+        return await self._select(
+            config.DB_SCHEMA.PORTFOLIOS,
+            _PORTFOLIO_COLUMNS,
+            user_id=f"eq.{user_id}"
+        )
+
+    async def get_portfolio(self, user_id: str, portfolio_id: str) -> Optional[Dict[str, Any]]:
+        rows = await self._select(
+            config.DB_SCHEMA.PORTFOLIOS,
+            _PORTFOLIO_COLUMNS,
+            user_id=f"eq.{user_id}",
+            id=f"eq.{portfolio_id}"
+        )
+        return rows[0] if rows else None
+
+    async def get_portfolio_ids(self) -> List[str]:
+        rows = await self._select(config.DB_SCHEMA.PORTFOLIOS, "id")
+        return [row["id"] for row in rows]
+
+    async def get_ledger_version(self, portfolio_id: str) -> int:
+        rows = await self._select(
+            config.DB_SCHEMA.PORTFOLIOS,
+            "ledger_version",
+            id=f"eq.{portfolio_id}"
+        )
+        return int(rows[0]["ledger_version"]) if rows else 0
+
+    async def insert_portfolio(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._insert(config.DB_SCHEMA.PORTFOLIOS, row, _PORTFOLIO_COLUMNS)
+
+    async def delete_portfolio(self, user_id: str, portfolio_id: str) -> List[Dict[str, Any]]:
+        return await self._delete(
+            config.DB_SCHEMA.PORTFOLIOS,
+            id=f"eq.{portfolio_id}",
+            user_id=f"eq.{user_id}"
+        )
+
+    # ---- Orders ----
+    async def get_orders(self, portfolio_id: str, columns: str = "*") -> List[Dict[str, Any]]:
+        return await self._select(
+            config.DB_SCHEMA.ORDERS,
+            columns,
+            portfolio_id=f"eq.{portfolio_id}"
+        )
+
+    async def get_orders_page(
+        self,
+        portfolio_id: str,
+        columns: str = "*",
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 500
+    ) -> List[Dict[str, Any]]:
+        filters = {
+            "portfolio_id": f"eq.{portfolio_id}",
+            "order": "timestamp.asc,order_id.asc",
+            "limit": str(limit),
+        }
+        if after is not None:
+            ts, order_id = after
+            filters["or"] = (
+                f'(timestamp.gt."{ts}",'
+                f'and(timestamp.eq."{ts}",order_id.gt.{order_id}))'
+            )
+        return await self._select(config.DB_SCHEMA.ORDERS, columns, **filters)
+
+    async def insert_order(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._insert(config.DB_SCHEMA.ORDERS, row)
+
+    async def place_order(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            data = await self._rpc(
+                "place_order",
+                {
+                    "p_portfolio_id": row["portfolio_id"],
+                    "p_ticker": row["ticker"],
+                    "p_quantity": row["quantity"],
+                    "p_price": row["price"],
+                    "p_name": row.get("name"),
+                    "p_sector": row.get("sector"),
+                }
+            )
+        except RepositoryError as e:
+            if e.code == _RAISE_EXCEPTION:
+                raise LedgerRejected(str(e), code=e.code) from e
+            raise
+
+        if not data:
+            raise RepositoryError("place_order returned no rows")
+        return data[0]
+
+    async def place_orders(self, portfolio_id: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not rows:
+            return []
+
+        fields = ("ticker", "quantity", "price", "name", "sector")
+        try:
+            return await self._rpc(
+                "place_orders",
+                {
+                    "p_portfolio_id": portfolio_id,
+                    "p_orders": [{k: row.get(k) for k in fields} for row in rows],
+                }
+            ) or []
+        except RepositoryError as e:
+            if e.code == _RAISE_EXCEPTION:
+                raise LedgerRejected(str(e), code=e.code) from e
+            raise
+
+    async def delete_orders(self, portfolio_id: str) -> None:
+        await self._delete(
+            config.DB_SCHEMA.ORDERS,
+            portfolio_id=f"eq.{portfolio_id}"
+        )
+
+    # ---- Pending orders ----
+    async def insert_pending_order(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._insert(config.DB_SCHEMA.PENDING_ORDERS, row)
+
+    async def get_pending_orders(
+        self,
+        portfolio_id: str,
+        statuses: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        filters = {"portfolio_id": f"eq.{portfolio_id}", "order": "created_at.asc,id.asc"}
+        if statuses:
+            filters["status"] = f"in.({','.join(statuses)})"
+        return await self._select(config.DB_SCHEMA.PENDING_ORDERS, **filters)
+
+    async def get_live_pending_orders(
+        self,
+        after: Optional[Tuple[str, Optional[str]]] = None,
+        limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        filters = {"status": "in.(open,triggered)", "order": "created_at.asc,id.asc", "limit": str(limit)}
+        if after is not None and after[1] is None:
+            filters["created_at"] = f'gte."{after[0]}"'
+        elif after is not None:
+            ts, order_id = after
+            filters["or"] = (
+                f'(created_at.gt."{ts}",'
+                f'and(created_at.eq."{ts}",id.gt.{order_id}))'
+            )
+        return await self._select(config.DB_SCHEMA.PENDING_ORDERS, **filters)
+
+    async def update_pending_order(
+        self,
+        portfolio_id: str,
+        order_id: str,
+        fields: Dict[str, Any],
+        statuses: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        filters = {"id": f"eq.{order_id}", "portfolio_id": f"eq.{portfolio_id}"}
+        if statuses:
+            filters["status"] = f"in.({','.join(statuses)})"
+        rows = await self._update(config.DB_SCHEMA.PENDING_ORDERS, fields, **filters)
+        return rows[0] if rows else None
+
+    async def fill_pending_order(
+        self,
+        portfolio_id: str,
+        order_id: str,
+        price: float,
+        statuses: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        return await self._rpc(
+            "fill_pending_order",
+            {
+                "p_portfolio_id": portfolio_id,
+                "p_order_id": order_id,
+                "p_price": price,
+                "p_statuses": statuses,
+            }
+        ) or None
+
+    # ---- Positions ----
+    async def get_positions(self, portfolio_id: str) -> List[Dict[str, Any]]:
+        return await self._select(
+            config.DB_SCHEMA.POSITIONS,
+            "ticker,portfolio_id,name,sector,quantity,created_at,updated_at",
+            portfolio_id=f"eq.{portfolio_id}"
+        )
+
+    async def get_ledger_positions(self, portfolio_ids: List[str]) -> List[Dict[str, Any]]:
+        if not portfolio_ids:
+            return []
+        return await self._rpc("ledger_positions", {"p_portfolio_ids": portfolio_ids}) or []
+
+    async def increment_quantity(
+        self,
+        portfolio_id: str,
+        ticker: str,
+        quantity: float,
+        name: str,
+        sector: str
+    ) -> None:
+        await self._rpc(
+            "increment_quantity",
+            {
+                "p_portfolio_id": portfolio_id,
+                "p_ticker": ticker,
+                "p_quantity": quantity,
+                "p_name": name,
+                "p_sector": sector,
+            }
+        )
+
+    async def reconcile_positions(
+        self,
+        portfolio_id: str,
+        ledger_version: int,
+        quantities: Dict[str, float]
+    ) -> List[Dict[str, Any]]:
+        try:
+            return await self._rpc(
+                "reconcile_positions",
+                {
+                    "p_portfolio_id": portfolio_id,
+                    "p_ledger_version": ledger_version,
+                    "p_quantities": quantities,
+                }
+            ) or []
+        except RepositoryError as e:
+            if e.code == _RAISE_EXCEPTION:
+                raise LedgerRejected(str(e), code=e.code) from e
+            raise
+
+    # ---- Snapshots ----
+    async def get_snapshot(
+        self,
+        portfolio_id: str,
+        at: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        filters = {
+            "portfolio_id": f"eq.{portfolio_id}",
+            "order": "last_timestamp.desc,last_order_id.desc",
+            "limit": "1",
+        }
+        if at is not None:
+            filters["last_timestamp"] = f'lte."{at}"'
+        rows = await self._select(config.DB_SCHEMA.SNAPSHOTS, **filters)
+        return rows[0] if rows else None
+
+    async def insert_snapshot(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._insert(config.DB_SCHEMA.SNAPSHOTS, row)
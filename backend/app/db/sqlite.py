@@ -0,0 +1,632 @@
+"""
+Embedded SQLite repository (WAL mode), for local runs, load tests and
+single-node deployments without a network hop to the database
+"""
+
+import json
+import uuid
+import sqlite3
+import asyncio
+import threading
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.metrics import span
+from .base import Repository, RepositoryError, LedgerRejected
+
+
+CASH_TICKER = "CA$H"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS portfolios (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    last_updated TEXT,
+    ledger_version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS portfolios_user_idx ON portfolios (user_id);
+
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    portfolio_id TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    name TEXT,
+    sector TEXT,
+    quantity REAL NOT NULL,
+    price REAL NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_keyset_idx ON orders (portfolio_id, timestamp, order_id);
+
+CREATE TABLE IF NOT EXISTS positions (
+    portfolio_id TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    name TEXT,
+    sector TEXT,
+    quantity REAL NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (portfolio_id, ticker)
+);
+
+CREATE TABLE IF NOT EXISTS position_snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    portfolio_id TEXT NOT NULL,
+    last_timestamp TEXT NOT NULL,
+    last_order_id TEXT NOT NULL,
+    order_count INTEGER NOT NULL,
+    holdings TEXT NOT NULL DEFAULT '{}',
+    cash REAL NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS position_snapshots_portfolio_ts_idx
+    ON position_snapshots (portfolio_id, last_timestamp, last_order_id);
+
+CREATE TABLE IF NOT EXISTS pending_orders (
+    id TEXT PRIMARY KEY,
+    portfolio_id TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    name TEXT,
+    sector TEXT,
+    quantity REAL NOT NULL,
+    kind TEXT NOT NULL,
+    limit_price REAL,
+    stop_price REAL,
+    time_in_force TEXT NOT NULL DEFAULT 'gtc',
+    status TEXT NOT NULL DEFAULT 'open',
+    created_at TEXT NOT NULL,
+    expires_at TEXT,
+    updated_at TEXT NOT NULL,
+    filled_price REAL,
+    filled_order_id TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS pending_orders_portfolio_idx ON pending_orders (portfolio_id, created_at);
+CREATE INDEX IF NOT EXISTS pending_orders_live_idx ON pending_orders (created_at)
+    WHERE status IN ('open', 'triggered');
+
+CREATE TRIGGER IF NOT EXISTS orders_bump_ledger_version_ins AFTER INSERT ON orders
+BEGIN
+    UPDATE portfolios SET ledger_version = ledger_version + 1 WHERE id = NEW.portfolio_id;
+END;
+CREATE TRIGGER IF NOT EXISTS orders_bump_ledger_version_del AFTER DELETE ON orders
+BEGIN
+    UPDATE portfolios SET ledger_version = ledger_version + 1 WHERE id = OLD.portfolio_id;
+END;
+"""
+
+# Statements are constant strings so sqlite3's per-connection statement
+# cache prepares each of them once.
+_PORTFOLIO_COLUMNS = "id, user_id, name, created_at, last_updated"
+_POSITION_COLUMNS = "ticker, portfolio_id, name, sector, quantity, created_at, updated_at"
+
+_SQL_UPSERT_POSITION = """
+INSERT INTO positions (portfolio_id, ticker, quantity, name, sector, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (portfolio_id, ticker)
+DO UPDATE SET quantity = quantity + excluded.quantity, updated_at = excluded.updated_at
+"""
+
+_SQL_SET_POSITION = """
+INSERT INTO positions (portfolio_id, ticker, quantity, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (portfolio_id, ticker)
+DO UPDATE SET quantity = excluded.quantity, updated_at = excluded.updated_at
+"""
+
+_SQL_INSERT_ORDER = """
+INSERT INTO orders (order_id, portfolio_id, ticker, name, sector, quantity, price, timestamp)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_HELD = "SELECT quantity FROM positions WHERE portfolio_id = ? AND ticker = ?"
+
+# same rule as place_order / utils.holdings.replay, summed per portfolio
+_SQL_LEDGER_POSITIONS = (
+    "SELECT portfolio_id, ticker, SUM(quantity) AS quantity FROM orders "
+    "WHERE ticker IS NOT NULL AND ticker <> ? AND portfolio_id IN ({marks}) "
+    "GROUP BY portfolio_id, ticker "
+    "UNION ALL "
+    "SELECT portfolio_id, ? AS ticker, "
+    "SUM(CASE WHEN ticker = ? THEN quantity ELSE -quantity * COALESCE(price, 0) END) AS quantity "
+    "FROM orders WHERE ticker IS NOT NULL AND portfolio_id IN ({marks}) "
+    "GROUP BY portfolio_id"
+)
+
+_PENDING_COLUMNS = (
+    "id", "portfolio_id", "ticker", "name", "sector", "quantity", "kind", "limit_price", "stop_price",
+    "time_in_force", "status", "created_at", "expires_at", "updated_at", "filled_price", "filled_order_id", "error",
+)
+
+
+def _now() -> str:
+    # fixed-width UTC ISO 8601, so text order is time order (keyset pagination)
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+class SqliteRepository(Repository):
+    """
+    Repository on an embedded SQLite file
+
+    Every call runs on a worker thread (asyncio.to_thread) with that
+    thread's own connection; WAL lets readers proceed while one writer
+    holds the write lock. Ledger writes take the lock up front
+    (BEGIN IMMEDIATE), which gives them the same all-or-nothing checks as
+    the place_order / place_orders RPCs.
+    """
+    def __init__(self, path: str, timeout: float = 10.0):
+        self._path = path
+        self._timeout = timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+        # ":memory:" is per connection; share one cache between threads
+        if path == ":memory:":
+            self._path = f"file:oscillo-{uuid.uuid4().hex}?mode=memory&cache=shared"
+
+        self._keeper = self._connect()
+        self._keeper.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._path,
+            timeout=self._timeout,
+            isolation_level=None,  # explicit BEGIN / COMMIT
+            check_same_thread=False,
+            cached_statements=256,
+            uri=self._path.startswith("file:"),
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    async def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    async def _run(self, fn, *args) -> Any:
+        try:
+            with span("db"):
+                return await asyncio.to_thread(fn, *args)
+        except sqlite3.Error as e:
+            raise RepositoryError(str(e)) from e
+
+    def _all(self, sql: str, params: Tuple = ()) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def _one(self, sql: str, params: Tuple = ()) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(sql, params).fetchone()
+        return dict(row) if row is not None else None
+
+    def _transaction(self, fn, *args) -> Any:
+        """
+        Run fn(conn, *args) inside BEGIN IMMEDIATE ... COMMIT
+        """
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            out = fn(conn, *args)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return out
+
+    async def _write(self, fn, *args) -> Any:
+        return await self._run(self._transaction, fn, *args)
+
+    # ---- Portfolios ----
+    async def get_portfolios(self, user_id: str) -> List[Dict[str, Any]]:
+        return await self._run(
+            self._all,
+            f"SELECT {_PORTFOLIO_COLUMNS} FROM portfolios WHERE user_id = ?",
+            (user_id,)
+        )
+
+    async def get_portfolio(self, user_id: str, portfolio_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(
+            self._one,
+            f"SELECT {_PORTFOLIO_COLUMNS} FROM portfolios WHERE user_id = ? AND id = ?",
+            (user_id, portfolio_id)
+        )
+
+    async def get_portfolio_ids(self) -> List[str]:
+        rows = await self._run(self._all, "SELECT id FROM portfolios")
+        return [row["id"] for row in rows]
+
+    async def get_ledger_version(self, portfolio_id: str) -> int:
+        row = await self._run(
+            self._one,
+            "SELECT ledger_version FROM portfolios WHERE id = ?",
+            (portfolio_id,)
+        )
+        return int(row["ledger_version"]) if row else 0
+
+    async def insert_portfolio(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        def insert(conn: sqlite3.Connection) -> Dict[str, Any]:
+            conn.execute(
+                "INSERT INTO portfolios (id, user_id, name, created_at, last_updated) VALUES (?, ?, ?, ?, ?)",
+                (row["id"], row["user_id"], row["name"], row.get("created_at") or _now(), row.get("last_updated"))
+            )
+            return dict(conn.execute(
+                f"SELECT {_PORTFOLIO_COLUMNS} FROM portfolios WHERE id = ?", (row["id"],)
+            ).fetchone())
+
+        return await self._write(insert)
+
+    async def delete_portfolio(self, user_id: str, portfolio_id: str) -> List[Dict[str, Any]]:
+        def delete(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+            rows = [dict(r) for r in conn.execute(
+                f"SELECT {_PORTFOLIO_COLUMNS} FROM portfolios WHERE id = ? AND user_id = ?",
+                (portfolio_id, user_id)
+            )]
+            if rows:
+                # no foreign-key cascades here: everything keyed by the portfolio goes too
+                conn.execute("DELETE FROM pending_orders WHERE portfolio_id = ?", (portfolio_id,))
+                conn.execute("DELETE FROM orders WHERE portfolio_id = ?", (portfolio_id,))
+                conn.execute("DELETE FROM position_snapshots WHERE portfolio_id = ?", (portfolio_id,))
+                conn.execute("DELETE FROM positions WHERE portfolio_id = ?", (portfolio_id,))
+                conn.execute("DELETE FROM portfolios WHERE id = ?", (portfolio_id,))
+            return rows
+
+        return await self._write(delete)
+
+    # ---- Orders ----
+    async def get_orders(self, portfolio_id: str, columns: str = "*") -> List[Dict[str, Any]]:
+        return await self._run(
+            self._all,
+            f"SELECT {_columns(columns)} FROM orders WHERE portfolio_id = ?",
+            (portfolio_id,)
+        )
+
+    async def get_orders_page(
+        self,
+        portfolio_id: str,
+        columns: str = "*",
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 500
+    ) -> List[Dict[str, Any]]:
+        select = f"SELECT {_columns(columns)} FROM orders WHERE portfolio_id = ?"
+        order = " ORDER BY timestamp, order_id LIMIT ?"
+        if after is None:
+            return await self._run(self._all, select + order, (portfolio_id, limit))
+
+        ts, order_id = after
+        return await self._run(
+            self._all,
+            select + " AND (timestamp, order_id) > (?, ?)" + order,
+            (portfolio_id, ts, order_id, limit)
+        )
+
+    async def insert_order(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        def insert(conn: sqlite3.Connection) -> Dict[str, Any]:
+            return _insert_order(conn, row["portfolio_id"], row, row.get("timestamp") or _now())
+
+        return await self._write(insert)
+
+    async def place_order(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        def place(conn: sqlite3.Connection) -> Dict[str, Any]:
+            return _place_order(conn, row, _now())
+
+        return await self._write(place)
+
+    async def place_orders(self, portfolio_id: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not rows:
+            return []
+
+        def place(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+            now = _now()
+            batch = [dict(row, ticker=row["ticker"].upper()) for row in rows]
+            if any(row["quantity"] == 0 for row in batch):
+                raise LedgerRejected("Order quantity cannot be 0")
+
+            # net deltas: tickers by quantity, cash by deposits and -quantity * price
+            deltas: Dict[str, List[Any]] = {}
+            for row in batch:
+                if row["ticker"] == CASH_TICKER:
+                    cash_delta = row["quantity"]
+                else:
+                    cash_delta = -row["quantity"] * row["price"]
+                    delta = deltas.setdefault(row["ticker"], [0.0, row.get("name"), row.get("sector")])
+                    delta[0] += row["quantity"]
+                deltas.setdefault(CASH_TICKER, [0.0, "N/A (Cash Holdings)", "Cash"])[0] += cash_delta
+
+            for ticker, (delta, name, sector) in sorted(deltas.items()):
+                conn.execute(_SQL_UPSERT_POSITION, (portfolio_id, ticker, delta, name, sector, now, now))
+                if _held(conn, portfolio_id, ticker) < 0:
+                    what = "cash" if ticker == CASH_TICKER else ticker
+                    raise LedgerRejected(f"Portfolio does not have enough {what} to place these orders")
+
+            return [dict(_insert_order(conn, portfolio_id, row, now), ord=i) for i, row in enumerate(batch)]
+
+        return await self._write(place)
+
+    async def delete_orders(self, portfolio_id: str) -> None:
+        def delete(conn: sqlite3.Connection) -> None:
+            conn.execute("DELETE FROM orders WHERE portfolio_id = ?", (portfolio_id,))
+
+        await self._write(delete)
+
+    # ---- Pending orders ----
+    async def insert_pending_order(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        def insert(conn: sqlite3.Connection) -> Dict[str, Any]:
+            now = _now()
+            stored = {c: row.get(c) for c in _PENDING_COLUMNS}
+            stored.update(
+                id=row.get("id") or str(uuid.uuid4()),
+                status=row.get("status") or "open",
+                time_in_force=row.get("time_in_force") or "gtc",
+                created_at=row.get("created_at") or now,
+                updated_at=now,
+            )
+            conn.execute(
+                f"INSERT INTO pending_orders ({', '.join(_PENDING_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_PENDING_COLUMNS))})",
+                tuple(stored[c] for c in _PENDING_COLUMNS)
+            )
+            return stored
+
+        return await self._write(insert)
+
+    async def get_pending_orders(
+        self,
+        portfolio_id: str,
+        statuses: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        sql = "SELECT * FROM pending_orders WHERE portfolio_id = ?"
+        params: Tuple = (portfolio_id,)
+        if statuses:
+            sql += f" AND status IN ({','.join('?' * len(statuses))})"
+            params += tuple(statuses)
+        return await self._run(self._all, sql + " ORDER BY created_at, id", params)
+
+    async def get_live_pending_orders(
+        self,
+        after: Optional[Tuple[str, Optional[str]]] = None,
+        limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        sql = "SELECT * FROM pending_orders WHERE status IN ('open', 'triggered')"
+        params: Tuple = ()
+        if after is not None and after[1] is None:
+            sql += " AND created_at >= ?"
+            params = (after[0],)
+        elif after is not None:
+            sql += " AND (created_at, id) > (?, ?)"
+            params = after
+        return await self._run(self._all, sql + " ORDER BY created_at, id LIMIT ?", (*params, limit))
+
+    async def update_pending_order(
+        self,
+        portfolio_id: str,
+        order_id: str,
+        fields: Dict[str, Any],
+        statuses: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        if not all(c in _PENDING_COLUMNS for c in fields):
+            raise RepositoryError(f"Invalid pending order fields: {sorted(fields)}")
+
+        def update(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+            values = dict(fields, updated_at=_now())
+            sql = (
+                f"UPDATE pending_orders SET {', '.join(f'{c} = ?' for c in values)} "
+                "WHERE id = ? AND portfolio_id = ?"
+            )
+            params = (*values.values(), order_id, portfolio_id)
+            if statuses:
+                sql += f" AND status IN ({','.join('?' * len(statuses))})"
+                params += tuple(statuses)
+            if conn.execute(sql, params).rowcount == 0:
+                return None
+            return dict(conn.execute("SELECT * FROM pending_orders WHERE id = ?", (order_id,)).fetchone())
+
+        return await self._write(update)
+
+    async def fill_pending_order(
+        self,
+        portfolio_id: str,
+        order_id: str,
+        price: float,
+        statuses: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        def fill(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+            now = _now()
+            pending = conn.execute(
+                "SELECT * FROM pending_orders WHERE id = ? AND portfolio_id = ? "
+                f"AND status IN ({','.join('?' * len(statuses))})",
+                (order_id, portfolio_id, *statuses)
+            ).fetchone()
+            if pending is None:
+                return None
+
+            try:
+                stored = _place_order(conn, {
+                    "portfolio_id": portfolio_id,
+                    "ticker": pending["ticker"],
+                    "name": pending["name"],
+                    "sector": pending["sector"],
+                    "quantity": pending["quantity"],
+                    "price": price,
+                }, now)
+                values = {"status": "filled", "filled_price": price, "filled_order_id": stored["order_id"]}
+            except LedgerRejected as e:
+                stored = None
+                values = {"status": "rejected", "error": str(e)}
+
+            values["updated_at"] = now
+            conn.execute(
+                f"UPDATE pending_orders SET {', '.join(f'{c} = ?' for c in values)} WHERE id = ?",
+                (*values.values(), order_id)
+            )
+            row = conn.execute("SELECT * FROM pending_orders WHERE id = ?", (order_id,)).fetchone()
+            return {"pending": dict(row), "order": stored}
+
+        return await self._write(fill)
+
+    # ---- Positions ----
+    async def get_positions(self, portfolio_id: str) -> List[Dict[str, Any]]:
+        return await self._run(
+            self._all,
+            f"SELECT {_POSITION_COLUMNS} FROM positions WHERE portfolio_id = ?",
+            (portfolio_id,)
+        )
+
+    async def get_ledger_positions(self, portfolio_ids: List[str]) -> List[Dict[str, Any]]:
+        if not portfolio_ids:
+            return []
+        marks = ",".join("?" * len(portfolio_ids))
+        return await self._run(
+            self._all,
+            _SQL_LEDGER_POSITIONS.format(marks=marks),
+            (CASH_TICKER, *portfolio_ids, CASH_TICKER, CASH_TICKER, *portfolio_ids)
+        )
+
+    async def increment_quantity(
+        self,
+        portfolio_id: str,
+        ticker: str,
+        quantity: float,
+        name: str,
+        sector: str
+    ) -> None:
+        def increment(conn: sqlite3.Connection) -> None:
+            now = _now()
+            conn.execute(_SQL_UPSERT_POSITION, (portfolio_id, ticker, quantity, name, sector, now, now))
+
+        await self._write(increment)
+
+    async def reconcile_positions(
+        self,
+        portfolio_id: str,
+        ledger_version: int,
+        quantities: Dict[str, float]
+    ) -> List[Dict[str, Any]]:
+        def reconcile(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+            row = conn.execute("SELECT ledger_version FROM portfolios WHERE id = ?", (portfolio_id,)).fetchone()
+            version = row["ledger_version"] if row else None
+            if version != ledger_version:
+                raise LedgerRejected(f"Ledger changed during reconcile ({ledger_version} -> {version})")
+
+            now = _now()
+            conn.executemany(
+                _SQL_SET_POSITION,
+                [(portfolio_id, t.upper(), q, now, now) for t, q in quantities.items()]
+            )
+            return [dict(r) for r in conn.execute(
+                f"SELECT {_POSITION_COLUMNS} FROM positions WHERE portfolio_id = ?", (portfolio_id,)
+            ) if r["ticker"] in {t.upper() for t in quantities}]
+
+        return await self._write(reconcile)
+
+    # ---- Snapshots ----
+    async def get_snapshot(
+        self,
+        portfolio_id: str,
+        at: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        select = "SELECT * FROM position_snapshots WHERE portfolio_id = ?"
+        order = " ORDER BY last_timestamp DESC, last_order_id DESC LIMIT 1"
+        if at is None:
+            row = await self._run(self._one, select + order, (portfolio_id,))
+        else:
+            row = await self._run(self._one, select + " AND last_timestamp <= ?" + order, (portfolio_id, at))
+
+        if row is not None:
+            row["holdings"] = json.loads(row["holdings"])
+        return row
+
+    async def insert_snapshot(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        def insert(conn: sqlite3.Connection) -> Dict[str, Any]:
+            cur = conn.execute(
+                "INSERT INTO position_snapshots "
+                "(portfolio_id, last_timestamp, last_order_id, order_count, holdings, cash, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    row["portfolio_id"], row["last_timestamp"], row["last_order_id"],
+                    row["order_count"], json.dumps(row["holdings"]), row["cash"], _now(),
+                )
+            )
+            return dict(row, id=cur.lastrowid)
+
+        return await self._write(insert)
+
+
+def _columns(columns: str) -> str:
+    """
+    PostgREST-style "a,b,c" projection -> SQL column list (validated)
+    """
+    if columns.strip() == "*":
+        return "*"
+    cols = [c.strip() for c in columns.split(",") if c.strip()]
+    if not all(c.isidentifier() for c in cols):
+        raise RepositoryError(f"Invalid column list: {columns}")
+    return ", ".join(cols)
+
+
+def _held(conn: sqlite3.Connection, portfolio_id: str, ticker: str) -> float:
+    row = conn.execute(_SQL_HELD, (portfolio_id, ticker)).fetchone()
+    return (row["quantity"] or 0) if row else 0
+
+
+def _place_order(conn: sqlite3.Connection, row: Dict[str, Any], now: str) -> Dict[str, Any]:
+    """
+    place_order inside an open transaction: checks happen before any write
+    """
+    portfolio_id = row["portfolio_id"]
+    ticker = row["ticker"].upper()
+    quantity, price = row["quantity"], row["price"]
+
+    if quantity == 0:
+        raise LedgerRejected("Order quantity cannot be 0")
+
+    cash = _held(conn, portfolio_id, CASH_TICKER)
+    if ticker == CASH_TICKER:
+        cash_delta = quantity
+    else:
+        cash_delta = -quantity * price
+        if quantity < 0 and -quantity > _held(conn, portfolio_id, ticker):
+            raise LedgerRejected("Portfolio does not have the inventory to make this trade")
+
+    if cash + cash_delta < 0:
+        raise LedgerRejected("Portfolio does not have enough cash to make this trade / withdrawal")
+
+    if ticker != CASH_TICKER:
+        conn.execute(
+            _SQL_UPSERT_POSITION,
+            (portfolio_id, ticker, quantity, row.get("name"), row.get("sector"), now, now)
+        )
+    conn.execute(
+        _SQL_UPSERT_POSITION,
+        (portfolio_id, CASH_TICKER, cash_delta, "N/A (Cash Holdings)", "Cash", now, now)
+    )
+
+    return _insert_order(conn, portfolio_id, dict(row, ticker=ticker), now)
+
+
+def _insert_order(conn: sqlite3.Connection, portfolio_id: str, row: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
+    order_id = row.get("order_id") or str(uuid.uuid4())
+    values = (
+        order_id, portfolio_id, row["ticker"], row.get("name"), row.get("sector"),
+        row["quantity"], row["price"], timestamp,
+    )
+    conn.execute(_SQL_INSERT_ORDER, values)
+    return dict(zip(
+        ("order_id", "portfolio_id", "ticker", "name", "sector", "quantity", "price", "timestamp"),
+        values
+    ))
@@ -1,24 +1,104 @@
 import os
+import sys
+import asyncio
+import importlib
 import logging
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.configs import config
+from app.db import close_repository, get_repository
+from app.utils.auth import close_auth_client
+from app.services.jobs import close_jobs
+from app.utils.cache import close_cache
+from app.utils.metrics import TimingMiddleware
+from app.utils.profiling import ProfilingMiddleware
 from app.routers import general
 
 from app.routers import orders
 from app.routers import market
 from app.routers import portfolios
 from app.routers import performance
+from app.routers import metrics
+from app.routers import admin
+from app.routers import jobs
+from app.routers import backtest
 
 
+# Imported lazily by the routes that need them (see PRELOAD_HEAVY_MODULES)
+HEAVY_MODULES = (
+    "app.services.market",
+    "app.services.performance",
+    "app.services.snapshots",
+    "app.utils.serialize",
+)
+
 TITLE = "Oscillo Backend API"
 SEM_VER = "1.0"
 DESCRIPTION = "Developer API for Oscillo, a portfolio tracking & paper trading platform."
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.PRELOAD_HEAVY_MODULES:
+        await asyncio.to_thread(lambda: [importlib.import_module(m) for m in HEAVY_MODULES])
+
+    # positions drift repair + periodic snapshots (disabled when interval is 0)
+    reconcile = None
+    if config.RECONCILE_INTERVAL_SECONDS > 0:
+        from app.services.snapshots import run_reconcile_job
+
+        reconcile = asyncio.create_task(
+            run_reconcile_job(get_repository(), config.RECONCILE_INTERVAL_SECONDS)
+        )
+
+    # pending limit / stop orders against new bars (disabled when interval is 0)
+    matching = None
+    if config.MATCHING_INTERVAL_SECONDS > 0:
+        from app.services.matching import run_matching_job
+
+        matching = asyncio.create_task(
+            run_matching_job(get_repository(), config.MATCHING_INTERVAL_SECONDS)
+        )
+
+    # one worker per host keeps the shared price matrix fresh
+    prices = None
+    if config.PRICE_MATRIX:
+        from app.services.bars import run_shared_prices_job
+
+        prices = asyncio.create_task(run_shared_prices_job(config.PRICE_MATRIX_REFRESH))
+
+    yield
+
+    # performance / report jobs still queued are dropped
+    await close_jobs()
+    if reconcile is not None:
+        reconcile.cancel()
+    if matching is not None:
+        matching.cancel()
+    if prices is not None:
+        prices.cancel()
+        from app.utils.shared_prices import close_shared_prices
+
+        close_shared_prices()
+    # sweep processes, if a backtest ever started them
+    if "app.utils.backtest" in sys.modules:
+        sys.modules["app.utils.backtest"].close_pool()
+    # release the shared DB / auth / cache connection pools
+    await close_repository()
+    await close_auth_client()
+    await close_cache()
+    if config.MARKET_DATA_URL:
+        from app.services.chart import close_chart_client
+
+        await close_chart_client()
+
+
 def build_app():
-    app = FastAPI()
+    # lifespan must live on the root app; mounted sub-apps never receive it
+    app = FastAPI(lifespan=lifespan)
 
     api = FastAPI(
         title=TITLE,
@@ -36,7 +116,12 @@ def build_app():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Server-Timing"],
     )
+    # opt-in per-request profiles (see utils.profiling)
+    api.add_middleware(ProfilingMiddleware)
+    # outermost: Server-Timing + per-route latency (see utils.metrics)
+    api.add_middleware(TimingMiddleware)
 
     # Include routes
     api.include_router(general.router)
@@ -44,6 +129,10 @@ def build_app():
     api.include_router(portfolios.router)
     api.include_router(orders.router)
     api.include_router(performance.router)
+    api.include_router(metrics.router)
+    api.include_router(jobs.router)
+    api.include_router(backtest.router)
+    api.include_router(admin.router)
 
     app.mount(f"/api/{SEM_VER}/", api)
 
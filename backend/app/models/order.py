@@ -5,12 +5,18 @@ Order Models
 from .base import BaseModel
 from .types import OrderType
 from app.utils.logger import setup_logger
-from app.utils.market import verify_ticker
 
 
 _logger = setup_logger()
 
 
+def _verify_ticker(ticker: str) -> bool:
+    # deferred: yfinance is only loaded once an order needs a symbol check
+    from app.utils.market import verify_ticker
+
+    return verify_ticker(ticker)
+
+
 class Order(BaseModel):
     """
     Base Class for Orders
@@ -50,31 +56,39 @@ class Order(BaseModel):
 
     def verify(
             self,
-            positions: dict[str, int]
+            positions: dict[str, int] | None = None,
+            check_ticker: bool = True
         ) -> 'Order':
         """
         Verify Order: returns self for chaining
+
+        Cash / inventory checks run only when positions are given; otherwise
+        they are left to the ledger (Repository.place_order).
+        check_ticker=False skips the Yahoo lookup for already verified symbols.
         """
         if self.quantity == 0:
             raise ValueError("Order quantity cannot be 0")
 
         if self.is_cash_transaction and self.type == OrderType.BUY:
             # this is a deposit
-            _logger.info(f"Verified deposit: {self}")
+            _logger.debug("Verified deposit: %s", self)
             return self
 
-        if not self.is_cash_transaction and not verify_ticker(self.ticker):
+        if check_ticker and not self.is_cash_transaction and not _verify_ticker(self.ticker):
             raise ValueError("Ticker not found")
 
-        if self.type == OrderType.BUY:  # buy
+        if positions is None:
+            pass
+        elif self.type == OrderType.BUY:  # buy
             if self.price * self.quantity > positions[self.CASH_TICKER]['quantity']:
                 raise ValueError("Portfolio does not have enough \
 cash to make this trade / withdrawal")
-        elif self.ticker is not None:  # sell
-            if self.quantity > positions[self.ticker]['quantity']:
+        elif self.ticker is not None:  # sell (quantity is negative)
+            held = positions.get(self.ticker, {}).get('quantity') or 0
+            if -self.quantity > held:
                 raise ValueError("Portfolio does not have the inventory \
 to make this trade")
 
-        _logger.info(f"Verified order: {self}")
+        _logger.debug("Verified order: %s", self)
 
         return self
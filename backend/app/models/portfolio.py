@@ -2,14 +2,16 @@
 Portfolio Model
 """
 
-import numpy as np
-import pandas as pd
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
 from datetime import datetime
 
 from .order import Order
 from .base import BaseModel
 
-from app.utils.timeseries import compute_portfolio_timeseries
+if TYPE_CHECKING:
+    import pandas as pd
 
 class Portfolio(BaseModel):
     """
@@ -42,5 +44,18 @@ class Portfolio(BaseModel):
         self,
         orders_df: pd.DataFrame,
         prices_df: pd.DataFrame,
+        initial_holdings: dict[str, float] | None = None,
+        initial_cash: float = 0.0,
     ) -> dict[str, list]:
-        return compute_portfolio_timeseries(prices_df, orders_df, cash_ticker=Order.CASH_TICKER, include_weights=True, compute_simple_returns=True)
+        # deferred: keeps pandas out of the portfolio CRUD import path
+        from app.utils.timeseries import compute_portfolio_timeseries
+
+        return compute_portfolio_timeseries(
+            prices_df,
+            orders_df,
+            cash_ticker=Order.CASH_TICKER,
+            include_weights=True,
+            compute_simple_returns=True,
+            initial_holdings=initial_holdings,
+            initial_cash=initial_cash,
+        )
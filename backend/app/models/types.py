@@ -14,3 +14,43 @@ class OrderType(Enum):
 
     def __str__(self):
         return self.value
+
+
+class OrderKind(Enum):
+    """
+    Enum for Order Kinds: market orders fill immediately at the submitted
+    price, the others rest as pending orders until a bar triggers them
+    """
+    MARKET = "market"
+    LIMIT = "limit"
+    STOP = "stop"
+    STOP_LIMIT = "stop_limit"
+
+    def __str__(self):
+        return self.value
+
+
+class TimeInForce(Enum):
+    """
+    Enum for how long a pending order stays open
+    """
+    GTC = "gtc"   # good til cancelled
+    DAY = "day"   # until the close of the session it was placed in (or the next one)
+
+    def __str__(self):
+        return self.value
+
+
+class PendingStatus(Enum):
+    """
+    Enum for pending order states (open and triggered ones are live)
+    """
+    OPEN = "open"
+    TRIGGERED = "triggered"  # stop-limit whose stop was hit; rests as a limit
+    FILLED = "filled"
+    CANCELLED = "cancelled"
+    EXPIRED = "expired"
+    REJECTED = "rejected"    # triggered, but the ledger refused the fill
+
+    def __str__(self):
+        return self.value
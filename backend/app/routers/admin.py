@@ -0,0 +1,41 @@
+"""
+Admin endpoints (X-Admin-Token, see utils.auth.require_admin)
+
+admin/profiles - stored request profiles, newest first
+admin/profiles/{profile_id} - call stats and memory hot spots
+admin/profiles/{profile_id}/pstats - raw cProfile stats (pstats / snakeviz)
+"""
+
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import Response
+
+from app.utils.auth import require_admin
+from app.utils.profiling import list_profiles, get_profile, get_pstats
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles")
+async def get_profiles():
+    return list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile_detail(profile_id: str):
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
+@router.get("/profiles/{profile_id}/pstats")
+async def download_pstats(profile_id: str):
+    data = get_pstats(profile_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'}
+    )
@@ -0,0 +1,80 @@
+"""
+Strategy backtest endpoints (see services.backtest)
+
+backtest - post a strategy run or parameter sweep (result, or 202 + jobs/{job_id})
+backtest/strategies - built-in strategies and their parameters
+"""
+
+import inspect
+
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+from fastapi import APIRouter, Request, HTTPException, Query, Depends
+from fastapi.responses import ORJSONResponse
+
+from app.configs import config
+from app.services.backtest import submit_backtest
+from app.services.jobs import public, wait
+from app.utils.auth import get_current_user_id
+
+
+router = APIRouter(prefix="/backtest", tags=["Backtest"])
+
+
+class BacktestRequest(BaseModel):
+    tickers: List[str]
+    start: str
+    end: Optional[str] = None
+    strategy: str = "rebalance"
+    params: Dict[str, Any] = Field(default_factory=dict)
+    sweep: Optional[Dict[str, List[Any]]] = None
+    interval: str = "1d"
+    initial_cash: float = Field(100_000.0, gt=0)
+    commission_bps: float = Field(0.0, ge=0)
+
+
+@router.post("")
+async def post_backtest(
+    request: Request,
+    body: BacktestRequest,
+    defer: bool = Query(False, description="Answer 202 with a job id instead of waiting for the result"),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Simulate a built-in strategy over daily bars: the portfolio value series
+    and risk stats of one run, or the stats of every sweep combination.
+
+    Waits up to JOB_SYNC_TIMEOUT for the job (defer=true: not at all), then
+    falls back to 202 + Location: jobs/{job_id}.
+    """
+    try:
+        job = await submit_backtest(user_id, body.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not defer:
+        job = await wait(job["id"], config.JOB_SYNC_TIMEOUT)
+    if job["status"] == "done":
+        return ORJSONResponse(job["result"])
+    if job["status"] == "failed":
+        raise HTTPException(status_code=job.get("status_code", 500), detail=job["error"])
+    return ORJSONResponse(
+        public(job),
+        status_code=202,
+        headers={"Location": str(request.url_for("get_job", job_id=job["id"]))}
+    )
+
+
+@router.get("/strategies")
+async def get_strategies(user_id: str = Depends(get_current_user_id)):
+    from app.utils.backtest import STRATEGIES
+
+    return {
+        name: {
+            "description": inspect.getdoc(fn),
+            "params": {
+                p.name: p.default for p in list(inspect.signature(fn).parameters.values())[1:]
+            },
+        }
+        for name, fn in STRATEGIES.items()
+    }
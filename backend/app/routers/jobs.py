@@ -0,0 +1,26 @@
+"""
+Background job endpoints (see services.jobs)
+
+jobs/{job_id} - status, and the result once done
+"""
+
+from fastapi import APIRouter, Request, HTTPException, Depends
+
+from app.services.jobs import get_job as find_job, public
+from app.utils.auth import get_current_user_id
+
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/{job_id}", name="get_job")
+async def get_job(
+    request: Request,
+    job_id: str,
+    user_id: str = Depends(get_current_user_id)
+):
+    job = await find_job(job_id)
+    # other users' jobs look like missing ones
+    if job is None or job.get("owner") != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return public(job)
@@ -1,8 +1,6 @@
 import asyncio
 from fastapi import APIRouter, HTTPException
 
-import app.services.market as market
-
 
 router = APIRouter(
     prefix="/market",
@@ -34,6 +32,9 @@ async def get_recent_prices(
 
     ticker_list = tickers.strip().upper().split(",")
 
+    # deferred: yfinance / pandas load on the first market request
+    import app.services.market as market
+
     try:
         results = await asyncio.gather(*[
             market.fetch_last_single(
@@ -70,6 +71,8 @@ async def get_price_history(
     if timeout <= 0 or timeout > 240:
         raise HTTPException(status_code=400, detail="Timeout must be between 1 and 240 seconds.")
 
+    import app.services.market as market
+
     try:
         ticker_dfs = await market.fetch_full_data(
             tickers,
@@ -0,0 +1,21 @@
+"""
+Metrics router
+
+GET /metrics - Prometheus text exposition of request / stage latency
+histograms and cache hit/miss counters (see utils.metrics); admin only
+(X-Admin-Token, see utils.auth.require_admin)
+"""
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.utils.auth import require_admin
+from app.utils.metrics import render
+
+
+router = APIRouter(tags=["Metrics"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
@@ -1,38 +1,82 @@
 """
 Orders related endpoints.
 
-portfolios/{portfolio_id}/orders - get / post
+portfolios/{portfolio_id}/orders - get / post (limit / stop kinds rest as pending orders)
+portfolios/{portfolio_id}/orders/bulk - post (market orders)
+portfolios/{portfolio_id}/orders/pending - get
+portfolios/{portfolio_id}/orders/pending/{order_id} - delete (cancel)
 """
 
+from typing import List, Optional
 from pydantic import BaseModel
-from fastapi import APIRouter, Request, HTTPException, Body
+from fastapi import APIRouter, Request, HTTPException, Body, Depends, Query
 
-from app.utils.auth import get_current_user_id
-from app.services.orders import create_order, get_all_orders
+from app.db import Repository, get_repository
+from app.models.types import OrderKind, TimeInForce
+from app.utils.auth import get_portfolio_owner
+from app.services.orders import (
+    create_order,
+    create_orders,
+    get_all_orders,
+    get_orders_page
+)
+from app.services.matching import (
+    submit_pending_order,
+    get_pending_orders,
+    cancel_pending_order
+)
 
 
 router = APIRouter(prefix="/portfolios", tags=["Orders", "Portfolios"])
 
+MAX_BULK_ORDERS = 1000
+MAX_PAGE_SIZE = 1000
+
 
 class OrderRequest(BaseModel):
     ticker: str
     quantity: int
-    price: float
+    price: Optional[float] = None  # market orders
+    kind: OrderKind = OrderKind.MARKET
+    limit_price: Optional[float] = None
+    stop_price: Optional[float] = None
+    time_in_force: TimeInForce = TimeInForce.GTC
 
 
 @router.get("/{portfolio_id}/orders")
 async def get_orders(
     request: Request,
     portfolio_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated order columns"),
+    repo: Repository = Depends(get_repository),
+    user_id: str = Depends(get_portfolio_owner),
 ):
-    try:
-        get_current_user_id(request)
+    """
+    Orders for a given portfolio, oldest first.
 
-        pos = get_all_orders(portfolio_id)
+    Pass limit (and the returned next_cursor) to page through the history
+    by (timestamp, order_id); fields= projects the returned columns.
+    """
+    try:
+        if limit is None and cursor is None and fields is None:
+            pos = await get_all_orders(repo, portfolio_id)
+            return {
+                "status": "success",
+                "orders": pos
+            }
 
+        page = await get_orders_page(
+            repo,
+            portfolio_id,
+            limit=limit or MAX_PAGE_SIZE,
+            cursor=cursor,
+            fields=fields
+        )
         return {
             "status": "success",
-            "orders": pos
+            **page
         }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -44,15 +88,38 @@ async def get_orders(
 async def add_order(
     request: Request,
     portfolio_id: str,
-    order: OrderRequest = Body(...)
+    order: OrderRequest = Body(...),
+    repo: Repository = Depends(get_repository),
+    user_id: str = Depends(get_portfolio_owner),
 ):
     """
     Create a new order (buy or sell) for a given portfolio.
+
+    Market orders fill immediately at price; limit, stop and stop-limit
+    orders are stored as pending and filled by the matcher (see
+    services.matching) when a bar crosses them.
     """
     try:
-        get_current_user_id(request)
+        if order.kind != OrderKind.MARKET:
+            pending = await submit_pending_order(
+                repo,
+                portfolio_id,
+                order.ticker,
+                order.quantity,
+                order.kind,
+                limit_price=order.limit_price,
+                stop_price=order.stop_price,
+                time_in_force=order.time_in_force
+            )
+            return {
+                "status": "success",
+                "pending_order": pending
+            }
 
+        if order.price is None:
+            raise ValueError("Market orders need a price")
         new_order = await create_order(
+            repo,
             portfolio_id,
             order.ticker,
             order.quantity,
@@ -65,4 +132,82 @@ async def add_order(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{portfolio_id}/orders/pending")
+async def get_pending(
+    request: Request,
+    portfolio_id: str,
+    status: Optional[str] = Query(None, description="Comma-separated statuses (open, triggered, filled, ...)"),
+    repo: Repository = Depends(get_repository),
+    user_id: str = Depends(get_portfolio_owner),
+):
+    """
+    Pending (limit / stop) orders of a portfolio, oldest first.
+    """
+    try:
+        statuses = [s.strip().lower() for s in status.split(",") if s.strip()] if status else None
+        pending = await get_pending_orders(repo, portfolio_id, statuses)
+        return {
+            "status": "success",
+            "pending_orders": pending
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/{portfolio_id}/orders/pending/{order_id}")
+async def cancel_pending(
+    request: Request,
+    portfolio_id: str,
+    order_id: str,
+    repo: Repository = Depends(get_repository),
+    user_id: str = Depends(get_portfolio_owner),
+):
+    """
+    Cancel an open (or triggered) pending order.
+    """
+    cancelled = await cancel_pending_order(repo, portfolio_id, order_id)
+    if cancelled is None:
+        raise HTTPException(status_code=404, detail="Pending order not found or no longer open")
+    return {
+        "status": "success",
+        "pending_order": cancelled
+    }
+
+
+@router.post("/{portfolio_id}/orders/bulk")
+async def add_orders(
+    request: Request,
+    portfolio_id: str,
+    orders: List[OrderRequest] = Body(...),
+    repo: Repository = Depends(get_repository),
+    user_id: str = Depends(get_portfolio_owner),
+):
+    """
+    Create many orders for a given portfolio in one call.
+
+    Orders are checked in submission order; rejected ones are reported per
+    order and do not block the rest.
+    """
+    try:
+        if len(orders) > MAX_BULK_ORDERS:
+            raise ValueError(f"At most {MAX_BULK_ORDERS} orders per request")
+
+        results = await create_orders(
+            repo,
+            portfolio_id,
+            [{"ticker": order.ticker, "quantity": order.quantity, "price": order.price, "kind": order.kind}
+             for order in orders]
+        )
+        return {
+            "status": "success",
+            "results": results
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
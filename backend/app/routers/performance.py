@@ -1,38 +1,172 @@
 """
 Portfolio related endpoints.
 
-performance/{portfolio_id}?period=1D|1W|1M|YTD|1Y|ALL
+performance/{portfolio_id}?period=1D|1W|1M|YTD|1Y|ALL[&defer=true]
+performance/{portfolio_id}/jobs?period=... - post (202, poll jobs/{job_id})
+performance/{portfolio_id}/bundle?periods=1D,1W,... (defaults to all periods)
+performance/{portfolio_id}/whatif?period=... - post hypothetical orders (nothing is stored)
 """
 
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
-from fastapi import APIRouter, Request, HTTPException, Body, Query
+from fastapi import APIRouter, Request, HTTPException, Body, Query, Depends
 
+from app.db import Repository, get_repository
+from app.services.jobs import public, submit_performance
 from app.utils.logger import setup_logger
-from app.utils.auth import get_current_user_id
-
-from app.services.performance import get_portfolio_data
-from app.utils.logger import setup_logger
+from app.utils.auth import get_portfolio_owner
+from app.utils.metrics import span
 from fastapi.responses import ORJSONResponse
-from app.utils.serialize import serialize_performance_legacy
 
 router = APIRouter(prefix="/performance", tags=["Portfolios", "Performance"])
 _logger = setup_logger()
 
+class HypotheticalOrder(BaseModel):
+    ticker: str
+    quantity: float
+    price: Optional[float] = None  # close of the bar it aligns to
+    timestamp: Optional[str] = None  # now
+
+
+class WhatIfRequest(BaseModel):
+    orders: List[HypotheticalOrder]
+
+
+def _accepted(request: Request, job: dict) -> ORJSONResponse:
+    """
+    202 with the job record and a Location to poll (jobs/{job_id})
+    """
+    return ORJSONResponse(
+        public(job),
+        status_code=202,
+        headers={"Location": str(request.url_for("get_job", job_id=job["id"]))}
+    )
+
+
 @router.get("/{portfolio_id}")
-async def get_portfolio_performance(request: Request, portfolio_id: str, period: str):
-    _logger.info(period)
-    user_id = get_current_user_id(request)
-    raw = await get_portfolio_data(user_id=user_id, portfolio_id=portfolio_id, granularity=period)
-    legacy = serialize_performance_legacy(raw.get("performance", {}))
-
-    payload = {
-        "id": str(raw.get("id", portfolio_id)),
-        "user_id": str(user_id),
-        "name": raw.get("name", ""),
-        "created_at": raw.get("start_dt", ""),
-        "last_updated": raw.get("start_dt", ""),
-        "performance": legacy,
-    }
+async def get_portfolio_performance(
+    request: Request,
+    portfolio_id: str,
+    period: str,
+    defer: bool = Query(False, description="Compute in a background job: 202 with a job id until it is done"),
+    repo: Repository = Depends(get_repository),
+    user_id: str = Depends(get_portfolio_owner)
+):
+    """
+    Performance for one period, computed in the request.
+
+    defer=true hands it to a background job instead (see services.jobs,
+    shared by identical requests): answers from a finished job for the
+    current data, otherwise 202 + Location: jobs/{job_id}. The plain request
+    never waits on the job pool, so a busy pool cannot cap or defer it.
+    """
+    if not defer:
+        from app.services.performance import get_performance_payload
+
+        try:
+            payload = await get_performance_payload(repo, user_id, portfolio_id, period)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return ORJSONResponse(payload)
+
+    try:
+        job = await submit_performance(repo, user_id=user_id, portfolio_id=portfolio_id, period=period)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if job["status"] == "done":
+        return ORJSONResponse(job["result"])
+    if job["status"] == "failed":
+        raise HTTPException(status_code=job.get("status_code", 500), detail=job["error"])
+    return _accepted(request, job)
+
+
+@router.post("/{portfolio_id}/jobs", status_code=202)
+async def submit_portfolio_performance(
+    request: Request,
+    portfolio_id: str,
+    period: str,
+    repo: Repository = Depends(get_repository),
+    user_id: str = Depends(get_portfolio_owner)
+):
+    """
+    Queue a performance job; poll the returned Location (jobs/{job_id})
+    """
+    try:
+        job = await submit_performance(repo, user_id=user_id, portfolio_id=portfolio_id, period=period)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return _accepted(request, job)
+
+
+@router.get("/{portfolio_id}/bundle")
+async def get_portfolio_performance_bundle(
+    request: Request,
+    portfolio_id: str,
+    periods: Optional[str] = Query(None, description="Comma-separated subset of 1D,1W,1M,YTD,1Y,ALL"),
+    repo: Repository = Depends(get_repository),
+    user_id: str = Depends(get_portfolio_owner)
+):
+    """
+    Performance for several periods at once, keyed by period.
+
+    All periods share one ledger read and one price fetch per bar interval,
+    so the dashboard can switch tabs client-side.
+    """
+    from app.services.performance import (
+        get_portfolio_performance as get_performance_by_period,
+        parse_periods
+    )
+    from app.utils.serialize import serialize_performance_legacy
+
+    try:
+        granularities = parse_periods(periods)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    perf = await get_performance_by_period(
+        repo,
+        user_id=user_id,
+        portfolio_id=portfolio_id,
+        granularities=granularities
+    )
+
+    with span("serialize"):
+        payload = {
+            "id": str(portfolio_id),
+            "user_id": str(user_id),
+            "performance": {
+                g: serialize_performance_legacy(p) for g, p in perf.items()
+            },
+        }
     return ORJSONResponse(payload)
 
+
+@router.post("/{portfolio_id}/whatif")
+async def simulate_portfolio_orders(
+    portfolio_id: str,
+    body: WhatIfRequest,
+    period: str = "ALL",
+    repo: Repository = Depends(get_repository),
+    user_id: str = Depends(get_portfolio_owner)
+):
+    """
+    Performance for one period as if the hypothetical orders had also been
+    placed: the real and simulated end state plus the diff (simulated - real)
+    from the first bar they change. Nothing is written.
+    """
+    from app.services.whatif import simulate_orders
+
+    try:
+        payload = await simulate_orders(
+            repo,
+            user_id=user_id,
+            portfolio_id=portfolio_id,
+            orders=[o.model_dump() for o in body.orders],
+            granularity=period
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return ORJSONResponse(payload)
@@ -4,14 +4,16 @@ Portfolio related endpoints.
 portfolios/ - get / post portfolios for an authenticated user
 portfolios/{portfolio_id} - delete
 portfolios/{portfolio_id}/orders - get / post
+portfolios/{portfolio_id}/holdings - get (as of any time)
 """
 
 from typing import Optional
 from pydantic import BaseModel
-from fastapi import APIRouter, Request, HTTPException, Body
+from fastapi import APIRouter, Request, HTTPException, Body, Depends
 
+from app.db import Repository, get_repository
 from app.utils.logger import setup_logger
-from app.utils.auth import get_current_user_id
+from app.utils.auth import get_current_user_id, get_portfolio_owner
 from app.services.positions import get_portfolio_positions
 from app.services.portfolios import (
     get_all_portfolios,
@@ -36,10 +38,18 @@ class PortfolioRequest(BaseModel):
 
 
 @router.get("")
-async def list_portfolios(request: Request):
+async def list_portfolios(
+    request: Request,
+    with_values: bool = False,
+    repo: Repository = Depends(get_repository)
+):
+    """
+    List the user's portfolios; with_values=true also returns present_value
+    and positions for each (one batched valuation instead of N detail calls).
+    """
     try:
-        user_id = get_current_user_id(request)
-        res = get_all_portfolios(user_id)
+        user_id = await get_current_user_id(request)
+        res = await get_all_portfolios(repo, user_id, with_values=with_values)
         return res
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -51,11 +61,12 @@ async def list_portfolios(request: Request):
 @router.get("/{portfolio_id}")
 async def get_portfolio(
     request: Request, 
-    portfolio_id: str
+    portfolio_id: str,
+    repo: Repository = Depends(get_repository),
+    user_id: str = Depends(get_portfolio_owner)
 ):
     try:
-        user_id = get_current_user_id(request)
-        return await get_portfolio_data(user_id, portfolio_id)
+        return await get_portfolio_data(repo, user_id, portfolio_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except HTTPException as e:
@@ -65,13 +76,17 @@ async def get_portfolio(
 
 
 @router.post("")
-async def add_portfolio(request: Request, new_portfolio: PortfolioRequest = Body(...)):
+async def add_portfolio(
+    request: Request,
+    new_portfolio: PortfolioRequest = Body(...),
+    repo: Repository = Depends(get_repository)
+):
     """
     Create a new portfolio for the authenticated user.
     Request body should include: name, initial_investment, capital.
     """
     try:
-        user_id = get_current_user_id(request)
+        user_id = await get_current_user_id(request)
 
         name = new_portfolio.name
 
@@ -81,7 +96,7 @@ async def add_portfolio(request: Request, new_portfolio: PortfolioRequest = Body
                 detail="Missing required fields: name, initial_investment"
             )
 
-        return create_portfolio(user_id, name)
+        return await create_portfolio(repo, user_id, name)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except HTTPException as e:
@@ -91,10 +106,14 @@ async def add_portfolio(request: Request, new_portfolio: PortfolioRequest = Body
 
 
 @router.delete("/{portfolio_id}")
-async def remove_portfolio(portfolio_id: str, request: Request):
+async def remove_portfolio(
+    portfolio_id: str,
+    request: Request,
+    repo: Repository = Depends(get_repository),
+    user_id: str = Depends(get_portfolio_owner)
+):
     try:
-        user_id = get_current_user_id(request)
-        return delete_portfolio(user_id, portfolio_id)
+        return await delete_portfolio(repo, user_id, portfolio_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except HTTPException as e:
@@ -107,11 +126,11 @@ async def remove_portfolio(portfolio_id: str, request: Request):
 async def get_positions(
     request: Request,
     portfolio_id: str,
+    repo: Repository = Depends(get_repository),
+    user_id: str = Depends(get_portfolio_owner),
 ):
     try:
-        get_current_user_id(request)
-
-        pos = get_portfolio_positions(portfolio_id)
+        pos = await get_portfolio_positions(repo, portfolio_id)
 
         return {
             "status": "success",
@@ -123,3 +142,27 @@ async def get_positions(
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{portfolio_id}/holdings")
+async def get_holdings(
+    request: Request,
+    portfolio_id: str,
+    at: Optional[str] = None,
+    repo: Repository = Depends(get_repository),
+    user_id: str = Depends(get_portfolio_owner),
+):
+    """
+    Holdings and cash at `at` (ISO 8601, default now), from the nearest
+    position snapshot plus the orders after it.
+    """
+    from app.services.snapshots import holdings_at
+
+    try:
+        return await holdings_at(repo, portfolio_id, at)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,152 @@
+"""
+Backtest Service - strategy simulations over market data
+
+Prices come from the same path as performance (shared price matrix or the
+bar store, see services.performance), are forward-filled per ticker and
+handed to utils.backtest. Runs go through background jobs (services.jobs),
+so identical requests on the same day share one simulation; parameter
+sweeps fan out over the backtest process pool.
+
+pandas / numpy are only imported once a backtest is submitted.
+"""
+
+import hashlib
+import asyncio
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from app.configs import config
+from app.utils.logger import setup_logger
+from app.utils.metrics import span
+from .jobs import submit
+
+
+_logger = setup_logger()
+
+INTERVALS = ("1d", "1wk")
+MAX_TICKERS = 500
+
+
+async def load_prices(tickers: List[str], start, end, interval: str = "1d"):
+    """
+    Wide, forward-filled close matrix (DataFrame) for [start, end]
+    """
+    from .performance import _fetch_prices, _normalize_prices
+
+    raw = await _fetch_prices(tickers, start, end, interval)
+    prices = _normalize_prices(raw, interval)
+    missing = sorted(set(tickers) - set(prices.columns))
+    if missing:
+        raise ValueError(f"No prices for: {missing}")
+    return prices[tickers].ffill()
+
+
+def _window(start: str, end: Optional[str]):
+    import pandas as pd
+
+    def utc(value):
+        ts = pd.Timestamp(value)
+        return ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
+
+    try:
+        lo = utc(start)
+        hi = utc(end) if end else pd.Timestamp.now(tz="UTC")
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid backtest window: {e}")
+    if lo >= hi:
+        raise ValueError("Backtest start must be before its end")
+    return lo, hi
+
+
+async def run_backtest(
+    tickers: List[str],
+    start: str,
+    end: Optional[str],
+    strategy: str,
+    params: Optional[Dict[str, Any]] = None,
+    sweep: Optional[Dict[str, List[Any]]] = None,
+    interval: str = "1d",
+    initial_cash: float = 100_000.0,
+    commission_bps: float = 0.0,
+) -> Dict[str, Any]:
+    """
+    One strategy run (series + stats), or the stats of every combination
+    of a parameter sweep (on top of params), best Sharpe first
+    """
+    from app.utils import backtest
+    from app.utils.serialize import serialize_performance_legacy
+
+    lo, hi = _window(start, end)
+    prices = await load_prices(tickers, lo, hi, interval)
+    options = {"initial_cash": initial_cash, "commission_bps": commission_bps}
+
+    if sweep:
+        fixed = {k: [v] for k, v in (params or {}).items() if k not in sweep}
+        with span("backtest_sweep"):
+            results = await asyncio.to_thread(
+                backtest.sweep, prices, strategy, {**fixed, **sweep},
+                workers=config.BACKTEST_WORKERS or None, **options
+            )
+        results.sort(key=lambda r: -r["stats"]["sharpe"] if "stats" in r else float("inf"))
+        return {"strategy": strategy, "runs": results}
+
+    with span("backtest"):
+        result = await asyncio.to_thread(backtest.run_strategy, prices, strategy, params, **options)
+    with span("serialize"):
+        trades = result["trades"]
+        return {
+            "strategy": strategy,
+            "params": params or {},
+            "stats": result["stats"],
+            "performance": serialize_performance_legacy(result),
+            "rebalances": [ts.isoformat() for ts in trades.index],
+        }
+
+
+def _check(tickers: List[str], strategy: str, sweep: Optional[Dict[str, List[Any]]], interval: str) -> List[str]:
+    from app.utils.backtest import STRATEGIES
+
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+    if not tickers:
+        raise ValueError("At least one ticker is required")
+    if len(tickers) > MAX_TICKERS:
+        raise ValueError(f"At most {MAX_TICKERS} tickers per backtest")
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy}. Must be one of {sorted(STRATEGIES)}")
+    if interval not in INTERVALS:
+        raise ValueError(f"Invalid interval: {interval}. Must be one of {list(INTERVALS)}")
+    if sweep:
+        runs = 1
+        for values in sweep.values():
+            if not isinstance(values, list) or not values:
+                raise ValueError("Sweep values must be non-empty lists")
+            runs *= len(values)
+        if runs > config.BACKTEST_MAX_RUNS:
+            raise ValueError(f"Sweep has {runs} runs; at most {config.BACKTEST_MAX_RUNS} allowed")
+    return tickers
+
+
+async def submit_backtest(user_id: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Backtest job for run_backtest(**request), deduplicated per user by the
+    request and the current day (daily bars only change once a day)
+    """
+    request = dict(request, tickers=_check(
+        request["tickers"], request["strategy"], request.get("sweep"), request.get("interval", "1d")
+    ))
+    digest = hashlib.sha1(orjson.dumps(request, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    day = datetime.now(timezone.utc).date().isoformat()
+
+    async def run():
+        return await run_backtest(**request)
+
+    return await submit(
+        "backtest",
+        f"{user_id}|{digest}|{day}",
+        owner=user_id,
+        params={"strategy": request["strategy"], "tickers": len(request["tickers"]), "sweep": bool(request.get("sweep"))},
+        run=run,
+    )
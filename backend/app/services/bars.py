@@ -0,0 +1,264 @@
+"""
+Bar Store - window-exact price bars per (ticker, interval)
+
+Keeps the bars already downloaded for each (ticker, interval) together with
+the [start, end] window they cover, and only asks Yahoo for the parts of a
+requested window that are not held yet. With a shared cache tier
+(CACHE_URL) entries are also published there, and a worker missing part of a
+window first adopts what another worker already downloaded.
+"""
+
+import time
+import asyncio
+
+import pandas as pd
+
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Any
+
+from app.configs import config
+from app.utils import shared_prices
+from app.utils.cache import TieredCache
+from app.utils.logger import setup_logger
+from app.utils.metrics import cache_event
+from app.services.market import fetch_range
+from app.utils.market_calendar import has_session
+
+
+_logger = setup_logger()
+
+# (ticker, interval) -> {"data": DataFrame, "start": ts, "end": ts, "timestamp": fetched_at},
+# least recently used first (BAR_STORE_SIZE entries at most)
+_store: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+
+# A stored right edge younger than this is treated as covering "now"
+BAR_TTL = 30  # seconds
+
+# Shared tier only ("{ticker}|{interval}" -> store entry); _store is the local tier
+SHARED_TTL = 6 * 3600  # seconds
+_shared = TieredCache("bars", ttl=SHARED_TTL, local_size=0)
+
+# How far back the store keeps bars per interval (Yahoo serves no more anyway)
+RETENTION = {
+    "1m": pd.Timedelta(days=8),
+    "2m": pd.Timedelta(days=60),
+    "5m": pd.Timedelta(days=60),
+    "15m": pd.Timedelta(days=60),
+    "30m": pd.Timedelta(days=60),
+    "60m": pd.Timedelta(days=730),
+    "90m": pd.Timedelta(days=60),
+}
+
+DAILY_INTERVALS = {"1d", "5d", "1wk", "1mo", "3mo"}
+
+
+def _bar_step(interval: str) -> pd.Timedelta:
+    """
+    Width of one bar; daily-like intervals round up to a day since Yahoo's
+    `end` is exclusive and date-granular for them.
+    """
+    if interval in DAILY_INTERVALS:
+        return pd.Timedelta(days=1)
+    return pd.Timedelta(interval.replace("m", "min"))
+
+
+def _put(key: Tuple[str, str], entry: Dict[str, Any]) -> None:
+    _store[key] = entry
+    _store.move_to_end(key)
+    while len(_store) > config.BAR_STORE_SIZE:
+        _store.popitem(last=False)
+
+
+def _missing_segments(
+    key: Tuple[str, str],
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    now: float
+) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    Sub-windows of [start, end] the store does not hold for key, skipping
+    any the exchange was closed for (those can only come back empty).
+    """
+    entry = _store.get(key)
+    if entry is None:
+        segments = [(start, end)]
+    else:
+        segments = []
+        if start < entry["start"]:
+            segments.append((start, entry["start"]))
+
+        fresh = now - entry["timestamp"] < BAR_TTL
+        if end > entry["end"] and not fresh:
+            segments.append((entry["end"], end))
+
+    return [(s, e) for s, e in segments if has_session(s, e)]
+
+
+def _merge(
+    key: Tuple[str, str],
+    df: pd.DataFrame,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    now: float
+) -> None:
+    """
+    Fold freshly downloaded bars for [start, end] into the store.
+    """
+    entry = _store.get(key)
+    if entry is None:
+        entry = {"data": df, "start": start, "end": end, "timestamp": now}
+    else:
+        frames = [f for f in (entry["data"], df) if not f.empty]
+        data = pd.concat(frames) if frames else entry["data"]
+        data = data[~data.index.duplicated(keep="last")].sort_index()
+        entry = {
+            "data": data,
+            "start": min(entry["start"], start),
+            "end": max(entry["end"], end),
+            "timestamp": now if end >= entry["end"] else entry["timestamp"],
+        }
+
+    retention = RETENTION.get(key[1])
+    if retention is not None:
+        floor = pd.Timestamp.now(tz="UTC") - retention
+        if entry["start"] < floor:
+            entry["data"] = entry["data"].loc[entry["data"].index >= floor]
+            entry["start"] = floor
+
+    _put(key, entry)
+
+
+def _adopt(key: Tuple[str, str], shared: Dict[str, Any]) -> None:
+    """
+    Fold an entry published by another worker into the store: merged when
+    the windows overlap, otherwise the one reaching further right wins.
+    """
+    entry = _store.get(key)
+    if entry is None:
+        _put(key, shared)
+    elif shared["start"] <= entry["end"] and entry["start"] <= shared["end"]:
+        _merge(key, shared["data"], shared["start"], shared["end"], shared["timestamp"])
+    elif shared["end"] > entry["end"]:
+        _put(key, shared)
+
+
+def _shared_key(key: Tuple[str, str]) -> str:
+    return f"{key[0]}|{key[1]}"
+
+
+async def fetch_bars(
+    tickers: List[str],
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    interval: str = "1d",
+    timeout: int = 10,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Bars for exactly [start, end] per ticker, downloading only what the store
+    is missing. Tickers missing the same segment share one download.
+
+    Returns a dict {ticker: DataFrame}, index tz-aware UTC.
+    """
+    tickers = sorted(set(t.strip().upper() for t in tickers if t.strip()))
+    if not tickers:
+        return {}
+
+    now = time.time()
+    # bars past "now" don't exist yet; never record them as covered
+    end = min(end, pd.Timestamp(now, unit="s", tz="UTC"))
+
+    # ---- Adopt what other workers already hold ----
+    stale = [(t, interval) for t in tickers if _missing_segments((t, interval), start, end, now)]
+    if stale and _shared.shared is not None:
+        held = await _shared.get_many([_shared_key(k) for k in stale])
+        for key in stale:
+            if _shared_key(key) in held:
+                _adopt(key, held[_shared_key(key)])
+
+    # ---- Plan: group tickers by the segment they are missing ----
+    plan: Dict[Tuple[pd.Timestamp, pd.Timestamp], List[str]] = {}
+    misses = 0
+    for t in tickers:
+        segments = _missing_segments((t, interval), start, end, now)
+        misses += bool(segments)
+        for segment in segments:
+            plan.setdefault(segment, []).append(t)
+    cache_event("bars", hit=True, amount=len(tickers) - misses)
+    cache_event("bars", hit=False, amount=misses)
+
+    # ---- Fetch each segment once ----
+    step = _bar_step(interval)
+    segments = list(plan.items())
+    daily = interval in DAILY_INTERVALS
+    fetched = await asyncio.gather(*[
+        # daily bars are stamped at midnight; a mid-day start would skip that day's bar
+        fetch_range(members, s.normalize() if daily else s, e + step, interval=interval, timeout=timeout)
+        for (s, e), members in segments
+    ])
+
+    merged = set()
+    for ((s, e), members), frames in zip(segments, fetched):
+        _logger.debug({"bars_fetch": members, "interval": interval, "window": (s, e)})
+        for t in members:
+            df = frames.get(t)
+            # Yahoo answers transient failures with nothing: leave the window
+            # uncovered so the next request retries it
+            if df is None or df.empty:
+                continue
+            _merge((t, interval), df, s, e, now)
+            merged.add((t, interval))
+
+    if merged and _shared.shared is not None:
+        await _shared.set_many({_shared_key(k): _store[k] for k in merged if k in _store})
+
+    # ---- Serve from the store ----
+    out: Dict[str, pd.DataFrame] = {}
+    for t in tickers:
+        entry = _store.get((t, interval))
+        if entry is None:
+            out[t] = pd.DataFrame(index=pd.DatetimeIndex([], tz="UTC"))
+            continue
+        _store.move_to_end((t, interval))
+        data = entry["data"]
+        if not data.empty:
+            data = data.loc[(data.index >= start) & (data.index <= end)]
+        out[t] = data
+
+    return out
+
+
+async def refresh_shared_prices() -> None:
+    """
+    Owner side of the shared price matrix (utils.shared_prices): bring the
+    wanted tickers' bars up to date through the store and publish them
+    """
+    now = pd.Timestamp.now(tz="UTC")
+    blocks = {}
+    for interval in config.PRICE_MATRIX_INTERVALS:
+        tickers = shared_prices.wanted(interval)
+        if not tickers:
+            continue
+        start = now - RETENTION.get(interval, pd.Timedelta(days=8))
+        frames = await fetch_bars(tickers, start, now, interval=interval)
+        block = shared_prices.PriceBlock.from_frames(
+            interval, frames, start, now, time.time(), sessions_only=interval not in DAILY_INTERVALS
+        )
+        if block is not None:
+            blocks[interval] = block
+
+    if blocks:
+        shared_prices.publish(blocks)
+
+
+async def run_shared_prices_job(interval: float) -> None:
+    """
+    Background loop: every `interval` seconds, refresh the shared price
+    matrix if this worker holds (or can take) ownership (until cancelled)
+    """
+    while True:
+        try:
+            if shared_prices.acquire_ownership():
+                await refresh_shared_prices()
+        except Exception as e:
+            _logger.error("Shared price matrix refresh failed: %s", e)
+        await asyncio.sleep(interval)
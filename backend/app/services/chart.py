@@ -0,0 +1,185 @@
+"""
+Chart API Client - market data straight from a Yahoo chart API endpoint
+
+Used instead of yfinance when MARKET_DATA_URL is set: one pooled async HTTP
+client, one /v8/finance/chart/{symbol} request per ticker, parsed into the
+same {ticker: OHLCV DataFrame} shape yf.download produces.
+"""
+
+import asyncio
+
+import httpx
+import pandas as pd
+
+from typing import Any, Dict, List, Optional
+
+from app.configs import config
+from app.utils.logger import setup_logger
+
+
+_logger = setup_logger()
+
+_client: Optional[httpx.AsyncClient] = None
+
+_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+def _http() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(base_url=config.MARKET_DATA_URL, headers=_HEADERS)
+    return _client
+
+
+async def close_chart_client() -> None:
+    """
+    Close the pooled chart API client (app shutdown)
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _params(
+    period: Optional[str],
+    start: Optional[pd.Timestamp],
+    end: Optional[pd.Timestamp],
+    interval: str,
+    prepost: bool
+) -> Dict[str, str]:
+    params = {
+        "interval": interval,
+        "includePrePost": str(bool(prepost)).lower(),
+        "events": "div,splits",
+    }
+    if start is not None:
+        params["period1"] = str(int(pd.Timestamp(start).timestamp()))
+        params["period2"] = str(int(pd.Timestamp(end if end is not None else pd.Timestamp.now(tz="UTC")).timestamp()))
+    else:
+        params["range"] = period or "1d"
+    return params
+
+
+def parse_chart(result: Optional[Dict[str, Any]], auto_adjust: bool = True) -> pd.DataFrame:
+    """
+    One chart `result` -> OHLCV frame (tz-aware UTC index), empty if no bars.
+    auto_adjust scales OHLC by adjclose / close like yfinance does.
+    """
+    empty = pd.DataFrame(index=pd.DatetimeIndex([], tz="UTC"))
+    if not result or not result.get("timestamp"):
+        return empty
+
+    quote = (result.get("indicators", {}).get("quote") or [{}])[0]
+    index = pd.to_datetime(result["timestamp"], unit="s", utc=True)
+    df = pd.DataFrame({
+        "Open": quote.get("open"),
+        "High": quote.get("high"),
+        "Low": quote.get("low"),
+        "Close": quote.get("close"),
+        "Volume": quote.get("volume"),
+    }, index=index, dtype="float64")
+
+    adjclose = (result.get("indicators", {}).get("adjclose") or [{}])[0].get("adjclose")
+    if adjclose is not None:
+        adj = pd.Series(adjclose, index=index, dtype="float64")
+        if auto_adjust:
+            ratio = adj / df["Close"]
+            for col in ("Open", "High", "Low"):
+                df[col] = df[col] * ratio
+            df["Close"] = adj
+        else:
+            df["Adj Close"] = adj
+
+    return df.dropna(how="all")
+
+
+async def fetch_chart(
+    symbol: str,
+    *,
+    period: Optional[str] = None,
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+    interval: str = "1d",
+    prepost: bool = False,
+    timeout: float = 10
+) -> Optional[Dict[str, Any]]:
+    """
+    Raw chart `result` for one symbol, or None if the symbol has no data
+    (raises httpx.HTTPError on transport / server errors)
+    """
+    res = await _http().get(
+        f"/v8/finance/chart/{symbol}",
+        params=_params(period, start, end, interval, prepost),
+        timeout=timeout,
+    )
+    if res.status_code == 404:
+        return None
+    res.raise_for_status()
+
+    results = (res.json().get("chart") or {}).get("result") or []
+    return results[0] if results else None
+
+
+async def download(
+    tickers: List[str],
+    timeout: float,
+    *,
+    period: Optional[str] = None,
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+    interval: str = "1d",
+    auto_adjust: bool = True,
+    prepost: bool = False,
+) -> Dict[str, pd.DataFrame]:
+    """
+    yf.download equivalent: {ticker: OHLCV DataFrame}, all tickers fetched
+    concurrently; a ticker that fails comes back empty, as with yfinance.
+    """
+    results = await asyncio.gather(*[
+        fetch_chart(t, period=period, start=start, end=end, interval=interval, prepost=prepost, timeout=timeout)
+        for t in tickers
+    ], return_exceptions=True)
+
+    out: Dict[str, pd.DataFrame] = {}
+    for t, result in zip(tickers, results):
+        if isinstance(result, Exception):
+            _logger.warning("Chart request for %s failed: %s", t, result)
+            result = None
+        out[t] = parse_chart(result, auto_adjust=auto_adjust)
+    return out
+
+
+async def get_metadata(symbol: str, timeout: float = 10) -> Dict[str, Any]:
+    """
+    {"name", "sector"} from the chart meta block ({} if unavailable)
+    """
+    try:
+        result = await fetch_chart(symbol, period="1d", interval="1d", timeout=timeout)
+    except httpx.HTTPError as e:
+        _logger.warning("Chart metadata for %s failed: %s", symbol, e)
+        return {}
+
+    meta = (result or {}).get("meta") or {}
+    return {
+        "name": meta.get("longName") or meta.get("shortName"),
+        "sector": meta.get("sector"),
+    }
+
+
+def has_bars(symbol: str, timeout: float = 10) -> bool:
+    """
+    Blocking check that a symbol has a recent daily bar (Order.verify)
+    """
+    res = httpx.get(
+        f"{config.MARKET_DATA_URL}/v8/finance/chart/{symbol}",
+        params=_params("1d", None, None, "1d", False),
+        headers=_HEADERS,
+        timeout=timeout,
+    )
+    if res.status_code == 404:
+        return False
+    res.raise_for_status()
+
+    results = (res.json().get("chart") or {}).get("result") or []
+    return bool(results and results[0].get("timestamp"))
@@ -0,0 +1,247 @@
+"""
+Background jobs - long computations off the request path
+
+A cold "ALL" performance (or any future report) runs on a small pool of
+worker tasks (JOB_WORKERS) instead of inside the HTTP request: submit()
+answers with a job record right away, and the result is read back later
+(jobs/{job_id}) or awaited for a bounded time (wait).
+
+Jobs are deduplicated by key - kind, parameters and the data version they
+were computed from - so concurrent requests for the same report share one
+run, and a finished result keeps answering until the data changes or
+JOB_RESULT_TTL runs out. Finished records live in the "jobs" TieredCache,
+which makes them visible to the other workers when a shared tier is set
+(CACHE_URL); queued / running jobs are only known to their own worker.
+
+Records are plain dicts:
+    {"id", "kind", "status": queued|running|done|failed, "params",
+     "created_at", "started_at", "finished_at", "result", "error", ...}
+"""
+
+import uuid
+import asyncio
+import contextvars
+
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.configs import config
+from app.db import Repository
+from app.utils.cache import TieredCache
+from app.utils.logger import setup_logger
+from app.utils.metrics import JOBS
+
+
+_logger = setup_logger()
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# internal fields, never sent to clients
+_PRIVATE = ("owner", "key", "status_code")
+
+# job_id -> record of the jobs submitted here (oldest first)
+_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+# dedupe key -> id of the queued / running job for it
+_active: Dict[str, str] = {}
+# job_id -> set once the job finished
+_finished: Dict[str, asyncio.Event] = {}
+
+_results = TieredCache("jobs", ttl=config.JOB_RESULT_TTL, local_size=config.JOB_STORE_SIZE)
+
+_pool: Dict[str, Any] = {"loop": None, "queue": None, "workers": []}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def public(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Client view of a job record
+    """
+    return {k: v for k, v in job.items() if k not in _PRIVATE}
+
+
+def _remember(job: Dict[str, Any]) -> None:
+    _jobs[job["id"]] = job
+    # keep at most JOB_STORE_SIZE records here; unfinished ones stay
+    for job_id in list(_jobs):
+        if len(_jobs) <= config.JOB_STORE_SIZE:
+            break
+        if _jobs[job_id]["status"] in (DONE, FAILED):
+            del _jobs[job_id]
+            _finished.pop(job_id, None)
+
+
+def _queue() -> asyncio.Queue:
+    """
+    The job queue of the running loop, starting its workers on first use
+    """
+    loop = asyncio.get_running_loop()
+    if _pool["loop"] is not loop:
+        # workers belong to one event loop (tests and reloads start new ones)
+        _pool.update(loop=loop, queue=asyncio.Queue(), workers=[])
+    if not _pool["workers"]:
+        # a clean context, so workers don't inherit the submitting request's
+        # Server-Timing spans
+        _pool["workers"] = [
+            contextvars.Context().run(loop.create_task, _work(_pool["queue"]))
+            for _ in range(max(1, config.JOB_WORKERS))
+        ]
+    return _pool["queue"]
+
+
+async def _work(queue: asyncio.Queue) -> None:
+    while True:
+        job_id, run = await queue.get()
+        job = _jobs[job_id]
+        job.update(status=RUNNING, started_at=_now())
+        try:
+            job.update(status=DONE, result=await run())
+        except asyncio.CancelledError:
+            job.update(status=FAILED, error="Cancelled", status_code=503)
+            raise
+        except ValueError as e:
+            job.update(status=FAILED, error=str(e), status_code=400)
+        except Exception as e:
+            _logger.exception("Job %s (%s) failed: %s", job_id, job["kind"], e)
+            job.update(status=FAILED, error="Internal error", status_code=500)
+        finally:
+            job["finished_at"] = _now()
+            _active.pop(job["key"], None)
+            JOBS.inc(job["kind"], job["status"])
+            event = _finished.get(job_id)
+            if event is not None:
+                event.set()
+            queue.task_done()
+
+        if job["status"] == DONE:
+            # the result is already served from _jobs; a failed publish only
+            # costs other workers a recompute and must not end this worker
+            try:
+                await _results.set_many({f"job:{job_id}": job, f"key:{job['key']}": job_id})
+            except Exception as e:
+                _logger.error("Could not publish job %s (%s): %s", job_id, job["kind"], e)
+
+
+async def submit(
+    kind: str,
+    key: str,
+    owner: str,
+    params: Dict[str, Any],
+    run: Callable[[], Awaitable[Any]]
+) -> Dict[str, Any]:
+    """
+    Queue run() as a `kind` job, unless a job with the same dedupe key is
+    already queued, running, or finished (and still cached); returns that
+    job's record then.
+
+    run() should raise ValueError for bad input (the job fails with 400).
+    """
+    key = f"{kind}|{key}"
+    job_id = _active.get(key)
+    if job_id is not None:
+        JOBS.inc(kind, "deduplicated")
+        return _jobs[job_id]
+
+    job_id = await _results.get(f"key:{key}")
+    job = await get_job(job_id) if job_id is not None else None
+    if job is not None and job["status"] == DONE:
+        JOBS.inc(kind, "deduplicated")
+        return job
+
+    job = {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": QUEUED,
+        "params": params,
+        "created_at": _now(),
+        "started_at": None,
+        "finished_at": None,
+        "result": None,
+        "error": None,
+        "owner": owner,
+        "key": key,
+    }
+    queue = _queue()
+    _remember(job)
+    _active[key] = job["id"]
+    _finished[job["id"]] = asyncio.Event()
+    queue.put_nowait((job["id"], run))
+    return job
+
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Record of a job submitted here or finished on any worker
+    """
+    job = _jobs.get(job_id)
+    if job is not None:
+        return job
+    return await _results.get(f"job:{job_id}")
+
+
+async def wait(job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+    """
+    The job's record once it finished, or as it stands after `timeout` seconds
+    """
+    event = _finished.get(job_id)
+    if event is not None and timeout > 0:
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    return await get_job(job_id)
+
+
+async def close_jobs() -> None:
+    """
+    Cancel the workers (app shutdown); queued jobs are dropped
+    """
+    workers, _pool["workers"] = _pool["workers"], []
+    for task in workers:
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+
+# ---------- Reports ----------
+
+async def submit_performance(
+    repo: Repository,
+    user_id: str,
+    portfolio_id: str,
+    period: str
+) -> Dict[str, Any]:
+    """
+    Performance job for one period, deduplicated by (portfolio, period,
+    ledger version) and, for intraday periods, the last bar boundary: a new
+    bar changes the chart even when the ledger does not
+    """
+    import pandas as pd
+    from app.services.bars import DAILY_INTERVALS, _bar_step
+    from app.services.ledger import get_ledger
+    from app.services.performance import PERIODS, _parse_granularity, get_performance_payload
+
+    period = period.upper().strip()
+    if period not in PERIODS:
+        raise ValueError(f"Invalid period: {period}. Must be one of {list(PERIODS)}")
+    version = (await get_ledger(repo, portfolio_id))["version"]
+
+    key = f"{portfolio_id}|{period}|{version}"
+    interval = _parse_granularity(period)
+    bar = None
+    if interval not in DAILY_INTERVALS:
+        bar = pd.Timestamp.now(tz="UTC").floor(_bar_step(interval)).isoformat()
+        key = f"{key}|{bar}"
+
+    async def run():
+        return await get_performance_payload(repo, user_id, portfolio_id, period)
+
+    return await submit(
+        "performance",
+        key,
+        owner=user_id,
+        params={"portfolio_id": portfolio_id, "period": period, "version": version, "bar": bar},
+        run=run,
+    )
@@ -0,0 +1,253 @@
+"""
+Ledger Cache - per-portfolio orders frame and positions, written through
+
+Each worker keeps the cleaned orders DataFrame and the positions dict
+(derived from those orders, see derive_positions) of the portfolios it has
+served, tagged with the portfolio's ledger_version (bumped by the database
+on every order write). Writes made through this process are
+applied to the cached copy directly; writes made elsewhere are picked up by
+a cheap version check at most every LEDGER_REVALIDATE_SECONDS.
+
+Cached frames and dicts are replaced, never mutated, so callers may hold on
+to what they were handed but must treat it as read-only.
+
+pandas is imported inside the functions that build frames, so portfolio
+CRUD (which only needs invalidate) never loads it.
+"""
+
+from __future__ import annotations
+
+import time
+import asyncio
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.configs import config
+from app.db import Repository
+from app.models import Order
+from app.utils.logger import setup_logger
+from app.utils.metrics import cache_event
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+_logger = setup_logger()
+
+# Only what the timeseries engine needs, plus the keyset
+LEDGER_COLUMNS = "ticker,quantity,price,timestamp,order_id"
+
+# portfolio_id -> {"orders": DataFrame, "positions": {ticker: row}, "version": int, "checked": ts}
+_ledgers: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+# portfolio_id -> in-flight load shared by concurrent callers
+_loading: Dict[str, asyncio.Task] = {}
+
+# portfolio_id -> writes recorded while a load was in flight
+_writes: Dict[str, int] = {}
+
+
+async def iter_orders(
+    repo: Repository,
+    portfolio_id: str,
+    columns: str = LEDGER_COLUMNS,
+    page_size: int = 1000,
+    after: Optional[Tuple[str, str]] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Stream a portfolio's orders page by page (oldest first), optionally
+    starting strictly after the keyset `after` = (timestamp, order_id)
+    """
+    while True:
+        rows = await repo.get_orders_page(portfolio_id, columns, after=after, limit=page_size)
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        after = (rows[-1]["timestamp"], rows[-1]["order_id"])
+
+
+async def load_orders_df(
+    repo: Repository,
+    portfolio_id: str,
+    page_size: int = 1000
+) -> pd.DataFrame:
+    """
+    Cleaned orders frame (see clean_orders_df) built chunk by chunk from the
+    streamed ledger columns, so no full select("*") response is ever held.
+    """
+    import pandas as pd
+    from app.utils.performance import clean_orders_df
+
+    chunks = [
+        clean_orders_df(rows)
+        async for rows in iter_orders(repo, portfolio_id, page_size=page_size)
+    ]
+    if not chunks:
+        return clean_orders_df([])
+
+    # pages arrive in timestamp order; the stable sort only fixes NaT placement
+    orders = pd.concat(chunks, ignore_index=True)
+    return orders.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+
+def derive_positions(
+    portfolio_id: str,
+    orders: pd.DataFrame,
+    rows: List[Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Positions as the order ledger implies them: quantities from a replay of
+    the orders, name / sector (and timestamps) from the stored position rows.
+    """
+    from app.utils.holdings import replay
+
+    holdings, cash = replay(orders, cash_ticker=Order.CASH_TICKER)
+    holdings[Order.CASH_TICKER] = cash
+
+    stored = {row["ticker"]: row for row in rows if row.get("ticker")}
+    positions = {}
+    for ticker in holdings.keys() | stored.keys():
+        row = dict(stored.get(ticker) or {
+            "portfolio_id": portfolio_id,
+            "ticker": ticker,
+            "name": "N/A (Cash Holdings)" if ticker == Order.CASH_TICKER else None,
+            "sector": "Cash" if ticker == Order.CASH_TICKER else None,
+        })
+        row["quantity"] = holdings.get(ticker, 0.0)
+        positions[ticker] = row
+    return positions
+
+
+async def _load(repo: Repository, portfolio_id: str) -> Dict[str, Any]:
+    """
+    Read the version first so the entry can only ever look older than the
+    data it holds (the next revalidation then reloads it).
+    """
+    writes = _writes.get(portfolio_id, 0)
+
+    version = await repo.get_ledger_version(portfolio_id)
+    orders, rows = await asyncio.gather(
+        load_orders_df(repo, portfolio_id),
+        repo.get_positions(portfolio_id),
+    )
+    entry = {
+        "orders": orders,
+        "positions": derive_positions(portfolio_id, orders, rows),
+        "version": version,
+        "checked": time.monotonic(),
+    }
+
+    # a write that landed mid-load may or may not be in what was read
+    if _writes.pop(portfolio_id, 0) == writes:
+        _store(portfolio_id, entry)
+    return entry
+
+
+def _overlap(portfolio_id: str) -> None:
+    if portfolio_id in _loading:
+        _writes[portfolio_id] = _writes.get(portfolio_id, 0) + 1
+
+
+def _store(portfolio_id: str, entry: Dict[str, Any]) -> None:
+    _ledgers[portfolio_id] = entry
+    _ledgers.move_to_end(portfolio_id)
+    while len(_ledgers) > config.LEDGER_CACHE_SIZE:
+        _ledgers.popitem(last=False)
+
+
+async def get_ledger(repo: Repository, portfolio_id: str) -> Dict[str, Any]:
+    """
+    Cached ledger for a portfolio: {"orders": DataFrame, "positions": dict, "version": int}
+
+    Loads on first use, then only re-reads the version counter once the
+    entry is older than LEDGER_REVALIDATE_SECONDS.
+    """
+    entry = _ledgers.get(portfolio_id)
+    if entry is not None:
+        _ledgers.move_to_end(portfolio_id)
+        if time.monotonic() - entry["checked"] < config.LEDGER_REVALIDATE_SECONDS:
+            cache_event("ledger", hit=True)
+            return entry
+
+        version = await repo.get_ledger_version(portfolio_id)
+        if version == entry["version"]:
+            entry["checked"] = time.monotonic()
+            cache_event("ledger", hit=True)
+            return entry
+
+        _logger.info("Ledger %s changed elsewhere (%s -> %s), reloading", portfolio_id, entry["version"], version)
+
+    cache_event("ledger", hit=False)
+    task = _loading.get(portfolio_id)
+    if task is None:
+        task = asyncio.ensure_future(_load(repo, portfolio_id))
+        _loading[portfolio_id] = task
+        task.add_done_callback(lambda _: _loading.pop(portfolio_id, None))
+
+    return await asyncio.shield(task)
+
+
+def record_orders(portfolio_id: str, rows: List[Dict[str, Any]]) -> None:
+    """
+    Write-through for orders this process just stored: append them to the
+    cached frame and apply their position deltas, mirroring place_order.
+    """
+    if not rows:
+        return
+
+    _overlap(portfolio_id)
+
+    entry = _ledgers.get(portfolio_id)
+    if entry is None:
+        return
+
+    import pandas as pd
+    from app.utils.performance import clean_orders_df
+
+    orders = pd.concat([entry["orders"], clean_orders_df(rows)], ignore_index=True)
+    orders = orders.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+    positions = {t: dict(row) for t, row in entry["positions"].items()}
+
+    def bump(ticker: str, delta: float, row: Dict[str, Any]) -> None:
+        held = positions.setdefault(ticker, {
+            "portfolio_id": portfolio_id,
+            "ticker": ticker,
+            "name": row.get("name"),
+            "sector": row.get("sector"),
+            "quantity": 0,
+        })
+        held["quantity"] = (held.get("quantity") or 0) + delta
+
+    try:
+        for row in rows:
+            ticker = str(row["ticker"]).upper()
+            quantity = float(row["quantity"])
+            bump(ticker, quantity, row)
+            # CA$H rows move cash by quantity, their price (maybe NULL) is ignored
+            if ticker != Order.CASH_TICKER:
+                cash = {"name": "N/A (Cash Holdings)", "sector": "Cash"}
+                bump(Order.CASH_TICKER, -quantity * float(row["price"]), cash)
+    except (KeyError, TypeError, ValueError):
+        # the write has committed; a row this copy can't apply means a reload
+        _logger.warning("Ledger cache for %s dropped: unexpected order row", portfolio_id)
+        invalidate(portfolio_id)
+        return
+
+    # the database bumps ledger_version once per order row
+    _store(portfolio_id, {
+        "orders": orders,
+        "positions": positions,
+        "version": entry["version"] + len(rows),
+        "checked": entry["checked"],
+    })
+
+
+def invalidate(portfolio_id: str) -> None:
+    """
+    Drop a portfolio's cached ledger (deleted, or written outside this path)
+    """
+    _overlap(portfolio_id)
+    _ledgers.pop(portfolio_id, None)
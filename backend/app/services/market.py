@@ -13,12 +13,82 @@ import pandas as pd
 import yfinance as yf
 
 from typing import Dict, Union, Any
+from app.configs import config
+from app.services import chart
 from app.utils.logger import setup_logger
+from app.utils.cache import TieredCache
+from app.utils.metrics import span
 
 _logger = setup_logger()
-# Cache per unique ticker set
-_cache: Dict[str, Dict[str, Any]] = {}
 CACHE_TTL = 30  # seconds
+# Cache per unique ticker set, shared across workers when CACHE_URL is set
+_cache = TieredCache("market", ttl=CACHE_TTL)
+
+# Ticker registry: symbol -> {"name", "sector"} for verified symbols, None for
+# unknown ones; unknown symbols are only remembered briefly (a bad download
+# must not ban a real ticker for the life of the worker)
+REGISTRY_TTL = 24 * 3600  # seconds
+UNKNOWN_TTL = 300  # seconds
+_registry = TieredCache("tickers", ttl=REGISTRY_TTL, local_size=config.TICKER_REGISTRY_SIZE, shared=None)
+
+
+async def _download(
+    tickers_list: list,
+    timeout: int,
+    **kwargs
+) -> Dict[str, pd.DataFrame]:
+    """
+    Uncached yf.download in a thread, normalized to {ticker: DataFrame}
+    with a tz-aware UTC index. kwargs are passed through to yf.download.
+    """
+    if config.MARKET_DATA_URL:
+        with span("yahoo"):
+            return await chart.download(tickers_list, timeout, **kwargs)
+
+    # yfinance: use a **space-separated** ticker string
+    ticker_str = " ".join(tickers_list)
+
+    # Do the download in a thread (async safe)
+    with span("yahoo"):
+        df: pd.DataFrame = await asyncio.wait_for(
+            asyncio.to_thread(
+                yf.download,
+                tickers=ticker_str,
+                group_by="ticker",       # ensure first level = ticker
+                progress=False,
+                **kwargs,                # period or start/end, interval, auto_adjust, prepost
+            ),
+            timeout=timeout,
+        )
+
+    # Normalize to per-ticker frames with tz-aware UTC index
+    results: Dict[str, pd.DataFrame] = {}
+
+    # yfinance with group_by="ticker" yields a MultiIndex whose first level is the ticker.
+    # For a single ticker, columns are flat; handle both cases.
+    if isinstance(df.columns, pd.MultiIndex):
+        # Expected: top level = ticker, second level = OHLCV
+        for t in tickers_list:
+            if t in df.columns.get_level_values(0):
+                sub = df[t].copy()
+                # Ensure tz-aware UTC
+                if sub.index.tz is None:
+                    sub.index = sub.index.tz_localize("UTC")
+                else:
+                    sub.index = sub.index.tz_convert("UTC")
+                results[t] = sub
+            else:
+                results[t] = pd.DataFrame(index=pd.DatetimeIndex([], tz="UTC"))
+    else:
+        # Single ticker case
+        sub = df.copy()
+        if sub.index.tz is None:
+            sub.index = sub.index.tz_localize("UTC")
+        else:
+            sub.index = sub.index.tz_convert("UTC")
+        results[tickers_list[0]] = sub
+
+    return results
 
 
 async def fetch_full_data(
@@ -57,59 +127,44 @@ async def fetch_full_data(
         f"prepost={int(bool(prepost))}",
     ])
 
-    now = time.time()
-    if key in _cache and (now - _cache[key]["timestamp"] < CACHE_TTL):
-        return _cache[key]["data"]
-
-    # yfinance: use a **space-separated** ticker string
-    ticker_str = " ".join(tickers_list)
-
-    # Do the download in a thread (async safe)
-    df: pd.DataFrame = await asyncio.wait_for(
-        asyncio.to_thread(
-            yf.download,
-            tickers=ticker_str,
-            period=period,
-            interval=interval,
-            group_by="ticker",       # ensure first level = ticker
-            auto_adjust=auto_adjust, # silence the FutureWarning & be explicit
-            prepost=prepost,         # regular-hours default; set True if you want RTH+AH
-            progress=False,
-        ),
-        timeout=timeout,
-    )
+    return await _cache.get_or_load(key, lambda: _download(
+        tickers_list,
+        timeout,
+        period=period,
+        interval=interval,
+        auto_adjust=auto_adjust,
+        prepost=prepost,
+    ))
 
-    # Normalize to per-ticker frames with tz-aware UTC index
-    results: Dict[str, pd.DataFrame] = {}
 
-    # yfinance with group_by="ticker" yields a MultiIndex whose first level is the ticker.
-    # For a single ticker, columns are flat; handle both cases.
-    if isinstance(df.columns, pd.MultiIndex):
-        # Expected: top level = ticker, second level = OHLCV
-        for t in tickers_list:
-            if t in df.columns.get_level_values(0):
-                sub = df[t].copy()
-                # Ensure tz-aware UTC
-                if sub.index.tz is None:
-                    sub.index = sub.index.tz_localize("UTC")
-                else:
-                    sub.index = sub.index.tz_convert("UTC")
-                results[t] = sub
-            else:
-                results[t] = pd.DataFrame(index=pd.DatetimeIndex([], tz="UTC"))
-    else:
-        # Single ticker case
-        sub = df.copy()
-        if sub.index.tz is None:
-            sub.index = sub.index.tz_localize("UTC")
-        else:
-            sub.index = sub.index.tz_convert("UTC")
-        results[tickers_list[0]] = sub
 
-    # Store in cache with the full key
-    _cache[key] = {"data": results, "timestamp": now}
-    return results
+async def fetch_range(
+    tickers: list,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    interval: str = "1d",
+    timeout: int = 10,
+    *,
+    auto_adjust: bool = True,
+    prepost: bool = False,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Fetch OHLCV bars for exactly [start, end) (uncached, see services.bars).
+    Returns a dict {ticker: DataFrame}, index tz-aware UTC.
+    """
+    tickers_list = sorted(set(t.strip().upper() for t in tickers if t.strip()))
+    if not tickers_list:
+        return {}
 
+    return await _download(
+        tickers_list,
+        timeout,
+        start=start,
+        end=end,
+        interval=interval,
+        auto_adjust=auto_adjust,
+        prepost=prepost,
+    )
 
 
 async def fetch_last_single(ticker: str, period: str, interval: str, timeout: int):
@@ -117,6 +172,11 @@ async def fetch_last_single(ticker: str, period: str, interval: str, timeout: in
     Fetch the most recent OHLCV row for a single ticker.
     """
     try:
+        if config.MARKET_DATA_URL:
+            df = (await chart.download([ticker], timeout, period=period, interval=interval))[ticker]
+            df = df.rename_axis("Datetime")
+            return df.tail(1).reset_index().to_dict(orient="records")[0] if not df.empty else None
+
         df = await asyncio.wait_for(
             asyncio.to_thread(
                 lambda: yf.Ticker(ticker).history(period=period, interval=interval)
@@ -144,9 +204,14 @@ async def fetch_recent_quotes(tickers: str, timeout: int = 10):
         timeout=timeout
     )
 
+    # tickers without bars (unknown, or the fetch failed) are left out
     out = {}
     for ticker, df in data.items():
-        out[ticker] = df['Close'].iloc[-1]
+        if 'Close' not in df:
+            continue
+        close = df['Close'].dropna()
+        if not close.empty:
+            out[ticker] = close.iloc[-1]
 
     return out
 
@@ -228,11 +293,12 @@ async def get_ticker_metadata(ticker : str, timeout: int = 10) -> Dict[str, Any]
     """
     Fetch metadata for a given ticker using yfinance.
     """
+    if config.MARKET_DATA_URL:
+        return await chart.get_metadata(ticker, timeout=timeout)
 
     def _fetch():
         try:
             tk = yf.Ticker(ticker)
-            _logger.info("Got ticker")
             info = tk.info
             return {
                 #"symbol": info.get("symbol"),
@@ -245,11 +311,47 @@ async def get_ticker_metadata(ticker : str, timeout: int = 10) -> Dict[str, Any]
                 #"website": info.get("website"),
                 #"description": info.get("longBusinessSummary"),
             }
-        except Exception:
-            _logger.info("caught exception")
+        except Exception as e:
+            _logger.warning("Metadata for %s failed: %s", ticker, e)
             return {}
 
     return await asyncio.wait_for(
         asyncio.to_thread(_fetch),
         timeout=timeout
-    )
\ No newline at end of file
+    )
+
+
+async def lookup_tickers(tickers: list, timeout: int = 10) -> Dict[str, Union[Dict[str, Any], None]]:
+    """
+    Verify many symbols at once and return their metadata.
+
+    Unknown symbols are found with one batched download (no recent bars means
+    no such ticker); metadata for the rest is fetched concurrently. Results
+    are kept in the ticker registry so repeat lookups are free.
+
+    Returns {ticker: {"name", "sector"} or None if the ticker does not exist}.
+    """
+    wanted = sorted(set(t.strip().upper() for t in tickers if t.strip()))
+    out = await _registry.get_many(wanted)
+    missing = [t for t in wanted if t not in out]
+
+    if missing:
+        bars = await fetch_full_data(missing, period="5d", interval="1d", timeout=timeout)
+        known = [t for t in missing if t in bars and not bars[t].dropna(how="all").empty]
+
+        metadata = await asyncio.gather(*[
+            get_ticker_metadata(t, timeout=timeout) for t in known
+        ], return_exceptions=True)
+        # a metadata timeout doesn't make a trading symbol unknown
+        found = {t: meta if isinstance(meta, dict) else {} for t, meta in zip(known, metadata)}
+        unknown = {t: None for t in missing if t not in found}
+        out.update(found)
+        out.update(unknown)
+
+        await _registry.set_many(found)
+        # an empty download is as likely a Yahoo hiccup as a batch of bad
+        # symbols: only remember unknowns when the same download found others
+        if found:
+            await _registry.set_many(unknown, ttl=UNKNOWN_TTL)
+
+    return {t: out[t] for t in wanted}
@@ -0,0 +1,324 @@
+"""
+Pending Orders - resting limit / stop orders and the matcher that fills them
+
+Limit, stop and stop-limit orders (good-til-cancelled or day) are stored as
+pending orders and indexed in memory by trigger price (see
+utils.matching.MatchingEngine). Each matching pass (run_matching_job):
+
+    1. picks up live orders placed through other workers (sync)
+    2. expires DAY orders past their session close
+    3. feeds the engine the 1m bars completed since the last pass, for the
+       tickers with live orders only
+    4. fills each crossed order through the ledger (Repository.fill_pending_order)
+
+Every state change claims the row first (only while it has the statuses it
+expects), so a cancel, or another worker matching the same order, can never
+fill it twice. A fill claims, places the ledger order and marks the pending
+order in one transaction, so a crash cannot leave a "filled" order without
+its ledger order. Orders the ledger refuses at fill time (cash / inventory)
+end up "rejected".
+
+Matching runs in the process that starts run_matching_job
+(MATCHING_INTERVAL_SECONDS > 0); enable it on one instance only.
+
+pandas / the bar store are only imported by the matching pass itself.
+"""
+
+import asyncio
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.db import Repository
+from app.models import Order
+from app.models.types import OrderKind, PendingStatus, TimeInForce
+from app.utils.logger import setup_logger
+from app.utils.matching import MatchingEngine
+from app.utils.timestamps import parse_timestamptz
+from .ledger import record_orders
+
+
+_logger = setup_logger()
+
+LIVE = [PendingStatus.OPEN.value, PendingStatus.TRIGGERED.value]
+
+BAR_NS = 60 * 10**9  # matching runs on 1m bars
+# rows can commit out of created_at order, so each sync re-reads this much
+SYNC_OVERLAP_NS = 60 * 10**9
+SYNC_PAGE = 1000
+# how far back a pass may replay bars (the 1m retention of the bar store)
+MAX_REPLAY_NS = 7 * 24 * 3600 * 10**9
+
+_engine = MatchingEngine()
+# synced: created_at watermark of the last sync; marks: ticker -> start ns of the last bar matched
+_state: Dict[str, Any] = {"synced": None, "marks": {}}
+
+
+def _ns(ts: Optional[str]) -> Optional[int]:
+    if ts is None:
+        return None
+    dt = parse_timestamptz(ts)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1_000_000) * 1000
+
+
+def _iso(ns: int) -> str:
+    return datetime.fromtimestamp(ns // 1000 / 1e6, timezone.utc).isoformat(timespec="microseconds")
+
+
+def _track(row: Dict[str, Any]) -> bool:
+    """
+    Add a stored pending order to the engine (False if already tracked)
+    """
+    entry = dict(
+        row,
+        quantity=float(row["quantity"]),
+        created_ns=_ns(row["created_at"]),
+        expires_ns=_ns(row.get("expires_at")),
+    )
+    if not _engine.add(entry):
+        return False
+    # bars from the order's minute on are matched (earlier marks are kept)
+    marks = _state["marks"]
+    start = entry["created_ns"] - BAR_NS
+    if marks.get(row["ticker"], start) >= start:
+        marks[row["ticker"]] = start
+    return True
+
+
+def _session_close(now: datetime) -> str:
+    """
+    Close of the session in progress, or of the next one (DAY expiry)
+    """
+    import numpy as np
+    from app.utils.market_calendar import sessions
+
+    _, closes = sessions()
+    now_ns = int(now.timestamp() * 1_000_000) * 1000
+    i = int(np.searchsorted(closes, now_ns, side="right"))
+    if i >= len(closes):
+        raise ValueError("No upcoming market session")
+    return datetime.fromtimestamp(int(closes[i]) / 1e9, timezone.utc).isoformat()
+
+
+def _check_prices(kind: OrderKind, limit_price: Optional[float], stop_price: Optional[float]) -> None:
+    needs_limit = kind in (OrderKind.LIMIT, OrderKind.STOP_LIMIT)
+    needs_stop = kind in (OrderKind.STOP, OrderKind.STOP_LIMIT)
+    for name, value, needed in (("limit_price", limit_price, needs_limit), ("stop_price", stop_price, needs_stop)):
+        if needed and (value is None or value <= 0):
+            raise ValueError(f"{kind} orders need a positive {name}")
+        if not needed and value is not None:
+            raise ValueError(f"{kind} orders take no {name}")
+
+
+async def submit_pending_order(
+    repo: Repository,
+    portfolio_id: str,
+    ticker: str,
+    quantity: int,
+    kind: OrderKind,
+    limit_price: Optional[float] = None,
+    stop_price: Optional[float] = None,
+    time_in_force: TimeInForce = TimeInForce.GTC
+) -> Dict[str, Any]:
+    """
+    Store a limit / stop / stop-limit order as pending and start matching it
+
+    Cash / inventory are checked by the ledger when it fills, not here.
+    """
+    from .market import get_ticker_metadata
+
+    if kind == OrderKind.MARKET:
+        raise ValueError("Market orders fill immediately; they cannot rest")
+    _check_prices(kind, limit_price, stop_price)
+
+    ticker = ticker.strip().upper()
+    if ticker == Order.CASH_TICKER:
+        raise ValueError("Cash deposits / withdrawals cannot rest")
+
+    metadata = await get_ticker_metadata(ticker)
+    order = Order(
+        portfolio_id=portfolio_id,
+        ticker=ticker,
+        name=metadata.get("name") or "Unknown",
+        sector=metadata.get("sector") or "Unknown",
+        quantity=quantity,
+        price=limit_price or stop_price
+    ).verify()
+
+    now = datetime.now(timezone.utc)
+    row = {
+        "portfolio_id": portfolio_id,
+        "ticker": ticker,
+        "name": order.name,
+        "sector": order.sector,
+        "quantity": quantity,
+        "kind": kind.value,
+        "limit_price": limit_price,
+        "stop_price": stop_price,
+        "time_in_force": time_in_force.value,
+        "status": PendingStatus.OPEN.value,
+        "expires_at": _session_close(now) if time_in_force == TimeInForce.DAY else None,
+    }
+
+    _logger.info("Resting %s %s order for portfolio %s", kind, ticker, portfolio_id)
+
+    stored = await repo.insert_pending_order(row)
+    _track(stored)
+
+    return stored
+
+
+async def get_pending_orders(
+    repo: Repository,
+    portfolio_id: str,
+    statuses: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Pending orders of a portfolio, oldest first
+    """
+    known = {s.value for s in PendingStatus}
+    unknown = [s for s in statuses or [] if s not in known]
+    if unknown:
+        raise ValueError(f"Unknown statuses: {unknown}. Must be among {sorted(known)}")
+    return await repo.get_pending_orders(portfolio_id, statuses)
+
+
+async def cancel_pending_order(repo: Repository, portfolio_id: str, order_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Cancel a live pending order; None if it is unknown or no longer live
+    """
+    row = await repo.update_pending_order(
+        portfolio_id, order_id, {"status": PendingStatus.CANCELLED.value}, statuses=LIVE
+    )
+    if row is not None:
+        _engine.remove(order_id)
+    return row
+
+
+def forget_pending_orders(portfolio_id: str) -> int:
+    """
+    Drop a deleted portfolio's orders from the engine; returns how many
+    """
+    return _engine.remove_portfolio(portfolio_id)
+
+
+async def sync_pending_orders(repo: Repository) -> int:
+    """
+    Track the live orders placed since the last sync (by any worker);
+    returns how many were new here
+    """
+    after = None
+    if _state["synced"] is not None:
+        after = (_iso(_ns(_state["synced"]) - SYNC_OVERLAP_NS), None)
+
+    new = 0
+    while True:
+        rows = await repo.get_live_pending_orders(after, limit=SYNC_PAGE)
+        new += sum(_track(row) for row in rows)
+        if rows:
+            _state["synced"] = rows[-1]["created_at"]
+        if len(rows) < SYNC_PAGE:
+            return new
+        after = (rows[-1]["created_at"], rows[-1]["id"])
+
+
+async def _fill(repo: Repository, order: Dict[str, Any], price: float) -> str:
+    """
+    Fill one order through the ledger; returns its final status
+    """
+    filled = await repo.fill_pending_order(order["portfolio_id"], order["id"], price, statuses=LIVE)
+    if filled is None:
+        return "gone"  # cancelled, or filled by another worker
+
+    if filled["order"] is not None:
+        record_orders(order["portfolio_id"], [filled["order"]])
+    return filled["pending"]["status"]
+
+
+async def match_pending_orders(repo: Repository, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    One matching pass (see module docstring); returns counts per outcome
+    """
+    now = now or datetime.now(timezone.utc)
+    now_ns = int(now.timestamp() * 1_000_000) * 1000
+    counts = {"synced": await sync_pending_orders(repo), "expired": 0, "triggered": 0, "filled": 0, "rejected": 0}
+
+    for order in _engine.expire(now_ns):
+        expired = await repo.update_pending_order(
+            order["portfolio_id"], order["id"], {"status": PendingStatus.EXPIRED.value}, statuses=LIVE
+        )
+        counts["expired"] += expired is not None
+
+    tickers = _engine.tickers()
+    if not tickers:
+        return counts
+
+    import pandas as pd
+    from .bars import fetch_bars
+
+    marks = _state["marks"]
+    start_ns = max(min(marks.get(t, now_ns) for t in tickers) + BAR_NS, now_ns - MAX_REPLAY_NS)
+    frames = await fetch_bars(
+        tickers,
+        pd.Timestamp(start_ns, tz="UTC"),
+        pd.Timestamp(now_ns, tz="UTC"),
+        interval="1m"
+    )
+
+    for ticker in tickers:
+        frame = frames.get(ticker)
+        if frame is None or frame.empty:
+            continue
+        stamps = frame.index.asi8
+        # complete bars past the ticker's mark only (the last one may still move)
+        keep = (stamps > marks.get(ticker, start_ns - BAR_NS)) & (stamps + BAR_NS <= now_ns)
+        if not keep.any():
+            continue
+        close = frame["Close"].to_numpy(dtype=float)
+        columns = [
+            frame[c].to_numpy(dtype=float) if c in frame.columns else close
+            for c in ("Open", "High", "Low")
+        ]
+
+        for stamp, open_, high, low in zip(stamps[keep], *(c[keep] for c in columns)):
+            if open_ != open_:  # NaN bar (no trades)
+                continue
+            fills, triggered = _engine.on_bar(ticker, int(stamp), float(open_), float(high), float(low))
+            for order in triggered:
+                resting = await repo.update_pending_order(
+                    order["portfolio_id"], order["id"],
+                    {"status": PendingStatus.TRIGGERED.value}, statuses=[PendingStatus.OPEN.value]
+                )
+                if resting is None:
+                    _engine.remove(order["id"])
+                else:
+                    counts["triggered"] += 1
+            for order, price, _ in fills:
+                try:
+                    outcome = await _fill(repo, order, price)
+                except Exception as e:
+                    _logger.warning("Filling pending order %s failed: %s", order["id"], e)
+                    _engine.add(order)
+                    continue
+                if outcome in counts:
+                    counts[outcome] += 1
+        marks[ticker] = int(stamps[keep][-1])
+
+    return counts
+
+
+async def run_matching_job(repo: Repository, interval: float) -> None:
+    """
+    Background loop: match_pending_orders every `interval` seconds (until cancelled)
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            counts = await match_pending_orders(repo)
+        except Exception as e:
+            _logger.error("Matching pass failed: %s", e)
+            continue
+        if any(counts.values()):
+            _logger.info("Matching pass: %s", counts)
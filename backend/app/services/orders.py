@@ -2,38 +2,42 @@
 Orders Service - searching, adding, updating, and deleting order records
 """
 
-from supabase import create_client
+import json
+import uuid
+import base64
+import asyncio
+
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 
+from app.db import Repository
 from app.models import Order
-from app.configs import config
-from app.models.types import OrderType
+from app.models.types import OrderKind
 from app.utils.logger import setup_logger
+from .ledger import record_orders
 from .positions import get_portfolio_positions
-from .market import get_ticker_metadata
-
-import asyncio
 
 _logger = setup_logger()
 
+ORDER_FIELDS = {"order_id", "portfolio_id", "ticker", "name", "sector", "quantity", "price", "timestamp"}
+KEYSET = ("timestamp", "order_id")
 
-supabase = create_client(
-    config.SUPABASE_URL,
-    config.SUPABASE_SERVICE_KEY
-)
 
-
-async def create_order(portfolio_id: str, ticker: str, quantity: int, price: float):
+async def create_order(repo: Repository, portfolio_id: str, ticker: str, quantity: int, price: float):
     """
     Create order record
+
+    Cash / inventory checks, the insert and both position deltas happen in
+    one atomic ledger call (Repository.place_order).
     """
-    _logger.info("Verifying order...")
-    if ticker.upper() != Order.CASH_TICKER:
+    from .market import get_ticker_metadata
+
+    ticker = ticker.strip().upper()
+
+    if ticker != Order.CASH_TICKER:
         metadata = await get_ticker_metadata(ticker)
-        _logger.info("Metadata fetched.")
     else:
         metadata = {"name": "N/A (Cash Holdings)", "sector": "Cash"}
-        _logger.info("Cash transaction detected.")
     new_order = Order(
         portfolio_id=portfolio_id,
         ticker=ticker,
@@ -41,75 +45,179 @@ async def create_order(portfolio_id: str, ticker: str, quantity: int, price: flo
         sector=metadata.get("sector") or "Unknown",
         quantity=quantity,
         price=price
-    ).verify(
-        positions=get_portfolio_positions(portfolio_id)
-    )
+    ).verify()
+
+    _logger.info("Placing %s order for portfolio %s", ticker, portfolio_id)
+
+    return await execute_order(repo, new_order)
+
 
-    _logger.info("Inserting order record...")
+async def execute_order(repo: Repository, order: Order) -> Dict[str, Any]:
+    """
+    Place a verified order through the ledger (Repository.place_order) and
+    apply it to the cached ledger; returns the stored order.
 
-    res = supabase.table(
-        config.DB_SCHEMA.ORDERS
-    ).insert(new_order.raw).execute()
+    Raises LedgerRejected if the portfolio cannot cover it.
+    """
+    stored = await repo.place_order(order.raw)
+    record_orders(order.portfolio_id, [stored])
 
-    _logger.info(f"Updating positions for portfolio {portfolio_id}")
+    return stored
 
-    # updating ticker by quantity
-    supabase.rpc(
-        "increment_quantity",
-        {
-            "p_portfolio_id": portfolio_id,
-            "p_ticker": new_order.ticker.upper(),
-            "p_quantity": new_order.quantity,
-            "p_name": new_order.name,
-            "p_sector": new_order.sector,
-        }
-    ).execute()
 
-    # updating cash if it wasn't a cash transaction
-    if not new_order.is_cash_transaction:
-        cash_adjustment = new_order.quantity * new_order.price
+async def create_orders(repo: Repository, portfolio_id: str, requests: List[Dict[str, Any]]):
+    """
+    Create many order records at once
 
-        if new_order.type == OrderType.BUY:
-            cash_adjustment *= -1
+    All symbols are verified in one registry lookup, then cash / inventory
+    checks are simulated in memory in submission order against the cached
+    positions. Accepted orders and their net position deltas are written in one
+    ledger call (Repository.place_orders).
 
-        supabase.rpc(
-            "increment_quantity",
-            {
-                "p_portfolio_id": portfolio_id,
-                "p_ticker": Order.CASH_TICKER,
-                "p_quantity": cash_adjustment,
-                "p_name": new_order.name,
-                "p_sector": new_order.sector,
-            }
-        ).execute()
+    Each request is {"ticker", "quantity", "price", "kind"?}; only market
+    orders with a price are accepted.
 
-    return res.data[0]
+    Returns one result per request, in order:
+        {"index", "status": "accepted" | "rejected", "order" | "error"}
+    """
+    from .market import lookup_tickers
 
+    tickers = [r["ticker"].strip().upper() for r in requests]
+    registry, positions = await asyncio.gather(
+        lookup_tickers([t for t in tickers if t != Order.CASH_TICKER]),
+        get_portfolio_positions(repo, portfolio_id),
+    )
 
-def get_all_tickers(portfolio_id: str):
+    # running balances: {ticker: {"quantity": q}}
+    running = {t: {"quantity": row.get("quantity") or 0} for t, row in positions.items()}
+    running.setdefault(Order.CASH_TICKER, {"quantity": 0})
+
+    results: List[Dict[str, Any]] = []
+    accepted: List[Order] = []
+    for i, (ticker, req) in enumerate(zip(tickers, requests)):
+        if ticker == Order.CASH_TICKER:
+            metadata = {"name": "N/A (Cash Holdings)", "sector": "Cash"}
+        else:
+            metadata = registry.get(ticker)
+
+        try:
+            kind = req.get("kind", OrderKind.MARKET)
+            if kind != OrderKind.MARKET:
+                raise ValueError(f"{kind} orders cannot be placed in bulk")
+            if req.get("price") is None:
+                raise ValueError("Market orders need a price")
+            if metadata is None:
+                raise ValueError("Ticker not found")
+
+            order = Order(
+                portfolio_id=portfolio_id,
+                ticker=ticker,
+                name=metadata.get("name") or "Unknown",
+                sector=metadata.get("sector") or "Unknown",
+                quantity=req["quantity"],
+                price=req["price"]
+            ).verify(positions=running, check_ticker=False)
+        except ValueError as e:
+            results.append({"index": i, "status": "rejected", "error": str(e)})
+            continue
+
+        # apply to running balances so later orders see this one
+        if order.is_cash_transaction:
+            running[Order.CASH_TICKER]["quantity"] += order.quantity
+        else:
+            running.setdefault(ticker, {"quantity": 0})["quantity"] += order.quantity
+            running[Order.CASH_TICKER]["quantity"] -= order.quantity * order.price
+
+        results.append({"index": i, "status": "accepted"})
+        accepted.append(order)
+
+    _logger.info("Placing %d/%d orders for portfolio %s", len(accepted), len(requests), portfolio_id)
+
+    stored = await repo.place_orders(portfolio_id, [o.raw for o in accepted])
+    # match rows on their position in the batch, not on the order they come back in
+    by_ord = {row.pop("ord"): row for row in stored}
+    record_orders(portfolio_id, [by_ord[k] for k in sorted(by_ord)])
+    for k, result in enumerate(r for r in results if r["status"] == "accepted"):
+        result["order"] = by_ord[k]
+
+    return results
+
+
+async def get_all_tickers(repo: Repository, portfolio_id: str):
     """
     Get any ticker that has ever appeared in a given portfolio
     """
-    orders_res = (
-        supabase.table(config.DB_SCHEMA.ORDERS)
-        .select("ticker", distinct=True)
-        .eq("portfolio_id", portfolio_id)
-        .execute()
-    )   
+    rows = await repo.get_orders(portfolio_id, "ticker")
 
-    unique_tickers = [row["ticker"] for row in orders_res.data]
+    unique_tickers = list(dict.fromkeys(row["ticker"] for row in rows))
 
     return unique_tickers
 
 
-def get_all_orders(portfolio_id: str):
+async def get_all_orders(repo: Repository, portfolio_id: str):
     """
     Fetch Orders for a given portfolio
     """
-    tickers_res = supabase.table(
-        config.DB_SCHEMA.ORDERS
-    ).select("*").eq(
-        "portfolio_id", portfolio_id
-    ).execute()
-    
-    return tickers_res.data
+    return await repo.get_orders(portfolio_id)
+
+
+def _encode_cursor(row: Dict[str, Any]) -> str:
+    raw = json.dumps([row["timestamp"], row["order_id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    (timestamp, order_id) of a cursor; both end up in a PostgREST filter, so
+    anything but an ISO timestamp and a UUID is refused.
+    """
+    try:
+        ts, order_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        datetime.fromisoformat(ts.replace("Z", "+00:00"))
+        return ts, str(uuid.UUID(order_id))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _projection(fields: Optional[str]) -> str:
+    """
+    Validated column list for a fields= projection, always including the
+    keyset columns the cursor is built from.
+    """
+    if not fields:
+        return "*"
+
+    cols = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [c for c in cols if c not in ORDER_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown order fields: {unknown}. Must be among {sorted(ORDER_FIELDS)}")
+
+    for key in KEYSET:
+        if key not in cols:
+            cols.append(key)
+    return ",".join(cols)
+
+
+async def get_orders_page(
+    repo: Repository,
+    portfolio_id: str,
+    limit: int = 500,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    One keyset page of a portfolio's orders, oldest first
+
+    Returns: { "orders": [...], "next_cursor": str | None }
+    """
+    rows = await repo.get_orders_page(
+        portfolio_id,
+        _projection(fields),
+        after=_decode_cursor(cursor) if cursor else None,
+        limit=limit
+    )
+
+    return {
+        "orders": rows,
+        "next_cursor": _encode_cursor(rows[-1]) if len(rows) == limit else None
+    }
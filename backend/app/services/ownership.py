@@ -0,0 +1,83 @@
+"""
+Ownership Service - which portfolios belong to which user
+
+A bounded in-memory map user_id -> {portfolio_id: portfolio row}, filled
+from one portfolios select per user and kept current by create / delete.
+Ownership checks and portfolio row lookups are answered from it.
+"""
+
+import time
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.configs import config
+from app.db import Repository
+from app.utils.metrics import cache_event
+
+
+# user_id -> {"portfolios": {portfolio_id: row}, "loaded": monotonic ts}
+_owners: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+async def _load(repo: Repository, user_id: str) -> Dict[str, Dict[str, Any]]:
+    rows = await repo.get_portfolios(user_id)
+    remember_portfolios(user_id, rows)
+    return _owners[user_id]["portfolios"]
+
+
+def remember_portfolios(user_id: str, rows: list) -> None:
+    """
+    Replace a user's entry with a complete list of their portfolio rows
+    """
+    _owners[user_id] = {
+        "portfolios": {row["id"]: row for row in rows},
+        "loaded": time.monotonic(),
+    }
+    _owners.move_to_end(user_id)
+    while len(_owners) > config.OWNERSHIP_CACHE_SIZE:
+        _owners.popitem(last=False)
+
+
+async def get_owned_portfolio(
+    repo: Repository,
+    user_id: str,
+    portfolio_id: str
+) -> Optional[Dict[str, Any]]:
+    """
+    The portfolio row if user_id owns portfolio_id, else None
+
+    A miss re-reads the user's portfolios once (it may have been created by
+    another worker); entries older than OWNERSHIP_TTL are re-read as well.
+    """
+    entry = _owners.get(user_id)
+    if entry is None or time.monotonic() - entry["loaded"] > config.OWNERSHIP_TTL:
+        cache_event("ownership", hit=False)
+        return (await _load(repo, user_id)).get(portfolio_id)
+
+    _owners.move_to_end(user_id)
+    row = entry["portfolios"].get(portfolio_id)
+    if row is None:
+        cache_event("ownership", hit=False)
+        row = (await _load(repo, user_id)).get(portfolio_id)
+    else:
+        cache_event("ownership", hit=True)
+    return row
+
+
+def remember_portfolio(user_id: str, row: Dict[str, Any]) -> None:
+    """
+    Record a newly created portfolio (if the user's entry is cached)
+    """
+    entry = _owners.get(user_id)
+    if entry is not None:
+        entry["portfolios"][row["id"]] = row
+
+
+def forget_portfolio(user_id: str, portfolio_id: str) -> None:
+    """
+    Drop a deleted portfolio from the user's entry
+    """
+    entry = _owners.get(user_id)
+    if entry is not None:
+        entry["portfolios"].pop(portfolio_id, None)
@@ -3,35 +3,32 @@ Performance Service
 """
 
 import uuid
+import asyncio
+import logging
 
 import pandas as pd
-from typing import Dict, Tuple
-from supabase import create_client
+from typing import Any, Dict, Tuple
 from datetime import datetime, timezone
 from pandas.tseries.offsets import DateOffset
 
-from app.configs import config
+from app.db import Repository
 from app.models import Order, Portfolio
+from app.configs import config
 from app.utils.logger import setup_logger
-from app.services.orders import get_all_orders
-from app.services.market import fetch_full_data
+from app.utils.metrics import span
+from app.services.ledger import get_ledger
+from app.services.ownership import get_owned_portfolio
+from app.services.bars import fetch_bars, DAILY_INTERVALS
+from app.utils.holdings import replay, split_at
 from app.utils.timestamps import parse_timestamptz
-from app.utils.performance import (
-    clean_orders_df,
-    clean_prices_df,
-    nearest_yf_period
-)
+from app.utils.market_calendar import last_session, session_mask
+from app.utils.performance import clean_prices_df
+from app.utils.shared_prices import PriceBlock, lookup
 
 
 _logger = setup_logger()
 
 
-supabase = create_client(
-    config.SUPABASE_URL,
-    config.SUPABASE_SERVICE_KEY
-)
-
-
 def _ensure_uuid_str(value: str, field_name: str) -> str:
     """Validate input is a UUID and return its canonical string form."""
     try:
@@ -39,49 +36,19 @@ def _ensure_uuid_str(value: str, field_name: str) -> str:
     except Exception:
         raise ValueError(f"{field_name} must be a valid UUID string; got: {value!r}")
 
-def _choose_period(start_dt, now_dt, retrieval_period: str | None) -> str:
-    """
-    Prefer explicit retrieval_period (if valid) else fall back to nearest_yf_period().
-    """
-    valid = {"1d","5d","7d","1mo","3mo","6mo","ytd","1y","2y","5y","10y","max"}
-    if retrieval_period and retrieval_period.lower() in valid:
-        return retrieval_period.lower()
-    return nearest_yf_period(start_dt, now_dt)
-
-
-def _validate_yf(period: str, interval: str) -> Tuple[str, str]:
+def _parse_granularity(granularity: str) -> str:
     """
-    Yahoo rule of thumb:
-    - 1m allowed only for short windows (~7 days). We allow {'1d','5d','7d'}.
-    - For 1mo windows, prefer 5m or 15m or 30m depending on your taste; 30m is safe & light.
-    - Otherwise, default to daily.
-    """
-    p = period.lower()
-    i = interval.lower()
-
-    if i == "1m" and p not in {"1d", "5d", "7d"}:
-        if p == "1mo":
-            return ("1mo", "5m")  # lighter alt: ("1mo", "30m")
-        return (p, "1d")
-
-    # 90m typically good up to ~60 days; if user maps YTD to 90m it can break mid-year.
-    # We'll leave other combos as-is and rely on the backend to error if illegal.
-    return (p, i)
-
-
-def _parse_granularity(granularity: str) -> Tuple[str, str]:
-    """
-    Map a UI granularity to (period, interval) *intent* before validation.
-    We’ll still run it through _validate_yf to make sure Yahoo allows it.
+    Map a UI granularity to the bar interval used to chart it.
+    The window itself comes from compute_window, not from a Yahoo period.
     """
     g = granularity.upper().strip()
-    mapping: Dict[str, Tuple[str, str]] = {
-        "1D":  ("1d",  "1m"),   # intraday minute bars (valid)
-        "1W":  ("5d",  "5m"),   # 5 trading days -> 5m
-        "1M":  ("1mo", "30m"),  # 1 month -> 30m (or 5m/15m if you want denser)
-        "YTD": ("ytd", "1d"),   # YTD -> daily (avoid 90m mid-year issues)
-        "1Y":  ("1y",  "1d"),   # 1 year -> daily
-        "ALL": ("max", "1d"),   # max history -> daily
+    mapping: Dict[str, str] = {
+        "1D":  "1m",    # intraday minute bars
+        "1W":  "5m",    # 5 trading days -> 5m
+        "1M":  "30m",   # 1 month -> 30m (Yahoo serves 30m for the last 60 days)
+        "YTD": "1d",    # YTD -> daily (avoid 90m mid-year issues)
+        "1Y":  "1d",    # 1 year -> daily
+        "ALL": "1d",    # full history -> daily
     }
     if g not in mapping:
         raise ValueError(
@@ -106,11 +73,10 @@ def compute_window(granularity: str, now_utc: pd.Timestamp | None = None) -> Tup
     g = granularity.upper().strip()
 
     if g == "1D":
-        # same-calendar-day regular session (09:30–16:00 NY), minus 1 minute to align with minute bars
-        day = now_ny.date()
-        start_ny = pd.Timestamp(day, tz=NY) + pd.Timedelta(hours=9, minutes=30)
-        end_ny   = pd.Timestamp(day, tz=NY) + pd.Timedelta(hours=16) - pd.Timedelta(minutes=1)
-        return start_ny.tz_convert("UTC"), end_ny.tz_convert("UTC")
+        # latest regular session (previous one on weekends, holidays and before the bell),
+        # minus 1 minute to align with minute bars
+        open_utc, close_utc = last_session(now_utc)
+        return open_utc, close_utc - pd.Timedelta(minutes=1)
 
     if g == "1W":
         return (now_utc - pd.Timedelta(days=7), end_utc)
@@ -128,93 +94,136 @@ def compute_window(granularity: str, now_utc: pd.Timestamp | None = None) -> Tup
     # ALL: let caller widen to earliest seen data/first order
     return (pd.Timestamp("1970-01-01", tz="UTC"), end_utc)
 
+PERIODS = ("1D", "1W", "1M", "YTD", "1Y", "ALL")
 
-async def get_portfolio_data(
-    user_id: str,
-    portfolio_id: str,
-    granularity: str = "ALL"
-):
-    # ---- Validate IDs ----
-    user_id_str = _ensure_uuid_str(user_id, "user_id")
-    portfolio_id_str = _ensure_uuid_str(portfolio_id, "portfolio_id")
+def parse_periods(periods: str | None) -> list[str]:
+    """
+    Parse a comma-separated list of UI granularities (defaults to all PERIODS).
+    """
+    if not periods:
+        return list(PERIODS)
+
+    out = []
+    for p in periods.split(","):
+        g = p.upper().strip()
+        if not g:
+            continue
+        _parse_granularity(g)  # raises ValueError on unknown granularity
+        if g not in out:
+            out.append(g)
+    return out
+
+
+def _fetch_window(
+    granularity: str,
+    interval: str,
+    orders: pd.DataFrame,
+    now_utc: pd.Timestamp
+) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Exact [start, end] to download for a granularity: its window with the
+    start clamped to the first order (nothing before it is ever charted).
+    """
+    start_utc, end_utc = compute_window(granularity, now_utc=now_utc)
 
-    portfolio_res = (
-        supabase.table(config.DB_SCHEMA.PORTFOLIOS)
-        .select("*")
-        .eq("user_id", user_id_str)
-        .eq("id", portfolio_id_str)
-        .execute()
-    )
-    if not portfolio_res.data:
-        raise ValueError("Portfolio not found or not accessible by user")
+    earliest_orders = orders["timestamp"].min() if not orders.empty else None
+    if earliest_orders is not None and earliest_orders > start_utc:
+        # daily bars are stamped at midnight, keep the first order's day
+        start_utc = earliest_orders.normalize() if interval in DAILY_INTERVALS else earliest_orders
 
-    portfolio = Portfolio(**portfolio_res.data[0])
+    return start_utc, end_utc
 
-    # ---- Time context ----
-    start_dt = parse_timestamptz(portfolio.created_at)  # tz-aware
-    tzinfo = start_dt.tzinfo or timezone.utc
-    now_dt = datetime.now(tzinfo)
-    now_utc = pd.Timestamp(now_dt).tz_convert("UTC")
 
-    # ---- Orders ----
-    raw_orders = get_all_orders(portfolio_id_str)
-    # from tests.test_data import ORDERS as raw_orders
-    orders = clean_orders_df(raw_orders).copy()
+def _plan_fetches(
+    granularities: list[str],
+    orders: pd.DataFrame,
+    now_utc: pd.Timestamp
+) -> Dict[Tuple[str, pd.Timestamp, pd.Timestamp], list[str]]:
+    """
+    Group granularities by the bar interval they need.
 
-    # ---- Granularity -> intended (period, interval) ----
-    intended_period, intended_interval = _parse_granularity(granularity)
+    Granularities sharing an interval share one fetch over the union of their
+    windows, e.g. YTD, 1Y and ALL all resolve to a single daily download
+    starting at the first order.
+    Returns {(interval, start, end): [granularity, ...]}.
+    """
+    by_interval: Dict[str, Tuple[pd.Timestamp, pd.Timestamp, list[str]]] = {}
+    for g in granularities:
+        interval = _parse_granularity(g)
+        start, end = _fetch_window(g, interval, orders, now_utc)
+
+        if interval in by_interval:
+            s, e, members = by_interval[interval]
+            start, end, members = min(s, start), max(e, end), members + [g]
+        else:
+            members = [g]
+        by_interval[interval] = (start, end, members)
 
-    # ---- Choose final period; validate with Yahoo rules ----
-    yf_period = _choose_period(start_dt, now_dt, intended_period)
-    effective_period, effective_interval = _validate_yf(yf_period, intended_interval)
+    return {
+        (interval, start, end): members
+        for interval, (start, end, members) in by_interval.items()
+    }
+
+
+async def _fetch_prices(
+    tickers: list[str],
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    interval: str
+) -> Dict[str, pd.DataFrame] | PriceBlock:
+    """
+    Bars for [start, end]: a view on the shared price matrix when it holds
+    every ticker (PRICE_MATRIX), otherwise the bar store's frames.
+    """
+    if config.PRICE_MATRIX and interval in config.PRICE_MATRIX_INTERVALS:
+        block = lookup(tickers, interval, start, end)
+        if block is not None:
+            return block
+    return await fetch_bars(tickers, start, end, interval=interval)
 
-    # ---- Tickers ----
-    tickers = sorted(orders["ticker"].dropna().unique().tolist())
-    tickers_no_cash = [t for t in tickers if t != Order.CASH_TICKER]
-    _logger.info({
-        "granularity_in": granularity,
-        "intended": (intended_period, intended_interval),
-        "effective": (effective_period, effective_interval),
-    })
-
-    # ---- Fetch prices ----
-    prices_raw: Dict[str, pd.DataFrame] = {}
-    if tickers_no_cash:
-        prices_raw = await fetch_full_data(
-            tickers=tickers_no_cash,
-            period=effective_period,
-            interval=effective_interval,
-        )
 
-    price_df = clean_prices_df(prices_raw).copy()  # may be wide; index must be tz-aware UTC
+def _normalize_prices(prices_raw: Dict[str, pd.DataFrame] | PriceBlock, interval: str) -> pd.DataFrame:
+    """
+    Wide close frame with a sorted, de-duplicated tz-aware UTC index.
+    Intraday bars are aligned to exchange sessions (stray off-session bars dropped).
+    Each step only copies when it changes something (a PriceBlock is already clean).
+    """
+    with span("clean_prices"):
+        price_df = clean_prices_df(prices_raw)  # may be wide; index must be tz-aware UTC
 
-    # ==== NORMALIZE BEFORE ANY LOGGING/SLICE ====
     if not price_df.empty:
         if price_df.index.tz is None:
             price_df.index = price_df.index.tz_localize("UTC")
         else:
             price_df.index = price_df.index.tz_convert("UTC")
-        price_df = price_df[~price_df.index.duplicated(keep="last")].sort_index()
-
-    # ---- Coverage print (pre-slice) ----
-    pre_min = None if price_df.empty else str(price_df.index.min())
-    pre_max = None if price_df.empty else str(price_df.index.max())
-    unique_ny_days = (
-        0 if price_df.empty
-        else pd.Index(price_df.index.tz_convert(NY).date).nunique()
-    )
-    print({
-        "effective": (effective_period, effective_interval),
-        "pre_slice_min": pre_min,
-        "pre_slice_max": pre_max,
-        "pre_slice_unique_days_ny": unique_ny_days,
-        "pre_slice_rows": int(len(price_df)),
-    })
-
-    # ---- Apply time window slice (CRITICAL) ----
+        duplicated = price_df.index.duplicated(keep="last")
+        if duplicated.any():
+            price_df = price_df[~duplicated]
+        if not price_df.index.is_monotonic_increasing:
+            price_df = price_df.sort_index()
+
+        if interval not in DAILY_INTERVALS:
+            inside = session_mask(price_df.index)
+            if not inside.all():
+                price_df = price_df.loc[inside]
+
+    return price_df
+
+
+def _resolve_window(
+    granularity: str,
+    interval: str,
+    orders: pd.DataFrame,
+    price_df: pd.DataFrame,
+    now_utc: pd.Timestamp
+) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Window for a granularity, clamped to inception (first order).
+    """
     win_start_utc, win_end_utc = compute_window(granularity, now_utc=now_utc)
 
     # ---- Clamp window start to inception (first order), with daily edge fix ----
+    daily_like = interval in {"1d", "1wk", "1mo"}
     earliest_orders = orders["timestamp"].min() if not orders.empty else None
     if earliest_orders is not None:
         # Ensure tz-aware UTC
@@ -222,8 +231,6 @@ async def get_portfolio_data(
                 if getattr(earliest_orders, "tzinfo", None)
                 else pd.Timestamp(earliest_orders, tz="UTC"))
 
-        daily_like = effective_interval in {"1d", "1wk", "1mo"}
-
         if eo_utc > win_start_utc:
             if daily_like:
                 eo_day = eo_utc.normalize()  # midnight UTC of that day (yfinance daily bar)
@@ -238,25 +245,14 @@ async def get_portfolio_data(
                 # Intraday: can start exactly at the first order timestamp
                 win_start_utc = max(win_start_utc, eo_utc)
 
-
-
-    # For ALL, widen to earliest data or order
     # ---- ALL: start at inception (first order), else earliest price ----
-    if granularity.upper() == "ALL":
+    if granularity == "ALL":
         earliest_prices = price_df.index.min() if not price_df.empty else None
 
-        if not orders.empty:
-            # eo_utc already computed above (tz-aware UTC)
-            if effective_interval in {"1d", "1wk", "1mo"}:
-                eo_day = eo_utc.normalize()
+        if earliest_orders is not None:
+            if daily_like:
                 # start the day AFTER the first order so positions exist at the first bar
-                win_start_utc = eo_day + pd.Timedelta(days=1)
-
-                # optional: if you prefer to align to the next available timestamp in the data:
-                # if not price_df.empty:
-                #     next_idx = price_df.index[price_df.index > eo_day]
-                #     if len(next_idx) > 0:
-                #         win_start_utc = next_idx[0]
+                win_start_utc = eo_utc.normalize() + pd.Timedelta(days=1)
             else:
                 # intraday can start exactly at the first order timestamp
                 win_start_utc = eo_utc
@@ -264,44 +260,231 @@ async def get_portfolio_data(
             win_start_utc = (earliest_prices.tz_convert("UTC")
                             if getattr(earliest_prices, "tzinfo", None)
                             else pd.Timestamp(earliest_prices, tz="UTC"))
-    # else keep computed window
 
+    return win_start_utc, win_end_utc
 
-    if granularity.upper() == "1D" and not price_df.empty:
-        last_day_ny = price_df.index.tz_convert(NY).date.max()
-        today_ny = now_utc.tz_convert(NY).date()
-        if last_day_ny != today_ny:
-            s_ny = pd.Timestamp(last_day_ny, tz=NY) + pd.Timedelta(hours=9, minutes=30)
-            e_ny = pd.Timestamp(last_day_ny, tz=NY) + pd.Timedelta(hours=16) - pd.Timedelta(minutes=1)
-            win_start_utc, win_end_utc = s_ny.tz_convert("UTC"), e_ny.tz_convert("UTC")
+
+def _slice_prices(
+    price_df: pd.DataFrame,
+    start_utc: pd.Timestamp,
+    end_utc: pd.Timestamp
+) -> pd.DataFrame:
+    """
+    Authoritative [start, end] slice, forward-filled per ticker.
+    """
+    if price_df.empty:
+        return price_df
+
+    # sorted index (see _normalize_prices): a positional slice is a view
+    lo, hi = price_df.index.searchsorted(start_utc, side="left"), price_df.index.searchsorted(end_utc, side="right")
+    price_df = price_df.iloc[lo:hi]
+    if not price_df.isna().values.any():
+        return price_df
+
+    # (Optional) FFILL per ticker for a wide MultiIndex to avoid NaNs at the first bar
+    try:
+        if isinstance(price_df.columns, pd.MultiIndex):
+            # forward-fill within each ticker group
+            price_df = (price_df.sort_index()
+                        .groupby(level=0, axis=1, sort=False)
+                        .apply(lambda g: g.ffill()))
+        else:
+            price_df = price_df.ffill()
+        price_df = price_df.dropna(how="all")
+    except Exception:
+        # keep going even if ffill grouping isn't needed
+        pass
+
+    return price_df
+
+
+def _slice_performance(
+    perf: Dict[str, pd.DataFrame | pd.Series],
+    start_utc: pd.Timestamp,
+    end_utc: pd.Timestamp
+) -> Dict[str, pd.DataFrame | pd.Series]:
+    """
+    Cut a performance dict computed over a wider window down to [start, end].
+
+    Holdings and cash are cumulative, so slicing them is equivalent to replaying
+    the ledger over the narrower window; only simple returns need recomputing.
+    """
+    out = {}
+    for key, obj in perf.items():
+        if isinstance(obj, (pd.Series, pd.DataFrame)):
+            obj = obj.loc[(obj.index >= start_utc) & (obj.index <= end_utc)]
+        out[key] = obj
+
+    if "ret" in out:
+        out["ret"] = out["portfolio_pv"].pct_change().fillna(0.0)
+
+    return out
+
+
+def _replay_interval(
+    portfolio: Portfolio,
+    orders: pd.DataFrame,
+    price_df: pd.DataFrame,
+    members: list[str],
+    interval: str,
+    now_utc: pd.Timestamp
+) -> Tuple[Dict[str, Tuple[pd.Timestamp, pd.Timestamp]], pd.DataFrame, Dict[str, pd.DataFrame | pd.Series]]:
+    """
+    One replay of the ledger over the union of the members' windows.
+    Returns ({granularity: (start, end)}, the sliced prices, performance dict).
+    """
+    windows = {
+        g: _resolve_window(g, interval, orders, price_df, now_utc)
+        for g in members
+    }
+    union_start = min(s for s, _ in windows.values())
+    union_end = max(e for _, e in windows.values())
 
     # ---- Authoritative slice ----
-    if not price_df.empty:
-        price_df = price_df.loc[(price_df.index >= win_start_utc) & (price_df.index <= win_end_utc)]
-
-        # (Optional) FFILL per ticker for a wide MultiIndex to avoid NaNs at the first bar
-        try:
-            if isinstance(price_df.columns, pd.MultiIndex):
-                # forward-fill within each ticker group
-                price_df = (price_df.sort_index()
-                            .groupby(level=0, axis=1, sort=False)
-                            .apply(lambda g: g.ffill()))
-            else:
-                price_df = price_df.ffill()
-            price_df = price_df.dropna(how="all")
-        except Exception:
-            # keep going even if ffill grouping isn't needed
-            pass
+    price_df = _slice_prices(price_df, union_start, union_end)
 
-    _logger.info({"window": (str(win_start_utc), str(win_end_utc)),
-                  "rows_after_window": len(price_df)})
+    _logger.debug({"windows": windows, "rows_after_window": len(price_df)})
 
     # ---- Compute performance ----
-    return {
-        "performance": portfolio.get_performance(
-            orders_df=orders,     # full history (do NOT window orders)
+    # orders before the first bar fold into the opening state; only the
+    # ones inside the window are aligned to bars. Unpriced tickers stay out
+    # of both, as when the whole ledger went through the timeseries engine.
+    before, during = split_at(orders, price_df.index[0]) if not price_df.empty else (orders.iloc[:0], orders)
+    opening, opening_cash = replay(before, cash_ticker=Order.CASH_TICKER, tickers=price_df.columns)
+    with span("timeseries"):
+        perf = portfolio.get_performance(
+            orders_df=during,
             prices_df=price_df,   # normalized, clamped, sliced
-        ),
+            initial_holdings=opening,
+            initial_cash=opening_cash,
+        )
+
+    return windows, price_df, perf
+
+
+async def _load_portfolio(
+    repo: Repository,
+    user_id: str,
+    portfolio_id: str
+) -> Tuple[Portfolio, pd.DataFrame]:
+    """
+    Fetch the portfolio row (scoped by user) and its cleaned order ledger.
+    """
+    user_id_str = _ensure_uuid_str(user_id, "user_id")
+    portfolio_id_str = _ensure_uuid_str(portfolio_id, "portfolio_id")
+
+    portfolio_row, ledger = await asyncio.gather(
+        get_owned_portfolio(repo, user_id_str, portfolio_id_str),
+        get_ledger(repo, portfolio_id_str),
+    )
+    if not portfolio_row:
+        raise ValueError("Portfolio not found or not accessible by user")
+
+    portfolio = Portfolio(**portfolio_row)
+
+    return portfolio, ledger["orders"]
+
+
+async def get_portfolio_performance(
+    repo: Repository,
+    user_id: str,
+    portfolio_id: str,
+    granularities: list[str] = PERIODS
+) -> Dict[str, Dict[str, pd.DataFrame | pd.Series]]:
+    """
+    Compute performance for several granularities from one ledger read.
+
+    Granularities are grouped by bar interval (see _plan_fetches) so each
+    interval is fetched once over its exact window, and the ledger is replayed once per interval
+    over the union of its members' windows before being sliced per member.
+
+    Returns {granularity: performance dict}.
+    """
+    granularities = [g.upper().strip() for g in granularities]
+    portfolio, orders = await _load_portfolio(repo, user_id, portfolio_id)
+
+    # ---- Time context ----
+    start_dt = parse_timestamptz(portfolio.created_at)  # tz-aware
+    tzinfo = start_dt.tzinfo or timezone.utc
+    now_dt = datetime.now(tzinfo)
+    now_utc = pd.Timestamp(now_dt).tz_convert("UTC")
+
+    # ---- Tickers ----
+    tickers = sorted(orders["ticker"].dropna().unique().tolist())
+    tickers_no_cash = [t for t in tickers if t != Order.CASH_TICKER]
+
+    plan = _plan_fetches(granularities, orders, now_utc)
+    if _logger.isEnabledFor(logging.DEBUG):
+        _logger.debug({
+            "granularities": granularities,
+            "fetches": {f"{i} {s} -> {e}": members for (i, s, e), members in plan.items()},
+        })
+
+    # ---- Fetch prices, one window-exact fetch per interval ----
+    fetched = await asyncio.gather(*[
+        _fetch_prices(tickers_no_cash, start, end, interval)
+        if tickers_no_cash else asyncio.sleep(0, result={})
+        for interval, start, end in plan
+    ])
+
+    out: Dict[str, Dict[str, pd.DataFrame | pd.Series]] = {}
+    for ((interval, start, end), members), prices_raw in zip(plan.items(), fetched):
+        price_df = _normalize_prices(prices_raw, interval)
+
+        # ---- Coverage (pre-slice) ----
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug({
+                "effective": (interval, str(start), str(end)),
+                "pre_slice_min": None if price_df.empty else str(price_df.index.min()),
+                "pre_slice_max": None if price_df.empty else str(price_df.index.max()),
+                "pre_slice_unique_days_ny": (
+                    0 if price_df.empty
+                    else pd.Index(price_df.index.tz_convert(NY).date).nunique()
+                ),
+                "pre_slice_rows": int(len(price_df)),
+            })
+
+        windows, _, perf = _replay_interval(portfolio, orders, price_df, members, interval, now_utc)
+
+        for g, (s, e) in windows.items():
+            out[g] = perf if len(members) == 1 else _slice_performance(perf, s, e)
+
+    return out
+
+
+async def get_portfolio_data(
+    repo: Repository,
+    user_id: str,
+    portfolio_id: str,
+    granularity: str = "ALL"
+):
+    perf = await get_portfolio_performance(repo, user_id, portfolio_id, [granularity])
+
+    return {
+        "performance": perf[granularity.upper().strip()],
     }
 
 
+async def get_performance_payload(
+    repo: Repository,
+    user_id: str,
+    portfolio_id: str,
+    granularity: str = "ALL"
+) -> Dict[str, Any]:
+    """
+    Response body of performance/{portfolio_id} (legacy flat arrays)
+    """
+    from app.utils.serialize import serialize_performance_legacy
+
+    raw = await get_portfolio_data(repo, user_id=user_id, portfolio_id=portfolio_id, granularity=granularity)
+    with span("serialize"):
+        legacy = serialize_performance_legacy(raw.get("performance", {}))
+
+    return {
+        "id": str(raw.get("id", portfolio_id)),
+        "user_id": str(user_id),
+        "name": raw.get("name", ""),
+        "created_at": raw.get("start_dt", ""),
+        "last_updated": raw.get("start_dt", ""),
+        "performance": legacy,
+    }
@@ -5,62 +5,109 @@ Portfolios Service
 import uuid
 
 from datetime import datetime
-from supabase import create_client
+from typing import Any, Dict, List
 
-from app.configs import config
+from app.db import Repository
 from app.utils.logger import setup_logger
 from app.models import Portfolio, Order, Positions
-from app.services.market import fetch_recent_quotes
+from app.services import ledger
+from app.services.matching import forget_pending_orders
+from app.services.ownership import (
+    get_owned_portfolio,
+    remember_portfolios,
+    remember_portfolio,
+    forget_portfolio
+)
 from app.services.positions import get_portfolio_positions
 
 
 _logger = setup_logger()
 
 
-supabase = create_client(
-    config.SUPABASE_URL,
-    config.SUPABASE_SERVICE_KEY
-)
-
-
-def get_all_portfolios(user_id: str):
+async def get_all_portfolios(repo: Repository, user_id: str, with_values: bool = False):
     """
     Fetch all portfolios for a given user, including their tickers.
+
+    with_values adds present_value and positions (as GET /portfolios/{id})
+    to every row, using one ledger positions query and one quote fetch in total.
     """
     # Step 1: Get all portfolios for the user
-    portfolios_res = supabase.table(
-        config.DB_SCHEMA.PORTFOLIOS
-    ).select("*").eq("user_id", user_id).execute()
-
-    portfolios = portfolios_res.data
+    portfolios = await repo.get_portfolios(user_id)
+    remember_portfolios(user_id, portfolios)
 
     if not portfolios:
         return []
 
+    if with_values:
+        return await value_portfolios(repo, portfolios)
+
     return portfolios
 
 
+async def value_portfolios(repo: Repository, portfolios: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Value many portfolios at once: the positions their order ledgers imply
+    (the source get_portfolio_data values, not the positions table) in one
+    query, quotes once for the union of their tickers, then one vectorized
+    quantity * price and group-by.
+    """
+    import pandas as pd
+    from app.services.market import fetch_recent_quotes
+
+    ids = [p["id"] for p in portfolios]
+    rows = await repo.get_ledger_positions(ids)
+
+    positions = pd.DataFrame(rows, columns=["portfolio_id", "ticker", "quantity"])
+    positions["quantity"] = pd.to_numeric(positions["quantity"], errors="coerce").fillna(0.0)
+
+    tickers = sorted(set(positions["ticker"].dropna()) - {Order.CASH_TICKER})
+    quotes = await fetch_recent_quotes(tickers) if tickers else {}
+
+    prices = pd.Series(quotes, dtype=float)
+    prices[Order.CASH_TICKER] = 1.0
+    missing = sorted(set(tickers) - set(quotes))
+    if missing:
+        _logger.warning("No quote for %s, valued at 0", missing)
+
+    positions["value"] = positions["quantity"] * positions["ticker"].map(prices).fillna(0.0)
+    totals = positions.groupby("portfolio_id")["value"].sum()
+
+    by_portfolio: Dict[str, Dict[str, Any]] = {pid: {} for pid in ids}
+    for pid, ticker, quantity, value in positions[["portfolio_id", "ticker", "quantity", "value"]].itertuples(index=False):
+        by_portfolio.setdefault(pid, {})[ticker] = dict(quantity=float(quantity), value=float(value))
+
+    out = []
+    for row in portfolios:
+        item = Portfolio(**row).raw
+        item.update(
+            dict(
+                present_value=float(totals.get(row["id"], 0.0)),
+                positions=by_portfolio[row["id"]]
+            )
+        )
+        out.append(item)
+
+    return out
+
+
 async def get_portfolio_data(
+        repo: Repository,
         user_id: str, 
         portfolio_id: str
     ):
     """
     Fetch all portfolios for a given user, including their tickers.
     """
-    portfolio_res = (
-        supabase.table(config.DB_SCHEMA.PORTFOLIOS)
-        .select("*")
-        .eq("user_id", user_id)
-        .eq("id", portfolio_id)
-        .execute()
-    )
+    portfolio_row = await get_owned_portfolio(repo, user_id, portfolio_id)
 
-    if not portfolio_res.data[0]:
+    if not portfolio_row:
         raise ValueError('Portfolio not found')
 
-    out = Portfolio(**portfolio_res.data[0]).raw
+    from app.services.market import fetch_recent_quotes
+
+    out = Portfolio(**portfolio_row).raw
     positions = Positions(
-        get_portfolio_positions(portfolio_id=portfolio_id)
+        await get_portfolio_positions(repo, portfolio_id=portfolio_id)
     )
 
     lean_positions = dict()
@@ -69,14 +116,17 @@ async def get_portfolio_data(
         value=positions.cash
     )
     prices = await fetch_recent_quotes(positions.tickers)
+    missing = sorted(set(positions.tickers) - set(prices))
+    if missing:
+        _logger.warning("No quote for %s, valued at 0", missing)
 
     total_value = positions.cash
     for ticker in positions.tickers:
         lean_positions[ticker] = dict(
             quantity=positions.quantity_of(ticker),
-            value=positions.value_of(ticker, prices[ticker])
+            value=positions.value_of(ticker, prices.get(ticker, 0.0))
         )
-        total_value += positions.value_of(ticker, prices[ticker])
+        total_value += positions.value_of(ticker, prices.get(ticker, 0.0))
 
     out.update(
         dict(present_value=total_value, positions=lean_positions)
@@ -85,7 +135,7 @@ async def get_portfolio_data(
     return out
 
 
-def create_portfolio(user_id: str, name: str):
+async def create_portfolio(repo: Repository, user_id: str, name: str):
     """
     Insert a new portfolio into the portfolios table with initial capital.
     """
@@ -99,35 +149,31 @@ def create_portfolio(user_id: str, name: str):
         last_updated=now
     ).verify()
 
-    res = supabase.table("portfolios").insert(
-        new_portfolio.raw
-    ).execute()
-
-    if not res.data:
-        raise Exception(f"Failed to create portfolio: {res}")
+    row = await repo.insert_portfolio(new_portfolio.raw)
+    remember_portfolio(user_id, row)
 
-    return res.data[0]
+    return row
 
 
-def delete_portfolio(user_id: str, portfolio_id: str):
+async def delete_portfolio(repo: Repository, user_id: str, portfolio_id: str):
     """
     Delete a portfolio for the given user and portfolio_id.
     Also removes all associated tickers/orders.
     """
+    if await get_owned_portfolio(repo, user_id, portfolio_id) is None:
+        raise ValueError(f"Portfolio {portfolio_id} not found")
+
     # First delete any related tickers/orders
-    supabase.table(config.DB_SCHEMA.ORDERS) \
-        .delete() \
-        .eq("portfolio_id", portfolio_id) \
-        .execute()
+    await repo.delete_orders(portfolio_id)
 
     # Then delete the portfolio itself (scoped by user_id for safety)
-    res = supabase.table(config.DB_SCHEMA.PORTFOLIOS) \
-        .delete() \
-        .eq("id", portfolio_id) \
-        .eq("user_id", user_id) \
-        .execute()
+    deleted = await repo.delete_portfolio(user_id, portfolio_id)
+
+    ledger.invalidate(portfolio_id)
+    forget_portfolio(user_id, portfolio_id)
+    forget_pending_orders(portfolio_id)
 
-    if not res.data:
+    if not deleted:
         raise Exception(f"Portfolio {portfolio_id} not found or could not be deleted")
 
     return {"message": f"Portfolio {portfolio_id} deleted successfully"}
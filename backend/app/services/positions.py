@@ -3,29 +3,18 @@ Positions Management Service
 """
 
 from typing import Dict, Any
-from supabase import create_client
 
-from app.configs import config
-from app.models import Positions
+from app.db import Repository
 from app.utils.logger import setup_logger
+from .ledger import get_ledger
 
 _logger = setup_logger()
 
-supabase = create_client(
-    config.SUPABASE_URL,
-    config.SUPABASE_SERVICE_KEY
-)
 
-
-def get_portfolio_positions(portfolio_id: str) -> Dict[str, Any]:
+async def get_portfolio_positions(repo: Repository, portfolio_id: str) -> Dict[str, Any]:
     """
     Returns: { "<TICKER>": { ...all row fields incl. portfolio_id } }
     """
-    res = supabase.table(config.DB_SCHEMA.POSITIONS)\
-        .select("ticker, portfolio_id, name, sector, quantity, created_at, updated_at")\
-        .eq("portfolio_id", portfolio_id)\
-        .execute()
-
-    items = res.data or []
+    ledger = await get_ledger(repo, portfolio_id)
 
-    return {row["ticker"]: row for row in items if row.get("ticker")}
+    return {ticker: dict(row) for ticker, row in ledger["positions"].items()}
@@ -0,0 +1,199 @@
+"""
+Snapshots Service - positions as periodic snapshots of the order ledger
+
+Orders are the event log. A snapshot stores the holdings and cash implied
+by every order up to a keyset (last_timestamp, last_order_id); holdings at
+any time are the nearest earlier snapshot plus a replay of the orders after
+it. The reconcile job compares the positions table against the ledger and
+repairs drift.
+"""
+
+import asyncio
+
+import pandas as pd
+
+from typing import Any, Dict, List, Optional
+
+from app.configs import config
+from app.db import Repository, LedgerRejected
+from app.models import Order
+from app.utils.logger import setup_logger
+from app.utils.holdings import replay, drift
+from app.utils.performance import clean_orders_df
+from app.utils.timestamps import parse_timestamptz
+from . import ledger
+
+
+_logger = setup_logger()
+
+
+async def _replay_from(
+    repo: Repository,
+    portfolio_id: str,
+    snapshot: Optional[Dict[str, Any]],
+    at: Optional[pd.Timestamp] = None
+) -> Dict[str, Any]:
+    """
+    Snapshot state (or empty) plus the orders after it, up to `at`.
+
+    Returns {"holdings", "cash", "last", "order_count", "replayed"} where
+    last is the keyset of the newest order folded in.
+    """
+    holdings = dict(snapshot["holdings"]) if snapshot else {}
+    cash = float(snapshot["cash"]) if snapshot else 0.0
+    last = (snapshot["last_timestamp"], snapshot["last_order_id"]) if snapshot else None
+    count = int(snapshot["order_count"]) if snapshot else 0
+
+    replayed = 0
+    async for rows in ledger.iter_orders(repo, portfolio_id, after=last):
+        chunk = clean_orders_df(rows)
+        if at is not None:
+            keep = (chunk["timestamp"] <= at).to_numpy()
+            rows = [row for row, k in zip(rows, keep) if k]
+            chunk = chunk[keep]
+        holdings, cash = replay(chunk, holdings, cash, cash_ticker=Order.CASH_TICKER)
+        if rows:
+            last = (rows[-1]["timestamp"], rows[-1]["order_id"])
+        replayed += len(rows)
+        if at is not None and len(rows) < len(keep):
+            break
+
+    return {
+        "holdings": holdings,
+        "cash": cash,
+        "last": last,
+        "order_count": count + replayed,
+        "replayed": replayed,
+    }
+
+
+async def holdings_at(
+    repo: Repository,
+    portfolio_id: str,
+    at: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Holdings and cash of a portfolio at `at` (now if None)
+
+    Returns: { "holdings": {ticker: qty}, "cash": float, "as_of": str | None, "replayed": int }
+    """
+    at_ts = parse_timestamptz(at) if at else None
+    at_utc = pd.Timestamp(at_ts).tz_convert("UTC") if at_ts is not None else None
+
+    snapshot = await repo.get_snapshot(portfolio_id, at=at_utc.isoformat() if at_utc is not None else None)
+    state = await _replay_from(repo, portfolio_id, snapshot, at=at_utc)
+
+    return {
+        "holdings": {t: q for t, q in state["holdings"].items() if q},
+        "cash": state["cash"],
+        "as_of": state["last"][0] if state["last"] else None,
+        "replayed": state["replayed"],
+    }
+
+
+async def take_snapshot(
+    repo: Repository,
+    portfolio_id: str,
+    force: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Store a new snapshot once SNAPSHOT_EVERY_ORDERS orders have accumulated
+    since the latest one (any new order if force). Returns the stored row.
+    """
+    snapshot = await repo.get_snapshot(portfolio_id)
+    state = await _replay_from(repo, portfolio_id, snapshot)
+
+    if state["last"] is None or state["replayed"] == 0:
+        return None
+    if not force and state["replayed"] < config.SNAPSHOT_EVERY_ORDERS:
+        return None
+
+    last_timestamp, last_order_id = state["last"]
+    return await repo.insert_snapshot({
+        "portfolio_id": portfolio_id,
+        "last_timestamp": last_timestamp,
+        "last_order_id": last_order_id,
+        "order_count": state["order_count"],
+        "holdings": state["holdings"],
+        "cash": state["cash"],
+    })
+
+
+async def reconcile_portfolio(
+    repo: Repository,
+    portfolio_id: str,
+    repair: bool = True
+) -> Dict[str, Any]:
+    """
+    Compare stored positions with the ledger (latest snapshot + replay) and,
+    if repair, overwrite the drifted quantities.
+
+    Returns: { "portfolio_id", "drift": {ticker: [ledger, stored]}, "repaired": bool }
+    """
+    version = await repo.get_ledger_version(portfolio_id)
+    snapshot, rows = await asyncio.gather(
+        repo.get_snapshot(portfolio_id),
+        repo.get_positions(portfolio_id),
+    )
+    state = await _replay_from(repo, portfolio_id, snapshot)
+
+    expected = dict(state["holdings"])
+    expected[Order.CASH_TICKER] = state["cash"]
+    stored = {row["ticker"]: float(row.get("quantity") or 0) for row in rows if row.get("ticker")}
+
+    found = drift(expected, stored)
+    report = {
+        "portfolio_id": portfolio_id,
+        "drift": {t: list(pair) for t, pair in found.items()},
+        "repaired": False,
+    }
+    if not found:
+        return report
+
+    _logger.warning("Positions drift in portfolio %s: %s", portfolio_id, report["drift"])
+
+    if repair:
+        try:
+            await repo.reconcile_positions(
+                portfolio_id,
+                version,
+                {t: expected.get(t, 0.0) for t in found}
+            )
+            report["repaired"] = True
+            ledger.invalidate(portfolio_id)
+        except LedgerRejected as e:
+            # an order landed mid-check; the next run sees the new state
+            _logger.info("Reconcile of %s skipped: %s", portfolio_id, e)
+
+    return report
+
+
+async def reconcile_all(repo: Repository, repair: bool = True) -> List[Dict[str, Any]]:
+    """
+    Reconcile (and snapshot, when due) every portfolio; returns drift reports
+    """
+    reports = []
+    for portfolio_id in await repo.get_portfolio_ids():
+        try:
+            report = await reconcile_portfolio(repo, portfolio_id, repair=repair)
+            await take_snapshot(repo, portfolio_id)
+        except Exception as e:
+            _logger.error("Reconcile of %s failed: %s", portfolio_id, e)
+            continue
+        if report["drift"]:
+            reports.append(report)
+    return reports
+
+
+async def run_reconcile_job(repo: Repository, interval: float) -> None:
+    """
+    Background loop: reconcile_all every `interval` seconds (until cancelled)
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            reports = await reconcile_all(repo)
+        except Exception as e:
+            _logger.error("Reconcile run failed: %s", e)
+            continue
+        _logger.info("Reconcile run done, %d portfolio(s) drifted", len(reports))
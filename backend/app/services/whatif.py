@@ -0,0 +1,262 @@
+"""
+What-if Simulation - hypothetical orders overlaid on a portfolio's ledger
+
+The real series of a (portfolio, period) is computed once per ledger version
+and kept in a per-process cache together with its price slice. A simulation
+then only:
+
+    1. prices the hypothetical orders (default: the close of the bar they
+       align to; timestamps past the last bar execute on it)
+    2. takes the real holdings / cash on the bar before the earliest
+       hypothetical order as the opening state
+    3. replays the real orders after that bar merged with the hypothetical
+       ones, over the remaining bars only
+
+so editing an order form costs one short replay, not a ledger read, a price
+fetch and a full recompute. Nothing is written to the database.
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from app.configs import config
+from app.db import Repository
+from app.models import Order
+from app.utils.cache import TieredCache
+from app.utils.holdings import replay, split_at
+from app.utils.logger import setup_logger
+from app.utils.metrics import span
+from app.utils.serialize import _iso
+from app.utils.timeseries import compute_portfolio_timeseries
+from .ledger import get_ledger
+from .performance import (
+    _fetch_prices,
+    _fetch_window,
+    _load_portfolio,
+    _normalize_prices,
+    _parse_granularity,
+    _replay_interval,
+    _slice_prices,
+)
+
+
+_logger = setup_logger()
+
+SERIES = ("holdings", "cash", "position_pv", "portfolio_pv", "weights")
+
+# (portfolio, period, ledger version) -> real series; frames stay in-process
+_baselines = TieredCache(
+    "whatif", ttl=config.WHATIF_BASELINE_TTL, local_size=config.WHATIF_BASELINE_SIZE, shared=None
+)
+
+
+async def _baseline(repo: Repository, user_id: str, portfolio_id: str, granularity: str) -> Dict[str, Any]:
+    """
+    Ledger, bar window, price slice and real performance of one period
+    (real is None when the ledger holds nothing to price)
+    """
+    portfolio, orders = await _load_portfolio(repo, user_id, portfolio_id)
+    now_utc = pd.Timestamp.now(tz="UTC")
+    interval = _parse_granularity(granularity)
+    window = _fetch_window(granularity, interval, orders, now_utc)
+
+    tickers = sorted(t for t in orders["ticker"].dropna().unique() if t != Order.CASH_TICKER)
+    prices, real = pd.DataFrame(), None
+    if tickers:
+        prices = _normalize_prices(await _fetch_prices(tickers, *window, interval), interval)
+    if not prices.empty:
+        _, prices, real = _replay_interval(portfolio, orders, prices, [granularity], interval, now_utc)
+
+    return {"orders": orders, "interval": interval, "window": window, "prices": prices, "real": real}
+
+
+def _hypothetical(orders: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Cleaned frame of the requested orders (price NaN = at the bar's close)
+    """
+    if not orders:
+        raise ValueError("At least one hypothetical order is required")
+    if len(orders) > config.WHATIF_MAX_ORDERS:
+        raise ValueError(f"At most {config.WHATIF_MAX_ORDERS} hypothetical orders per simulation")
+
+    rows = []
+    for o in orders:
+        ticker = str(o.get("ticker") or "").strip().upper()
+        quantity = float(o.get("quantity") or 0)
+        price = o.get("price")
+        if not ticker:
+            raise ValueError("Hypothetical orders need a ticker")
+        if quantity == 0:
+            raise ValueError(f"Hypothetical {ticker} order needs a non-zero quantity")
+        if price is not None and price <= 0:
+            raise ValueError(f"Hypothetical {ticker} order needs a positive price")
+        try:
+            ts = pd.Timestamp(o.get("timestamp") or pd.Timestamp.now(tz="UTC"))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid timestamp for hypothetical {ticker} order: {e}")
+        rows.append({
+            "ticker": ticker,
+            "quantity": quantity,
+            "price": 1.0 if ticker == Order.CASH_TICKER else (np.nan if price is None else float(price)),
+            "timestamp": ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC"),
+        })
+    return pd.DataFrame(rows).sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+
+async def _prices_with(base: Dict[str, Any], tickers: List[str]) -> pd.DataFrame:
+    """
+    The baseline price slice plus columns for tickers the ledger never held
+    """
+    prices = base["prices"]
+    extra = sorted(set(tickers) - set(prices.columns) - {Order.CASH_TICKER})
+    if not extra:
+        return prices
+
+    interval = base["interval"]
+    start, end = (prices.index[0], prices.index[-1]) if not prices.empty else base["window"]
+    more = _normalize_prices(await _fetch_prices(extra, start, end, interval), interval)
+    missing = sorted(set(extra) - set(more.columns))
+    if missing:
+        raise ValueError(f"No prices for: {missing}")
+    if prices.empty:
+        return _slice_prices(more[extra], start, end)
+
+    # the baseline's bars, each extra ticker at its last close on or before them
+    more = more[extra].reindex(more.index.union(prices.index)).ffill().reindex(prices.index)
+    return pd.concat([prices, more], axis=1)
+
+
+def _perf(prices: pd.DataFrame, orders: pd.DataFrame, holdings: Dict[str, float], cash: float) -> Dict[str, Any]:
+    return compute_portfolio_timeseries(
+        prices, orders, cash_ticker=Order.CASH_TICKER, initial_holdings=holdings, initial_cash=cash
+    )
+
+
+def _overlay(
+    orders: pd.DataFrame,
+    prices: pd.DataFrame,
+    real: Dict[str, Any] | None,
+    hypothetical: pd.DataFrame
+) -> Dict[str, Any]:
+    """
+    (priced hypothetical orders, first affected bar, real series, simulated
+    series); both series span every bar of prices
+    """
+    index = prices.index
+
+    # price and align the hypothetical orders
+    hypothetical = hypothetical.assign(timestamp=hypothetical["timestamp"].clip(upper=index[-1]))
+    bars = index.searchsorted(hypothetical["timestamp"], side="left")
+    unpriced = hypothetical["price"].isna().to_numpy()
+    if unpriced.any():
+        columns = prices.columns.get_indexer(hypothetical.loc[unpriced, "ticker"])
+        hypothetical.loc[unpriced, "price"] = prices.to_numpy()[bars[unpriced], columns]
+    for row in hypothetical[hypothetical["price"].isna()].itertuples():
+        raise ValueError(f"No {row.ticker} price at {row.timestamp.isoformat()}")
+
+    if real is None:
+        before, during = split_at(orders, index[0])
+        real = _perf(prices, during, *replay(before, cash_ticker=Order.CASH_TICKER, tickers=prices.columns))
+
+    # opening state on the bar before the first hypothetical one: the real
+    # series already holds it, so only the bars from there on are replayed
+    k = int(bars.min())
+    if k > 0:
+        held = real["holdings"].iloc[k - 1]
+        opening, opening_cash = {t: q for t, q in held.items() if q}, float(real["cash"].iloc[k - 1])
+        rest = orders.iloc[orders["timestamp"].searchsorted(index[k - 1], side="right"):]
+    else:
+        before, rest = split_at(orders, index[0])
+        opening, opening_cash = replay(before, cash_ticker=Order.CASH_TICKER, tickers=prices.columns)
+
+    merged = pd.concat([rest[hypothetical.columns], hypothetical], ignore_index=True)
+    tail = _perf(prices.iloc[k:], merged.sort_values("timestamp", kind="stable"), opening, opening_cash)
+
+    # tickers only the hypothetical orders trade were never held: 0 in real
+    columns = prices.columns
+    real = {
+        key: real[key].reindex(columns=columns, fill_value=0.0) if isinstance(real[key], pd.DataFrame) else real[key]
+        for key in SERIES
+    }
+    simulated = {key: pd.concat([real[key].iloc[:k], tail[key]]) for key in SERIES}
+    return {"orders": hypothetical.assign(bar=index[bars]), "start": k, "real": real, "simulated": simulated}
+
+
+def _summary(perf: Dict[str, Any]) -> Dict[str, Any]:
+    weights = perf["weights"].iloc[-1]
+    return {
+        "pv": float(perf["portfolio_pv"].iloc[-1]),
+        "cash": float(perf["cash"].iloc[-1]),
+        "weights": {t: float(w) for t, w in weights.items() if w},
+    }
+
+
+def _values(series: pd.Series) -> List[float]:
+    return series.replace([np.inf, -np.inf], np.nan).fillna(0.0).tolist()
+
+
+async def simulate_orders(
+    repo: Repository,
+    user_id: str,
+    portfolio_id: str,
+    orders: List[Dict[str, Any]],
+    granularity: str = "ALL"
+) -> Dict[str, Any]:
+    """
+    The period's series with hypothetical orders ({ticker, quantity, price?,
+    timestamp?}) added, as a diff against the real one from the first bar
+    they change; see module docstring
+    """
+    granularity = granularity.upper().strip()
+    _parse_granularity(granularity)  # raises ValueError on unknown granularity
+    hypothetical = _hypothetical(orders)
+
+    version = (await get_ledger(repo, portfolio_id))["version"]
+    base = await _baselines.get_or_load(
+        f"{portfolio_id}|{granularity}|{version}",
+        lambda: _baseline(repo, user_id, portfolio_id, granularity)
+    )
+    prices = await _prices_with(base, hypothetical["ticker"].tolist())
+    if prices.empty:
+        raise ValueError("Nothing to simulate: no priced tickers in the ledger or the hypothetical orders")
+
+    with span("whatif"):
+        sim = _overlay(base["orders"], prices, base["real"], hypothetical)
+
+    k, real, simulated = sim["start"], sim["real"], sim["simulated"]
+    touched = [t for t in dict.fromkeys(hypothetical["ticker"]) if t != Order.CASH_TICKER]
+    diff = {
+        "TIMESTAMP": _iso(prices.index[k:]),
+        "pv:TOTAL": _values(simulated["portfolio_pv"].iloc[k:] - real["portfolio_pv"].iloc[k:]),
+        "cash": _values(simulated["cash"].iloc[k:] - real["cash"].iloc[k:]),
+        **{
+            f"pv:{t}": _values(simulated["position_pv"][t].iloc[k:] - real["position_pv"][t].iloc[k:])
+            for t in touched
+        },
+    }
+
+    warnings = []
+    low = float(simulated["cash"].iloc[k:].min())
+    if low < -1e-6:
+        warnings.append(f"Cash goes negative (down to {low:.2f})")
+    for t in touched:
+        if float(simulated["holdings"][t].iloc[k:].min()) < -1e-9:
+            warnings.append(f"{t} holdings go negative")
+
+    priced = sim["orders"]
+    return {
+        "id": str(portfolio_id),
+        "period": granularity,
+        "version": version,
+        "orders": [
+            {"ticker": o.ticker, "quantity": o.quantity, "price": float(o.price), "timestamp": ts}
+            for o, ts in zip(priced.itertuples(), _iso(pd.DatetimeIndex(priced["bar"])))
+        ],
+        "start": diff["TIMESTAMP"][0],
+        "real": _summary(real),
+        "simulated": _summary(simulated),
+        "diff": diff,
+        "warnings": warnings,
+    }
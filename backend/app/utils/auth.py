@@ -1,26 +1,213 @@
 """
 Auth Utils
+
+Supabase access tokens are verified locally (PyJWT): HS256 against the
+project's JWT secret, or asymmetric algorithms against the project's JWKS,
+which is cached and refreshed. Verified claims are cached per token until
+the token expires. The remote /auth/v1/user call is only used when no local
+key can verify a token, or on every cache miss when AUTH_REMOTE_CHECK is on
+(to honor server-side revocation).
 """
 
-import requests
-from fastapi import Request, HTTPException
+import hmac
+import time
+import asyncio
+
+import jwt
+import httpx
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from fastapi import Request, HTTPException, Depends
 
 from app.configs import config
+from app.db import Repository, get_repository
+from app.services.ownership import get_owned_portfolio
+from app.utils.logger import setup_logger
+from app.utils.metrics import span, cache_event
+
+
+_logger = setup_logger()
+
+# token -> (claims, expires_at)
+_claims: "OrderedDict[str, tuple[Dict[str, Any], float]]" = OrderedDict()
+
+# kid -> PyJWK, refreshed every AUTH_JWKS_TTL seconds (or on an unknown kid)
+_jwks: Dict[str, Any] = {"keys": {}, "fetched": 0.0}
+_jwks_lock = asyncio.Lock()
+
+_client: Optional[httpx.AsyncClient] = None
+
+# Never refetch the JWKS more often than this for unknown kids
+_JWKS_MIN_REFRESH = 30.0
+
+
+def _http() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(base_url=f"{config.SUPABASE_URL}/auth/v1", timeout=config.AUTH_TIMEOUT)
+    return _client
 
 
-def get_current_user_id(request: Request) -> str:
+async def close_auth_client() -> None:
+    """
+    Close the pooled client used for JWKS / remote checks (app shutdown)
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _refresh_jwks(force: bool = False) -> Dict[str, Any]:
+    async with _jwks_lock:
+        age = time.monotonic() - _jwks["fetched"]
+        if age < (_JWKS_MIN_REFRESH if force else config.AUTH_JWKS_TTL):
+            return _jwks["keys"]
+
+        try:
+            res = await _http().get("/.well-known/jwks.json")
+            res.raise_for_status()
+            keys = {}
+            for jwk in res.json().get("keys", []):
+                try:
+                    keys[jwk.get("kid")] = jwt.PyJWK(jwk)
+                except (jwt.PyJWKError, jwt.InvalidKeyError) as e:
+                    # e.g. EC / RSA keys without the optional `cryptography` package
+                    _logger.warning("Skipping JWKS key %s: %s", jwk.get("kid"), e)
+            _jwks["keys"] = keys
+        except (httpx.HTTPError, ValueError) as e:
+            _logger.warning("JWKS refresh failed, keeping %d cached key(s): %s", len(_jwks["keys"]), e)
+
+        _jwks["fetched"] = time.monotonic()
+        return _jwks["keys"]
+
+
+async def _local_key(token: str) -> Optional[tuple[Any, str]]:
+    """
+    (key, algorithm) able to verify this token locally, or None
+    """
+    header = jwt.get_unverified_header(token)
+    alg = header.get("alg")
+
+    if alg == "HS256":
+        return (config.SUPABASE_JWT_SECRET, alg) if config.SUPABASE_JWT_SECRET else None
+
+    kid = header.get("kid")
+    keys = await _refresh_jwks()
+    if kid not in keys:
+        keys = await _refresh_jwks(force=True)
+    key = keys.get(kid)
+    return (key.key, key.algorithm_name) if key is not None else None
+
+
+async def _verify_remote(token: str) -> Dict[str, Any]:
+    try:
+        res = await _http().get(
+            "/user",
+            headers={"Authorization": f"Bearer {token}", "apikey": config.SUPABASE_SERVICE_KEY}
+        )
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=503, detail=f"Auth service unavailable: {e}")
+    if res.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    user = res.json()
+    return {"sub": user["id"]}
+
+
+async def verify_token(token: str) -> Dict[str, Any]:
+    """
+    Verified claims of a Supabase access token (raises 401)
+    """
+    now = time.time()
+    cached = _claims.get(token)
+    if cached is not None and cached[1] > now:
+        _claims.move_to_end(token)
+        cache_event("auth_token", hit=True)
+        return cached[0]
+
+    cache_event("auth_token", hit=False)
+    with span("auth"):
+        return await _verify_uncached(token, now)
+
+
+async def _verify_uncached(token: str, now: float) -> Dict[str, Any]:
+    """
+    Verify a token not in the claims cache and cache its claims
+    """
+    try:
+        local = await _local_key(token)
+        claims = None
+        if local is not None:
+            key, alg = local
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[alg],
+                audience=config.AUTH_JWT_AUDIENCE,
+                options={"require": ["exp", "sub"]},
+                leeway=config.AUTH_LEEWAY,
+            )
+    except jwt.PyJWTError as e:
+        raise HTTPException(status_code=401, detail=f"Invalid or expired token: {e}")
+
+    if claims is None or config.AUTH_REMOTE_CHECK:
+        remote = await _verify_remote(token)
+        if claims is None:
+            claims = remote
+            claims["exp"] = now + config.AUTH_REMOTE_TTL
+
+    expires_at = float(claims["exp"])
+    if config.AUTH_REMOTE_CHECK:
+        expires_at = min(expires_at, now + config.AUTH_REMOTE_TTL)
+
+    _claims[token] = (claims, expires_at)
+    _claims.move_to_end(token)
+    while len(_claims) > config.AUTH_TOKEN_CACHE_SIZE:
+        _claims.popitem(last=False)
+
+    return claims
+
+
+async def get_current_user_id(request: Request) -> str:
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
 
     token = auth_header.split(" ")[1]
 
-    res = requests.get(
-        f"{config.SUPABASE_URL}/auth/v1/user",
-        headers={"Authorization": f"Bearer {token}", "apikey": config.SUPABASE_SERVICE_KEY}
-    )
+    claims = await verify_token(token)
 
-    if res.status_code != 200:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return claims["sub"]
+
+
+async def get_portfolio_owner(
+    request: Request,
+    portfolio_id: str,
+    repo: Repository = Depends(get_repository)
+) -> str:
+    """
+    Dependency for portfolio-scoped routes: the authenticated user's id,
+    after checking (in memory, see services.ownership) that they own
+    portfolio_id. Answers 404 otherwise, so ids of others stay opaque.
+    """
+    user_id = await get_current_user_id(request)
+
+    if await get_owned_portfolio(repo, user_id, portfolio_id) is None:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+
+    return user_id
+
+
+async def require_admin(request: Request) -> None:
+    """
+    Dependency for admin routes: X-Admin-Token must equal ADMIN_TOKEN.
+    Admin routes answer 404 while no ADMIN_TOKEN is configured.
+    """
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
 
-    return res.json()["id"]
\ No newline at end of file
+    token = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(token.encode(), config.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
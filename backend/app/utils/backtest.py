@@ -0,0 +1,335 @@
+"""
+Backtest Functions - strategies simulated over a price matrix
+
+A strategy turns a wide price frame (index = tz-aware bars, columns =
+tickers, as built by clean_prices_df) into one of:
+
+    target weights  (backtest(prices, weights=...)): fraction of portfolio
+                    value per ticker, NaN rows = hold (no rebalance)
+    target shares   (backtest(prices, shares=...)):  NaN rows = hold
+    orders          (backtest(prices, orders=...)):  signed share deltas
+
+Signals are computed on a bar's close and filled at the close `lag` bars
+later. Orders and share targets are simulated with cumulative sums over the
+whole matrix; weight targets only loop over the bars that rebalance (a
+monthly rebalance over ten years is ~120 steps of one vector op each), and
+holdings / cash between rebalances are filled in by index.
+
+Outputs match compute_portfolio_timeseries (holdings, cash, position_pv,
+portfolio_pv, weights, ret) plus the executed trades and risk stats.
+"""
+
+import os
+import itertools
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+NY = "America/New_York"
+TRADING_DAYS = 252
+SESSION_MINUTES = 390
+
+_pool: Dict[str, Any] = {"executor": None, "workers": 0}
+_pool_lock = threading.Lock()
+
+
+# ---------- Strategies ----------
+
+def rebalance(
+    prices: pd.DataFrame,
+    weights: Optional[Dict[str, float]] = None,
+    every: str = "M"
+) -> pd.DataFrame:
+    """
+    Rebalance to fixed target weights (equal weights if None) on the first
+    bar of every period (pandas period alias: W, M, Q, Y)
+    """
+    if weights is None:
+        weights = {t: 1.0 / len(prices.columns) for t in prices.columns}
+    unknown = sorted(set(weights) - set(prices.columns))
+    if unknown:
+        raise ValueError(f"No prices for weighted tickers: {unknown}")
+
+    index = prices.index.tz_convert(NY).tz_localize(None)
+    periods = index.to_period(every)
+    first = np.r_[True, periods[1:] != periods[:-1]]
+
+    target = pd.Series(weights, dtype=float).reindex(prices.columns, fill_value=0.0).to_numpy()
+    out = np.full(prices.shape, np.nan)
+    out[first] = target
+    return pd.DataFrame(out, index=prices.index, columns=prices.columns)
+
+
+def ma_crossover(prices: pd.DataFrame, fast: int = 20, slow: int = 50) -> pd.DataFrame:
+    """
+    Hold (equal weights) every ticker whose fast moving average is above its
+    slow one; cash otherwise. Rebalances only on bars where a signal flips.
+    """
+    if not 0 < fast < slow:
+        raise ValueError("ma_crossover needs 0 < fast < slow")
+
+    long = (prices.rolling(fast).mean() > prices.rolling(slow).mean()).to_numpy()
+    count = long.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = np.where(count > 0, long / count, 0.0)
+
+    flips = np.r_[True, (long[1:] != long[:-1]).any(axis=1)]
+    weights[~flips] = np.nan
+    return pd.DataFrame(weights, index=prices.index, columns=prices.columns)
+
+
+STRATEGIES: Dict[str, Callable[..., pd.DataFrame]] = {
+    "rebalance": rebalance,
+    "ma_crossover": ma_crossover,
+}
+
+
+# ---------- Simulation ----------
+
+def periods_per_year(index: pd.DatetimeIndex) -> float:
+    """
+    Bars per year for annualizing, from the median bar spacing
+    """
+    if len(index) < 2:
+        return float(TRADING_DAYS)
+    step = float(np.median(np.diff(index.asi8))) / 60e9  # minutes
+    if step >= 24 * 60:
+        return TRADING_DAYS * (24 * 60) / step
+    return TRADING_DAYS * SESSION_MINUTES / step
+
+
+def risk_stats(portfolio_pv: pd.Series, bars_per_year: Optional[float] = None) -> Dict[str, float]:
+    """
+    Total return, CAGR, annualized volatility, Sharpe / Sortino (risk-free
+    rate 0), max drawdown and Calmar ratio of a value series
+    """
+    pv = portfolio_pv.to_numpy(dtype=float)
+    if bars_per_year is None:
+        bars_per_year = periods_per_year(portfolio_pv.index)
+    if len(pv) < 2 or pv[0] <= 0:
+        return {k: 0.0 for k in ("total_return", "cagr", "volatility", "sharpe", "sortino", "max_drawdown", "calmar")}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret = np.nan_to_num(pv[1:] / pv[:-1] - 1.0, nan=0.0, posinf=0.0, neginf=0.0)
+    years = len(ret) / bars_per_year
+    total = pv[-1] / pv[0] - 1.0
+    cagr = (pv[-1] / pv[0]) ** (1.0 / years) - 1.0 if pv[-1] > 0 and years > 0 else -1.0
+
+    scale = np.sqrt(bars_per_year)
+    std = ret.std(ddof=1) if len(ret) > 1 else 0.0
+    downside = np.sqrt(np.mean(np.minimum(ret, 0.0) ** 2))
+    peak = np.maximum.accumulate(pv)
+    drawdown = float((pv / peak - 1.0).min())
+
+    return {
+        "total_return": float(total),
+        "cagr": float(cagr),
+        "volatility": float(std * scale),
+        "sharpe": float(ret.mean() / std * scale) if std > 0 else 0.0,
+        "sortino": float(ret.mean() / downside * scale) if downside > 0 else 0.0,
+        "max_drawdown": drawdown,
+        "calmar": float(cagr / -drawdown) if drawdown < 0 else 0.0,
+    }
+
+
+def _frame(signal: pd.DataFrame, prices: pd.DataFrame, lag: int) -> np.ndarray:
+    """
+    Signal aligned to the price matrix and shifted to its fill bar
+    """
+    aligned = signal.reindex(index=prices.index, columns=prices.columns)
+    return aligned.shift(lag).to_numpy(dtype=float) if lag else aligned.to_numpy(dtype=float)
+
+
+def _from_weights(
+    weights: np.ndarray,
+    px: np.ndarray,
+    cash: float,
+    cost: float,
+    fractional: bool
+) -> np.ndarray:
+    """
+    Share deltas that rebalance to the weight rows (NaN rows hold)
+    """
+    deltas = np.zeros_like(px)
+    shares = np.zeros(px.shape[1])
+    for t in np.flatnonzero(~np.isnan(weights).all(axis=1)):
+        price = px[t]
+        tradable = price > 0
+        # trade costs come out of the value being allocated
+        value = (cash + shares @ price) / (1.0 + cost)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            target = np.where(tradable, np.nan_to_num(weights[t]) * value / price, shares)
+        if not fractional:
+            target = np.trunc(target)
+        delta = target - shares
+        cash -= delta @ price + np.abs(delta) @ price * cost
+        shares = target
+        deltas[t] = delta
+    return deltas
+
+
+def backtest(
+    prices: pd.DataFrame,
+    weights: Optional[pd.DataFrame] = None,
+    *,
+    shares: Optional[pd.DataFrame] = None,
+    orders: Optional[pd.DataFrame] = None,
+    initial_cash: float = 100_000.0,
+    commission_bps: float = 0.0,
+    lag: int = 1,
+    fractional: bool = True,
+) -> Dict[str, Any]:
+    """
+    Simulate one signal (exactly one of weights / shares / orders, see the
+    module docstring) over prices, starting from initial_cash.
+
+    Returns the compute_portfolio_timeseries outputs plus "trades" (share
+    deltas on the bars that traded) and "stats" (risk_stats, turnover and
+    trade count).
+    """
+    if sum(x is not None for x in (weights, shares, orders)) != 1:
+        raise ValueError("Pass exactly one of weights, shares or orders")
+    if not isinstance(prices.index, pd.DatetimeIndex) or prices.index.tz is None:
+        raise ValueError("prices must have a tz-aware DatetimeIndex")
+    if not prices.index.is_monotonic_increasing:
+        prices = prices.sort_index()
+
+    px = np.nan_to_num(prices.to_numpy(dtype=float), nan=0.0)
+    cost = commission_bps / 1e4
+
+    if weights is not None:
+        deltas = _from_weights(_frame(weights, prices, lag), px, float(initial_cash), cost, fractional)
+    elif shares is not None:
+        target = pd.DataFrame(_frame(shares, prices, lag)).ffill().fillna(0.0).to_numpy()
+        deltas = np.diff(target, axis=0, prepend=0.0)
+    else:
+        deltas = np.nan_to_num(_frame(orders, prices, lag), nan=0.0)
+    # no trading without a price
+    deltas[px <= 0] = 0.0
+
+    holdings = np.cumsum(deltas, axis=0)
+    traded = deltas * px
+    cash = float(initial_cash) - np.cumsum(traded.sum(axis=1) + np.abs(traded).sum(axis=1) * cost)
+    position_pv = holdings * px
+    assets = position_pv.sum(axis=1)
+    portfolio_pv = assets + cash
+
+    index, columns = prices.index, prices.columns
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights_out = np.nan_to_num(position_pv / assets[:, None], nan=0.0, posinf=0.0, neginf=0.0)
+    pv = pd.Series(portfolio_pv, index=index)
+    traded_rows = np.flatnonzero(np.abs(deltas).sum(axis=1) > 0)
+
+    stats = risk_stats(pv)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        turnover = np.abs(traded).sum(axis=1) / np.where(portfolio_pv > 0, portfolio_pv, np.nan)
+    stats["turnover"] = float(np.nansum(turnover) / max(len(pv) / periods_per_year(index), 1e-9))
+    stats["trades"] = int(np.count_nonzero(deltas))
+    stats["final_value"] = float(portfolio_pv[-1]) if len(pv) else float(initial_cash)
+
+    return {
+        "holdings": pd.DataFrame(holdings, index=index, columns=columns),
+        "cash": pd.Series(cash, index=index),
+        "position_pv": pd.DataFrame(position_pv, index=index, columns=columns),
+        "portfolio_pv": pv,
+        "weights": pd.DataFrame(weights_out, index=index, columns=columns),
+        "ret": pv.pct_change().fillna(0.0),
+        "trades": pd.DataFrame(deltas[traded_rows], index=index[traded_rows], columns=columns),
+        "stats": stats,
+    }
+
+
+def run_strategy(prices: pd.DataFrame, strategy: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+    """
+    backtest() of a named strategy (see STRATEGIES) producing target weights
+    """
+    fn = STRATEGIES.get(strategy)
+    if fn is None:
+        raise ValueError(f"Unknown strategy: {strategy}. Must be one of {sorted(STRATEGIES)}")
+    try:
+        weights = fn(prices, **(params or {}))
+    except TypeError as e:
+        raise ValueError(f"Invalid parameters for {strategy}: {e}")
+    return backtest(prices, weights, **kwargs)
+
+
+# ---------- Parameter sweeps ----------
+
+def _sweep_chunk(prices: pd.DataFrame, strategy: str, chunk: List[Dict[str, Any]], kwargs: Dict[str, Any]) -> List[Dict[str, Any]]:
+    out = []
+    for params in chunk:
+        try:
+            stats = run_strategy(prices, strategy, params, **kwargs)["stats"]
+            out.append({"params": params, "stats": stats})
+        except ValueError as e:
+            out.append({"params": params, "error": str(e)})
+    return out
+
+
+def _executor(workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool shared by sweeps, sized by the first sweep that starts it
+    and never resized: concurrent sweeps (one per job worker) all map onto
+    it, so nothing may shut it down under them but close_pool
+    """
+    with _pool_lock:
+        if _pool["executor"] is None:
+            import multiprocessing
+
+            # spawn: the server process has threads (log listener, DB pool)
+            # that must not be forked mid-flight
+            _pool["executor"] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool["workers"] = workers
+        return _pool["executor"]
+
+
+def close_pool() -> None:
+    with _pool_lock:
+        executor, _pool["executor"] = _pool["executor"], None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def grid(params: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Every combination of the listed parameter values
+    """
+    keys = list(params)
+    return [dict(zip(keys, values)) for values in itertools.product(*(params[k] for k in keys))]
+
+
+def sweep(
+    prices: pd.DataFrame,
+    strategy: str,
+    params: Dict[str, List[Any]],
+    *,
+    workers: Optional[int] = None,
+    **kwargs
+) -> List[Dict[str, Any]]:
+    """
+    run_strategy for every combination in params, in parallel over the shared
+    process pool (workers, default cpu count, sizes the pool when it starts);
+    each worker receives the prices once per sweep. Returns
+    [{"params", "stats"} | {"params", "error"}] in grid order.
+    """
+    combos = grid(params)
+    workers = max(1, workers or os.cpu_count() or 1)
+    if min(workers, len(combos)) == 1:
+        return _sweep_chunk(prices, strategy, combos, kwargs)
+
+    executor = _executor(workers)
+    # one chunk per pool worker at most; small grids use fewer
+    n = min(_pool["workers"] or workers, len(combos))
+    chunks = [combos[i::n] for i in range(n)]
+    results = executor.map(_sweep_chunk, *zip(*[(prices, strategy, c, kwargs) for c in chunks]))
+
+    # undo the round-robin split
+    merged: List[Optional[Dict[str, Any]]] = [None] * len(combos)
+    for i, chunk in enumerate(results):
+        merged[i::n] = chunk
+    return merged
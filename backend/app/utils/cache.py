@@ -0,0 +1,478 @@
+"""
+Tiered Cache - per-process tier in front of a shared Redis tier
+
+Caches used to be plain per-process dicts, so every uvicorn worker / serverless
+instance downloaded and held the same bars separately. A TieredCache keeps
+the per-process tier (live objects, bounded LRU) and, when CACHE_URL is set,
+a shared tier every worker reads and writes:
+
+    CACHE_URL=redis://[:password@]host:6379/0   any server speaking RESP
+    CACHE_URL=memory://                         in-process stand-in (tests)
+
+Values go to the shared tier in a compact binary form (see dumps): frames as
+raw NumPy column buffers plus a small JSON header, everything else as JSON.
+The shared tier is best effort: on errors or timeouts (CACHE_TIMEOUT) it is
+skipped for CACHE_RETRY_SECONDS and the cache runs on the local tier alone.
+"""
+
+import time
+import struct
+import asyncio
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse, unquote
+
+import orjson
+
+from app.configs import config
+from app.utils.logger import setup_logger
+from app.utils.metrics import cache_event
+
+
+_logger = setup_logger()
+
+_MAGIC = b"OSC\x01"
+
+
+class CacheError(Exception):
+    """
+    The shared tier failed (connection, protocol or server error)
+    """
+
+
+# ---------- Serialization ----------
+def _pack(obj: Any, buffers: List[bytes]) -> Any:
+    """
+    obj -> JSON-able tree; frame columns / indexes are appended to buffers
+    """
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(obj, pd.DataFrame):
+        index = obj.index
+        if isinstance(index, pd.DatetimeIndex):
+            buffers.append(np.ascontiguousarray(index.as_unit("ns").asi8).tobytes())
+            index_spec = {"dt": len(buffers) - 1, "tz": str(index.tz) if index.tz else None, "name": index.name}
+        else:
+            index_spec = {"values": _pack(index.tolist(), buffers), "name": index.name}
+
+        columns = []
+        for name in obj.columns:
+            values = obj[name]
+            if isinstance(values.dtype, pd.DatetimeTZDtype):
+                buffers.append(np.ascontiguousarray(values.dt.as_unit("ns").array.asi8).tobytes())
+                columns.append([name, "tz:" + str(values.dt.tz), len(buffers) - 1])
+            elif values.dtype.kind in "biufcmM":
+                buffers.append(np.ascontiguousarray(values.to_numpy()).tobytes())
+                columns.append([name, values.dtype.str, len(buffers) - 1])
+            else:
+                columns.append([name, "json", _pack(values.tolist(), buffers)])
+        return {"~f": {"index": index_spec, "columns": columns, "rows": len(obj)}}
+
+    if isinstance(obj, pd.Timestamp):
+        return {"~t": [obj.value, str(obj.tz) if obj.tz else None]}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, dict):
+        if all(isinstance(k, str) and not k.startswith("~") for k in obj):
+            return {k: _pack(v, buffers) for k, v in obj.items()}
+        return {"~d": [[_pack(k, buffers), _pack(v, buffers)] for k, v in obj.items()]}
+    if isinstance(obj, tuple):
+        return {"~u": [_pack(v, buffers) for v in obj]}
+    if isinstance(obj, list):
+        return [_pack(v, buffers) for v in obj]
+    return obj
+
+
+def _unpack(tree: Any, buffers: List[memoryview]) -> Any:
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(tree, list):
+        return [_unpack(v, buffers) for v in tree]
+    if not isinstance(tree, dict):
+        return tree
+
+    if "~f" in tree:
+        spec = tree["~f"]
+        index_spec = spec["index"]
+        if "dt" in index_spec:
+            index = pd.DatetimeIndex(np.frombuffer(buffers[index_spec["dt"]], dtype="int64").view("datetime64[ns]"))
+            if index_spec["tz"]:
+                index = index.tz_localize("UTC").tz_convert(index_spec["tz"])
+            index.name = index_spec["name"]
+        else:
+            index = pd.Index(_unpack(index_spec["values"], buffers), name=index_spec["name"])
+
+        data = {}
+        for name, dtype, ref in spec["columns"]:
+            if dtype == "json":
+                data[name] = _unpack(ref, buffers)
+            elif dtype.startswith("tz:"):
+                stamps = np.frombuffer(buffers[ref], dtype="int64").view("datetime64[ns]")
+                data[name] = pd.DatetimeIndex(stamps).tz_localize("UTC").tz_convert(dtype[3:])
+            else:
+                data[name] = np.frombuffer(buffers[ref], dtype=np.dtype(dtype))
+        return pd.DataFrame(data, index=index, columns=[c[0] for c in spec["columns"]])
+
+    if "~t" in tree:
+        value, tz = tree["~t"]
+        return pd.Timestamp(value, tz="UTC").tz_convert(tz) if tz else pd.Timestamp(value)
+    if "~u" in tree:
+        return tuple(_unpack(v, buffers) for v in tree["~u"])
+    if "~d" in tree:
+        return {_unpack(k, buffers): _unpack(v, buffers) for k, v in tree["~d"]}
+    return {k: _unpack(v, buffers) for k, v in tree.items()}
+
+
+def dumps(value: Any) -> bytes:
+    """
+    value -> bytes: magic, header length, JSON header, raw buffers
+    """
+    buffers: List[bytes] = []
+    tree = _pack(value, buffers)
+    header = orjson.dumps({"v": tree, "b": [len(b) for b in buffers]}, option=orjson.OPT_SERIALIZE_NUMPY)
+    return b"".join([_MAGIC, struct.pack("<I", len(header)), header, *buffers])
+
+
+def loads(payload: bytes) -> Any:
+    """
+    bytes from dumps -> value (frame columns are views on one copy of the payload)
+    """
+    if payload[:4] != _MAGIC:
+        raise ValueError("not a cache payload")
+    (size,) = struct.unpack_from("<I", payload, 4)
+    header = orjson.loads(payload[8:8 + size])
+
+    # a writable copy of the payload, so frames built on it are writable too
+    view = memoryview(bytearray(payload))
+    buffers, offset = [], 8 + size
+    for length in header["b"]:
+        buffers.append(view[offset:offset + length])
+        offset += length
+    return _unpack(header["v"], buffers)
+
+
+# ---------- Shared tier ----------
+class MemoryStore:
+    """
+    In-process stand-in for the shared tier (CACHE_URL=memory://, tests).
+    Several TieredCaches on one MemoryStore behave like workers on one Redis.
+    """
+    def __init__(self):
+        self._data: Dict[str, Tuple[float, bytes]] = {}
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        now = time.monotonic()
+        out = []
+        for key in keys:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._data[key]
+                entry = None
+            out.append(entry[1] if entry is not None else None)
+        return out
+
+    async def set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        expires = time.monotonic() + ttl
+        for key, value in items.items():
+            self._data[key] = (expires, value)
+
+    async def delete(self, keys: List[str]) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def close(self) -> None:
+        pass
+
+
+def _command(*args: Any) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def _reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise CacheError("connection closed")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise CacheError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        size = int(rest)
+        if size < 0:
+            return None
+        data = await reader.readexactly(size + 2)
+        return data[:-2]
+    if kind == b"*":
+        size = int(rest)
+        return None if size < 0 else [await _reply(reader) for _ in range(size)]
+    raise CacheError(f"unexpected reply {line[:20]!r}")
+
+
+class RedisStore:
+    """
+    Shared tier over the Redis protocol (RESP2): a small pool of pipelined
+    connections, GET/SET only (MGET, SET PX, DEL)
+    """
+    def __init__(self, url: str, timeout: float, pool_size: int):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.ssl = parsed.scheme == "rediss"
+        self.timeout = timeout
+        self._pool_size = pool_size
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+        setup = []
+        if self.password:
+            setup.append(_command("AUTH", *([self.username] if self.username else []), self.password))
+        if self.db:
+            setup.append(_command("SELECT", self.db))
+        if setup:
+            writer.write(b"".join(setup))
+            for _ in setup:
+                await _reply(reader)
+        return reader, writer
+
+    async def _execute(self, commands: List[bytes]) -> List[Any]:
+        """
+        Pipeline commands on one pooled connection; replies in order
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # connections belong to the loop that opened them
+            self._idle, self._loop = [], loop
+
+        conn = self._idle.pop() if self._idle else None
+
+        async def roundtrip():
+            nonlocal conn
+            if conn is None:
+                conn = await self._connect()
+            reader, writer = conn
+            writer.write(b"".join(commands))
+            await writer.drain()
+            return [await _reply(reader) for _ in commands]
+
+        try:
+            replies = await asyncio.wait_for(roundtrip(), self.timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, CacheError) as e:
+            if conn is not None:
+                conn[1].close()
+            raise CacheError(str(e) or type(e).__name__) from e
+
+        if len(self._idle) < self._pool_size:
+            self._idle.append(conn)
+        else:
+            conn[1].close()
+        return replies
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return (await self._execute([_command("MGET", *keys)]))[0]
+
+    async def set_many(self, items: Dict[str, bytes], ttl: float) -> None:
+        ms = max(1, int(ttl * 1000))
+        await self._execute([_command("SET", key, value, "PX", ms) for key, value in items.items()])
+
+    async def delete(self, keys: List[str]) -> None:
+        await self._execute([_command("DEL", *keys)])
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+
+_shared: Optional[Any] = None
+
+
+def shared_store() -> Optional[Any]:
+    """
+    The process-wide shared tier for CACHE_URL (None when unset)
+    """
+    global _shared
+    if _shared is None and config.CACHE_URL:
+        if config.CACHE_URL.startswith("memory://"):
+            _shared = MemoryStore()
+        else:
+            _shared = RedisStore(config.CACHE_URL, config.CACHE_TIMEOUT, config.CACHE_POOL_SIZE)
+    return _shared
+
+
+async def close_cache() -> None:
+    """
+    Close the shared tier's connections (app shutdown)
+    """
+    if _shared is not None:
+        await _shared.close()
+
+
+# ---------- Tiered cache ----------
+_DEFAULT = object()
+
+
+class TieredCache:
+    """
+    Named cache: a per-process LRU of live objects (local_size entries, 0 for
+    none) in front of the shared tier. Hits and misses are counted per tier
+    as cache_requests_total{cache=name} and {cache=name_shared}.
+    """
+    def __init__(self, name: str, ttl: float, *, local_size: int = 256, shared: Any = _DEFAULT):
+        self.name = name
+        self.ttl = ttl
+        self.local_size = local_size
+        self._shared = shared
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._down_until = 0.0
+
+    @property
+    def shared(self) -> Optional[Any]:
+        return shared_store() if self._shared is _DEFAULT else self._shared
+
+    def _key(self, key: str) -> str:
+        return f"{config.CACHE_PREFIX}{self.name}:{key}"
+
+    def _remember(self, key: str, value: Any, expires: float) -> None:
+        if self.local_size <= 0:
+            return
+        self._local[key] = (expires, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    def _shared_up(self) -> Optional[Any]:
+        store = self.shared
+        return store if store is not None and time.monotonic() >= self._down_until else None
+
+    def _shared_failed(self, e: Exception) -> None:
+        self._down_until = time.monotonic() + config.CACHE_RETRY_SECONDS
+        _logger.warning("Shared cache %s unavailable for %ss: %s", self.name, config.CACHE_RETRY_SECONDS, e)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        {key: value} for the keys held by either tier
+        """
+        keys = list(keys)
+        now = time.time()
+        out: Dict[str, Any] = {}
+        missing = []
+        for key in keys:
+            entry = self._local.get(key)
+            if entry is not None and entry[0] > now:
+                self._local.move_to_end(key)
+                out[key] = entry[1]
+            else:
+                missing.append(key)
+        if self.local_size > 0:
+            cache_event(self.name, hit=True, amount=len(keys) - len(missing))
+            cache_event(self.name, hit=False, amount=len(missing))
+
+        store = self._shared_up()
+        if not missing or store is None:
+            return out
+
+        try:
+            payloads = await store.get_many([self._key(k) for k in missing])
+        except CacheError as e:
+            self._shared_failed(e)
+            return out
+
+        hits = 0
+        for key, payload in zip(missing, payloads):
+            if payload is None:
+                continue
+            try:
+                out[key] = loads(payload)
+            except Exception as e:
+                _logger.warning("Dropping unreadable %s cache entry %s: %s", self.name, key, e)
+                continue
+            hits += 1
+            # the shared TTL isn't read back; keep the local copy one TTL at most
+            self._remember(key, out[key], now + self.ttl)
+        cache_event(f"{self.name}_shared", hit=True, amount=hits)
+        cache_event(f"{self.name}_shared", hit=False, amount=len(missing) - hits)
+        return out
+
+    async def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """
+        Store values in both tiers
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl
+        for key, value in items.items():
+            self._remember(key, value, expires)
+
+        store = self._shared_up()
+        if store is None or not items:
+            return
+        try:
+            await store.set_many({self._key(k): dumps(v) for k, v in items.items()}, ttl)
+        except CacheError as e:
+            self._shared_failed(e)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return (await self.get_many([key])).get(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self.set_many({key: value}, ttl)
+
+    async def invalidate(self, key: str) -> None:
+        self._local.pop(key, None)
+        store = self._shared_up()
+        if store is not None:
+            try:
+                await store.delete([self._key(key)])
+            except CacheError as e:
+                self._shared_failed(e)
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None
+    ) -> Any:
+        """
+        Cached value, or loader() stored in both tiers; concurrent misses for
+        one key in this process share a single load
+        """
+        hit = await self.get_many([key])
+        if key in hit:
+            return hit[key]
+
+        pending = self._loading.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await loader()
+            await self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # nobody else may be waiting; don't warn about an unretrieved exception
+            future.exception()
+            raise
+        finally:
+            del self._loading[key]
@@ -0,0 +1,74 @@
+"""
+Ledger Replay Functions
+
+Orders are the event log; holdings and cash at any point are a starting
+state (a snapshot, or nothing) plus the orders after it.
+"""
+
+from __future__ import annotations
+
+import pandas as pd
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.utils.timeseries import CASH_TICKER
+
+
+def replay(
+    orders: pd.DataFrame,
+    holdings: Optional[Dict[str, float]] = None,
+    cash: float = 0.0,
+    *,
+    cash_ticker: str = CASH_TICKER,
+    tickers: Optional[Iterable[str]] = None,
+) -> Tuple[Dict[str, float], float]:
+    """
+    Apply cleaned orders (see clean_orders_df) on top of (holdings, cash).
+
+    Same rule as the place_order ledger: trades move their ticker by
+    quantity and cash by -quantity * price; CA$H rows move cash by quantity.
+    With tickers, trades in any other ticker are skipped outright (holding
+    and cash), as compute_portfolio_timeseries does for unpriced tickers.
+    Returns new (holdings, cash); the inputs are not modified.
+    """
+    out = dict(holdings or {})
+    if orders is None or orders.empty:
+        return out, float(cash)
+
+    is_cash = orders["ticker"] == cash_ticker
+    traded = orders["ticker"].notna() if tickers is None else orders["ticker"].isin(list(tickers))
+    trades = orders[~is_cash & traded]
+
+    for ticker, delta in trades.groupby("ticker")["quantity"].sum().items():
+        out[ticker] = out.get(ticker, 0.0) + float(delta)
+
+    spent = (trades["quantity"] * trades["price"]).sum()
+    cash = float(cash) + float(orders.loc[is_cash, "quantity"].sum()) - float(spent)
+
+    return out, cash
+
+
+def split_at(orders: pd.DataFrame, ts: pd.Timestamp) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (orders strictly before ts, orders at or after ts) of a sorted ledger.
+    """
+    if orders.empty:
+        return orders, orders
+    cut = orders["timestamp"].searchsorted(ts, side="left")
+    return orders.iloc[:cut], orders.iloc[cut:]
+
+
+def drift(
+    expected: Dict[str, float],
+    stored: Dict[str, float],
+    tolerance: float = 1e-6,
+) -> Dict[str, Tuple[float, float]]:
+    """
+    {ticker: (expected, stored)} for every ticker whose stored quantity
+    differs from what the ledger implies.
+    """
+    out = {}
+    for ticker in set(expected) | set(stored):
+        want, have = expected.get(ticker, 0.0), stored.get(ticker, 0.0)
+        if abs(want - have) > tolerance:
+            out[ticker] = (want, have)
+    return out
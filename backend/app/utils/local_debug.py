@@ -2,9 +2,13 @@
 Local Debugging Util for Debugging at Scale
 """
 
+import logging
+
+from app.utils.logger import queue_logger
+
 
 class _SpoofLogger:
-    def debug(msg: str):
+    def debug(self, msg, *args, **kwargs) -> None:
         """
         Spoof debug function to avoid errors in production.
         """
@@ -14,20 +18,25 @@ class _SpoofLogger:
 class _LocalLogger:
     def __init__(self, output_file: str = 'test.txt'):
         """
-        Initialize the LocalLogger.
+        Initialize the LocalLogger: one file opened once, written from the
+        log queue's background thread.
         """
         self._out_file = output_file
 
-        self.debug("Local Debugging Logger Initialized. Output file: " + self._out_file, overwrite=True)
+        sink = logging.FileHandler(output_file, mode='w')
+        sink.setFormatter(logging.Formatter("%(message)s"))
+        self._logger = logging.getLogger(f"local_debug.{output_file}")
+        self._logger.setLevel(logging.DEBUG)
+        queue_logger(self._logger, sink)
+
+        self.debug("Local Debugging Logger Initialized. Output file: %s", self._out_file)
         self.debug('\n\n=== get_portfolio_history DEBUG START ===\n')
 
-    def debug(self, msg: str, overwrite = False) -> None:
+    def debug(self, msg, *args) -> None:
         """
-        Local logger for debugging purposes.
+        Local logger for debugging purposes (formatted lazily, %-style args).
         """
-        with open(self._out_file, 'w' if overwrite else 'a') as f:
-            f.write(str(msg))
-            f.write('\n')
+        self._logger.debug(msg, *args)
 
 
 def setup_logger(debug: bool, output_file: str):
@@ -39,4 +48,4 @@ def setup_logger(debug: bool, output_file: str):
     if debug:
         return _LocalLogger(output_file)
     else:
-        return _SpoofLogger()
\ No newline at end of file
+        return _SpoofLogger()
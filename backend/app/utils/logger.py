@@ -1,20 +1,157 @@
 """
 Logger setup
+
+Records are put on an in-memory queue by the calling thread and written by a
+background QueueListener thread, so logging on the request path never blocks
+on stderr / file I/O. Messages are formatted lazily on the listener thread
+(`_logger.debug("x %s", obj)` or a dict only costs str() if it is written).
+
+LOG_FORMAT=json writes one JSON object per line (dict messages become fields),
+LOG_DEBUG_SAMPLE_RATE keeps a fraction of DEBUG records, and a full queue
+(LOG_QUEUE_SIZE) drops records instead of blocking (logs_dropped_total).
 """
 
+import sys
+import atexit
+import queue
+import random
 import logging
+import logging.handlers
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import orjson
 
 from app.configs import config
+from app.utils import metrics
+
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RESERVED = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listeners: List[logging.handlers.QueueListener] = []
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record: ts, level, logger, msg, `extra=` fields,
+    and the keys of dict messages
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        out: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        if isinstance(record.msg, dict) and not record.args:
+            out.update({str(k): v for k, v in record.msg.items()})
+        else:
+            out["msg"] = record.getMessage()
+
+        for key, value in vars(record).items():
+            if key not in _RESERVED and key not in out:
+                out[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            out["exc"] = record.exc_text
+
+        return orjson.dumps(out, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+class _DebugSampler(logging.Filter):
+    """
+    Keeps a `rate` fraction of DEBUG records (other levels always pass)
+    """
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
 
 
-def setup_logger():
-    logger = logging.getLogger(config.LOGGER)
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread and drops
+    records when the queue is full
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the stock prepare() formats the message on the calling thread; only
+        # tracebacks have to be rendered here (they pin frames)
+        record = logging.makeLogRecord(vars(record))
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
-    if not logger.handlers:
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s %(levelname)s %(name)s: %(message)s"
-        )
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.LOGS_DROPPED.inc(record.levelname)
 
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # wait for room: stop() must not fail on a full queue
+        self.queue.put(self._sentinel)
+
+
+def _formatter() -> logging.Formatter:
+    if config.LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def queue_logger(logger: logging.Logger, *sinks: logging.Handler) -> logging.Logger:
+    """
+    Route `logger` through its own queue: its records are written to `sinks`
+    (default: its current handlers) on a background thread
+    """
+    sinks = sinks or tuple(logger.handlers)
+    q: queue.Queue = queue.Queue(config.LOG_QUEUE_SIZE)
+    handler = _LazyQueueHandler(q)
+    listener = _Listener(q, *sinks, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+
+    for h in list(logger.handlers):
+        logger.removeHandler(h)
+    logger.addHandler(handler)
+    logger.propagate = False
     return logger
 
+
+def stop_logging() -> None:
+    """
+    Flush and stop the listener threads (at exit)
+    """
+    while _listeners:
+        _listeners.pop().stop()
+
+
+atexit.register(stop_logging)
+
+
+def setup_logger(name: Optional[str] = None) -> logging.Logger:
+    logger = logging.getLogger(name or config.LOGGER)
+
+    if not any(isinstance(h, _LazyQueueHandler) for h in logger.handlers):
+        sink = logging.StreamHandler(sys.stderr)
+        sink.setFormatter(_formatter())
+        logger.setLevel(config.LOG_LEVEL)
+        queue_logger(logger, sink)
+        if config.LOG_DEBUG_SAMPLE_RATE < 1:
+            logger.handlers[0].addFilter(_DebugSampler(config.LOG_DEBUG_SAMPLE_RATE))
+
+        # uvicorn's access log writes one line per request; when uvicorn has
+        # configured it, move its handlers behind a queue as well
+        access = logging.getLogger("uvicorn.access")
+        if access.handlers and not any(isinstance(h, _LazyQueueHandler) for h in access.handlers):
+            queue_logger(access)
+
+    return logger
@@ -1,10 +1,17 @@
 """
 Market Data Utils
 """
-import yfinance as yf
+from app.configs import config
 
 
 def verify_ticker(ticker: str) -> bool:
     sym = ticker.strip().upper().replace(".", "-")
+    if config.MARKET_DATA_URL:
+        from app.services.chart import has_bars
+
+        return has_bars(sym)
+
+    import yfinance as yf
+
     df = yf.Ticker(sym).history(period="1d", interval="1d", prepost=False, auto_adjust=False)
     return not df.empty
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+Exchange Session Calendar
+
+Precomputed regular-session open/close instants (UTC, int64 ns) per market,
+looked up with searchsorted instead of per-request tz math.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+from typing import Dict, Any, Tuple
+from datetime import date, datetime, time, timedelta
+
+
+MARKETS: Dict[str, Dict[str, Any]] = {
+    "XNYS": {
+        "tz": "America/New_York",
+        "open": time(9, 30),
+        "close": time(16, 0),
+        "early_close": time(13, 0),
+    },
+}
+
+DEFAULT_MARKET = "XNYS"
+
+# Years covered by the precomputed arrays (relative to the current year)
+YEARS_BACK = 25
+YEARS_AHEAD = 2
+
+# One-off full-day closures (national mourning, weather, 9/11)
+_SPECIAL_CLOSURES = {
+    date(2001, 9, 11), date(2001, 9, 12), date(2001, 9, 13), date(2001, 9, 14),
+    date(2004, 6, 11), date(2007, 1, 2), date(2012, 10, 29), date(2012, 10, 30),
+    date(2018, 12, 5), date(2025, 1, 9),
+}
+
+
+def _easter(year: int) -> date:
+    """
+    Gregorian Easter Sunday (anonymous algorithm).
+    """
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """
+    n-th given weekday of a month (n=-1 for the last one).
+    """
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(d: date) -> date:
+    """
+    Saturday holidays move to Friday, Sunday holidays to Monday.
+    """
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+def _nyse_holidays(year: int) -> Tuple[set, set]:
+    """
+    (full-day closures, early-close days) for a year.
+    """
+    closed = set()
+
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:  # no Friday Dec 31 observance
+        closed.add(_observed(new_year))
+    closed.add(_nth_weekday(year, 1, 0, 3))    # Martin Luther King Jr. Day
+    closed.add(_nth_weekday(year, 2, 0, 3))    # Washington's Birthday
+    closed.add(_easter(year) - timedelta(days=2))  # Good Friday
+    closed.add(_nth_weekday(year, 5, 0, -1))   # Memorial Day
+    if year >= 2022:
+        closed.add(_observed(date(year, 6, 19)))  # Juneteenth
+    closed.add(_observed(date(year, 7, 4)))    # Independence Day
+    closed.add(_nth_weekday(year, 9, 0, 1))    # Labor Day
+    thanksgiving = _nth_weekday(year, 11, 3, 4)
+    closed.add(thanksgiving)
+    closed.add(_observed(date(year, 12, 25)))  # Christmas
+
+    closed |= {d for d in _SPECIAL_CLOSURES if d.year == year}
+
+    early = {
+        date(year, 7, 3),
+        thanksgiving + timedelta(days=1),
+        date(year, 12, 24),
+    }
+    early = {d for d in early if d.weekday() < 5 and d not in closed}
+
+    return closed, early
+
+
+_HOLIDAY_RULES = {
+    "XNYS": _nyse_holidays,
+}
+
+
+@lru_cache(maxsize=None)
+def sessions(market: str = DEFAULT_MARKET) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (opens, closes) as sorted int64 UTC nanoseconds, one entry per session.
+    Built once per market and shared by every request.
+    """
+    spec = MARKETS[market]
+    tz = ZoneInfo(spec["tz"])
+    this_year = datetime.now(tz).year
+
+    opens, closes = [], []
+    for year in range(this_year - YEARS_BACK, this_year + YEARS_AHEAD + 1):
+        closed, early = _HOLIDAY_RULES[market](year)
+        day = date(year, 1, 1)
+        while day.year == year:
+            if day.weekday() < 5 and day not in closed:
+                close_t = spec["early_close"] if day in early else spec["close"]
+                opens.append(int(datetime.combine(day, spec["open"], tz).timestamp()))
+                closes.append(int(datetime.combine(day, close_t, tz).timestamp()))
+            day += timedelta(days=1)
+
+    to_ns = lambda xs: np.asarray(xs, dtype=np.int64) * 1_000_000_000
+    return to_ns(opens), to_ns(closes)
+
+
+def _ns(ts: pd.Timestamp) -> int:
+    ts = pd.Timestamp(ts)
+    if ts.tz is None:
+        ts = ts.tz_localize("UTC")
+    return ts.value
+
+
+def _pair(i: int, opens: np.ndarray, closes: np.ndarray) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    return pd.Timestamp(opens[i], tz="UTC"), pd.Timestamp(closes[i], tz="UTC")
+
+
+def last_session(
+    ts: pd.Timestamp,
+    market: str = DEFAULT_MARKET
+) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    (open, close) UTC of the latest session that has opened at or before ts.
+    On weekends, holidays and before the bell this is the previous session.
+    """
+    opens, closes = sessions(market)
+    i = np.searchsorted(opens, _ns(ts), side="right") - 1
+    if i < 0:
+        raise ValueError(f"{ts} is before the {market} calendar range")
+    return _pair(i, opens, closes)
+
+
+def next_session(
+    ts: pd.Timestamp,
+    market: str = DEFAULT_MARKET
+) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    (open, close) UTC of the first session opening strictly after ts.
+    """
+    opens, closes = sessions(market)
+    i = np.searchsorted(opens, _ns(ts), side="right")
+    if i >= len(opens):
+        raise ValueError(f"{ts} is past the {market} calendar range")
+    return _pair(i, opens, closes)
+
+
+def is_open(ts: pd.Timestamp, market: str = DEFAULT_MARKET) -> bool:
+    """
+    True while a regular session is in progress at ts.
+    """
+    opens, closes = sessions(market)
+    t = _ns(ts)
+    i = np.searchsorted(opens, t, side="right") - 1
+    return bool(i >= 0 and t < closes[i])
+
+
+def has_session(
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    market: str = DEFAULT_MARKET
+) -> bool:
+    """
+    True if any session overlaps [start, end]; False means a fetch of that
+    window can only come back empty.
+    """
+    opens, closes = sessions(market)
+    i = np.searchsorted(closes, _ns(start), side="right")
+    return bool(i < len(opens) and opens[i] <= _ns(end))
+
+
+def session_mask(index: pd.DatetimeIndex, market: str = DEFAULT_MARKET) -> np.ndarray:
+    """
+    Boolean mask of index timestamps falling inside a session [open, close).
+    """
+    opens, closes = sessions(market)
+    t = index.tz_convert("UTC").asi8 if index.tz is not None else index.asi8
+    i = np.searchsorted(opens, t, side="right") - 1
+    inside = i >= 0
+    inside[inside] = t[inside] < closes[i[inside]]
+    return inside
+
@@ -0,0 +1,228 @@
+"""
+Matching Engine - pending limit / stop orders against incoming bars
+
+Every pending order waits for one trigger price, crossed either from above
+(the bar's low reaches it) or from below (the bar's high reaches it):
+
+    below: buy limit (limit), sell stop (stop), sell stop-limit (stop),
+           triggered buy stop-limit (limit)
+    above: sell limit (limit), buy stop (stop), buy stop-limit (stop),
+           triggered sell stop-limit (limit)
+
+so each ticker keeps two heaps - a max-heap of "below" triggers and a
+min-heap of "above" triggers - and a bar only pops the orders it crosses:
+O(log n) per fill plus a peek, however many orders are open. Cancels are
+lazy (the heap entry is skipped when it surfaces) and DAY orders sit in
+one expiry heap.
+
+Fill prices assume the bar may gap through the trigger at its open:
+limits fill at the limit or better, stops at the stop or worse. A
+stop-limit whose trigger price is already past its limit rests as a limit
+order from the next bar on.
+
+Orders are the pending-order rows (see services.matching) with their
+timestamps as UTC nanoseconds in "created_ns" / "expires_ns"; the engine
+never touches storage.
+"""
+
+import heapq
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.types import OrderKind, PendingStatus
+
+
+LIMIT = OrderKind.LIMIT.value
+STOP_LIMIT = OrderKind.STOP_LIMIT.value
+TRIGGERED = PendingStatus.TRIGGERED.value
+
+# dead heap entries tolerated per book before it is rebuilt
+COMPACT_MIN = 1024
+
+# (order, fill price, start ns of the bar it filled in)
+Fill = Tuple[Dict[str, Any], float, int]
+
+
+def trigger(order: Dict[str, Any]) -> Tuple[str, float]:
+    """
+    ("below" | "above", price) an order waits for
+    """
+    buy = order["quantity"] > 0
+    if order["kind"] == LIMIT or order.get("status") == TRIGGERED:
+        return ("below" if buy else "above"), float(order["limit_price"])
+    return ("above" if buy else "below"), float(order["stop_price"])
+
+
+class _Book:
+    """
+    Trigger heaps of one ticker: below holds (-price, seq, id), above
+    holds (price, seq, id)
+    """
+    __slots__ = ("below", "above", "dead")
+
+    def __init__(self):
+        self.below: List[Tuple[float, int, str]] = []
+        self.above: List[Tuple[float, int, str]] = []
+        self.dead = 0
+
+    def __len__(self) -> int:
+        return len(self.below) + len(self.above) - self.dead
+
+
+class MatchingEngine:
+    """
+    In-memory book of live pending orders, keyed by id
+    """
+    def __init__(self):
+        self._orders: Dict[str, Dict[str, Any]] = {}
+        self._books: Dict[str, _Book] = {}
+        self._expiry: List[Tuple[int, str]] = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self._orders
+
+    def get(self, order_id: str) -> Optional[Dict[str, Any]]:
+        return self._orders.get(order_id)
+
+    def tickers(self) -> List[str]:
+        return [t for t, book in self._books.items() if len(book)]
+
+    def _push(self, order: Dict[str, Any]) -> None:
+        side, price = trigger(order)
+        book = self._books.get(order["ticker"])
+        if book is None:
+            book = self._books[order["ticker"]] = _Book()
+        self._seq += 1
+        if side == "below":
+            heapq.heappush(book.below, (-price, self._seq, order["id"]))
+        else:
+            heapq.heappush(book.above, (price, self._seq, order["id"]))
+
+    def add(self, order: Dict[str, Any]) -> bool:
+        """
+        Track a live order (no-op for ids already tracked)
+        """
+        if order["id"] in self._orders:
+            return False
+        self._orders[order["id"]] = order
+        self._push(order)
+        if order.get("expires_ns") is not None:
+            heapq.heappush(self._expiry, (order["expires_ns"], order["id"]))
+        return True
+
+    def remove(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Stop tracking an order (cancelled, filled or expired elsewhere)
+        """
+        order = self._orders.pop(order_id, None)
+        if order is None:
+            return None
+        book = self._books[order["ticker"]]
+        book.dead += 1
+        if book.dead > COMPACT_MIN and book.dead * 2 > len(book.below) + len(book.above):
+            self._compact(book)
+        return order
+
+    def remove_portfolio(self, portfolio_id: str) -> int:
+        """
+        Stop tracking every order of a portfolio (deleted); returns how many
+        """
+        ids = [i for i, order in self._orders.items() if order.get("portfolio_id") == portfolio_id]
+        for order_id in ids:
+            self.remove(order_id)
+        return len(ids)
+
+    def _compact(self, book: _Book) -> None:
+        live = self._orders
+        book.below = [e for e in book.below if e[2] in live]
+        book.above = [e for e in book.above if e[2] in live]
+        heapq.heapify(book.below)
+        heapq.heapify(book.above)
+        book.dead = 0
+
+    def _cross(
+        self,
+        book: _Book,
+        side: str,
+        start_ns: int,
+        open_: float,
+        bound: float,
+        fills: List[Fill],
+        resting: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Pop the `side` orders the bar crossed (low <= price for below, high
+        >= price for above); orders created after the bar started wait
+        """
+        heap = book.below if side == "below" else book.above
+        sign = -1.0 if side == "below" else 1.0
+        # below: the trigger is hit on the way down, so fills are at or under
+        # the trigger price; above: at or over it
+        worse = min if side == "below" else max
+        deferred = []
+        while heap and heap[0][0] <= sign * bound:
+            entry = heapq.heappop(heap)
+            order = self._orders.get(entry[2])
+            if order is None:
+                book.dead -= 1
+                continue
+            if order.get("created_ns", 0) > start_ns:
+                deferred.append(entry)
+                continue
+
+            hit = worse(sign * entry[0], open_)
+            if order["kind"] == STOP_LIMIT and order.get("status") != TRIGGERED:
+                limit = float(order["limit_price"])
+                if (hit > limit) if order["quantity"] > 0 else (hit < limit):
+                    resting.append(order)
+                    continue
+            fills.append((order, hit, start_ns))
+
+        for entry in deferred:
+            heapq.heappush(heap, entry)
+
+    def on_bar(
+        self,
+        ticker: str,
+        start_ns: int,
+        open_: float,
+        high: float,
+        low: float
+    ) -> Tuple[List[Fill], List[Dict[str, Any]]]:
+        """
+        Match one bar of `ticker`: returns (fills, triggered). Filled orders
+        are forgotten; triggered stop-limits that could not fill within
+        their limit rest on it from the next bar on (status "triggered").
+        """
+        book = self._books.get(ticker)
+        if book is None:
+            return [], []
+
+        fills: List[Fill] = []
+        resting: List[Dict[str, Any]] = []
+        self._cross(book, "below", start_ns, open_, low, fills, resting)
+        self._cross(book, "above", start_ns, open_, high, fills, resting)
+
+        for order, _, _ in fills:
+            del self._orders[order["id"]]
+        for order in resting:
+            order["status"] = TRIGGERED
+            order["created_ns"] = start_ns + 1
+            self._push(order)
+        return fills, resting
+
+    def expire(self, now_ns: int) -> List[Dict[str, Any]]:
+        """
+        Forget and return the live orders whose expiry is at or before now_ns
+        """
+        out = []
+        while self._expiry and self._expiry[0][0] <= now_ns:
+            _, order_id = heapq.heappop(self._expiry)
+            order = self.remove(order_id)
+            if order is not None:
+                out.append(order)
+        return out
@@ -0,0 +1,212 @@
+"""
+Request Instrumentation
+
+Timing spans usable anywhere in a request (services, repositories, worker
+threads), reported per request as a Server-Timing header and aggregated
+into Prometheus-style histograms and counters served at /metrics.
+
+    with span("yahoo"):
+        ...
+    cache_event("ledger", hit=True)
+"""
+
+import time
+import threading
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# Seconds; Prometheus' default latency buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Spans of the current request: [(name, seconds)]; None outside a request
+_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("spans", default=None)
+
+_lock = threading.Lock()
+
+# Called as hook(name, seconds) after every span (see utils.profiling)
+span_hooks: List[Callable[[str, float], None]] = []
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram keyed by a label tuple
+    """
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with _lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [bucket counts..., +Inf count, sum]
+                series = self._series[label_values] = [0.0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with _lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for label_values, series in sorted(items):
+            base = _labels(self.labels, label_values)
+            for bound, count in zip(BUCKETS, series):
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound}"}} {int(count)}')
+            lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="+Inf"}} {int(series[-2])}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {int(series[-2])}")
+        return lines
+
+
+class Counter:
+    """
+    Monotonic counter keyed by a label tuple
+    """
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with _lock:
+            self._series[label_values] = self._series.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with _lock:
+            items = list(self._series.items())
+        for label_values, value in sorted(items):
+            lines.append(f"{self.name}{{{_labels(self.labels, label_values)}}} {int(value)}")
+        return lines
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route",
+    ("method", "route", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "stage_duration_seconds",
+    "Time spent per instrumented stage",
+    ("stage",),
+)
+CACHE_EVENTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result",
+    ("cache", "result"),
+)
+LOGS_DROPPED = Counter(
+    "logs_dropped_total",
+    "Log records dropped because the log queue was full",
+    ("level",),
+)
+JOBS = Counter(
+    "jobs_total",
+    "Background jobs by kind and outcome (done, failed, deduplicated)",
+    ("kind", "status"),
+)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time a block as stage `name` (Server-Timing entry + stage histogram)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, name)
+        spans = _spans.get()
+        if spans is not None:
+            spans.append((name, elapsed))
+        for hook in span_hooks:
+            hook(name, elapsed)
+
+
+def cache_event(cache: str, hit: bool, amount: int = 1) -> None:
+    """
+    Count `amount` lookups of `cache` as hits or misses
+    """
+    if amount:
+        CACHE_EVENTS.inc(cache, "hit" if hit else "miss", amount=amount)
+
+
+def server_timing(spans: List[Tuple[str, float]], total: float) -> str:
+    """
+    Server-Timing header value; repeated stages are summed (desc = count)
+    """
+    totals: Dict[str, List[float]] = {}
+    for name, seconds in spans:
+        entry = totals.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    parts = [
+        f'{name};dur={seconds * 1000:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+        for name, (seconds, count) in totals.items()
+    ]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def render() -> str:
+    """
+    Prometheus text exposition of every metric
+    """
+    lines: List[str] = []
+    for metric in (REQUEST_SECONDS, STAGE_SECONDS, CACHE_EVENTS, LOGS_DROPPED, JOBS):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware: collects the request's spans, adds Server-Timing to
+    the response and records the request in REQUEST_SECONDS by route
+    template (so /portfolios/{portfolio_id} is one series).
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        spans: List[Tuple[str, float]] = []
+        token = _spans.set(spans)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                header = server_timing(spans, time.perf_counter() - start)
+                message = dict(message, headers=[*message.get("headers", []), (b"server-timing", header.encode())])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _spans.reset(token)
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], template, str(status["code"]))
@@ -9,6 +9,8 @@ import pandas as pd
 from typing import Dict, Any
 from datetime import datetime
 
+from app.utils.shared_prices import PriceBlock
+
 
 def clean_orders_df(raw: Any) -> pd.DataFrame:
     """
@@ -32,12 +34,16 @@ def clean_orders_df(raw: Any) -> pd.DataFrame:
     return df
 
 
-def clean_prices_df(prices_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+def clean_prices_df(prices_dict: Dict[str, pd.DataFrame] | PriceBlock) -> pd.DataFrame:
     """
     Build wide price DataFrame (index=Datetime[UTC], cols=tickers, values=Close).
-    Accepts dict[ticker] -> df with either an index or a column named 'Datetime'/'Date'.
+    Accepts dict[ticker] -> df with either an index or a column named 'Datetime'/'Date',
+    or a shared-memory PriceBlock (used as-is, no copy).
     Preserves sub-daily resolution (minute, hourly, etc.).
     """
+    if isinstance(prices_dict, PriceBlock):
+        return prices_dict.close_frame()
+
     frames = []
     for tkr, df in (prices_dict or {}).items():
         if df is None or df.empty:
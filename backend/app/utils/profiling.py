@@ -0,0 +1,275 @@
+"""
+Request Profiling
+
+Opt-in profiles of single requests, for slow cases that only show up with
+production data. A request is profiled when it carries
+`X-Profile: <ADMIN_TOKEN>` or is picked by PROFILE_SAMPLE_RATE (sampled
+profiles are kept only if slower than PROFILE_MIN_MS). It then runs under
+cProfile (call tree) and, with PROFILE_MEMORY, tracemalloc: allocations are
+grouped by the app line that called into pandas / numpy, taken at the span
+boundary (utils.metrics.span) where traced memory was highest.
+
+Profiles live in a bounded per-worker store read by the admin router; the
+response carries X-Profile-Id. One request is profiled at a time: cProfile
+sees everything else running on the event-loop thread meanwhile (other
+requests' coroutines included), but not worker threads.
+"""
+
+import io
+import time
+import uuid
+import hmac
+import random
+import marshal
+import pstats
+import cProfile
+import tracemalloc
+
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.configs import config
+from app.utils import metrics
+from app.utils.logger import setup_logger
+
+
+_logger = setup_logger()
+
+PROFILE_HEADER = b"x-profile"
+
+# Never sampled (they'd only profile the profiler)
+_UNSAMPLED = ("/admin", "/metrics")
+
+# Library code whose allocations are attributed to the calling app line
+_LIBRARIES = ("pandas", "numpy")
+
+# profile_id -> profile (see _finish), oldest first
+_profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+# State of the request being profiled, None when idle
+_active: Optional[Dict[str, Any]] = None
+
+
+def _trigger(scope) -> Optional[str]:
+    """
+    "header" / "sample" if this request should be profiled, else None
+    """
+    for name, value in scope.get("headers", []):
+        if name == PROFILE_HEADER:
+            token = config.ADMIN_TOKEN
+            if token and hmac.compare_digest(value, token.encode()):
+                return "header"
+            break
+
+    rate = config.PROFILE_SAMPLE_RATE
+    if rate > 0 and not scope["path"].startswith(_UNSAMPLED) and random.random() < rate:
+        return "sample"
+    return None
+
+
+def _checkpoint(name: str, seconds: float) -> None:
+    """
+    Span hook: keep a tracemalloc snapshot of the highest-memory span boundary
+    """
+    state = _active
+    if state is None or not state["memory"]:
+        return
+    current, _ = tracemalloc.get_traced_memory()
+    if current > state["best"]:
+        state["best"] = current
+        state["snapshot"] = tracemalloc.take_snapshot()
+        state["snapshot_at"] = name
+
+
+metrics.span_hooks.append(_checkpoint)
+
+
+def _library(filename: str) -> Optional[str]:
+    for lib in _LIBRARIES:
+        if f"/{lib}/" in filename or f"\\{lib}\\" in filename:
+            return lib
+    return None
+
+
+def _hot_spots(snapshot: tracemalloc.Snapshot, limit: int) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Allocation sites: library allocations grouped by the closest app frame
+    that called into them, and the top lines overall
+    """
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+
+    spots: Dict[tuple, List[int]] = {}
+    for stat in snapshot.statistics("traceback"):
+        frames = list(stat.traceback)  # oldest -> most recent
+        lib = next((_library(f.filename) for f in reversed(frames) if _library(f.filename)), None)
+        if lib is None:
+            continue
+        caller = next((f for f in reversed(frames) if "/app/" in f.filename and not _library(f.filename)), None)
+        key = (f"{caller.filename}:{caller.lineno}" if caller else "<outside app>", lib)
+        entry = spots.setdefault(key, [0, 0])
+        entry[0] += stat.size
+        entry[1] += stat.count
+
+    by_caller = sorted(spots.items(), key=lambda kv: -kv[1][0])[:limit]
+    return {
+        "library_callers": [
+            {"caller": caller, "library": lib, "size_kib": round(size / 1024, 1), "count": count}
+            for (caller, lib), (size, count) in by_caller
+        ],
+        "top_lines": [
+            {"line": f"{stat.traceback[-1].filename}:{stat.traceback[-1].lineno}",
+             "size_kib": round(stat.size / 1024, 1), "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:limit]
+        ],
+    }
+
+
+def _call_stats(profiler: cProfile.Profile, limit: int) -> Dict[str, Any]:
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out).sort_stats("cumulative")
+    stats.print_stats(limit)
+
+    calls = []
+    for func in stats.fcn_list[:limit]:
+        cc, nc, tt, ct, _ = stats.stats[func]
+        filename, lineno, name = func
+        calls.append({
+            "function": f"{filename}:{lineno}({name})",
+            "ncalls": nc,
+            "tottime_ms": round(tt * 1000, 3),
+            "cumtime_ms": round(ct * 1000, 3),
+        })
+    return {"text": out.getvalue(), "calls": calls}
+
+
+def _store(profile: Dict[str, Any]) -> None:
+    _profiles[profile["id"]] = profile
+    while len(_profiles) > config.PROFILE_STORE_SIZE:
+        _profiles.popitem(last=False)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """
+    Stored profiles, newest first, without their stats
+    """
+    keys = ("id", "method", "path", "route", "status", "duration_ms", "started_at", "trigger")
+    return [{k: p[k] for k in keys} for p in reversed(_profiles.values())]
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    """
+    A stored profile (call stats + memory hot spots), without the raw pstats
+    """
+    profile = _profiles.get(profile_id)
+    if profile is None:
+        return None
+    return {k: v for k, v in profile.items() if k != "pstats"}
+
+
+def get_pstats(profile_id: str) -> Optional[bytes]:
+    """
+    Raw cProfile stats (pstats / snakeviz format)
+    """
+    profile = _profiles.get(profile_id)
+    return profile["pstats"] if profile is not None else None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling selected requests (see module docstring)
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _active
+
+        if scope["type"] != "http" or _active is not None:
+            return await self.app(scope, receive, send)
+
+        trigger = _trigger(scope)
+        if trigger is None:
+            return await self.app(scope, receive, send)
+
+        profile_id = uuid.uuid4().hex[:16]
+        status = {"code": 500}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if trigger == "header":
+                    message = dict(message, headers=[*message.get("headers", []), (b"x-profile-id", profile_id.encode())])
+            await send(message)
+
+        memory = config.PROFILE_MEMORY
+        started_tracing = memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(config.PROFILE_MEMORY_FRAMES)
+        if memory:
+            tracemalloc.reset_peak()
+
+        _active = {"memory": memory, "best": -1, "snapshot": None, "snapshot_at": None}
+        profiler = cProfile.Profile()
+        started_at = datetime.now(timezone.utc).isoformat()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            duration_ms = (time.perf_counter() - start) * 1000
+            state, _active = _active, None
+            try:
+                if trigger == "header" or duration_ms >= config.PROFILE_MIN_MS:
+                    _store(self._finish(scope, profile_id, trigger, status["code"], started_at, duration_ms, profiler, state))
+            except Exception as e:
+                _logger.warning("Could not store profile %s: %s", profile_id, e)
+            finally:
+                if started_tracing:
+                    tracemalloc.stop()
+
+    def _finish(
+        self,
+        scope,
+        profile_id: str,
+        trigger: str,
+        status: int,
+        started_at: str,
+        duration_ms: float,
+        profiler: cProfile.Profile,
+        state: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        memory = None
+        if state["memory"]:
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot, at = state["snapshot"], state["snapshot_at"]
+            if snapshot is None:
+                snapshot, at = tracemalloc.take_snapshot(), "response"
+            memory = {
+                "peak_mib": round(peak / 2 ** 20, 2),
+                "snapshot_at": at,
+                **_hot_spots(snapshot, config.PROFILE_TOP),
+            }
+
+        # before _call_stats: pstats.Stats(profiler) takes profiler.stats
+        profiler.create_stats()
+        raw = marshal.dumps(profiler.stats)
+        route = scope.get("route")
+        _logger.info("Stored profile %s (%s) of %s %s: %.0f ms", profile_id, trigger, scope["method"], scope["path"], duration_ms)
+        return {
+            "id": profile_id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(route, "path", None),
+            "status": status,
+            "duration_ms": round(duration_ms, 1),
+            "started_at": started_at,
+            "trigger": trigger,
+            **_call_stats(profiler, config.PROFILE_TOP),
+            "memory": memory,
+            "pstats": raw,
+        }
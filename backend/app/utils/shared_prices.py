@@ -0,0 +1,432 @@
+"""
+Shared Price Matrix - hot bars in shared memory for every worker on a host
+
+With several uvicorn workers each one used to hold its own pandas copies of
+the same minute bars. With PRICE_MATRIX on, one worker (the owner, elected
+with a file lock in PRICE_MATRIX_DIR) refreshes the bars of every ticker the
+workers asked for and publishes them as one shared-memory segment per
+generation:
+
+    magic | header length | data offset | JSON header | 64-byte aligned arrays
+
+The header maps each interval to a block: tickers -> row, the timestamp axis
+(int64 ns UTC) and two float64 (tickers x timestamps) arrays, close (forward
+filled) and volume. A (ticker, interval) row sits at close + row * bytes per
+row. manifest.json names the current segment; readers re-attach when it
+changes and hand out read-only NumPy views, so a PriceBlock becomes a wide
+close DataFrame without copying (clean_prices_df accepts it directly).
+
+Readers register interest by touching PRICE_MATRIX_DIR/wanted/{interval}/{ticker};
+the owner drops tickers nobody asked for within PRICE_MATRIX_IDLE seconds.
+"""
+
+import os
+import json
+import time
+import struct
+
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.configs import config
+from app.utils.logger import setup_logger
+from app.utils.metrics import cache_event
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): every worker keeps its own bars
+    fcntl = None
+
+
+_logger = setup_logger()
+
+MAGIC = b"OSCPXM01"
+_PREAMBLE = struct.Struct("<8sQQ")
+_ALIGN = 64
+# re-touch a wanted file at most this often per process (seconds)
+_WANT_EVERY = 60.0
+
+
+@dataclass
+class PriceBlock:
+    """
+    Bars of several tickers on one timestamp axis: row i of close / volume
+    belongs to tickers[i]. Arrays may be read-only views into shared memory.
+    """
+    interval: str
+    tickers: List[str]
+    stamps: np.ndarray      # int64 ns UTC, sorted
+    close: np.ndarray       # float64, (len(tickers), len(stamps)), forward filled
+    volume: np.ndarray      # float64, same shape, NaN where there was no bar
+    start: int              # covered window [start, end], ns UTC
+    end: int
+    fetched: float          # time.time() of the refresh
+
+    @classmethod
+    def from_frames(
+        cls,
+        interval: str,
+        frames: Dict[str, pd.DataFrame],
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        fetched: float,
+        sessions_only: bool = True
+    ) -> Optional["PriceBlock"]:
+        """
+        Block from {ticker: OHLCV frame} (tickers without bars are left out)
+        """
+        from app.utils.market_calendar import session_mask
+
+        closes, volumes = {}, {}
+        for t, df in frames.items():
+            if df is None or df.empty or "Close" not in df:
+                continue
+            df = df[~df.index.duplicated(keep="last")]
+            closes[t] = df["Close"]
+            volumes[t] = df["Volume"] if "Volume" in df else pd.Series(np.nan, index=df.index)
+        if not closes:
+            return None
+
+        tickers = sorted(closes)
+        close = pd.concat([closes[t] for t in tickers], axis=1, keys=tickers).sort_index()
+        close.index = close.index.tz_convert("UTC")
+        if sessions_only:
+            close = close.loc[session_mask(close.index)]
+        volume = pd.concat([volumes[t] for t in tickers], axis=1, keys=tickers)
+        volume.index = volume.index.tz_convert("UTC")
+        volume = volume.reindex(close.index)
+
+        return cls(
+            interval=interval,
+            tickers=tickers,
+            stamps=close.index.as_unit("ns").asi8.copy(),
+            close=np.ascontiguousarray(close.ffill().to_numpy(dtype="float64").T),
+            volume=np.ascontiguousarray(volume.to_numpy(dtype="float64").T),
+            start=pd.Timestamp(start).value,
+            end=pd.Timestamp(end).value,
+            fetched=fetched,
+        )
+
+    def select(self, tickers: Sequence[str]) -> Optional["PriceBlock"]:
+        """
+        Rows for tickers (in that order), None if any is missing; a view when
+        they are consecutive rows
+        """
+        rows = {t: i for i, t in enumerate(self.tickers)}
+        try:
+            idx = [rows[t] for t in tickers]
+        except KeyError:
+            return None
+        if idx and idx == list(range(idx[0], idx[0] + len(idx))):
+            take = slice(idx[0], idx[0] + len(idx))
+        else:
+            take = idx
+        return PriceBlock(self.interval, list(tickers), self.stamps, self.close[take], self.volume[take],
+                          self.start, self.end, self.fetched)
+
+    def window(self, start: pd.Timestamp, end: pd.Timestamp) -> "PriceBlock":
+        """
+        Bars stamped in [start, end] (views)
+        """
+        lo = np.searchsorted(self.stamps, pd.Timestamp(start).value, side="left")
+        hi = np.searchsorted(self.stamps, pd.Timestamp(end).value, side="right")
+        return PriceBlock(self.interval, self.tickers, self.stamps[lo:hi], self.close[:, lo:hi],
+                          self.volume[:, lo:hi], self.start, self.end, self.fetched)
+
+    def close_frame(self) -> pd.DataFrame:
+        """
+        Wide close frame (index=Datetime[UTC], cols=tickers) on the close array
+        itself: pandas keeps a (tickers x rows) float block as-is
+        """
+        index = pd.DatetimeIndex(self.stamps.view("datetime64[ns]")).tz_localize("UTC")
+        index.name = "Datetime"
+        return pd.DataFrame(self.close.T, index=index, columns=list(self.tickers), copy=False)
+
+
+# ---------- Paths / ownership ----------
+def _path(*parts: str) -> str:
+    return os.path.join(config.PRICE_MATRIX_DIR, *parts)
+
+
+_lock_fd: Optional[int] = None
+
+
+def acquire_ownership() -> bool:
+    """
+    True if this process is (now) the owner; never blocks
+    """
+    global _lock_fd
+    if _lock_fd is not None:
+        return True
+    if fcntl is None:
+        return False
+
+    os.makedirs(config.PRICE_MATRIX_DIR, exist_ok=True)
+    fd = os.open(_path("owner.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return False
+    _lock_fd = fd
+    _logger.info("Worker %s owns the shared price matrix", os.getpid())
+    return True
+
+
+def release_ownership() -> None:
+    global _lock_fd
+    if _lock_fd is not None:
+        os.close(_lock_fd)
+        _lock_fd = None
+
+
+# ---------- Wanted tickers ----------
+_touched: Dict[tuple, float] = {}
+
+
+def want(tickers: Sequence[str], interval: str) -> None:
+    """
+    Ask the owner to keep these tickers' bars for interval
+    """
+    now = time.time()
+    for t in tickers:
+        if os.sep in t or t.startswith(".") or now - _touched.get((t, interval), 0.0) < _WANT_EVERY:
+            continue
+        folder = _path("wanted", interval)
+        try:
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, t), "a"):
+                os.utime(os.path.join(folder, t))
+        except OSError as e:
+            _logger.warning("Could not register %s for the price matrix: %s", t, e)
+            return
+        _touched[(t, interval)] = now
+
+
+def wanted(interval: str) -> List[str]:
+    """
+    Tickers asked for within PRICE_MATRIX_IDLE (stale requests are removed)
+    """
+    folder = _path("wanted", interval)
+    cutoff = time.time() - config.PRICE_MATRIX_IDLE
+    out = []
+    try:
+        entries = list(os.scandir(folder))
+    except FileNotFoundError:
+        return []
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime >= cutoff:
+                out.append(entry.name)
+            else:
+                os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+    return sorted(out)
+
+
+# ---------- Segments ----------
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach without registering with the resource tracker, which would unlink
+    the owner's segment when this reader exits (Python < 3.13)
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        from multiprocessing import resource_tracker
+
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+_generation = 0
+_published: List[shared_memory.SharedMemory] = []
+
+
+def publish(blocks: Dict[str, PriceBlock]) -> Optional[str]:
+    """
+    Owner: write blocks as a new generation and point the manifest at it;
+    returns the segment name
+    """
+    global _generation
+    _generation += 1
+
+    layout: Dict[str, Any] = {}
+    offset = 0
+    arrays = []
+    for interval, block in blocks.items():
+        entry = {
+            "tickers": {t: i for i, t in enumerate(block.tickers)},
+            "rows": int(len(block.stamps)),
+            "start": int(block.start),
+            "end": int(block.end),
+            "fetched": block.fetched,
+        }
+        for field, values in (("stamps", block.stamps.astype("int64")),
+                              ("close", block.close.astype("float64")),
+                              ("volume", block.volume.astype("float64"))):
+            entry[field] = offset
+            arrays.append((offset, np.ascontiguousarray(values)))
+            offset = _aligned(offset + values.nbytes)
+        layout[interval] = entry
+
+    header = json.dumps({"generation": _generation, "published": time.time(), "blocks": layout}).encode()
+    data_at = _aligned(_PREAMBLE.size + len(header))
+    name = f"{config.PRICE_MATRIX_PREFIX}-{os.getpid()}-{_generation}"
+
+    shm = shared_memory.SharedMemory(name=name, create=True, size=max(data_at + offset, 1))
+    try:
+        _PREAMBLE.pack_into(shm.buf, 0, MAGIC, len(header), data_at)
+        shm.buf[_PREAMBLE.size:_PREAMBLE.size + len(header)] = header
+        for at, values in arrays:
+            target = np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf, offset=data_at + at)
+            target[...] = values
+            del target
+    except Exception:
+        shm.close()
+        shm.unlink()
+        raise
+
+    previous = _read_manifest()
+    tmp = _path(f"manifest.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"segment": name, "generation": _generation, "owner": os.getpid()}, f)
+    os.replace(tmp, _path("manifest.json"))
+
+    # readers still mapping older generations keep them until they let go
+    _published.append(shm)
+    while len(_published) > 2:
+        _drop(_published.pop(0))
+    if previous and previous["segment"] not in {s.name for s in _published}:
+        # left behind by an owner that died
+        try:
+            _drop(_attach(previous["segment"]))
+        except FileNotFoundError:
+            pass
+    return name
+
+
+def _drop(shm: shared_memory.SharedMemory) -> None:
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+    try:
+        shm.close()
+    except BufferError:
+        pass
+
+
+def _read_manifest() -> Optional[Dict[str, Any]]:
+    try:
+        with open(_path("manifest.json")) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+# reader state: the attached generation and older ones still referenced
+_view: Dict[str, Any] = {"stamp": None, "shm": None, "blocks": {}}
+_retired: List[shared_memory.SharedMemory] = []
+
+
+def _load(shm: shared_memory.SharedMemory) -> Dict[str, PriceBlock]:
+    magic, size, data_at = _PREAMBLE.unpack_from(shm.buf, 0)
+    if magic != MAGIC:
+        raise ValueError("not a price matrix segment")
+    header = json.loads(bytes(shm.buf[_PREAMBLE.size:_PREAMBLE.size + size]))
+
+    def view(at: int, shape: tuple, dtype: str) -> np.ndarray:
+        arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=data_at + at)
+        arr.flags.writeable = False
+        return arr
+
+    blocks = {}
+    for interval, entry in header["blocks"].items():
+        tickers = sorted(entry["tickers"], key=entry["tickers"].get)
+        shape = (len(tickers), entry["rows"])
+        blocks[interval] = PriceBlock(
+            interval=interval,
+            tickers=tickers,
+            stamps=view(entry["stamps"], (entry["rows"],), "int64"),
+            close=view(entry["close"], shape, "float64"),
+            volume=view(entry["volume"], shape, "float64"),
+            start=entry["start"],
+            end=entry["end"],
+            fetched=entry["fetched"],
+        )
+    return blocks
+
+
+def current() -> Dict[str, PriceBlock]:
+    """
+    {interval: PriceBlock} of the latest generation ({} if none is published)
+    """
+    try:
+        st = os.stat(_path("manifest.json"))
+    except FileNotFoundError:
+        return {}
+    stamp = (st.st_mtime_ns, st.st_ino)
+    if stamp == _view["stamp"]:
+        return _view["blocks"]
+
+    manifest = _read_manifest()
+    if manifest is None:
+        return _view["blocks"]
+    try:
+        shm = _attach(manifest["segment"])
+        blocks = _load(shm)
+    except (FileNotFoundError, ValueError) as e:
+        _logger.debug("Price matrix %s unavailable: %s", manifest.get("segment"), e)
+        return {}
+
+    if _view["shm"] is not None:
+        _retired.append(_view["shm"])
+    _view.update(stamp=stamp, shm=shm, blocks=blocks)
+
+    # unmap older generations no PriceBlock points into any more
+    for old in list(_retired):
+        try:
+            old.close()
+            _retired.remove(old)
+        except BufferError:
+            pass
+    return blocks
+
+
+def lookup(tickers: Sequence[str], interval: str, start: pd.Timestamp, end: pd.Timestamp) -> Optional[PriceBlock]:
+    """
+    The tickers' bars in [start, end] from the shared matrix, or None if it
+    does not hold them all for that window (and fresh enough)
+    """
+    want(tickers, interval)
+    block = current().get(interval)
+    hit = None
+    if block is not None:
+        fresh = time.time() - block.fetched <= config.PRICE_MATRIX_REFRESH * 2
+        covered = block.start <= pd.Timestamp(start).value and (
+            pd.Timestamp(end).value <= block.end or fresh
+        )
+        if covered:
+            hit = block.select(tickers)
+    cache_event("price_matrix", hit=hit is not None)
+    return hit.window(start, end) if hit is not None else None
+
+
+def close_shared_prices() -> None:
+    """
+    Unlink this owner's segments and step down (app shutdown)
+    """
+    while _published:
+        _drop(_published.pop())
+    release_ownership()
@@ -29,10 +29,16 @@ def compute_portfolio_timeseries(
     cash_ticker: str = CASH_TICKER,
     include_weights: bool = True,
     compute_simple_returns: bool = True,
+    initial_holdings: Optional[Dict[str, float]] = None,
+    initial_cash: float = 0.0,
 ) -> Dict[str, pd.DataFrame | pd.Series]:
     """
     Build portfolio time series from intraday prices + executed orders.
 
+    initial_holdings / initial_cash are the state before the first order
+    passed (e.g. a snapshot, or orders folded in with utils.holdings.replay),
+    so only the orders inside the window need aligning.
+
     Returns dict of:
       - holdings:     shares per ticker over time
       - cash:         cash balance over time
@@ -47,7 +53,9 @@ def compute_portfolio_timeseries(
     if prices.index.tz is None:
         raise ValueError("prices index must be tz-aware (UTC or market tz)")
 
-    prices = prices.sort_index()
+    # sorted input (e.g. a shared-memory price block) is used without a copy
+    if not prices.index.is_monotonic_increasing:
+        prices = prices.sort_index()
     tickers = [c for c in prices.columns if c != cash_ticker]
 
     # --- 1) Clean & align orders to price index ---
@@ -88,6 +96,9 @@ def compute_portfolio_timeseries(
     # Reindex to full minute index with zeros, then cumsum to get holdings
     qty_changes = qty_changes.reindex(prices.index, fill_value=0.0)
     holdings = qty_changes.cumsum().astype(float)   # shares per ticker over time
+    if initial_holdings:
+        start = pd.Series(initial_holdings, dtype=float).reindex(tickers, fill_value=0.0)
+        holdings = holdings + start
 
     # --- 3) Cash flows ---
     # (a) Proceeds/costs from securities trades = -quantity * trade_price for buys, + for sells
@@ -102,12 +113,12 @@ def compute_portfolio_timeseries(
     else:
         sec_cash_flows = pd.Series(0.0, index=prices.index)
 
-    # (b) Pure cash deposits/withdrawals via CA$H rows (qty * price), price ~ 1.00
+    # (b) Pure cash deposits/withdrawals via CA$H rows: quantity only, as
+    # place_order and utils.holdings.replay book them (price is ignored)
     if len(orders_cash):
         cash_flows_cash = (
             orders_cash
-            .assign(cash_flow=lambda d: d["quantity"] * d["price"])
-            .groupby("aligned_bar")["cash_flow"]
+            .groupby("aligned_bar")["quantity"]
             .sum()
             .reindex(prices.index, fill_value=0.0)
         )
@@ -115,11 +126,11 @@ def compute_portfolio_timeseries(
         cash_flows_cash = pd.Series(0.0, index=prices.index)
 
     cash_flow = (sec_cash_flows + cash_flows_cash).astype(float)
-    cash = cash_flow.cumsum()
+    cash = cash_flow.cumsum() + float(initial_cash)
 
     # --- 4) Position values & totals ---
     # Align holdings with prices (same index/columns guaranteed by construction)
-    position_pv = (holdings * prices[tickers])
+    position_pv = (holdings * (prices if tickers == list(prices.columns) else prices[tickers]))
     portfolio_assets = position_pv.sum(axis=1)
     portfolio_pv = portfolio_assets + cash
 
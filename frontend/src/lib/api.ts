@@ -41,7 +41,7 @@ export interface Portfolio {
   created_at: string;
   last_updated: string;
   user_id: string;
-  // Extended fields from GET /portfolios/{id}
+  // Extended fields from GET /portfolios/{id} (or GET /portfolios?with_values=true)
   present_value?: number;
   positions?: {
     [ticker: string]: {
@@ -109,6 +109,12 @@ export interface PerformanceData {
   };
 }
 
+export interface PerformanceBundle {
+  id: string;
+  user_id: string;
+  performance: Record<string, PerformanceData["performance"]>;
+}
+
 // Legacy types for UI compatibility
 export interface Position {
   id: string;
@@ -195,10 +201,11 @@ export const api = {
   // Portfolios
   portfolios: {
     list: async () => {
-      const list = await fetchWithAuth('/portfolios');
+      // Values come back batched; one round trip for every portfolio
+      const list = await fetchWithAuth('/portfolios?with_values=true');
       if (!Array.isArray(list) || list.length === 0) return list ?? [];
 
-      // Enrich items that lack present_value using GET /portfolios/{id}
+      // Enrich any item still lacking present_value using GET /portfolios/{id}
       const enriched = await Promise.all(
         list.map(async (p: Portfolio) => {
           if (typeof p?.present_value === 'number') return p;
@@ -266,5 +273,7 @@ export const api = {
       portfolioId: string,
       period: "1D" | "1W" | "1M" | "YTD" | "1Y" | "ALL"
     ) => fetchWithAuth(`/performance/${portfolioId}?period=${period}`),
+    bundle: (portfolioId: string) =>
+      fetchWithAuth(`/performance/${portfolioId}/bundle`),
   },
 };
@@ -291,17 +291,23 @@ const Dashboard = () => {
     dlog('positions query state:', { positionsStatus, positionsLoading, positionsFetching, error: !!positionsError, len: positions.length });
   }, [positionsStatus, positionsLoading, positionsFetching, positionsError, positions]);
 
-  const { data: performanceData = [], isLoading: perfLoading, isFetching: perfFetching, status: perfStatus, error: perfError } = useQuery({
-    queryKey: ['performance', selectedPortfolioId, selectedPeriod],
+  // All periods arrive in one bundle; switching tabs only re-selects client-side.
+  const { data: performanceBundle, isLoading: perfLoading, isFetching: perfFetching, status: perfStatus, error: perfError } = useQuery({
+    queryKey: ['performance', selectedPortfolioId],
     queryFn: async () => {
-      dlog('performance queryFn:', { selectedPortfolioId, selectedPeriod });
-      if (!selectedPortfolioId) return [];
-      if (USE_MOCK_DATA) return generatePerformanceData(selectedPeriod);
-      const response = await api.performance.get(selectedPortfolioId, selectedPeriod);
-      return transformPerformanceData(response);
+      dlog('performance queryFn:', { selectedPortfolioId });
+      if (!selectedPortfolioId || USE_MOCK_DATA) return null;
+      return await api.performance.bundle(selectedPortfolioId);
     },
     enabled: !!selectedPortfolioId,
   });
+  const performanceData = useMemo(() => {
+    if (!selectedPortfolioId) return [];
+    if (USE_MOCK_DATA) return generatePerformanceData(selectedPeriod);
+    const series = performanceBundle?.performance?.[selectedPeriod];
+    if (!series) return [];
+    return transformPerformanceData({ ...performanceBundle, performance: series });
+  }, [performanceBundle, selectedPortfolioId, selectedPeriod]);
   useEffect(() => {
     dlog('performance query state:', { perfStatus, perfLoading, perfFetching, error: !!perfError, len: performanceData.length });
   }, [perfStatus, perfLoading, perfFetching, perfError, performanceData]);
@@ -0,0 +1,77 @@
+-- Atomic order placement: checks cash / inventory, inserts the order and
+-- applies both position deltas in one transaction (one round trip per order).
+--
+-- Cash orders (CA$H) move cash by quantity; trades move the ticker by
+-- quantity and cash by -quantity * price (buys spend, sells receive).
+
+CREATE OR REPLACE FUNCTION public.place_order(
+  p_portfolio_id uuid,
+  p_ticker text,
+  p_quantity numeric,
+  p_price numeric,
+  p_name text DEFAULT NULL,
+  p_sector text DEFAULT NULL
+)
+RETURNS SETOF public.orders
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_cash_ticker CONSTANT text := 'CA$H';
+  v_ticker text := upper(p_ticker);
+  v_cash numeric;
+  v_held numeric;
+  v_cash_delta numeric;
+BEGIN
+  IF p_quantity = 0 THEN
+    RAISE EXCEPTION 'Order quantity cannot be 0';
+  END IF;
+
+  -- Serialize concurrent orders on this portfolio's positions
+  SELECT coalesce(quantity, 0) INTO v_cash
+    FROM public.positions
+   WHERE portfolio_id = p_portfolio_id AND ticker = v_cash_ticker
+     FOR UPDATE;
+  v_cash := coalesce(v_cash, 0);
+
+  IF v_ticker = v_cash_ticker THEN
+    v_cash_delta := p_quantity;
+  ELSE
+    v_cash_delta := -p_quantity * p_price;
+
+    SELECT coalesce(quantity, 0) INTO v_held
+      FROM public.positions
+     WHERE portfolio_id = p_portfolio_id AND ticker = v_ticker
+       FOR UPDATE;
+    v_held := coalesce(v_held, 0);
+
+    IF p_quantity < 0 AND -p_quantity > v_held THEN
+      RAISE EXCEPTION 'Portfolio does not have the inventory to make this trade';
+    END IF;
+  END IF;
+
+  IF v_cash + v_cash_delta < 0 THEN
+    RAISE EXCEPTION 'Portfolio does not have enough cash to make this trade / withdrawal';
+  END IF;
+
+  -- Position deltas
+  IF v_ticker <> v_cash_ticker THEN
+    INSERT INTO public.positions (portfolio_id, ticker, quantity, name, sector)
+    VALUES (p_portfolio_id, v_ticker, p_quantity, p_name, p_sector)
+    ON CONFLICT (portfolio_id, ticker)
+    DO UPDATE SET quantity = public.positions.quantity + excluded.quantity,
+                  updated_at = now();
+  END IF;
+
+  INSERT INTO public.positions (portfolio_id, ticker, quantity, name, sector)
+  VALUES (p_portfolio_id, v_cash_ticker, v_cash_delta, 'N/A (Cash Holdings)', 'Cash')
+  ON CONFLICT (portfolio_id, ticker)
+  DO UPDATE SET quantity = public.positions.quantity + excluded.quantity,
+                updated_at = now();
+
+  -- Order record
+  RETURN QUERY
+  INSERT INTO public.orders (portfolio_id, ticker, quantity, price, name, sector)
+  VALUES (p_portfolio_id, v_ticker, p_quantity, p_price, p_name, p_sector)
+  RETURNING *;
+END;
+$$;
@@ -0,0 +1,23 @@
+-- Ledger version: bumped once per order row written or deleted, so backend
+-- workers holding a cached copy of a portfolio's ledger can detect writes
+-- made elsewhere with one cheap read of portfolios.ledger_version.
+
+ALTER TABLE public.portfolios
+  ADD COLUMN IF NOT EXISTS ledger_version bigint NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION public.bump_ledger_version()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  UPDATE public.portfolios
+     SET ledger_version = ledger_version + 1
+   WHERE id = coalesce(NEW.portfolio_id, OLD.portfolio_id);
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS orders_bump_ledger_version ON public.orders;
+CREATE TRIGGER orders_bump_ledger_version
+AFTER INSERT OR UPDATE OR DELETE ON public.orders
+FOR EACH ROW EXECUTE FUNCTION public.bump_ledger_version();
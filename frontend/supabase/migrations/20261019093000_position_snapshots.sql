@@ -0,0 +1,60 @@
+-- Position snapshots: holdings + cash of a portfolio as of a point in its
+-- order ledger (the last (timestamp, order_id) folded in). Holdings at any
+-- time are the nearest earlier snapshot plus a replay of the orders after it.
+
+CREATE TABLE IF NOT EXISTS public.position_snapshots (
+  id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  portfolio_id uuid NOT NULL REFERENCES public.portfolios (id) ON DELETE CASCADE,
+  last_timestamp timestamptz NOT NULL,
+  last_order_id uuid NOT NULL,
+  order_count bigint NOT NULL,
+  holdings jsonb NOT NULL DEFAULT '{}'::jsonb,
+  cash numeric NOT NULL DEFAULT 0,
+  created_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS position_snapshots_portfolio_ts_idx
+  ON public.position_snapshots (portfolio_id, last_timestamp DESC, last_order_id DESC);
+
+ALTER TABLE public.position_snapshots ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view snapshots of their portfolios"
+ON public.position_snapshots
+FOR SELECT
+USING (portfolio_id IN (SELECT id FROM public.portfolios WHERE user_id = auth.uid()));
+
+
+-- Drift repair: overwrite position quantities with what the ledger implies.
+-- Refuses (P0001) if an order landed since the caller derived p_quantities
+-- at p_ledger_version, so a repair can never undo a concurrent order.
+
+CREATE OR REPLACE FUNCTION public.reconcile_positions(
+  p_portfolio_id uuid,
+  p_ledger_version bigint,
+  p_quantities jsonb
+)
+RETURNS SETOF public.positions
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_version bigint;
+BEGIN
+  SELECT ledger_version INTO v_version
+    FROM public.portfolios
+   WHERE id = p_portfolio_id
+     FOR UPDATE;
+
+  IF v_version IS DISTINCT FROM p_ledger_version THEN
+    RAISE EXCEPTION 'Ledger changed during reconcile (% -> %)', p_ledger_version, v_version;
+  END IF;
+
+  RETURN QUERY
+  INSERT INTO public.positions (portfolio_id, ticker, quantity)
+  SELECT p_portfolio_id, upper(q.key), q.value::numeric
+    FROM jsonb_each_text(p_quantities) AS q
+  ON CONFLICT (portfolio_id, ticker)
+  DO UPDATE SET quantity = excluded.quantity,
+                updated_at = now()
+  RETURNING *;
+END;
+$$;
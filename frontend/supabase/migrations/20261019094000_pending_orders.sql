@@ -0,0 +1,40 @@
+-- Pending orders: resting limit / stop / stop-limit orders, matched against
+-- incoming bars by the backend (services.matching). A fill claims the row
+-- (status open|triggered -> filled) before placing the ledger order, so
+-- concurrent matchers fill each order at most once.
+
+CREATE TABLE IF NOT EXISTS public.pending_orders (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  portfolio_id uuid NOT NULL REFERENCES public.portfolios (id) ON DELETE CASCADE,
+  ticker text NOT NULL,
+  name text,
+  sector text,
+  quantity numeric NOT NULL CHECK (quantity <> 0),
+  kind text NOT NULL CHECK (kind IN ('limit', 'stop', 'stop_limit')),
+  limit_price numeric,
+  stop_price numeric,
+  time_in_force text NOT NULL DEFAULT 'gtc' CHECK (time_in_force IN ('gtc', 'day')),
+  status text NOT NULL DEFAULT 'open'
+    CHECK (status IN ('open', 'triggered', 'filled', 'cancelled', 'expired', 'rejected')),
+  created_at timestamptz NOT NULL DEFAULT now(),
+  expires_at timestamptz,
+  updated_at timestamptz NOT NULL DEFAULT now(),
+  filled_price numeric,
+  filled_order_id uuid,
+  error text
+);
+
+CREATE INDEX IF NOT EXISTS pending_orders_portfolio_idx
+  ON public.pending_orders (portfolio_id, created_at);
+
+-- the matcher only ever scans live orders
+CREATE INDEX IF NOT EXISTS pending_orders_live_idx
+  ON public.pending_orders (created_at)
+  WHERE status IN ('open', 'triggered');
+
+ALTER TABLE public.pending_orders ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view pending orders of their portfolios"
+ON public.pending_orders
+FOR SELECT
+USING (portfolio_id IN (SELECT id FROM public.portfolios WHERE user_id = auth.uid()));
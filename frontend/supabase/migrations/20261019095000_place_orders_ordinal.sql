@@ -0,0 +1,82 @@
+-- place_orders returns each stored order with its 0-based position in
+-- p_orders ("ord"), so callers match rows to their requests without relying
+-- on INSERT ... RETURNING preserving the insert order.
+--
+-- The return type changes, hence DROP + CREATE rather than CREATE OR REPLACE.
+
+DROP FUNCTION IF EXISTS public.place_orders(uuid, jsonb);
+
+CREATE FUNCTION public.place_orders(
+  p_portfolio_id uuid,
+  p_orders jsonb
+)
+RETURNS SETOF jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_cash_ticker CONSTANT text := 'CA$H';
+  v_delta record;
+BEGIN
+  CREATE TEMP TABLE _batch ON COMMIT DROP AS
+  SELECT o.ord,
+         gen_random_uuid() AS order_id,
+         upper(o.ticker) AS ticker,
+         o.quantity,
+         o.price,
+         o.name,
+         o.sector
+    FROM ROWS FROM (
+           jsonb_to_recordset(p_orders)
+             AS (ticker text, quantity numeric, price numeric, name text, sector text)
+         ) WITH ORDINALITY AS o(ticker, quantity, price, name, sector, ord);
+
+  IF EXISTS (SELECT 1 FROM _batch WHERE quantity = 0) THEN
+    RAISE EXCEPTION 'Order quantity cannot be 0';
+  END IF;
+
+  -- Net deltas: tickers by quantity, cash by deposits and -quantity * price
+  FOR v_delta IN
+    WITH deltas AS (
+      SELECT ticker, quantity AS delta, name, sector FROM _batch WHERE ticker <> v_cash_ticker
+      UNION ALL
+      SELECT v_cash_ticker,
+             CASE WHEN ticker = v_cash_ticker THEN quantity ELSE -quantity * price END,
+             'N/A (Cash Holdings)', 'Cash'
+        FROM _batch
+    )
+    SELECT ticker, sum(delta) AS delta, max(name) AS name, max(sector) AS sector
+      FROM deltas
+     GROUP BY ticker
+     ORDER BY ticker  -- consistent lock order
+  LOOP
+    PERFORM 1 FROM public.positions
+      WHERE portfolio_id = p_portfolio_id AND ticker = v_delta.ticker
+        FOR UPDATE;
+
+    INSERT INTO public.positions (portfolio_id, ticker, quantity, name, sector)
+    VALUES (p_portfolio_id, v_delta.ticker, v_delta.delta, v_delta.name, v_delta.sector)
+    ON CONFLICT (portfolio_id, ticker)
+    DO UPDATE SET quantity = public.positions.quantity + excluded.quantity,
+                  updated_at = now();
+
+    IF (SELECT quantity FROM public.positions
+         WHERE portfolio_id = p_portfolio_id AND ticker = v_delta.ticker) < 0 THEN
+      RAISE EXCEPTION 'Portfolio does not have enough % to place these orders',
+        CASE WHEN v_delta.ticker = v_cash_ticker THEN 'cash' ELSE v_delta.ticker END;
+    END IF;
+  END LOOP;
+
+  RETURN QUERY
+  WITH inserted AS (
+    INSERT INTO public.orders (order_id, portfolio_id, ticker, quantity, price, name, sector)
+    SELECT order_id, p_portfolio_id, ticker, quantity, price, name, sector
+      FROM _batch
+     ORDER BY ord
+    RETURNING *
+  )
+  SELECT to_jsonb(i) || jsonb_build_object('ord', b.ord - 1)
+    FROM inserted i
+    JOIN _batch b USING (order_id)
+   ORDER BY b.ord;
+END;
+$$;
@@ -0,0 +1,54 @@
+-- Pending order fills in one transaction: claim the pending order, place its
+-- ledger order through place_order and mark it filled (or rejected when the
+-- ledger refuses). A matcher that dies mid-fill leaves either the live
+-- pending order or the filled one with its ledger order, never half of it.
+--
+-- Returns {"pending": row, "order": row | null}, or null when the pending
+-- order is no longer in one of p_statuses (cancelled, or filled elsewhere).
+
+CREATE OR REPLACE FUNCTION public.fill_pending_order(
+  p_portfolio_id uuid,
+  p_order_id uuid,
+  p_price numeric,
+  p_statuses text[]
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_pending public.pending_orders;
+  v_order public.orders;
+BEGIN
+  SELECT * INTO v_pending
+    FROM public.pending_orders
+   WHERE id = p_order_id
+     AND portfolio_id = p_portfolio_id
+     AND status = ANY (p_statuses)
+     FOR UPDATE;
+  IF NOT FOUND THEN
+    RETURN NULL;
+  END IF;
+
+  BEGIN
+    SELECT * INTO v_order
+      FROM public.place_order(
+             p_portfolio_id, v_pending.ticker, v_pending.quantity, p_price,
+             v_pending.name, v_pending.sector
+           );
+  EXCEPTION WHEN raise_exception THEN
+    -- cash / inventory refused: place_order's writes are rolled back
+    UPDATE public.pending_orders
+       SET status = 'rejected', error = SQLERRM, updated_at = now()
+     WHERE id = p_order_id
+    RETURNING * INTO v_pending;
+    RETURN jsonb_build_object('pending', to_jsonb(v_pending), 'order', NULL);
+  END;
+
+  UPDATE public.pending_orders
+     SET status = 'filled', filled_price = p_price, filled_order_id = v_order.order_id, updated_at = now()
+   WHERE id = p_order_id
+  RETURNING * INTO v_pending;
+
+  RETURN jsonb_build_object('pending', to_jsonb(v_pending), 'order', to_jsonb(v_order));
+END;
+$$;
@@ -0,0 +1,25 @@
+-- Positions implied by the order ledgers of several portfolios, in one call
+-- (the portfolio list values these rather than the positions table, like
+-- the per-portfolio path). Same rule as place_order: tickers move by
+-- quantity; cash by CA$H quantity and -quantity * price for trades.
+
+CREATE OR REPLACE FUNCTION public.ledger_positions(p_portfolio_ids uuid[])
+RETURNS TABLE (portfolio_id uuid, ticker text, quantity numeric)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT o.portfolio_id, o.ticker, sum(o.quantity)
+    FROM public.orders o
+   WHERE o.portfolio_id = ANY (p_portfolio_ids)
+     AND o.ticker IS NOT NULL
+     AND o.ticker <> 'CA$H'
+   GROUP BY o.portfolio_id, o.ticker
+  UNION ALL
+  SELECT o.portfolio_id,
+         'CA$H',
+         sum(CASE WHEN o.ticker = 'CA$H' THEN o.quantity ELSE -o.quantity * coalesce(o.price, 0) END)
+    FROM public.orders o
+   WHERE o.portfolio_id = ANY (p_portfolio_ids)
+     AND o.ticker IS NOT NULL
+   GROUP BY o.portfolio_id;
+$$;
@@ -0,0 +1,482 @@
+# tests/loadtest/harness.py
+"""
+End-to-end load test: backend workers against local Supabase and Yahoo
+stand-ins, driven by simulated dashboard users.
+
+Starts three uvicorn processes (supabase_standin, yahoo_standin and the app
+with DB_BACKEND=postgrest / MARKET_DATA_URL pointing at them; --workers
+app workers, with --shared-cache sharing a redis_standin cache tier), seeds one
+portfolio with a backdated order history per user, then for each stage of
+--users runs that many concurrent users for --duration seconds. Each user
+loops over a weighted mix of dashboard calls (portfolio list, detail,
+quotes, performance per period, order placement) with exponential think
+time. Reports throughput and latency percentiles per endpoint and stage;
+the first stage whose p99 exceeds --p99-budget-ms is where the worker
+saturates.
+
+    python tests/loadtest/harness.py --users 5,10,25,50 --duration 20
+    python tests/loadtest/harness.py --users 20 --yahoo-latency-ms 200 --yahoo-error-rate 0.02 --json out.json
+    python tests/loadtest/harness.py --users 20 --workers 4 --shared-cache
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import jwt
+import httpx
+import numpy as np
+
+HERE = Path(__file__).resolve().parent
+BACKEND = HERE.parents[1] / "backend"
+
+CASH = "CA$H"
+ADMIN_TOKEN = "loadtest"
+PERIODS = ("1D", "1W", "1M", "YTD", "1Y", "ALL")
+DEFAULT_MIX = "list=3,detail=2,quotes=2,performance=4,order=1"
+DEFAULT_TICKERS = "AAPL,MSFT,NVDA,AMZN,GOOGL,META,TSLA,JPM,XOM,UNH,V,KO"
+
+
+@dataclass
+class Options:
+    users: List[int] = field(default_factory=lambda: [10])
+    duration: float = 20.0
+    warmup: float = 3.0
+    think_ms: float = 500.0
+    mix: str = DEFAULT_MIX
+    tickers: List[str] = field(default_factory=lambda: DEFAULT_TICKERS.split(","))
+    history_days: int = 365
+    orders_per_portfolio: int = 200
+    yahoo_latency_ms: float = 50.0
+    yahoo_jitter_ms: float = 25.0
+    yahoo_error_rate: float = 0.0
+    remote_auth: bool = False
+    workers: int = 1
+    shared_cache: bool = False
+    p99_budget_ms: float = 1000.0
+    seed: int = 7
+    log_dir: Optional[Path] = None
+
+
+# ---------- Processes ----------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Server:
+    """
+    A uvicorn subprocess (or a script, see `command`), waited on until
+    `ready_path` answers, or until the port accepts connections if it is None
+    """
+    def __init__(
+        self,
+        name: str,
+        target: str,
+        app_dir: Path,
+        env: Dict[str, str],
+        ready_path: Optional[str],
+        log_dir: Path,
+        *,
+        args: Tuple[str, ...] = (),
+        command: Optional[List[str]] = None,
+    ):
+        self.name = name
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._log = open(log_dir / f"{name}.log", "w")
+        if command is None:
+            command = [sys.executable, "-m", "uvicorn", target, "--app-dir", str(app_dir),
+                       "--host", "127.0.0.1", "--port", str(self.port), "--log-level", "warning", "--no-access-log", *args]
+        self._proc = subprocess.Popen(
+            [part.format(port=self.port) for part in command],
+            env={**os.environ, **env},
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+        )
+        self._wait(ready_path)
+
+    def _wait(self, path: Optional[str], timeout: float = 60.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._proc.poll() is not None:
+                raise RuntimeError(f"{self.name} exited with {self._proc.returncode}, see {self._log.name}")
+            try:
+                if path is None:
+                    socket.create_connection(("127.0.0.1", self.port), timeout=1.0).close()
+                    return
+                if httpx.get(self.url + path, timeout=1.0).status_code < 500:
+                    return
+            except (httpx.HTTPError, OSError):
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"{self.name} not ready after {timeout}s, see {self._log.name}")
+
+    def stop(self) -> None:
+        self._proc.terminate()
+        try:
+            self._proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+        self._log.close()
+
+
+def start_servers(options: Options, secret: str, log_dir: Path) -> Dict[str, Server]:
+    servers: Dict[str, Server] = {}
+    try:
+        servers["supabase"] = Server(
+            "supabase", "supabase_standin:app", HERE,
+            {"STANDIN_JWT_SECRET": secret, "STANDIN_DB": ":memory:"},
+            "/auth/v1/.well-known/jwks.json", log_dir,
+        )
+        servers["yahoo"] = Server(
+            "yahoo", "yahoo_standin:app", HERE,
+            {
+                "YAHOO_LATENCY_MS": str(options.yahoo_latency_ms),
+                "YAHOO_JITTER_MS": str(options.yahoo_jitter_ms),
+                "YAHOO_ERROR_RATE": str(options.yahoo_error_rate),
+            },
+            "/docs", log_dir,
+        )
+        cache = {}
+        if options.shared_cache:
+            servers["redis"] = Server(
+                "redis", "", HERE, {}, None, log_dir,
+                command=[sys.executable, str(HERE / "redis_standin.py"), "--port", "{port}"],
+            )
+            cache = {"CACHE_URL": f"redis://127.0.0.1:{servers['redis'].port}/0"}
+        servers["app"] = Server(
+            "app", "app:app", BACKEND,
+            {
+                "ENV": "DEV",
+                "SUPABASE_URL": servers["supabase"].url,
+                "SUPABASE_SERVICE_ROLE_KEY": "loadtest",
+                "SUPABASE_ANON_KEY": "loadtest",
+                # without a secret every new token goes to /auth/v1/user
+                "SUPABASE_JWT_SECRET": "" if options.remote_auth else secret,
+                "DB_BACKEND": "postgrest",
+                "MARKET_DATA_URL": servers["yahoo"].url,
+                "RECONCILE_INTERVAL_SECONDS": "0",
+                "PRELOAD_HEAVY_MODULES": "true",
+                "ADMIN_TOKEN": ADMIN_TOKEN,  # /metrics
+                **cache,
+            },
+            "/api/1.0/metrics", log_dir,
+            args=("--workers", str(options.workers)),
+        )
+    except Exception:
+        for server in servers.values():
+            server.stop()
+        raise
+    return servers
+
+
+# ---------- Seeding ----------
+@dataclass
+class User:
+    user_id: str
+    headers: Dict[str, str]
+    portfolio_id: str
+
+
+def _token(user_id: str, secret: str) -> str:
+    claims = {"sub": user_id, "aud": "authenticated", "role": "authenticated", "exp": int(time.time()) + 24 * 3600}
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+def _ledger(portfolio_id: str, options: Options, rng: random.Random) -> List[Dict[str, Any]]:
+    """
+    Backdated orders: an opening deposit, then buys and sells of held shares
+    spread over history_days (written straight to the Supabase stand-in)
+    """
+    now = time.time()
+    stamps = sorted(now - rng.uniform(3600, options.history_days * 86400) for _ in range(options.orders_per_portfolio))
+    held = {t: 0 for t in options.tickers}
+    rows = [dict(ticker=CASH, quantity=10_000_000, price=1.0, name="N/A (Cash Holdings)", sector="Cash")]
+    for _ in stamps[1:]:
+        ticker = rng.choice(options.tickers)
+        if held[ticker] > 0 and rng.random() < 0.35:
+            quantity = -rng.randint(1, held[ticker])
+        else:
+            quantity = rng.randint(1, 40)
+        held[ticker] += quantity
+        rows.append(dict(ticker=ticker, quantity=quantity, price=round(rng.uniform(20, 500), 2), name=ticker, sector="Synthetic"))
+
+    for row, ts in zip(rows, stamps):
+        row.update(
+            order_id=str(uuid.uuid4()),
+            portfolio_id=portfolio_id,
+            timestamp=time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(ts)),
+        )
+    return rows
+
+
+async def seed(supabase: str, count: int, options: Options, secret: str) -> List[User]:
+    rng = random.Random(options.seed)
+    rest = httpx.AsyncClient(base_url=f"{supabase}/rest/v1", timeout=30)
+    users = []
+    try:
+        for _ in range(count):
+            user_id, portfolio_id = str(uuid.uuid4()), str(uuid.uuid4())
+            await rest.post("/portfolios", json={"id": portfolio_id, "user_id": user_id, "name": "load test"})
+
+            rows = _ledger(portfolio_id, options, rng)
+            (await rest.post("/orders", json=rows)).raise_for_status()
+
+            cash: float = 0.0
+            net: Dict[str, float] = {}
+            for row in rows:
+                if row["ticker"] == CASH:
+                    cash += row["quantity"]
+                else:
+                    net[row["ticker"]] = net.get(row["ticker"], 0) + row["quantity"]
+                    cash -= row["quantity"] * row["price"]
+            for ticker, quantity in {**net, CASH: cash}.items():
+                (await rest.post("/rpc/increment_quantity", json={
+                    "p_portfolio_id": portfolio_id, "p_ticker": ticker, "p_quantity": quantity,
+                    "p_name": ticker, "p_sector": "Cash" if ticker == CASH else "Synthetic",
+                })).raise_for_status()
+
+            users.append(User(user_id, {"Authorization": f"Bearer {_token(user_id, secret)}"}, portfolio_id))
+    finally:
+        await rest.aclose()
+    return users
+
+
+# ---------- Traffic ----------
+def _parse_mix(mix: str) -> Dict[str, float]:
+    out = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        out[name.strip()] = float(weight or 1)
+    return out
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.recording = False
+
+    def add(self, label: str, ms: float, status: str) -> None:
+        if not self.recording:
+            return
+        self.samples.setdefault(label, []).append(ms)
+        counts = self.statuses.setdefault(label, {})
+        counts[status] = counts.get(status, 0) + 1
+
+
+async def _call(client: httpx.AsyncClient, recorder: Recorder, label: str, method: str, url: str, **kwargs) -> None:
+    start = time.perf_counter()
+    try:
+        res = await client.request(method, url, **kwargs)
+        status = str(res.status_code)
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    recorder.add(label, (time.perf_counter() - start) * 1000, status)
+
+
+async def dashboard_user(
+    client: httpx.AsyncClient,
+    user: User,
+    options: Options,
+    recorder: Recorder,
+    stop: asyncio.Event,
+    rng: random.Random
+) -> None:
+    mix = _parse_mix(options.mix)
+    actions, weights = list(mix), list(mix.values())
+    pid, headers = user.portfolio_id, user.headers
+
+    while not stop.is_set():
+        action = rng.choices(actions, weights)[0]
+        if action == "list":
+            await _call(client, recorder, "list", "GET", "/portfolios", params={"with_values": "true"}, headers=headers)
+        elif action == "detail":
+            await _call(client, recorder, "detail", "GET", f"/portfolios/{pid}", headers=headers)
+        elif action == "quotes":
+            tickers = ",".join(rng.sample(options.tickers, min(3, len(options.tickers))))
+            await _call(client, recorder, "quotes", "GET", "/market/quotes",
+                        params={"tickers": tickers, "period": "1d", "interval": "1m"}, headers=headers)
+        elif action == "performance":
+            period = rng.choice(PERIODS)
+            await _call(client, recorder, f"performance[{period}]", "GET", f"/performance/{pid}",
+                        params={"period": period}, headers=headers)
+        elif action == "order":
+            order = {"ticker": rng.choice(options.tickers), "quantity": 1, "price": round(rng.uniform(20, 500), 2)}
+            await _call(client, recorder, "order", "POST", f"/portfolios/{pid}/orders", json=order, headers=headers)
+
+        if options.think_ms > 0:
+            try:
+                await asyncio.wait_for(stop.wait(), rng.expovariate(1000 / options.think_ms))
+            except asyncio.TimeoutError:
+                pass
+
+
+def _summary(recorder: Recorder, seconds: float) -> Dict[str, Dict[str, Any]]:
+    out = {}
+    for label in sorted(recorder.samples):
+        ms = np.asarray(recorder.samples[label])
+        statuses = recorder.statuses[label]
+        ok = sum(n for s, n in statuses.items() if s.startswith("2"))
+        out[label] = {
+            "count": int(len(ms)),
+            "rps": len(ms) / seconds,
+            "errors": int(len(ms) - ok),
+            "statuses": statuses,
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p90_ms": float(np.percentile(ms, 90)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max()),
+        }
+    return out
+
+
+async def run_stage(api: str, users: List[User], options: Options, stage: int) -> Dict[str, Any]:
+    recorder = Recorder()
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=len(users) + 10, max_keepalive_connections=len(users) + 10)
+    async with httpx.AsyncClient(base_url=api, timeout=60, limits=limits) as client:
+        tasks = [
+            asyncio.create_task(dashboard_user(client, user, options, recorder, stop, random.Random(options.seed + stage * 1000 + i)))
+            for i, user in enumerate(users)
+        ]
+        await asyncio.sleep(options.warmup)
+        recorder.recording = True
+        start = time.perf_counter()
+        await asyncio.sleep(options.duration)
+        recorder.recording = False
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    endpoints = _summary(recorder, elapsed)
+    everything = np.concatenate([np.asarray(v) for v in recorder.samples.values()]) if recorder.samples else np.zeros(1)
+    return {
+        "users": len(users),
+        "seconds": elapsed,
+        "rps": sum(e["count"] for e in endpoints.values()) / elapsed,
+        "errors": sum(e["errors"] for e in endpoints.values()),
+        "p99_ms": float(np.percentile(everything, 99)),
+        "endpoints": endpoints,
+    }
+
+
+async def run(options: Options) -> Dict[str, Any]:
+    """
+    Start the servers, seed, run every stage; returns the full report
+    """
+    secret = uuid.uuid4().hex
+    log_dir = options.log_dir or Path(tempfile.mkdtemp(prefix="oscillo-loadtest-"))
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    servers = await asyncio.to_thread(start_servers, options, secret, log_dir)
+    try:
+        api = f"{servers['app'].url}/api/1.0"
+        users = await seed(servers["supabase"].url, max(options.users), options, secret)
+
+        stages = []
+        for i, n in enumerate(options.users):
+            stage = await run_stage(api, users[:n], options, i)
+            stage["within_budget"] = stage["p99_ms"] <= options.p99_budget_ms
+            stages.append(stage)
+            print(format_stage(stage), flush=True)
+
+        async with httpx.AsyncClient(timeout=10) as client:
+            metrics = (await client.get(f"{api}/metrics", headers={"X-Admin-Token": ADMIN_TOKEN})).text
+    finally:
+        for server in reversed(list(servers.values())):
+            await asyncio.to_thread(server.stop)
+
+    saturated = next((s["users"] for s in stages if not s["within_budget"]), None)
+    return {
+        "options": {k: str(v) if isinstance(v, Path) else v for k, v in vars(options).items()},
+        "stages": stages,
+        "saturated_at_users": saturated,
+        "server_metrics": metrics,
+        "log_dir": str(log_dir),
+    }
+
+
+def format_stage(stage: Dict[str, Any]) -> str:
+    lines = [
+        f"\n== {stage['users']} users: {stage['rps']:.1f} req/s, p99 {stage['p99_ms']:.0f} ms, "
+        f"{stage['errors']} errors{'' if stage['within_budget'] else '  [over p99 budget]'}",
+        f"{'endpoint':<20} {'count':>7} {'req/s':>8} {'err':>5} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}",
+    ]
+    for label, e in stage["endpoints"].items():
+        lines.append(
+            f"{label:<20} {e['count']:>7} {e['rps']:>8.1f} {e['errors']:>5} "
+            f"{e['p50_ms']:>8.0f} {e['p90_ms']:>8.0f} {e['p99_ms']:>8.0f} {e['max_ms']:>8.0f}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> Tuple[Options, Optional[Path]]:
+    d = Options()
+    p = argparse.ArgumentParser(description="Load-test the backend against local stand-ins")
+    p.add_argument("--users", default=",".join(map(str, d.users)), help="comma-separated concurrent users per stage")
+    p.add_argument("--duration", type=float, default=d.duration, help="measured seconds per stage")
+    p.add_argument("--warmup", type=float, default=d.warmup, help="unmeasured seconds before each stage")
+    p.add_argument("--think-ms", type=float, default=d.think_ms, help="mean think time between a user's calls")
+    p.add_argument("--mix", default=d.mix, help=f"action weights (default {DEFAULT_MIX})")
+    p.add_argument("--tickers", default=",".join(d.tickers))
+    p.add_argument("--history-days", type=int, default=d.history_days)
+    p.add_argument("--orders-per-portfolio", type=int, default=d.orders_per_portfolio)
+    p.add_argument("--yahoo-latency-ms", type=float, default=d.yahoo_latency_ms)
+    p.add_argument("--yahoo-jitter-ms", type=float, default=d.yahoo_jitter_ms)
+    p.add_argument("--yahoo-error-rate", type=float, default=d.yahoo_error_rate)
+    p.add_argument("--remote-auth", action="store_true", help="verify tokens via /auth/v1/user instead of locally")
+    p.add_argument("--workers", type=int, default=d.workers, help="uvicorn workers for the app")
+    p.add_argument("--shared-cache", action="store_true", help="share a Redis stand-in cache tier between workers")
+    p.add_argument("--p99-budget-ms", type=float, default=d.p99_budget_ms)
+    p.add_argument("--seed", type=int, default=d.seed)
+    p.add_argument("--log-dir", type=Path, help="server logs (default: a temp dir)")
+    p.add_argument("--json", type=Path, help="write the full report here")
+    args = p.parse_args(argv)
+
+    options = Options(
+        users=[int(u) for u in args.users.split(",") if u.strip()],
+        duration=args.duration,
+        warmup=args.warmup,
+        think_ms=args.think_ms,
+        mix=args.mix,
+        tickers=[t.strip().upper() for t in args.tickers.split(",") if t.strip()],
+        history_days=args.history_days,
+        orders_per_portfolio=args.orders_per_portfolio,
+        yahoo_latency_ms=args.yahoo_latency_ms,
+        yahoo_jitter_ms=args.yahoo_jitter_ms,
+        yahoo_error_rate=args.yahoo_error_rate,
+        remote_auth=args.remote_auth,
+        workers=args.workers,
+        shared_cache=args.shared_cache,
+        p99_budget_ms=args.p99_budget_ms,
+        seed=args.seed,
+        log_dir=args.log_dir,
+    )
+    return options, args.json
+
+
+if __name__ == "__main__":
+    options, json_path = parse_args()
+    report = asyncio.run(run(options))
+
+    saturated = report["saturated_at_users"]
+    print(
+        f"\np99 over {options.p99_budget_ms:.0f} ms from {saturated} users" if saturated
+        else f"\nall stages within the {options.p99_budget_ms:.0f} ms p99 budget"
+    )
+    print(f"server logs: {report['log_dir']}")
+    if json_path:
+        json_path.write_text(json.dumps(report, indent=2))
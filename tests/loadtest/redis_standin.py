@@ -0,0 +1,120 @@
+# tests/loadtest/redis_standin.py
+"""
+Redis stand-in: the RESP2 subset the shared cache tier uses (utils.cache),
+in memory, with key expiry.
+
+    PING, AUTH, SELECT, GET, MGET, SET (EX / PX), DEL, FLUSHDB, DBSIZE
+
+    python tests/loadtest/redis_standin.py --port 6380
+"""
+import time
+import asyncio
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class Store:
+    def __init__(self):
+        self.data: Dict[bytes, Tuple[Optional[float], bytes]] = {}
+        self.commands = 0
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, args: List[bytes]) -> Any:
+        self.commands += 1
+        name = args[0].upper()
+        if name == b"PING":
+            return "PONG"
+        if name in (b"AUTH", b"SELECT"):
+            return "OK"
+        if name == b"GET":
+            return self.get(args[1])
+        if name == b"MGET":
+            return [self.get(k) for k in args[1:]]
+        if name == b"SET":
+            expires = None
+            options = [a.upper() for a in args[3:]]
+            for unit, scale in ((b"EX", 1.0), (b"PX", 0.001)):
+                if unit in options:
+                    expires = time.monotonic() + float(args[3 + options.index(unit) + 1]) * scale
+            self.data[args[1]] = (expires, args[2])
+            return "OK"
+        if name == b"DEL":
+            return sum(self.data.pop(k, None) is not None for k in args[1:])
+        if name == b"FLUSHDB":
+            self.data.clear()
+            return "OK"
+        if name == b"DBSIZE":
+            return len(self.data)
+        return Exception(f"ERR unknown command '{args[0].decode()}'")
+
+
+def _encode(reply: Any) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return b"-%s\r\n" % str(reply).encode()
+    if isinstance(reply, str):
+        return b"+%s\r\n" % reply.encode()
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(_encode(r) for r in reply)
+
+
+async def _command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.split()  # inline command (redis-cli / telnet)
+    args = []
+    for _ in range(int(line[1:])):
+        size = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+async def start(host: str = "127.0.0.1", port: int = 0, store: Optional[Store] = None) -> Tuple[asyncio.base_events.Server, Store]:
+    """
+    Serve on (host, port) in the running loop; port 0 picks a free one
+    """
+    store = store or Store()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while (args := await _command(reader)) is not None:
+                if args:
+                    writer.write(_encode(store.execute(args)))
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    return server, store
+
+
+async def main(host: str, port: int) -> None:
+    server, _ = await start(host, port)
+    print(f"redis stand-in on {host}:{server.sockets[0].getsockname()[1]}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Redis (RESP2) stand-in")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=6380)
+    args = p.parse_args()
+    asyncio.run(main(args.host, args.port))
@@ -0,0 +1,299 @@
+# tests/loadtest/supabase_standin.py
+"""
+Supabase stand-in: the PostgREST subset and auth endpoints the backend uses,
+on a local SQLite database (the SqliteRepository schema and ledger logic).
+
+    /rest/v1/{table}          GET (select, eq/neq/gt/gte/lt/lte/in/is, or/and,
+                              order, limit), POST (insert), DELETE
+    /rest/v1/rpc/{fn}         place_order, place_orders, fill_pending_order,
+                              ledger_positions, increment_quantity,
+                              reconcile_positions
+                              (ledger errors -> P0001)
+    /auth/v1/user             the user of a valid HS256 token
+    /auth/v1/.well-known/jwks.json
+
+    STANDIN_JWT_SECRET=... STANDIN_DB=:memory: \
+        uvicorn supabase_standin:app --app-dir tests/loadtest --port 54321
+"""
+import os
+import re
+import sys
+import json
+import uuid
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import jwt
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+from app.db.base import LedgerRejected
+from app.db.sqlite import SqliteRepository
+
+
+JWT_SECRET = os.getenv("STANDIN_JWT_SECRET", "loadtest-secret")
+DB_PATH = os.getenv("STANDIN_DB", ":memory:")
+
+TABLES = {"portfolios", "orders", "positions", "position_snapshots"}
+JSON_COLUMNS = {"position_snapshots": {"holdings"}}
+
+# column defaults the Supabase schema fills in (gen_random_uuid(), now())
+_now = lambda: datetime.now(timezone.utc).isoformat(timespec="microseconds")
+DEFAULTS = {
+    "portfolios": {"created_at": _now},
+    "orders": {"order_id": lambda: str(uuid.uuid4()), "timestamp": _now},
+    "position_snapshots": {"created_at": _now},
+}
+
+OPERATORS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+COLUMN = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+repo = SqliteRepository(DB_PATH)
+app = FastAPI(title="Supabase stand-in")
+
+
+class FilterError(ValueError):
+    pass
+
+
+# ---------- PostgREST filter grammar ----------
+def _column(name: str) -> str:
+    if not COLUMN.match(name):
+        raise FilterError(f"invalid column {name!r}")
+    return name
+
+
+def _columns(select: str) -> str:
+    return "*" if select == "*" else ", ".join(_column(c.strip()) for c in select.split(","))
+
+
+def _split(body: str) -> List[str]:
+    """
+    Split a logic-tree body on top-level commas (respects () and "")
+    """
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(body):
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append(body[start:i])
+            start = i + 1
+    parts.append(body[start:])
+    return [p for p in parts if p]
+
+
+def _value(raw: str) -> str:
+    return raw[1:-1] if len(raw) >= 2 and raw[0] == raw[-1] == '"' else raw
+
+
+def _condition(column: str, expr: str) -> Tuple[str, List[Any]]:
+    """
+    `op.value` on a column -> (SQL, params)
+    """
+    op, _, raw = expr.partition(".")
+    column = _column(column)
+    if op in OPERATORS:
+        return f"{column} {OPERATORS[op]} ?", [_value(raw)]
+    if op == "in":
+        values = [_value(v) for v in _split(raw.strip("()"))]
+        if not values:
+            return "0", []
+        return f"{column} IN ({','.join('?' * len(values))})", values
+    if op == "is" and raw in ("null", "true", "false"):
+        return f"{column} IS {raw.upper()}", []
+    raise FilterError(f"unsupported operator {op!r}")
+
+
+def _tree(kind: str, body: str) -> Tuple[str, List[Any]]:
+    """
+    or(...) / and(...) body -> (SQL, params)
+    """
+    clauses, params = [], []
+    for part in _split(body):
+        m = re.match(r"^(and|or)\((.*)\)$", part)
+        if m:
+            sql, p = _tree(m.group(1), m.group(2))
+        else:
+            column, _, expr = part.partition(".")
+            sql, p = _condition(column, expr)
+        clauses.append(f"({sql})")
+        params.extend(p)
+    return f" {kind.upper()} ".join(clauses) or "1", params
+
+
+def _where(query: List[Tuple[str, str]]) -> Tuple[str, List[Any]]:
+    clauses, params = [], []
+    for key, value in query:
+        if key in ("select", "order", "limit", "offset"):
+            continue
+        if key in ("or", "and"):
+            sql, p = _tree(key, value.strip()[1:-1])
+        else:
+            sql, p = _condition(key, value)
+        clauses.append(f"({sql})")
+        params.extend(p)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _select_sql(table: str, query: List[Tuple[str, str]]) -> Tuple[str, List[Any]]:
+    args = dict(query)
+    where, params = _where(query)
+    sql = f"SELECT {_columns(args.get('select', '*'))} FROM {table}{where}"
+
+    if "order" in args:
+        terms = []
+        for term in args["order"].split(","):
+            column, _, direction = term.partition(".")
+            terms.append(f"{_column(column)} {'DESC' if direction.startswith('desc') else 'ASC'}")
+        sql += " ORDER BY " + ", ".join(terms)
+    if "limit" in args:
+        sql += f" LIMIT {int(args['limit'])}"
+        if "offset" in args:
+            sql += f" OFFSET {int(args['offset'])}"
+    return sql, params
+
+
+def _decode(table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    for column in JSON_COLUMNS.get(table, ()):
+        if isinstance(row.get(column), str):
+            row[column] = json.loads(row[column])
+    return row
+
+
+def _error(status: int, message: str, code: Optional[str] = None) -> JSONResponse:
+    return JSONResponse({"message": message, "code": code, "details": None, "hint": None}, status_code=status)
+
+
+# ---------- Tables ----------
+@app.get("/rest/v1/{table}")
+async def select(table: str, request: Request):
+    if table not in TABLES:
+        return _error(404, f"relation {table} does not exist", "42P01")
+    try:
+        sql, params = _select_sql(table, list(request.query_params.multi_items()))
+    except FilterError as e:
+        return _error(400, str(e), "PGRST100")
+
+    rows = await repo._run(repo._all, sql, tuple(params))
+    return [_decode(table, row) for row in rows]
+
+
+@app.post("/rest/v1/{table}")
+async def insert(table: str, request: Request):
+    if table not in TABLES:
+        return _error(404, f"relation {table} does not exist", "42P01")
+    body = await request.json()
+    rows = body if isinstance(body, list) else [body]
+    try:
+        columns = _columns(request.query_params.get("select", "*"))
+    except FilterError as e:
+        return _error(400, str(e), "PGRST100")
+
+    def write(conn):
+        out = []
+        for row in rows:
+            row = {
+                _column(k): json.dumps(v) if k in JSON_COLUMNS.get(table, ()) else v
+                for k, v in row.items()
+            }
+            for column, default in DEFAULTS.get(table, {}).items():
+                if row.get(column) is None:
+                    row[column] = default()
+            cursor = conn.execute(
+                f"INSERT INTO {table} ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                tuple(row.values())
+            )
+            stored = conn.execute(f"SELECT {columns} FROM {table} WHERE rowid = ?", (cursor.lastrowid,)).fetchone()
+            out.append(_decode(table, dict(stored)))
+        return out
+
+    try:
+        stored = await repo._write(write)
+    except Exception as e:
+        return _error(409, str(e), "23505")
+    return JSONResponse(stored, status_code=201)
+
+
+@app.delete("/rest/v1/{table}")
+async def delete(table: str, request: Request):
+    if table not in TABLES:
+        return _error(404, f"relation {table} does not exist", "42P01")
+    try:
+        where, params = _where(list(request.query_params.multi_items()))
+    except FilterError as e:
+        return _error(400, str(e), "PGRST100")
+
+    def remove(conn):
+        rows = [_decode(table, dict(r)) for r in conn.execute(f"SELECT * FROM {table}{where}", params)]
+        if table == "portfolios" and rows:
+            # ON DELETE CASCADE in the real schema
+            ids = [r["id"] for r in rows]
+            marks = ",".join("?" * len(ids))
+            for child in ("orders", "positions", "position_snapshots"):
+                conn.execute(f"DELETE FROM {child} WHERE portfolio_id IN ({marks})", ids)
+        conn.execute(f"DELETE FROM {table}{where}", params)
+        return rows
+
+    return await repo._write(remove)
+
+
+# ---------- RPC ----------
+@app.post("/rest/v1/rpc/{fn}")
+async def rpc(fn: str, request: Request):
+    params = await request.json()
+    try:
+        if fn == "place_order":
+            stored = await repo.place_order({
+                "portfolio_id": params["p_portfolio_id"],
+                "ticker": params["p_ticker"],
+                "quantity": params["p_quantity"],
+                "price": params["p_price"],
+                "name": params.get("p_name"),
+                "sector": params.get("p_sector"),
+            })
+            return [stored]
+        if fn == "place_orders":
+            return await repo.place_orders(params["p_portfolio_id"], params["p_orders"])
+        if fn == "fill_pending_order":
+            return await repo.fill_pending_order(
+                params["p_portfolio_id"], params["p_order_id"], params["p_price"], params["p_statuses"]
+            )
+        if fn == "ledger_positions":
+            return await repo.get_ledger_positions(params["p_portfolio_ids"])
+        if fn == "increment_quantity":
+            await repo.increment_quantity(
+                params["p_portfolio_id"], params["p_ticker"], params["p_quantity"],
+                params.get("p_name"), params.get("p_sector")
+            )
+            return Response(status_code=204)
+        if fn == "reconcile_positions":
+            return await repo.reconcile_positions(
+                params["p_portfolio_id"], params["p_ledger_version"], params["p_quantities"]
+            )
+    except LedgerRejected as e:
+        return _error(400, str(e), "P0001")
+    return _error(404, f"function {fn} does not exist", "PGRST202")
+
+
+# ---------- Auth ----------
+@app.get("/auth/v1/user")
+async def user(request: Request):
+    token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], audience="authenticated")
+    except jwt.PyJWTError as e:
+        return JSONResponse({"msg": f"invalid JWT: {e}"}, status_code=401)
+    return {"id": claims["sub"], "aud": "authenticated", "role": "authenticated"}
+
+
+@app.get("/auth/v1/.well-known/jwks.json")
+async def jwks():
+    # symmetric project: nothing to publish, tokens verify with the shared secret
+    return {"keys": []}
@@ -0,0 +1,157 @@
+# tests/loadtest/yahoo_standin.py
+"""
+Yahoo chart API stand-in: /v8/finance/chart/{symbol} with deterministic
+synthetic bars (geometric Brownian motion seeded by the symbol) on
+regular NYSE sessions, with configurable latency and error rate.
+
+    YAHOO_LATENCY_MS=80 YAHOO_JITTER_MS=40 YAHOO_ERROR_RATE=0.01 \
+        uvicorn yahoo_standin:app --app-dir tests/loadtest --port 54322
+
+Symbols starting with "ZZ" do not exist (404, like a delisted ticker).
+"""
+import os
+import sys
+import time
+import zlib
+import random
+import asyncio
+from pathlib import Path
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+from app.utils.market_calendar import sessions
+
+
+LATENCY_MS = float(os.getenv("YAHOO_LATENCY_MS", "50"))
+JITTER_MS = float(os.getenv("YAHOO_JITTER_MS", "25"))
+ERROR_RATE = float(os.getenv("YAHOO_ERROR_RATE", "0"))
+# synthetic history starts here (days since the Unix epoch, 2000-01-01)
+EPOCH_DAY = 10957
+SECTORS = ("Technology", "Healthcare", "Financial Services", "Energy", "Industrials")
+
+STEP = {
+    "1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800, "60m": 3600, "90m": 5400, "1h": 3600,
+    "1d": 86400, "5d": 5 * 86400, "1wk": 7 * 86400, "1mo": 30 * 86400, "3mo": 91 * 86400,
+}
+RANGE = {
+    "1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183, "1y": 366, "2y": 731,
+    "5y": 1827, "10y": 3653, "ytd": 366, "max": 3653,
+}
+
+app = FastAPI(title="Yahoo chart stand-in")
+
+
+def _stamps(start: int, end: int, step: int) -> np.ndarray:
+    """
+    Bar open times (UTC seconds) in [start, end): one per session for daily
+    steps (stamped at midnight UTC), every `step` seconds inside sessions otherwise
+    """
+    opens, closes = sessions()
+    opens, closes = opens // 1_000_000_000, closes // 1_000_000_000
+    lo = np.searchsorted(closes, start, side="right")
+    hi = np.searchsorted(opens, end, side="left")
+    if step >= 86400:
+        days = opens[lo:hi] - opens[lo:hi] % 86400
+        return days[(days >= start - 86400) & (days < end)][:: max(1, step // 86400)]
+
+    bars = [np.arange(o, c, step) for o, c in zip(opens[lo:hi], closes[lo:hi])]
+    stamps = np.concatenate(bars) if bars else np.empty(0, dtype=np.int64)
+    return stamps[(stamps >= start) & (stamps < end)]
+
+
+@lru_cache(maxsize=4096)
+def _path(symbol: str) -> Tuple[float, np.ndarray]:
+    """
+    (s0, log-price drift per day since EPOCH_DAY): a seeded daily GBM walk
+    """
+    seed = zlib.crc32(symbol.encode())
+    rng = np.random.default_rng(seed)
+    days = int(time.time() // 86400) - EPOCH_DAY + 2
+    steps = (0.08 - 0.5 * 0.3 ** 2) / 252 + 0.3 / np.sqrt(252) * rng.standard_normal(days)
+    return 20.0 + seed % 480, np.cumsum(steps)
+
+
+def _prices(symbol: str, stamps: np.ndarray) -> Dict[str, list]:
+    """
+    OHLCV at the given stamps: the symbol's daily path plus a small intraday
+    wiggle, so overlapping requests agree on every bar
+    """
+    s0, drift = _path(symbol)
+    seed = zlib.crc32(symbol.encode())
+    days = np.clip(stamps // 86400 - EPOCH_DAY, 0, len(drift) - 1)
+    wiggle = 0.002 * np.sin((stamps % 86400) / 3600 + seed % 7)
+    close = s0 * np.exp(drift[days] + wiggle)
+    spread = close * 0.002
+    return {
+        "open": np.round(close - spread / 2, 4).tolist(),
+        "high": np.round(close + spread, 4).tolist(),
+        "low": np.round(close - spread, 4).tolist(),
+        "close": np.round(close, 4).tolist(),
+        "volume": ((seed % 1000 + 1) * 1000 + (stamps % 997)).astype(int).tolist(),
+    }
+
+
+def _window(range_: str | None, period1: int | None, period2: int | None, now: int) -> Tuple[int, int]:
+    if period1 is not None:
+        return period1, period2 if period2 is not None else now
+
+    # like Yahoo, a range counts back from the latest session (range=1d on a
+    # weekend is Friday), not from the wall clock
+    opens, _ = sessions()
+    opens = opens // 1_000_000_000
+    latest = int(opens[np.searchsorted(opens, now, side="right") - 1])
+    return min(now - RANGE.get(range_ or "1d", 1) * 86400, latest), now
+
+
+@app.get("/v8/finance/chart/{symbol}")
+async def chart(
+    symbol: str,
+    interval: str = "1d",
+    range: str | None = None,
+    period1: int | None = None,
+    period2: int | None = None,
+):
+    if LATENCY_MS or JITTER_MS:
+        await asyncio.sleep(max(0.0, random.gauss(LATENCY_MS, JITTER_MS)) / 1000)
+
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        status = random.choice((429, 500, 502))
+        return ORJSONResponse({"chart": {"result": None, "error": {"code": str(status), "description": "stand-in error"}}}, status_code=status)
+
+    symbol = symbol.upper()
+    if symbol.startswith("ZZ") or interval not in STEP:
+        return ORJSONResponse(
+            {"chart": {"result": None, "error": {"code": "Not Found", "description": "No data found, symbol may be delisted"}}},
+            status_code=404,
+        )
+
+    now = int(time.time())
+    start, end = _window(range, period1, period2, now)
+    stamps = _stamps(start, min(end, now), STEP[interval])
+    quote = _prices(symbol, stamps)
+
+    seed = zlib.crc32(symbol.encode())
+    return ORJSONResponse({"chart": {"result": [{
+        "meta": {
+            "symbol": symbol,
+            "currency": "USD",
+            "exchangeName": "NMS",
+            "instrumentType": "EQUITY",
+            "longName": f"{symbol} Synthetic Inc.",
+            "shortName": symbol,
+            "sector": SECTORS[seed % len(SECTORS)],
+            "dataGranularity": interval,
+            "regularMarketPrice": quote["close"][-1] if quote["close"] else None,
+        },
+        "timestamp": stamps.astype(int).tolist(),
+        "indicators": {
+            "quote": [quote],
+            "adjclose": [{"adjclose": quote["close"]}] if STEP[interval] >= 86400 else [],
+        },
+    }], "error": None}})
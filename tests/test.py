@@ -12,6 +12,7 @@ import matplotlib
 matplotlib.use("Agg")  # headless
 import matplotlib.pyplot as plt
 
+from app.db import get_repository
 from app.models import Portfolio
 from app.services.performance import get_portfolio_data
 
@@ -139,6 +140,7 @@ async def _run_one(period: str) -> Dict[str, Any]:
     backend_gran = period
     try:
         agg: Dict[str, Any] = await get_portfolio_data(
+            get_repository(),
             TEST_PORTFOLIO.user_id,
             TEST_PORTFOLIO.id,
             granularity=backend_gran,
@@ -147,6 +149,7 @@ async def _run_one(period: str) -> Dict[str, Any]:
         # Only map spelling for explicit granularity errors
         backend_gran = BACKEND_FALLBACK.get(period, period)
         agg = await get_portfolio_data(
+            get_repository(),
             TEST_PORTFOLIO.user_id,
             TEST_PORTFOLIO.id,
             granularity=backend_gran,
@@ -0,0 +1,72 @@
+# tests/test_auth.py
+"""
+Local JWT verification (app.utils.auth): HS256 tokens are checked against
+the project secret without calling the auth server, claims are cached per
+token, and expired, forged or foreign-audience tokens are refused.
+
+    pytest tests/test_auth.py
+"""
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND))
+
+os.environ.setdefault("ENV", "DEV")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:9")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+
+from app.utils import auth
+
+
+SECRET = "test-jwt-secret-of-at-least-32-bytes"
+USER_ID = "00000000-0000-4000-8000-000000000051"
+
+
+def token(secret=SECRET, expires_in=3600, **claims):
+    payload = {"sub": USER_ID, "aud": "authenticated", "exp": int(time.time()) + expires_in, **claims}
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+@pytest.fixture(autouse=True)
+def local_only(monkeypatch):
+    async def remote(token):
+        raise AssertionError("the auth server must not be asked")
+
+    monkeypatch.setattr(auth.config, "SUPABASE_JWT_SECRET", SECRET)
+    monkeypatch.setattr(auth.config, "AUTH_JWT_AUDIENCE", "authenticated")
+    monkeypatch.setattr(auth.config, "AUTH_REMOTE_CHECK", False)
+    monkeypatch.setattr(auth.config, "AUTH_LEEWAY", 0)
+    monkeypatch.setattr(auth, "_claims", type(auth._claims)())
+    monkeypatch.setattr(auth, "_verify_remote", remote)
+
+
+def test_valid_token_is_verified_locally_and_cached():
+    valid = token()
+    claims = asyncio.run(auth.verify_token(valid))
+
+    assert claims["sub"] == USER_ID
+    assert valid in auth._claims and auth._claims[valid][1] == claims["exp"]
+    assert asyncio.run(auth.verify_token(valid)) is claims
+
+
+@pytest.mark.parametrize("bad", [
+    token(expires_in=-60),
+    token(secret="another-secret-of-at-least-32-bytes"),
+    token(aud="someone-else"),
+    token()[:-2] + "xx",
+])
+def test_expired_forged_or_foreign_tokens_are_refused(bad):
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(auth.verify_token(bad))
+
+    assert e.value.status_code == 401
+    assert bad not in auth._claims
@@ -0,0 +1,184 @@
+# tests/test_backtest.py
+"""
+Backtests (app.utils.backtest): a rebalancing run books the same portfolio
+value as compute_portfolio_timeseries replaying its trades, the three signal
+kinds agree, ten years of daily bars over hundreds of tickers simulate in
+well under a second, sweeps in parallel match serial ones, and the service
+runs through a background job.
+
+    pytest tests/test_backtest.py
+"""
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND))
+
+os.environ.setdefault("ENV", "DEV")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:9")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+
+from app.services import jobs, performance
+from app.services import backtest as backtest_service
+from app.utils import backtest
+from app.utils.timeseries import compute_portfolio_timeseries
+
+
+def walk(days, tickers, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2014-01-01", periods=days, tz="UTC")
+    steps = rng.normal(0.0003, 0.015, size=(days, tickers))
+    close = 50 * np.exp(np.cumsum(steps, axis=0))
+    return pd.DataFrame(close, index=index, columns=[f"T{i:03d}" for i in range(tickers)])
+
+
+def test_rebalance_matches_the_ledger_replay():
+    prices = walk(300, 4)
+    weights = {"T000": 0.4, "T001": 0.3, "T002": 0.2}
+    result = backtest.run_strategy(prices, "rebalance", {"weights": weights, "every": "M"}, initial_cash=10_000)
+
+    trades = result["trades"].stack()
+    trades = trades[trades != 0]
+    orders = pd.DataFrame({
+        "ticker": trades.index.get_level_values(1),
+        "quantity": trades.to_numpy(),
+        "price": [prices.at[ts, t] for ts, t in trades.index],
+        "timestamp": trades.index.get_level_values(0),
+    })
+    replayed = compute_portfolio_timeseries(prices, orders, initial_cash=10_000)
+
+    np.testing.assert_allclose(result["portfolio_pv"], replayed["portfolio_pv"], rtol=1e-9)
+    np.testing.assert_allclose(result["cash"], replayed["cash"], rtol=1e-9, atol=1e-6)
+    # ~14 monthly rebalances, each a day after the month's first bar
+    assert 13 <= len(result["trades"]) <= 15
+    first = result["trades"].index[0]
+    assert first == prices.index[1]
+    assert result["weights"].loc[first, "T000"] == pytest.approx(0.4 / 0.9)
+    assert result["holdings"]["T003"].eq(0).all()
+
+
+def test_signal_kinds_agree_and_commissions_cost():
+    prices = walk(120, 3, seed=1)
+    weights = backtest.rebalance(prices, every="Q")
+    by_weight = backtest.backtest(prices, weights, fractional=False)
+
+    shares = by_weight["holdings"].where(by_weight["trades"].reindex(prices.index).notna())
+    by_shares = backtest.backtest(prices, shares=shares, lag=0)
+    by_orders = backtest.backtest(prices, orders=by_weight["trades"], lag=0)
+
+    for other in (by_shares, by_orders):
+        np.testing.assert_allclose(other["portfolio_pv"], by_weight["portfolio_pv"])
+    assert (by_weight["holdings"] % 1 == 0).all().all()
+
+    costly = backtest.backtest(prices, weights, commission_bps=10)
+    assert costly["stats"]["final_value"] < by_weight["stats"]["final_value"]
+    assert costly["cash"].min() >= -1e-6
+
+    with pytest.raises(ValueError):
+        backtest.backtest(prices, weights, orders=by_weight["trades"])
+    with pytest.raises(ValueError):
+        backtest.run_strategy(prices, "ma_crossover", {"fast": 50, "slow": 20})
+
+
+def test_risk_stats():
+    index = pd.bdate_range("2020-01-01", periods=253, tz="UTC")
+    pv = pd.Series(np.r_[100.0, np.full(252, 100.0)], index=index)
+    pv.iloc[100:] = 80.0
+    pv.iloc[200:] = 110.0
+    stats = backtest.risk_stats(pv)
+    assert stats["total_return"] == pytest.approx(0.1)
+    assert stats["cagr"] == pytest.approx(0.1)
+    assert stats["max_drawdown"] == pytest.approx(-0.2)
+    assert stats["calmar"] == pytest.approx(0.5)
+    assert backtest.periods_per_year(pd.date_range("2020-01-02 14:30", periods=10, freq="1min", tz="UTC")) == 252 * 390
+
+
+def test_years_of_daily_bars_across_hundreds_of_tickers():
+    prices = walk(2520, 300, seed=2)
+    backtest.run_strategy(prices.iloc[:100], "ma_crossover")  # warm-up
+
+    start = time.perf_counter()
+    crossover = backtest.run_strategy(prices, "ma_crossover", {"fast": 20, "slow": 100})
+    monthly = backtest.run_strategy(prices, "rebalance")
+    elapsed = time.perf_counter() - start
+
+    assert len(crossover["trades"]) > 1000 and crossover["stats"]["trades"] > 10_000
+    assert monthly["portfolio_pv"].notna().all()
+    assert elapsed < 1.0, f"{elapsed:.2f}s for two 10y x 300 ticker backtests"
+
+
+def test_parallel_sweep_matches_serial():
+    prices = walk(500, 20, seed=3)
+    grid = {"fast": [5, 10, 20], "slow": [50, 100]}
+
+    serial = backtest.sweep(prices, "ma_crossover", grid, workers=1)
+    parallel = backtest.sweep(prices, "ma_crossover", grid, workers=2)
+    pool = backtest._pool["executor"]
+    # concurrent sweeps (one per job worker) share the pool; a different
+    # size or a smaller grid must not restart it under the other sweep
+    with ThreadPoolExecutor(2) as threads:
+        again = threads.submit(backtest.sweep, prices, "ma_crossover", grid, workers=3)
+        small = threads.submit(backtest.sweep, prices, "ma_crossover", {"fast": [5, 10], "slow": [50]}, workers=2)
+        again, small = again.result(), small.result()
+    assert backtest._pool["executor"] is pool
+    backtest.close_pool()
+
+    assert [r["params"] for r in serial] == backtest.grid(grid)
+    assert [r["params"] for r in parallel] == [r["params"] for r in serial]
+    for a, b, c in zip(serial, parallel, again):
+        assert a["stats"] == pytest.approx(b["stats"])
+        assert a["stats"] == pytest.approx(c["stats"])
+    assert [r["params"] for r in small] == [{"fast": 5, "slow": 50}, {"fast": 10, "slow": 50}]
+
+    bad = backtest.sweep(prices, "ma_crossover", {"fast": [50], "slow": [20]}, workers=1)
+    assert "error" in bad[0]
+
+
+def test_backtest_job(monkeypatch):
+    prices = walk(400, 3, seed=4)
+    calls = []
+
+    async def fetch_bars(tickers, start, end, interval="1d", timeout=10):
+        calls.append(sorted(tickers))
+        return {t: prices[[t]].rename(columns={t: "Close"}) for t in tickers}
+
+    monkeypatch.setattr(performance, "fetch_bars", fetch_bars)
+    monkeypatch.setattr(jobs, "_jobs", type(jobs._jobs)())
+    monkeypatch.setattr(jobs, "_active", {})
+    monkeypatch.setattr(jobs, "_finished", {})
+    monkeypatch.setattr(jobs, "_results", jobs.TieredCache("jobs", ttl=60, shared=None))
+
+    request = {
+        "tickers": ["t000", "T001", "T002"], "start": "2014-01-01", "end": "2015-08-01",
+        "strategy": "ma_crossover", "params": {"fast": 10, "slow": 40},
+    }
+
+    async def scenario():
+        job = await backtest_service.submit_backtest("user", request)
+        done = await jobs.wait(job["id"], timeout=30)
+        again = await backtest_service.submit_backtest("user", request)
+        swept = await backtest_service.submit_backtest("user", dict(request, sweep={"fast": [5, 10]}, interval="1d"))
+        swept = await jobs.wait(swept["id"], timeout=60)
+        with pytest.raises(ValueError):
+            await backtest_service.submit_backtest("user", dict(request, strategy="nope"))
+        await jobs.close_jobs()
+        return job, done, again, swept
+
+    job, done, again, swept = asyncio.run(scenario())
+    backtest.close_pool()
+
+    assert done["status"] == "done" and again["id"] == job["id"]
+    result = done["result"]
+    assert result["performance"]["TIMESTAMP"] and "sharpe" in result["stats"]
+    assert len(result["performance"]["pv:TOTAL"]) == len(prices)
+    assert swept["status"] == "done" and [r["params"]["fast"] for r in swept["result"]["runs"]] in ([5, 10], [10, 5])
+    assert calls[0] == ["T000", "T001", "T002"]
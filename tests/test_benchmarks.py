@@ -0,0 +1,401 @@
+# tests/test_benchmarks.py
+"""
+Benchmarks for the performance pipeline on synthetic portfolios.
+
+Bars are geometric Brownian motion on real exchange sessions (1m and 1d),
+the ledger is a seeded random walk of deposits, buys and sells. Each stage
+is timed (median of BENCH_REPEAT runs after a warm-up) and run once more
+under tracemalloc for its peak allocation:
+
+    clean_orders_df, clean_prices_df, compute_portfolio_timeseries,
+    serialize_performance_legacy, get_portfolio_data (1D and ALL)
+
+get_portfolio_data runs end to end against an in-memory SQLite repository
+with fetch_bars serving the synthetic bars, so nothing talks to Supabase or
+Yahoo. Results are compared with a saved baseline (same sizes only); a
+stage whose best time or peak memory exceeds baseline * (1 + BENCH_TOLERANCE)
+is a regression (best-of-N, since the median moves with machine load).
+
+    pytest tests/test_benchmarks.py
+    python tests/test_benchmarks.py --save          # write the baseline
+    BENCH_TICKERS=100 BENCH_ORDERS=20000 python tests/test_benchmarks.py
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import platform
+import statistics
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND))
+
+os.environ.setdefault("ENV", "DEV")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:9")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+os.environ.setdefault("RECONCILE_INTERVAL_SECONDS", "0")
+
+from app.db.sqlite import SqliteRepository
+from app.models import Order
+from app.services import ledger
+from app.services import performance
+from app.utils.holdings import replay, split_at
+from app.utils.market_calendar import sessions
+from app.utils.performance import clean_orders_df, clean_prices_df
+from app.utils.serialize import serialize_performance_legacy
+from app.utils.timeseries import compute_portfolio_timeseries
+
+
+# ---------- CONFIG ----------
+SIZES = {
+    "tickers": int(os.getenv("BENCH_TICKERS", "20")),
+    "orders": int(os.getenv("BENCH_ORDERS", "2000")),
+    "bars_1m": int(os.getenv("BENCH_BARS_1M", str(390 * 5))),
+    "bars_1d": int(os.getenv("BENCH_BARS_1D", str(252 * 10))),
+}
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.5"))
+SEED = int(os.getenv("BENCH_SEED", "7"))
+BASELINE = Path(os.getenv("BENCH_BASELINE", Path(__file__).with_name("benchmarks_baseline.json")))
+
+USER_ID = "00000000-0000-4000-8000-000000000001"
+PORTFOLIO_ID = "00000000-0000-4000-8000-000000000002"
+
+CASH = Order.CASH_TICKER
+
+
+# ---------- SYNTHETIC DATA ----------
+def gbm(n: int, rng: np.random.Generator, dt: float, s0: float = 100.0, mu: float = 0.08, sigma: float = 0.3) -> np.ndarray:
+    """
+    n closes of a geometric Brownian motion (annualized mu / sigma, step dt in years)
+    """
+    steps = (mu - 0.5 * sigma ** 2) * dt + sigma * np.sqrt(dt) * rng.standard_normal(n)
+    return s0 * np.exp(np.cumsum(steps))
+
+
+def minute_index(n: int, now: pd.Timestamp) -> pd.DatetimeIndex:
+    """
+    Last n regular-session minute bars before now (UTC), including the
+    session in progress so the 1D window always has bars
+    """
+    opens, closes = sessions()
+    last = np.searchsorted(opens, now.value, side="right")
+    chunks: List[np.ndarray] = []
+    total, i = 0, last - 1
+    while total < n and i >= 0:
+        chunk = np.arange(opens[i], min(closes[i], now.value), 60_000_000_000, dtype=np.int64)
+        chunks.append(chunk)
+        total += len(chunk)
+        i -= 1
+    stamps = np.concatenate(chunks[::-1])[-n:]
+    return pd.DatetimeIndex(stamps, tz="UTC")
+
+
+def daily_index(n: int, now: pd.Timestamp) -> pd.DatetimeIndex:
+    """
+    Last n sessions before now, stamped at midnight UTC like Yahoo's daily bars
+    """
+    opens, _ = sessions()
+    last = np.searchsorted(opens, now.value, side="right")
+    return pd.DatetimeIndex(opens[max(0, last - n):last], tz="UTC").normalize()
+
+
+def make_bars(tickers: List[str], index: pd.DatetimeIndex, dt: float, rng: np.random.Generator) -> Dict[str, pd.DataFrame]:
+    return {
+        t: pd.DataFrame({"Close": gbm(len(index), rng, dt, s0=float(rng.uniform(10, 500)))}, index=index)
+        for t in tickers
+    }
+
+
+def make_orders(
+    tickers: List[str],
+    n: int,
+    daily: Dict[str, pd.DataFrame],
+    rng: np.random.Generator
+) -> List[Dict[str, Any]]:
+    """
+    A feasible ledger of n orders over the daily bars: an opening deposit,
+    then buys, sells of held shares and the odd top-up, priced at the close.
+    """
+    index = next(iter(daily.values())).index
+    # spread over the history during US hours, oldest first
+    offsets = np.sort(rng.choice(len(index), size=n, replace=True))
+    seconds = rng.integers(14 * 3600, 20 * 3600, size=n)
+
+    cash, held = 0.0, {t: 0 for t in tickers}
+    rows = []
+    for i, (bar, sec) in enumerate(zip(offsets, seconds)):
+        ts = index[bar] + pd.Timedelta(seconds=int(sec) + i % 60)
+        if i == 0 or rng.random() < 0.02:
+            ticker, quantity, price = CASH, float(rng.integers(10_000, 100_000)), 1.0
+            cash += quantity
+        else:
+            ticker = tickers[rng.integers(len(tickers))]
+            price = float(daily[ticker]["Close"].iloc[bar])
+            if held[ticker] > 0 and rng.random() < 0.4:
+                quantity = -int(rng.integers(1, held[ticker] + 1))
+            else:
+                quantity = int(min(rng.integers(1, 50), cash // price))
+                if quantity == 0:
+                    ticker, quantity, price = CASH, float(rng.integers(10_000, 100_000)), 1.0
+            if ticker != CASH:
+                held[ticker] += quantity
+            cash -= quantity * price if ticker != CASH else -quantity
+
+        rows.append({
+            "order_id": str(uuid.uuid4()),
+            "portfolio_id": PORTFOLIO_ID,
+            "ticker": ticker,
+            "name": ticker,
+            "sector": "Cash" if ticker == CASH else "Synthetic",
+            "quantity": quantity,
+            "price": price,
+            "timestamp": ts.isoformat(),
+        })
+    return rows
+
+
+# ---------- MEASUREMENT ----------
+def measure(fn: Callable[[], Any], items: int, repeat: int = REPEAT) -> Dict[str, float]:
+    """
+    Median / min wall time over `repeat` runs (after one warm-up), items per
+    second at the median, and the peak traced allocation of one extra run.
+    """
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(times)
+    return {
+        "median_s": median,
+        "min_s": min(times),
+        "items": items,
+        "items_per_s": items / median if median > 0 else float("inf"),
+        "peak_mib": peak / 2 ** 20,
+    }
+
+
+def run_suite(sizes: Dict[str, int] = SIZES, repeat: int = REPEAT, seed: int = SEED) -> Dict[str, Any]:
+    """
+    Time every stage on one synthetic portfolio; returns {"meta", "results"}
+    """
+    rng = np.random.default_rng(seed)
+    now = pd.Timestamp.now(tz="UTC")
+    tickers = [f"T{i:03d}" for i in range(sizes["tickers"])]
+
+    bars = {
+        "1m": make_bars(tickers, minute_index(sizes["bars_1m"], now), 1 / (252 * 390), rng),
+        "1d": make_bars(tickers, daily_index(sizes["bars_1d"], now), 1 / 252, rng),
+    }
+    rows = make_orders(tickers, sizes["orders"], bars["1d"], rng)
+
+    results: Dict[str, Dict[str, float]] = {}
+
+    # ---- Pure stages ----
+    results["clean_orders_df"] = measure(lambda: clean_orders_df(rows), len(rows), repeat)
+    orders = clean_orders_df(rows)
+
+    perf_by_interval = {}
+    for interval, frames in bars.items():
+        n_bars = sizes["tickers"] * sizes[f"bars_{interval}"]
+        results[f"clean_prices_df[{interval}]"] = measure(lambda: clean_prices_df(frames), n_bars, repeat)
+        prices = clean_prices_df(frames)
+
+        before, during = split_at(orders, prices.index[0])
+        opening, opening_cash = replay(before, cash_ticker=CASH)
+
+        def timeseries():
+            return compute_portfolio_timeseries(
+                prices,
+                during,
+                cash_ticker=CASH,
+                initial_holdings=opening,
+                initial_cash=opening_cash,
+            )
+
+        results[f"compute_portfolio_timeseries[{interval}]"] = measure(timeseries, n_bars, repeat)
+        perf_by_interval[interval] = timeseries()
+
+        perf = perf_by_interval[interval]
+        results[f"serialize_performance_legacy[{interval}]"] = measure(
+            lambda: serialize_performance_legacy(perf), n_bars, repeat
+        )
+
+    # ---- Full path: SQLite ledger + synthetic fetch_bars ----
+    results.update(_run_full_path(rows, bars, sizes, repeat))
+
+    return {
+        "meta": {
+            "sizes": dict(sizes),
+            "repeat": repeat,
+            "seed": seed,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def _run_full_path(
+    rows: List[Dict[str, Any]],
+    bars: Dict[str, Dict[str, pd.DataFrame]],
+    sizes: Dict[str, int],
+    repeat: int
+) -> Dict[str, Dict[str, float]]:
+    async def fetch_bars(tickers, start, end, interval="1d", timeout=10):
+        frames = bars[interval]
+        return {
+            t: frames[t].loc[(frames[t].index >= start) & (frames[t].index <= end)]
+            for t in tickers if t in frames
+        }
+
+    loop = asyncio.new_event_loop()
+    repo = SqliteRepository(":memory:")
+    original = performance.fetch_bars
+    performance.fetch_bars = fetch_bars
+    try:
+        loop.run_until_complete(repo.insert_portfolio({
+            "id": PORTFOLIO_ID,
+            "user_id": USER_ID,
+            "name": "benchmark",
+            "created_at": rows[0]["timestamp"],
+        }))
+        for row in rows:
+            loop.run_until_complete(repo.insert_order(row))
+
+        def full_path(granularity: str) -> Callable[[], Any]:
+            def run():
+                # cold ledger each time: the orders read is part of the path
+                ledger.invalidate(PORTFOLIO_ID)
+                return loop.run_until_complete(
+                    performance.get_portfolio_data(repo, USER_ID, PORTFOLIO_ID, granularity)
+                )
+            return run
+
+        return {
+            f"get_portfolio_data[{g}]": measure(
+                full_path(g), sizes["orders"] + sizes["tickers"] * sizes[f"bars_{interval}"], repeat
+            )
+            for g, interval in (("1D", "1m"), ("ALL", "1d"))
+        }
+    finally:
+        performance.fetch_bars = original
+        ledger.invalidate(PORTFOLIO_ID)
+        loop.run_until_complete(repo.close())
+        loop.close()
+
+
+# ---------- BASELINE ----------
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = TOLERANCE) -> List[str]:
+    """
+    Regressions of current vs baseline, as readable lines (empty = none)
+    """
+    out = []
+    for name, base in baseline["results"].items():
+        now = current["results"].get(name)
+        if now is None:
+            continue
+        for key, label in (("min_s", "best time"), ("peak_mib", "peak memory")):
+            if base[key] > 0 and now[key] > base[key] * (1 + tolerance):
+                out.append(f"{name}: {label} {now[key]:.4g} vs baseline {base[key]:.4g} (+{now[key] / base[key] - 1:.0%})")
+    return out
+
+
+def report(suite: Dict[str, Any]) -> str:
+    lines = [f"{'stage':<40} {'median ms':>10} {'min ms':>10} {'items/s':>14} {'peak MiB':>9}"]
+    for name, r in suite["results"].items():
+        lines.append(
+            f"{name:<40} {r['median_s'] * 1000:>10.2f} {r['min_s'] * 1000:>10.2f} "
+            f"{r['items_per_s']:>14,.0f} {r['peak_mib']:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def load_baseline(path: Path = BASELINE) -> Dict[str, Any] | None:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+# ---------- TESTS ----------
+@pytest.fixture(scope="module")
+def suite():
+    result = run_suite()
+    print("\n" + report(result))
+    return result
+
+
+def test_every_stage_measured(suite):
+    expected = {
+        "clean_orders_df",
+        "clean_prices_df[1m]", "clean_prices_df[1d]",
+        "compute_portfolio_timeseries[1m]", "compute_portfolio_timeseries[1d]",
+        "serialize_performance_legacy[1m]", "serialize_performance_legacy[1d]",
+        "get_portfolio_data[1D]", "get_portfolio_data[ALL]",
+    }
+    assert set(suite["results"]) == expected
+    for name, r in suite["results"].items():
+        assert r["median_s"] > 0 and r["items_per_s"] > 0, name
+
+
+def test_no_regression_against_baseline(suite):
+    baseline = load_baseline()
+    if baseline is None:
+        pytest.skip(f"no baseline at {BASELINE} (python tests/test_benchmarks.py --save)")
+    if baseline["meta"]["sizes"] != suite["meta"]["sizes"]:
+        pytest.skip(f"baseline sizes {baseline['meta']['sizes']} differ from {suite['meta']['sizes']}")
+
+    regressions = compare(suite, baseline)
+    assert not regressions, "\n".join(regressions)
+
+
+# ---------- CLI ----------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the performance pipeline")
+    parser.add_argument("--save", action="store_true", help=f"write results as the baseline ({BASELINE})")
+    parser.add_argument("--out", type=Path, help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    result = run_suite()
+    print(report(result))
+
+    if args.out:
+        args.out.write_text(json.dumps(result, indent=2))
+
+    if args.save:
+        BASELINE.write_text(json.dumps(result, indent=2))
+        print(f"baseline saved to {BASELINE}")
+        sys.exit(0)
+
+    baseline = load_baseline()
+    if baseline is None:
+        print(f"no baseline at {BASELINE}; run with --save to create one")
+    elif baseline["meta"]["sizes"] != result["meta"]["sizes"]:
+        print("baseline was recorded with different sizes; not compared")
+    else:
+        regressions = compare(result, baseline)
+        print("\n".join(regressions) if regressions else f"no regressions (tolerance {TOLERANCE:.0%})")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,212 @@
+# tests/test_cache.py
+"""
+Tiered cache (app.utils.cache): frame serialization round trips, workers
+sharing one shared tier (MemoryStore and the RESP stand-in in
+tests/loadtest), and the bar store adopting bars another worker downloaded.
+
+    pytest tests/test_cache.py
+"""
+import os
+import sys
+import asyncio
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND))
+sys.path.insert(0, str(Path(__file__).resolve().parent / "loadtest"))
+
+os.environ.setdefault("ENV", "DEV")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:9")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+
+from app.services import bars
+from app.utils.cache import MemoryStore, RedisStore, TieredCache, dumps, loads
+
+import redis_standin
+
+
+def ohlcv(rows: int, seed: int = 0, start: str = "2025-03-03 14:30") -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=rows, freq="1min", tz="UTC")
+    close = 100 + rng.standard_normal(rows).cumsum()
+    return pd.DataFrame({
+        "Open": close - 0.1,
+        "High": close + 0.2,
+        "Low": close - 0.2,
+        "Close": close,
+        "Volume": rng.integers(1_000, 10_000, rows),
+    }, index=index)
+
+
+def test_round_trip_preserves_frames_and_values():
+    value = {
+        "AAPL": ohlcv(390),
+        "ZZZZ": pd.DataFrame(index=pd.DatetimeIndex([], tz="UTC")),
+        "entry": {
+            "start": pd.Timestamp("2025-03-03 14:30", tz="UTC"),
+            "end": pd.Timestamp("2025-03-03 21:00", tz="America/New_York"),
+            "timestamp": 1741012200.5,
+        },
+        ("AAPL", "1m"): [1, 2.5, None, "x"],
+        "mixed": pd.DataFrame({
+            "ticker": ["AAPL", "CA$H"],
+            "quantity": [3.0, -1.0],
+            "at": pd.to_datetime(["2025-01-02", "2025-01-03"], utc=True),
+        }),
+    }
+    out = loads(dumps(value))
+
+    pd.testing.assert_frame_equal(out["AAPL"], value["AAPL"], check_freq=False)
+    assert out["ZZZZ"].empty and str(out["ZZZZ"].index.tz) == "UTC"
+    assert out["entry"] == value["entry"]
+    assert out[("AAPL", "1m")] == [1, 2.5, None, "x"]
+    pd.testing.assert_frame_equal(out["mixed"], value["mixed"])
+
+    # frames are writable, like freshly downloaded ones
+    out["AAPL"].loc[out["AAPL"].index[0], "Close"] = 0.0
+
+
+def test_binary_frames_are_compact():
+    df = ohlcv(5_000)
+    assert len(dumps(df)) < len(df.to_json()) / 2
+
+
+def test_workers_share_loads():
+    shared = MemoryStore()
+    worker_a = TieredCache("market", ttl=30, shared=shared)
+    worker_b = TieredCache("market", ttl=30, shared=shared)
+    loads_ = []
+
+    async def loader():
+        loads_.append(1)
+        return {"AAPL": ohlcv(10)}
+
+    async def scenario():
+        a = await worker_a.get_or_load("AAPL|1d", loader)
+        b = await worker_b.get_or_load("AAPL|1d", loader)
+        again = await worker_b.get_or_load("AAPL|1d", loader)
+        return a, b, again
+
+    a, b, again = asyncio.run(scenario())
+    assert len(loads_) == 1
+    pd.testing.assert_frame_equal(a["AAPL"], b["AAPL"], check_freq=False)
+    assert again is b  # served by worker_b's local tier
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TieredCache("market", ttl=30, shared=None)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def scenario():
+        return await asyncio.gather(*[cache.get_or_load("k", loader) for _ in range(5)])
+
+    assert asyncio.run(scenario()) == [42] * 5
+    assert len(calls) == 1
+
+
+def test_redis_protocol_tier():
+    async def scenario():
+        server, _ = await redis_standin.start()
+        port = server.sockets[0].getsockname()[1]
+        redis = RedisStore(f"redis://127.0.0.1:{port}/0", timeout=1.0, pool_size=2)
+        try:
+            await redis.set_many({"a": b"1", "b": dumps(ohlcv(50))}, ttl=30)
+            await redis.set_many({"short": b"x"}, ttl=0.05)
+            a, b, missing = await redis.get_many(["a", "b", "missing"])
+            await asyncio.sleep(0.1)
+            (short,) = await redis.get_many(["short"])
+            await redis.delete(["a"])
+            (deleted,) = await redis.get_many(["a"])
+
+            worker_a = TieredCache("bars", ttl=30, shared=redis)
+            worker_b = TieredCache("bars", ttl=30, local_size=0, shared=redis)
+            await worker_a.set("AAPL|1m", ohlcv(20))
+            shared_hit = await worker_b.get("AAPL|1m")
+        finally:
+            await redis.close()
+            server.close()
+            await server.wait_closed()
+        return a, loads(b), missing, short, deleted, shared_hit
+
+    a, b, missing, short, deleted, shared_hit = asyncio.run(scenario())
+    assert a == b"1" and missing is None and short is None and deleted is None
+    pd.testing.assert_frame_equal(b, ohlcv(50), check_freq=False)
+    pd.testing.assert_frame_equal(shared_hit, ohlcv(20), check_freq=False)
+
+
+def test_unreachable_shared_tier_falls_back_to_loading():
+    redis = RedisStore("redis://127.0.0.1:9/0", timeout=0.2, pool_size=1)
+    cache = TieredCache("market", ttl=30, shared=redis)
+
+    async def loader():
+        return "fresh"
+
+    async def scenario():
+        return await cache.get_or_load("k", loader), await cache.get_or_load("k", loader)
+
+    assert asyncio.run(scenario()) == ("fresh", "fresh")
+
+
+def test_bar_store_adopts_bars_from_other_workers(monkeypatch):
+    downloads = []
+    # inside the 1m retention window
+    frame = ohlcv(390, start=str(pd.Timestamp.now(tz="UTC").floor("D") - pd.Timedelta(days=1, hours=-14)))
+
+    async def fake_fetch_range(tickers, start, end, interval="1d", timeout=10):
+        downloads.append(list(tickers))
+        return {t: frame.loc[(frame.index >= start) & (frame.index < end)] for t in tickers}
+
+    monkeypatch.setattr(bars, "fetch_range", fake_fetch_range)
+    monkeypatch.setattr(bars._shared, "_shared", MemoryStore())
+    monkeypatch.setattr(bars, "_store", type(bars._store)())
+    monkeypatch.setattr(bars, "has_session", lambda s, e: True)
+
+    start, end = frame.index[0], frame.index[-1]
+    first = asyncio.run(bars.fetch_bars(["AAPL", "MSFT"], start, end, interval="1m"))
+
+    # a fresh worker: empty local store, same shared tier
+    monkeypatch.setattr(bars, "_store", type(bars._store)())
+    second = asyncio.run(bars.fetch_bars(["AAPL", "MSFT"], start, end, interval="1m"))
+
+    assert downloads == [["AAPL", "MSFT"]]
+    for t in ("AAPL", "MSFT"):
+        pd.testing.assert_frame_equal(first[t], second[t], check_freq=False)
+
+
+def test_bar_store_retries_empty_downloads(monkeypatch):
+    downloads = []
+    frame = ohlcv(390, start=str(pd.Timestamp.now(tz="UTC").floor("D") - pd.Timedelta(days=1, hours=-14)))
+    answers = [True]  # a transient empty answer, then real bars
+
+    async def fake_fetch_range(tickers, start, end, interval="1d", timeout=10):
+        downloads.append(list(tickers))
+        if answers and answers.pop():
+            return {}
+        return {t: frame.loc[(frame.index >= start) & (frame.index < end)] for t in tickers}
+
+    shared = MemoryStore()
+    monkeypatch.setattr(bars, "fetch_range", fake_fetch_range)
+    monkeypatch.setattr(bars._shared, "_shared", shared)
+    monkeypatch.setattr(bars, "_store", type(bars._store)())
+    monkeypatch.setattr(bars, "has_session", lambda s, e: True)
+    monkeypatch.setattr(bars.config, "BAR_STORE_SIZE", 1)
+
+    start, end = frame.index[0], frame.index[-1]
+    empty = asyncio.run(bars.fetch_bars(["AAPL"], start, end, interval="1m"))
+    assert empty["AAPL"].empty and not bars._store and not asyncio.run(shared.get_many(["oscillo:bars:AAPL|1m"]))[0]
+
+    again = asyncio.run(bars.fetch_bars(["AAPL"], start, end, interval="1m"))
+    assert len(downloads) == 2 and len(again["AAPL"]) == len(frame)
+
+    # bounded: a second key evicts the first
+    asyncio.run(bars.fetch_bars(["MSFT"], start, end, interval="1m"))
+    assert list(bars._store) == [("MSFT", "1m")]
@@ -0,0 +1,108 @@
+# tests/test_import_time.py
+"""
+Cold-start guard: importing the app, authenticating and portfolio CRUD must
+not pull in pandas / numpy / yfinance, and `import app` must stay within an
+import-time budget.
+
+Each check runs in a fresh interpreter (python -X importtime) with the
+backend on the path and a throwaway SQLite database, so nothing here talks
+to Supabase or Yahoo.
+
+    pytest tests/test_import_time.py
+    IMPORT_BUDGET_MS=1500 pytest tests/test_import_time.py
+"""
+import os
+import re
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+
+HEAVY = ("pandas", "numpy", "yfinance")
+
+# Cumulative import time of the `app` package (microseconds)
+IMPORT_BUDGET_US = int(float(os.getenv("IMPORT_BUDGET_MS", "1200")) * 1000)
+
+ENV = {
+    **os.environ,
+    "ENV": "DEV",
+    "SUPABASE_URL": "http://localhost:9",
+    "SUPABASE_SERVICE_ROLE_KEY": "test",
+    "SUPABASE_ANON_KEY": "test",
+    "SUPABASE_JWT_SECRET": "import-time-test-secret",
+    "DB_BACKEND": "sqlite",
+    "SQLITE_PATH": ":memory:",
+    "RECONCILE_INTERVAL_SECONDS": "0",
+    "PYTHONPATH": str(BACKEND),
+}
+
+CRUD_SCRIPT = r"""
+import sys, json, time
+import jwt
+from fastapi.testclient import TestClient
+import app
+
+def auth(user):
+    claims = {"sub": user, "aud": "authenticated", "exp": int(time.time()) + 60}
+    return {"Authorization": "Bearer " + jwt.encode(claims, "import-time-test-secret", algorithm="HS256")}
+
+user = auth("11111111-1111-1111-1111-111111111111")
+with TestClient(app.app) as client:
+    base = "/api/1.0/portfolios"
+    created = client.post(base, json={"name": "cold start"}, headers=user)
+    listed = client.get(base, headers=user)
+    deleted = client.delete(f"{base}/{created.json()['id']}", headers=user)
+    unauth = client.get(base)
+
+print(json.dumps({
+    "status": [created.status_code, listed.status_code, deleted.status_code, unauth.status_code],
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY,)
+
+
+def _run(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=BACKEND,
+        env=ENV,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+
+def _import_times(stderr: str) -> dict:
+    """
+    {module: cumulative_us} from `python -X importtime` output
+    """
+    out = {}
+    for line in stderr.splitlines():
+        m = re.match(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)", line)
+        if m:
+            out[m.group(3)] = int(m.group(1))
+    return out
+
+
+def test_import_app_skips_heavy_modules():
+    proc = _run("-X", "importtime", "-c", f"import sys, app; print([m for m in {HEAVY!r} if m in sys.modules])")
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    assert proc.stdout.strip() == "[]", f"heavy modules loaded at import: {proc.stdout.strip()}"
+
+    times = _import_times(proc.stderr)
+    assert "app" in times
+    assert times["app"] <= IMPORT_BUDGET_US, (
+        f"`import app` took {times['app'] / 1000:.0f} ms (budget {IMPORT_BUDGET_US / 1000:.0f} ms); "
+        f"slowest: {sorted(times.items(), key=lambda kv: -kv[1])[:10]}"
+    )
+
+
+def test_auth_and_portfolio_crud_skip_heavy_modules():
+    proc = _run("-c", CRUD_SCRIPT)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert result["status"] == [200, 200, 200, 401]
+    assert result["loaded"] == [], f"heavy modules loaded on CRUD paths: {result['loaded']}"
@@ -0,0 +1,205 @@
+# tests/test_jobs.py
+"""
+Background jobs (app.services.jobs): identical performance requests share
+one run, a ledger write (or a new intraday bar) starts a new one, plain
+performance requests bypass the pool, failures surface their status
+(and never stop a worker), and finished jobs are readable from another
+worker through the shared tier.
+
+    pytest tests/test_jobs.py
+"""
+import os
+import sys
+import asyncio
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND))
+
+os.environ.setdefault("ENV", "DEV")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:9")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+
+from app.db.sqlite import SqliteRepository
+from app.models import Order
+from app.services import jobs, ledger, performance
+from app.utils.cache import MemoryStore
+
+
+USER_ID = "00000000-0000-4000-8000-000000000011"
+PORTFOLIO_ID = "00000000-0000-4000-8000-000000000012"
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    index = pd.date_range(end=pd.Timestamp.now(tz="UTC").normalize(), periods=60, freq="B")
+    frame = pd.DataFrame({"Close": np.linspace(100, 130, len(index))}, index=index)
+    calls = []
+
+    async def fetch_bars(tickers, start, end, interval="1d", timeout=10):
+        calls.append(list(tickers))
+        await asyncio.sleep(0.05)
+        return {t: frame.loc[(frame.index >= start) & (frame.index <= end)] for t in tickers}
+
+    monkeypatch.setattr(performance, "fetch_bars", fetch_bars)
+    monkeypatch.setattr(jobs, "_jobs", type(jobs._jobs)())
+    monkeypatch.setattr(jobs, "_active", {})
+    monkeypatch.setattr(jobs, "_finished", {})
+    monkeypatch.setattr(jobs, "_results", jobs.TieredCache("jobs", ttl=60, shared=None))
+
+    repo = SqliteRepository(":memory:")
+    start = index[0].isoformat()
+    asyncio.run(repo.insert_portfolio({"id": PORTFOLIO_ID, "user_id": USER_ID, "name": "jobs", "created_at": start}))
+    for ticker, quantity, price in ((Order.CASH_TICKER, 10_000, 1.0), ("AAPL", 10, 100.0)):
+        asyncio.run(repo.insert_order({
+            "portfolio_id": PORTFOLIO_ID, "ticker": ticker, "quantity": quantity, "price": price, "timestamp": start,
+        }))
+    ledger.invalidate(PORTFOLIO_ID)
+    repo.fetches = calls
+    yield repo
+    ledger.invalidate(PORTFOLIO_ID)
+    asyncio.run(repo.close())
+
+
+def test_identical_requests_share_one_job(repo):
+    async def scenario():
+        first, second = await asyncio.gather(*[
+            jobs.submit_performance(repo, USER_ID, PORTFOLIO_ID, "all") for _ in range(2)
+        ])
+        assert first["id"] == second["id"] and first["status"] in ("queued", "running")
+
+        done = await jobs.wait(first["id"], timeout=10)
+        again = await jobs.submit_performance(repo, USER_ID, PORTFOLIO_ID, "ALL")
+
+        # a new order bumps the ledger version: the next request recomputes
+        await repo.insert_order({
+            "portfolio_id": PORTFOLIO_ID, "ticker": "AAPL", "quantity": 1, "price": 120.0,
+            "timestamp": pd.Timestamp.now(tz="UTC").isoformat(),
+        })
+        ledger.invalidate(PORTFOLIO_ID)
+        fresh = await jobs.submit_performance(repo, USER_ID, PORTFOLIO_ID, "ALL")
+        await jobs.wait(fresh["id"], timeout=10)
+        await jobs.close_jobs()
+        return first, done, again, fresh
+
+    first, done, again, fresh = asyncio.run(scenario())
+    assert done["status"] == "done" and done["finished_at"] is not None
+    assert done["result"]["performance"]["TIMESTAMP"]
+    assert again["id"] == first["id"]
+    assert fresh["id"] != first["id"] and fresh["params"]["version"] > first["params"]["version"]
+    assert len(repo.fetches) == 2
+    assert "owner" not in jobs.public(done) and "key" not in jobs.public(done)
+
+
+def test_failures_report_status_and_retry(repo):
+    attempts = []
+
+    async def run():
+        attempts.append(1)
+        raise ValueError("bad input")
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await jobs.submit_performance(repo, USER_ID, PORTFOLIO_ID, "2Y")
+
+        job = await jobs.submit("report", "x", owner=USER_ID, params={}, run=run)
+        failed = await jobs.wait(job["id"], timeout=10)
+        retry = await jobs.submit("report", "x", owner=USER_ID, params={}, run=run)
+        await jobs.wait(retry["id"], timeout=10)
+        await jobs.close_jobs()
+        return failed, retry
+
+    failed, retry = asyncio.run(scenario())
+    assert failed["status"] == "failed" and failed["status_code"] == 400 and failed["error"] == "bad input"
+    assert retry["id"] != failed["id"] and len(attempts) == 2
+
+
+def test_finished_jobs_are_visible_to_other_workers(repo, monkeypatch):
+    shared = MemoryStore()
+    monkeypatch.setattr(jobs, "_results", jobs.TieredCache("jobs", ttl=60, shared=shared))
+
+    async def scenario():
+        job = await jobs.submit_performance(repo, USER_ID, PORTFOLIO_ID, "ALL")
+        await jobs.wait(job["id"], timeout=10)
+        await jobs.close_jobs()
+
+        # another worker: nothing local, same shared tier
+        monkeypatch.setattr(jobs, "_jobs", type(jobs._jobs)())
+        monkeypatch.setattr(jobs, "_results", jobs.TieredCache("jobs", ttl=60, local_size=0, shared=shared))
+        seen = await jobs.get_job(job["id"])
+        reused = await jobs.submit_performance(repo, USER_ID, PORTFOLIO_ID, "ALL")
+        return job, seen, reused
+
+    job, seen, reused = asyncio.run(scenario())
+    assert seen["status"] == "done" and seen["owner"] == USER_ID
+    assert seen["result"]["performance"]["TIMESTAMP"]
+    assert reused["id"] == job["id"] and len(repo.fetches) == 1
+
+
+def test_workers_survive_a_failed_publish(repo, monkeypatch):
+    monkeypatch.setattr(jobs.config, "JOB_WORKERS", 1)
+
+    async def publish(items, ttl=None):
+        raise TypeError("result is not serializable")
+
+    monkeypatch.setattr(jobs._results, "set_many", publish)
+
+    async def run():
+        return {"ok": True}
+
+    async def scenario():
+        first = await jobs.submit("report", "a", owner=USER_ID, params={}, run=run)
+        first = await jobs.wait(first["id"], timeout=10)
+        second = await jobs.submit("report", "b", owner=USER_ID, params={}, run=run)
+        second = await jobs.wait(second["id"], timeout=10)
+        await jobs.close_jobs()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first["status"] == second["status"] == "done"
+    assert second["result"] == {"ok": True}
+
+
+def test_intraday_jobs_are_only_reused_within_a_bar(repo, monkeypatch):
+    from app.services import bars
+
+    async def scenario():
+        daily = await jobs.submit_performance(repo, USER_ID, PORTFOLIO_ID, "ALL")
+        monkeypatch.setattr(bars, "_bar_step", lambda interval: pd.Timedelta(days=1))
+        first = await jobs.submit_performance(repo, USER_ID, PORTFOLIO_ID, "1D")
+        same_bar = await jobs.submit_performance(repo, USER_ID, PORTFOLIO_ID, "1D")
+        # every call lands in a new bar
+        monkeypatch.setattr(bars, "_bar_step", lambda interval: pd.Timedelta(1, "ns"))
+        next_bar = await jobs.submit_performance(repo, USER_ID, PORTFOLIO_ID, "1D")
+        await jobs.close_jobs()
+        return daily, first, same_bar, next_bar
+
+    daily, first, same_bar, next_bar = asyncio.run(scenario())
+    assert daily["params"]["bar"] is None
+    assert first["params"]["bar"] is not None and same_bar["id"] == first["id"]
+    assert next_bar["id"] != first["id"] and next_bar["params"]["bar"] > first["params"]["bar"]
+
+
+def test_plain_performance_requests_skip_the_job_pool(repo):
+    from fastapi import HTTPException
+    from app.routers import performance as router
+
+    async def scenario():
+        answer = await router.get_portfolio_performance(
+            None, PORTFOLIO_ID, period="ALL", defer=False, repo=repo, user_id=USER_ID
+        )
+        with pytest.raises(HTTPException) as e:
+            await router.get_portfolio_performance(
+                None, PORTFOLIO_ID, period="2Y", defer=False, repo=repo, user_id=USER_ID
+            )
+        return answer, e.value
+
+    answer, error = asyncio.run(scenario())
+    assert answer.status_code == 200 and b"TIMESTAMP" in answer.body
+    assert error.status_code == 400
+    assert len(jobs._jobs) == 0
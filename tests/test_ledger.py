@@ -0,0 +1,223 @@
+# tests/test_ledger.py
+"""
+Ledger replay: holdings and cash folded from the order log follow the
+place_order rule and agree with what the ledger stores, snapshots plus
+replay agree with the full ledger, the per-portfolio ledger cache picks up
+writes, and portfolio values come from the ledger on every path (SQLite,
+stubbed quotes).
+
+    pytest tests/test_ledger.py
+"""
+import os
+import sys
+import asyncio
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND))
+
+os.environ.setdefault("ENV", "DEV")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:9")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+
+from app.db.sqlite import SqliteRepository
+from app.models import Order
+from app.services import ledger, market, portfolios, snapshots
+from app.utils.holdings import replay, split_at
+from app.utils.performance import clean_orders_df
+from app.utils.timeseries import compute_portfolio_timeseries
+
+
+USER_ID = "00000000-0000-4000-8000-000000000041"
+PORTFOLIO_ID = "00000000-0000-4000-8000-000000000042"
+
+
+@pytest.fixture
+def repo():
+    repo = SqliteRepository(":memory:")
+    asyncio.run(repo.insert_portfolio({"id": PORTFOLIO_ID, "user_id": USER_ID, "name": "ledger"}))
+    for ticker, quantity, price in [(Order.CASH_TICKER, 1_000, 1.0), ("AAPL", 3, 100.0)]:
+        asyncio.run(repo.place_order({
+            "portfolio_id": PORTFOLIO_ID, "ticker": ticker, "quantity": quantity, "price": price,
+        }))
+    ledger.invalidate(PORTFOLIO_ID)
+    yield repo
+    ledger.invalidate(PORTFOLIO_ID)
+    asyncio.run(repo.close())
+
+
+def orders(*rows):
+    return clean_orders_df([
+        {"ticker": t, "quantity": q, "price": p, "timestamp": f"2026-01-0{i + 1}T15:00:00Z"}
+        for i, (t, q, p) in enumerate(rows)
+    ])
+
+
+def test_replay_follows_the_ledger_cash_rule():
+    # CA$H moves cash by quantity whatever its price (place_order ignores it)
+    holdings, cash = replay(orders(
+        (Order.CASH_TICKER, 1_000, 1.0),
+        (Order.CASH_TICKER, 500, None),
+        ("AAPL", 3, 100.0),
+        ("AAPL", -1, 120.0),
+        (Order.CASH_TICKER, -200, 2.0),
+    ), cash_ticker=Order.CASH_TICKER)
+
+    assert holdings == {"AAPL": 2.0}
+    assert cash == pytest.approx(1_000 + 500 - 300 + 120 - 200)
+
+
+def test_replay_skips_unpriced_tickers():
+    ledger = orders((Order.CASH_TICKER, 1_000, 1.0), ("AAPL", 2, 100.0), ("DELISTED", 5, 10.0))
+
+    assert replay(ledger, cash_ticker=Order.CASH_TICKER) == ({"AAPL": 2.0, "DELISTED": 5.0}, 750.0)
+    assert replay(ledger, cash_ticker=Order.CASH_TICKER, tickers=pd.Index(["AAPL"])) == ({"AAPL": 2.0}, 800.0)
+
+
+def test_window_start_does_not_change_cash():
+    index = pd.date_range("2026-01-01 15:00", periods=6, freq="D", tz="UTC")
+    prices = pd.DataFrame({"AAPL": [100.0, 101, 102, 103, 104, 105]}, index=index)
+    # CA$H rows priced off 1.00 (or not at all) still move cash by quantity
+    ledger = orders(
+        (Order.CASH_TICKER, 1_000, 2.0),
+        (Order.CASH_TICKER, 500, None),
+        ("AAPL", 2, 101.0),
+        (Order.CASH_TICKER, -100, 3.0),
+        ("AAPL", -1, 105.0),
+    )
+
+    def run(start):
+        before, during = split_at(ledger, index[start])
+        holdings, cash = replay(before, cash_ticker=Order.CASH_TICKER, tickers=prices.columns)
+        return compute_portfolio_timeseries(
+            prices.iloc[start:], during, cash_ticker=Order.CASH_TICKER,
+            initial_holdings=holdings, initial_cash=cash,
+        )
+
+    full = run(0)
+    assert full["cash"].iloc[-1] == pytest.approx(1_000 + 500 - 202 - 100 + 105)
+    for start in range(1, len(index)):
+        split = run(start)
+        pd.testing.assert_series_equal(split["cash"], full["cash"].iloc[start:], check_names=False)
+        pd.testing.assert_series_equal(split["portfolio_pv"], full["portfolio_pv"].iloc[start:], check_names=False)
+
+
+def test_list_and_detail_value_the_same_positions(repo, monkeypatch):
+    async def fetch_recent_quotes(tickers, *args, **kwargs):
+        return {t: 110.0 for t in tickers}
+
+    monkeypatch.setattr(market, "fetch_recent_quotes", fetch_recent_quotes)
+    # the positions table drifts from the ledger (e.g. a write that bypassed it)
+    asyncio.run(repo.increment_quantity(PORTFOLIO_ID, "AAPL", 5, "Apple", "Technology"))
+
+    # a second, empty portfolio: still one ledger query for the whole list
+    other = "00000000-0000-4000-8000-000000000043"
+    asyncio.run(repo.insert_portfolio({"id": other, "user_id": USER_ID, "name": "empty"}))
+    queries = []
+    get_ledger_positions = repo.get_ledger_positions
+
+    async def counted(ids):
+        queries.append(sorted(ids))
+        return await get_ledger_positions(ids)
+
+    async def no_ledger_loads(*args):
+        raise AssertionError("the list must not load ledgers one by one")
+
+    monkeypatch.setattr(repo, "get_ledger_positions", counted)
+    with monkeypatch.context() as m:
+        m.setattr(ledger, "_load", no_ledger_loads)
+        rows = asyncio.run(repo.get_portfolios(USER_ID))
+        listed = {row["id"]: row for row in asyncio.run(portfolios.value_portfolios(repo, rows))}
+    assert queries == [sorted([PORTFOLIO_ID, other])]
+    assert listed[other]["present_value"] == 0
+    listed = listed[PORTFOLIO_ID]
+
+    detail = asyncio.run(portfolios.get_portfolio_data(repo, USER_ID, PORTFOLIO_ID))
+
+    assert listed["present_value"] == detail["present_value"] == pytest.approx(700 + 3 * 110)
+    assert listed["positions"]["AAPL"]["quantity"] == detail["positions"]["AAPL"]["quantity"] == 3
+
+
+def test_ledger_cache_sees_writes(repo, monkeypatch):
+    async def place(ticker, quantity, price):
+        return await repo.place_order({
+            "portfolio_id": PORTFOLIO_ID, "ticker": ticker, "quantity": quantity, "price": price,
+        })
+
+    async def scenario():
+        first = await ledger.get_ledger(repo, PORTFOLIO_ID)
+        assert await ledger.get_ledger(repo, PORTFOLIO_ID) is first
+
+        # written through this process: applied to the cached copy
+        ledger.record_orders(PORTFOLIO_ID, [await place("AAPL", 1, 100.0)])
+        through = await ledger.get_ledger(repo, PORTFOLIO_ID)
+
+        # written elsewhere: served stale until the version check runs
+        await place("MSFT", 1, 200.0)
+        stale = await ledger.get_ledger(repo, PORTFOLIO_ID)
+        monkeypatch.setattr(ledger.config, "LEDGER_REVALIDATE_SECONDS", 0)
+        fresh = await ledger.get_ledger(repo, PORTFOLIO_ID)
+
+        ledger.invalidate(PORTFOLIO_ID)
+        reloaded = await ledger.get_ledger(repo, PORTFOLIO_ID)
+        return first, through, stale, fresh, reloaded
+
+    first, through, stale, fresh, reloaded = asyncio.run(scenario())
+
+    assert len(first["orders"]) == 2 and len(through["orders"]) == 3
+    assert through["positions"]["AAPL"]["quantity"] == 4
+    assert through["positions"][Order.CASH_TICKER]["quantity"] == pytest.approx(600)
+    assert "MSFT" not in stale["positions"]
+    assert fresh["positions"]["MSFT"]["quantity"] == 1 and fresh["version"] > stale["version"]
+    assert reloaded is not fresh and reloaded["positions"] == fresh["positions"]
+
+
+def test_unpriced_cash_rows_are_written_through(repo):
+    async def scenario():
+        await ledger.get_ledger(repo, PORTFOLIO_ID)
+        deposit = await repo.place_order({
+            "portfolio_id": PORTFOLIO_ID, "ticker": Order.CASH_TICKER, "quantity": 250, "price": 1.0,
+        })
+        # as a database without the NOT NULL on price may hand it back
+        ledger.record_orders(PORTFOLIO_ID, [dict(deposit, price=None)])
+        through = await ledger.get_ledger(repo, PORTFOLIO_ID)
+
+        # a row the cached copy can't apply drops it instead of failing the request
+        odd = await repo.place_order({
+            "portfolio_id": PORTFOLIO_ID, "ticker": "AAPL", "quantity": 1, "price": 100.0,
+        })
+        ledger.record_orders(PORTFOLIO_ID, [dict(odd, price=None)])
+        dropped = PORTFOLIO_ID not in ledger._ledgers
+        return through, dropped, await ledger.get_ledger(repo, PORTFOLIO_ID)
+
+    through, dropped, reloaded = asyncio.run(scenario())
+
+    assert through["positions"][Order.CASH_TICKER]["quantity"] == pytest.approx(700 + 250)
+    assert dropped
+    assert reloaded["positions"][Order.CASH_TICKER]["quantity"] == pytest.approx(950 - 100)
+    assert reloaded["positions"]["AAPL"]["quantity"] == 4
+
+
+def test_snapshot_plus_replay_matches_the_ledger(repo):
+    async def scenario():
+        await snapshots.take_snapshot(repo, PORTFOLIO_ID, force=True)
+        for ticker, quantity, price in [("AAPL", -1, 120.0), ("MSFT", 2, 50.0), (Order.CASH_TICKER, -100, 1.0)]:
+            await repo.place_order({
+                "portfolio_id": PORTFOLIO_ID, "ticker": ticker, "quantity": quantity, "price": price,
+            })
+        now = await snapshots.holdings_at(repo, PORTFOLIO_ID)
+        full = await ledger.load_orders_df(repo, PORTFOLIO_ID)
+        report = await snapshots.reconcile_portfolio(repo, PORTFOLIO_ID, repair=False)
+        return now, full, report
+
+    now, full, report = asyncio.run(scenario())
+    holdings, cash = replay(full, cash_ticker=Order.CASH_TICKER)
+
+    assert now["replayed"] == 3  # only the orders after the snapshot
+    assert now["holdings"] == {t: q for t, q in holdings.items() if q} == {"AAPL": 2.0, "MSFT": 2.0}
+    assert now["cash"] == pytest.approx(cash) == pytest.approx(1_000 - 300 + 120 - 100 - 100)
+    assert report["drift"] == {}
@@ -0,0 +1,39 @@
+# tests/test_loadtest.py
+"""
+Smoke run of the load-test harness (tests/loadtest): a few users for a few
+seconds against the Supabase / Yahoo stand-ins. Every dashboard call must
+succeed, with local and with remote (/auth/v1/user) token checks.
+
+    pytest tests/test_loadtest.py
+"""
+import sys
+import asyncio
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "loadtest"))
+
+from harness import Options, run
+
+
+@pytest.mark.parametrize("remote_auth", [False, True])
+def test_dashboard_traffic_succeeds(tmp_path, remote_auth):
+    options = Options(
+        users=[3],
+        duration=4,
+        warmup=2,
+        think_ms=100,
+        orders_per_portfolio=50,
+        yahoo_latency_ms=5,
+        yahoo_jitter_ms=2,
+        remote_auth=remote_auth,
+        log_dir=tmp_path,
+    )
+    report = asyncio.run(run(options))
+
+    stage = report["stages"][0]
+    assert stage["errors"] == 0, {k: e["statuses"] for k, e in stage["endpoints"].items()}
+    assert {"list", "detail", "quotes", "order"} <= set(stage["endpoints"])
+    assert any(label.startswith("performance[") for label in stage["endpoints"])
+    assert "http_request_duration_seconds" in report["server_metrics"]
@@ -0,0 +1,262 @@
+# tests/test_matching.py
+"""
+Pending orders: the matching engine's trigger heaps and fill prices, its
+cost per bar with many open orders, a matching pass that fills through
+the ledger, fills that are all-or-nothing, and deleted portfolios leaving
+no pending orders behind (SQLite, synthetic 1m bars).
+
+    pytest tests/test_matching.py
+"""
+import os
+import sys
+import time
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND))
+
+os.environ.setdefault("ENV", "DEV")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:9")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+
+from app.db import sqlite
+from app.db.sqlite import SqliteRepository
+from app.models import Order, order as order_model
+from app.models.types import OrderKind, TimeInForce
+from app.services import ledger, market, matching
+from app.utils.matching import MatchingEngine
+
+
+MINUTE = 60 * 10**9
+
+
+def pending(id, quantity, kind, limit=None, stop=None, created_ns=0, ticker="AAPL", **extra):
+    return {
+        "id": id, "ticker": ticker, "quantity": quantity, "kind": kind,
+        "limit_price": limit, "stop_price": stop, "status": "open", "created_ns": created_ns, **extra,
+    }
+
+
+def test_triggers_and_fill_prices():
+    engine = MatchingEngine()
+    engine.add(pending("buy-limit", 10, "limit", limit=95))
+    engine.add(pending("sell-limit", -5, "limit", limit=110))
+    engine.add(pending("buy-stop", 3, "stop", stop=105))
+    engine.add(pending("sell-stop", -2, "stop", stop=90))
+    engine.add(pending("cancelled", 1, "limit", limit=99))
+    engine.add(pending("late", 1, "limit", limit=99, created_ns=MINUTE + 1))
+    engine.remove("cancelled")
+
+    # nothing crossed
+    assert engine.on_bar("AAPL", MINUTE, 100, 104, 96) == ([], [])
+
+    # gaps down through the buy limit and the sell stop at the open
+    fills, _ = engine.on_bar("AAPL", 2 * MINUTE, 88, 92, 85)
+    assert {o["id"]: p for o, p, _ in fills} == {"buy-limit": 88, "sell-stop": 88, "late": 88}
+
+    # trades up through the sell limit and the buy stop
+    fills, _ = engine.on_bar("AAPL", 3 * MINUTE, 100, 111, 99)
+    assert {o["id"]: p for o, p, _ in fills} == {"buy-stop": 105, "sell-limit": 110}
+    assert len(engine) == 0 and engine.tickers() == []
+
+
+def test_orders_wait_for_bars_after_they_were_placed():
+    engine = MatchingEngine()
+    engine.add(pending("late", 1, "limit", limit=99, created_ns=MINUTE + 30 * 10**9))
+    assert engine.on_bar("AAPL", MINUTE, 100, 100, 90) == ([], [])
+    fills, _ = engine.on_bar("AAPL", 2 * MINUTE, 100, 100, 90)
+    assert [(o["id"], p) for o, p, _ in fills] == [("late", 99)]
+
+
+def test_stop_limit_rests_on_its_limit_after_a_gap():
+    engine = MatchingEngine()
+    engine.add(pending("buy-sl", 1, "stop_limit", limit=102, stop=100))
+    engine.add(pending("sell-sl", -1, "stop_limit", limit=95, stop=97))
+
+    # opens above the buy limit: triggered, rests on 102
+    fills, triggered = engine.on_bar("AAPL", MINUTE, 104, 106, 103)
+    assert fills == [] and [o["id"] for o in triggered] == ["buy-sl"]
+    assert engine.get("buy-sl")["status"] == "triggered"
+
+    fills, _ = engine.on_bar("AAPL", 2 * MINUTE, 103, 103, 101)
+    assert [(o["id"], p) for o, p, _ in fills] == [("buy-sl", 102)]
+
+    # the sell stop-limit fills on the way down, within its limit
+    fills, triggered = engine.on_bar("AAPL", 3 * MINUTE, 98, 98, 96)
+    assert [(o["id"], p) for o, p, _ in fills] == [("sell-sl", 97)] and triggered == []
+
+
+def test_day_orders_expire():
+    engine = MatchingEngine()
+    engine.add(pending("day", 1, "limit", limit=50, expires_ns=10 * MINUTE))
+    engine.add(pending("gtc", 1, "limit", limit=50))
+    assert engine.expire(9 * MINUTE) == []
+    assert [o["id"] for o in engine.expire(10 * MINUTE)] == ["day"]
+    assert "gtc" in engine and "day" not in engine
+
+
+def test_bars_cost_scales_with_fills_not_open_orders():
+    rng = random.Random(5)
+    engine = MatchingEngine()
+    tickers = [f"T{i:03d}" for i in range(200)]
+    for i in range(200_000):
+        buy = rng.random() < 0.5
+        engine.add(pending(
+            str(i), 1 if buy else -1, "limit",
+            limit=rng.uniform(50, 95) if buy else rng.uniform(105, 150),
+            ticker=rng.choice(tickers),
+        ))
+
+    start = time.perf_counter()
+    for k in range(2_000):
+        assert engine.on_bar(tickers[k % 200], MINUTE, 100, 101, 99) == ([], [])
+    quiet = (time.perf_counter() - start) / 2_000
+
+    fills, _ = engine.on_bar("T000", MINUTE, 100, 100, 94)
+    assert fills and all(o["ticker"] == "T000" and o["limit_price"] >= 94 for o, _, _ in fills)
+    assert len(engine) == 200_000 - len(fills)
+    assert quiet < 1e-3, f"{quiet * 1e6:.0f} us per bar that crosses nothing"
+
+
+USER_ID = "00000000-0000-4000-8000-000000000021"
+PORTFOLIO_ID = "00000000-0000-4000-8000-000000000022"
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    async def metadata(ticker, timeout=10):
+        return {"name": f"{ticker} Inc.", "sector": "Technology"}
+
+    monkeypatch.setattr(market, "get_ticker_metadata", metadata)
+    monkeypatch.setattr(order_model, "_verify_ticker", lambda ticker: True)
+    monkeypatch.setattr(matching, "_engine", MatchingEngine())
+    monkeypatch.setattr(matching, "_state", {"synced": None, "marks": {}})
+
+    repo = SqliteRepository(":memory:")
+    asyncio.run(repo.insert_portfolio({"id": PORTFOLIO_ID, "user_id": USER_ID, "name": "matching"}))
+    asyncio.run(repo.place_order({
+        "portfolio_id": PORTFOLIO_ID, "ticker": Order.CASH_TICKER, "quantity": 10_000, "price": 1.0,
+    }))
+    ledger.invalidate(PORTFOLIO_ID)
+    yield repo
+    ledger.invalidate(PORTFOLIO_ID)
+    asyncio.run(repo.close())
+
+
+def test_matching_pass_fills_through_the_ledger(repo, monkeypatch):
+    now = datetime.now(timezone.utc)
+    # ten complete minutes after the orders were placed: 100 -> 91 -> 100, the
+    # 95.2 bar trading through the 95 limit
+    index = pd.date_range(pd.Timestamp(now).ceil("min"), periods=10, freq="1min")
+    close = np.array([100, 98, 96, 95.2, 93, 91, 93, 96, 98, 100], dtype=float)
+    frame = pd.DataFrame({"Open": close, "High": close + 0.5, "Low": close - 0.5, "Close": close}, index=index)
+    seen = []
+
+    async def fetch_bars(tickers, start, end, interval="1d", timeout=10):
+        seen.append((sorted(tickers), interval))
+        return {t: frame.loc[(frame.index >= start) & (frame.index <= end)] for t in tickers}
+
+    from app.services import bars
+    monkeypatch.setattr(bars, "fetch_bars", fetch_bars)
+
+    async def scenario():
+        buy = await matching.submit_pending_order(repo, PORTFOLIO_ID, "aapl", 10, OrderKind.LIMIT, limit_price=95)
+        sell = await matching.submit_pending_order(repo, PORTFOLIO_ID, "MSFT", -5, OrderKind.STOP, stop_price=90)
+        day = await matching.submit_pending_order(
+            repo, PORTFOLIO_ID, "AAPL", 1, OrderKind.LIMIT, limit_price=50, time_in_force=TimeInForce.DAY
+        )
+        gone = await matching.submit_pending_order(repo, PORTFOLIO_ID, "AAPL", 1, OrderKind.LIMIT, limit_price=99)
+        await matching.cancel_pending_order(repo, PORTFOLIO_ID, gone["id"])
+
+        with pytest.raises(ValueError):
+            await matching.submit_pending_order(repo, PORTFOLIO_ID, "AAPL", 1, OrderKind.STOP, limit_price=1)
+
+        later = index[-1].to_pydatetime() + timedelta(minutes=1)
+        counts = await matching.match_pending_orders(repo, now=later)
+        again = await matching.match_pending_orders(repo, now=later)
+        rows = {r["id"]: r for r in await matching.get_pending_orders(repo, PORTFOLIO_ID)}
+        orders = await repo.get_orders(PORTFOLIO_ID)
+        return buy, sell, day, gone, counts, again, rows, orders
+
+    buy, sell, day, gone, counts, again, rows, orders = asyncio.run(scenario())
+
+    assert counts["filled"] == 1 and counts["rejected"] == 0
+    assert again["filled"] == 0 and seen[0][1] == "1m"
+    assert rows[buy["id"]]["status"] == "filled" and rows[buy["id"]]["filled_price"] == 95
+    assert rows[sell["id"]]["status"] == "open"  # MSFT never traded through 90
+    assert rows[gone["id"]]["status"] == "cancelled"
+    assert rows[day["id"]]["expires_at"]  # session close; open unless the pass ran past it
+
+    filled = [o for o in orders if o["ticker"] == "AAPL"]
+    assert len(filled) == 1 and filled[0]["quantity"] == 10 and filled[0]["price"] == 95
+    assert rows[buy["id"]]["filled_order_id"] == filled[0]["order_id"]
+
+
+def test_fills_are_all_or_nothing(repo, monkeypatch):
+    def crash(*args):
+        raise RuntimeError("worker died mid-fill")
+
+    async def scenario():
+        buy = await matching.submit_pending_order(repo, PORTFOLIO_ID, "AAPL", 10, OrderKind.LIMIT, limit_price=95)
+        short = await matching.submit_pending_order(repo, PORTFOLIO_ID, "MSFT", -5, OrderKind.LIMIT, limit_price=90)
+
+        with monkeypatch.context() as m:
+            m.setattr(sqlite, "_insert_order", crash)
+            with pytest.raises(RuntimeError):
+                await matching._fill(repo, buy, 95.0)
+        interrupted = (
+            (await matching.get_pending_orders(repo, PORTFOLIO_ID))[0],
+            await repo.get_orders(PORTFOLIO_ID),
+            await repo.get_positions(PORTFOLIO_ID),
+        )
+
+        outcomes = [await matching._fill(repo, buy, 95.0), await matching._fill(repo, buy, 95.0),
+                    await matching._fill(repo, short, 90.0)]
+        rows = {r["id"]: r for r in await matching.get_pending_orders(repo, PORTFOLIO_ID)}
+        return buy, short, interrupted, outcomes, rows, await repo.get_orders(PORTFOLIO_ID)
+
+    buy, short, (pending, orders, positions), outcomes, rows, after = asyncio.run(scenario())
+
+    # the crash left the order live and the ledger untouched
+    assert pending["status"] == "open" and pending["filled_order_id"] is None
+    assert len(orders) == 1 and {p["ticker"] for p in positions} == {Order.CASH_TICKER}
+
+    assert outcomes == ["filled", "gone", "rejected"]
+    assert rows[buy["id"]]["filled_order_id"] == after[-1]["order_id"] and len(after) == 2
+    assert rows[short["id"]]["status"] == "rejected" and "inventory" in rows[short["id"]]["error"]
+
+
+def test_deleting_a_portfolio_drops_its_pending_orders(repo):
+    from app.services import portfolios
+
+    other = "00000000-0000-4000-8000-000000000063"
+
+    async def scenario():
+        await repo.insert_portfolio({"id": other, "user_id": USER_ID, "name": "kept"})
+        await matching.submit_pending_order(repo, PORTFOLIO_ID, "AAPL", 10, OrderKind.LIMIT, limit_price=95)
+        await matching.submit_pending_order(repo, PORTFOLIO_ID, "MSFT", 1, OrderKind.STOP, stop_price=300)
+        await repo.place_order({"portfolio_id": other, "ticker": Order.CASH_TICKER, "quantity": 100, "price": 1.0})
+        kept = await matching.submit_pending_order(repo, other, "AAPL", 1, OrderKind.LIMIT, limit_price=90)
+        tracked = len(matching._engine)
+
+        await portfolios.delete_portfolio(repo, USER_ID, PORTFOLIO_ID)
+        return kept, tracked, (
+            await repo.get_pending_orders(PORTFOLIO_ID), await repo.get_orders(PORTFOLIO_ID),
+            await repo.get_pending_orders(other),
+        )
+
+    kept, tracked, (pending, orders, others) = asyncio.run(scenario())
+
+    assert tracked == 3
+    assert len(matching._engine) == 1 and kept["id"] in matching._engine
+    assert matching._engine.tickers() == ["AAPL"]
+    assert pending == [] and orders == []
+    assert [r["id"] for r in others] == [kept["id"]]
@@ -0,0 +1,152 @@
+# tests/test_orders.py
+"""
+Orders: bulk placement with per-order rejections and the ticker registry
+behind it, and keyset cursors (SQLite, stubbed market data).
+
+    pytest tests/test_orders.py
+"""
+import os
+import sys
+import json
+import base64
+import asyncio
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND))
+
+os.environ.setdefault("ENV", "DEV")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:9")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+
+from app.db.sqlite import SqliteRepository
+from app.models import Order
+from app.models.types import OrderKind
+from app.services import ledger, market
+from app.services.orders import create_orders, get_orders_page
+from app.utils.cache import TieredCache
+
+
+USER_ID = "00000000-0000-4000-8000-000000000031"
+PORTFOLIO_ID = "00000000-0000-4000-8000-000000000032"
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    async def lookup_tickers(tickers, timeout=10):
+        return {t: None if t == "NOPE" else {"name": f"{t} Inc.", "sector": "Technology"} for t in tickers}
+
+    monkeypatch.setattr(market, "lookup_tickers", lookup_tickers)
+
+    repo = SqliteRepository(":memory:")
+    asyncio.run(repo.insert_portfolio({"id": PORTFOLIO_ID, "user_id": USER_ID, "name": "orders"}))
+    asyncio.run(repo.place_order({
+        "portfolio_id": PORTFOLIO_ID, "ticker": Order.CASH_TICKER, "quantity": 1_000, "price": 1.0,
+    }))
+    ledger.invalidate(PORTFOLIO_ID)
+    yield repo
+    ledger.invalidate(PORTFOLIO_ID)
+    asyncio.run(repo.close())
+
+
+def test_bulk_rejects_per_order(repo, monkeypatch):
+    place_orders = repo.place_orders
+
+    async def shuffled(portfolio_id, rows):
+        # stored rows may come back in any order; results must still line up
+        return list(reversed(await place_orders(portfolio_id, rows)))
+
+    monkeypatch.setattr(repo, "place_orders", shuffled)
+
+    requests = [
+        {"ticker": "aapl", "quantity": 2, "price": 100.0},
+        {"ticker": "MSFT", "quantity": 1, "price": 200.0, "kind": OrderKind.LIMIT},
+        {"ticker": "MSFT", "quantity": 1, "price": None},
+        {"ticker": "NOPE", "quantity": 1, "price": 10.0},
+        {"ticker": "MSFT", "quantity": 3, "price": 200.0},  # 800 cash left
+        {"ticker": "GOOG", "quantity": 1, "price": 500.0},  # only 200 cash left
+        {"ticker": "AAPL", "quantity": -1, "price": 110.0},
+    ]
+    results = asyncio.run(create_orders(repo, PORTFOLIO_ID, requests))
+
+    assert [r["index"] for r in results] == list(range(len(requests)))
+    assert [r["status"] for r in results] == [
+        "accepted", "rejected", "rejected", "rejected", "accepted", "rejected", "accepted",
+    ]
+    assert "bulk" in results[1]["error"]
+    assert "price" in results[2]["error"]
+    assert results[3]["error"] == "Ticker not found"
+
+    accepted = [r for r in results if r["status"] == "accepted"]
+    assert [(r["order"]["ticker"], r["order"]["quantity"]) for r in accepted] == [("AAPL", 2), ("MSFT", 3), ("AAPL", -1)]
+    assert all("ord" not in r["order"] for r in accepted)
+
+    positions = {row["ticker"]: row["quantity"] for row in asyncio.run(repo.get_positions(PORTFOLIO_ID))}
+    assert positions["AAPL"] == 1 and positions["MSFT"] == 3
+    assert positions[Order.CASH_TICKER] == pytest.approx(1_000 - 200 - 600 + 110)
+
+
+def test_registry_only_remembers_unknowns_next_to_known(monkeypatch):
+    monkeypatch.setattr(market, "_registry", TieredCache("tickers", ttl=60, local_size=16, shared=None))
+    downloads = []
+    answers = [{}]  # first download comes back empty (a Yahoo hiccup)
+
+    async def fetch_full_data(tickers, period="5d", interval="1d", timeout=10):
+        downloads.append(sorted(tickers))
+        if answers:
+            return answers.pop()
+        return {t: pd.DataFrame({"Close": [1.0]}) for t in tickers if t != "NOPE"}
+
+    async def get_ticker_metadata(ticker, timeout=10):
+        return {"name": f"{ticker} Inc.", "sector": "Technology"}
+
+    monkeypatch.setattr(market, "fetch_full_data", fetch_full_data)
+    monkeypatch.setattr(market, "get_ticker_metadata", get_ticker_metadata)
+
+    assert asyncio.run(market.lookup_tickers(["AAPL", "NOPE"])) == {"AAPL": None, "NOPE": None}
+    # nothing remembered from the empty download: both are asked again
+    out = asyncio.run(market.lookup_tickers(["AAPL", "NOPE"]))
+    assert out == {"AAPL": {"name": "AAPL Inc.", "sector": "Technology"}, "NOPE": None}
+    # now both are remembered
+    asyncio.run(market.lookup_tickers(["AAPL", "NOPE"]))
+    assert downloads == [["AAPL", "NOPE"], ["AAPL", "NOPE"]]
+
+
+def test_pages_walk_the_whole_ledger_once(repo):
+    # ties on timestamp are broken by order_id
+    for i in range(7):
+        asyncio.run(repo.insert_order({
+            "portfolio_id": PORTFOLIO_ID, "ticker": "AAPL", "quantity": i + 1, "price": 100.0,
+            "timestamp": f"2026-01-0{1 + i // 3}T15:00:00+00:00",
+        }))
+    everything = asyncio.run(repo.get_orders(PORTFOLIO_ID))
+
+    seen, cursor = [], None
+    while True:
+        page = asyncio.run(get_orders_page(repo, PORTFOLIO_ID, limit=3, cursor=cursor, fields="quantity"))
+        seen += page["orders"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [o["order_id"] for o in seen] == [o["order_id"] for o in everything]
+    assert set(seen[0]) == {"quantity", "timestamp", "order_id"}
+    assert len(seen) == 8  # the deposit plus seven orders
+
+
+@pytest.mark.parametrize("payload", [
+    ["2026-01-01T00:00:00+00:00", "x),order_id.gt.0"],
+    ['2026-01-01",timestamp.gt."', "00000000-0000-4000-8000-000000000001"],
+    ["2026-01-01T00:00:00+00:00"],
+    "not a cursor",
+])
+def test_cursor_rejects_anything_but_timestamp_and_uuid(repo, payload):
+    cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        asyncio.run(get_orders_page(repo, PORTFOLIO_ID, limit=10, cursor=cursor))
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        asyncio.run(get_orders_page(repo, PORTFOLIO_ID, limit=10, cursor="%%%"))
@@ -0,0 +1,150 @@
+# tests/test_shared_prices.py
+"""
+Shared price matrix (app.utils.shared_prices): a published generation is
+read by another process through views, clean_prices_df / the performance
+pipeline consume it without copying, and only one process owns refreshes.
+
+    pytest tests/test_shared_prices.py
+"""
+import os
+import sys
+import json
+import uuid
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND))
+
+os.environ.setdefault("ENV", "DEV")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:9")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+
+from app.configs import config
+from app.services import performance
+from app.utils import shared_prices
+from app.utils.market_calendar import sessions
+from app.utils.performance import clean_prices_df
+from app.utils.timeseries import compute_portfolio_timeseries
+
+if shared_prices.fcntl is None:
+    pytest.skip("no flock on this platform", allow_module_level=True)
+
+
+TICKERS = ["AAPL", "MSFT", "NVDA"]
+
+
+def minute_frames(days: int = 2, seed: int = 3) -> dict:
+    opens, closes = sessions()
+    now = pd.Timestamp.now(tz="UTC").value
+    done = np.flatnonzero(closes <= now)[-days:]
+    index = pd.DatetimeIndex(np.concatenate([
+        np.arange(opens[i], closes[i], 60 * 10**9) for i in done
+    ]).view("datetime64[ns]")).tz_localize("UTC")
+
+    rng = np.random.default_rng(seed)
+    out = {}
+    for k, t in enumerate(TICKERS):
+        close = 100 * (k + 1) + rng.standard_normal(len(index)).cumsum()
+        df = pd.DataFrame({"Close": close, "Volume": rng.integers(100, 1000, len(index)).astype(float)}, index=index)
+        out[t] = df.drop(df.index[5 * (k + 1)])  # a missing bar per ticker
+    return out
+
+
+@pytest.fixture
+def matrix(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PRICE_MATRIX_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "PRICE_MATRIX_PREFIX", f"oscillo-test-{uuid.uuid4().hex[:8]}")
+    frames = minute_frames()
+    index = frames["AAPL"].index.union(frames["MSFT"].index)
+    start, end = index[0], index[-1]
+    block = shared_prices.PriceBlock.from_frames("1m", frames, start, end, fetched=pd.Timestamp.now().timestamp())
+    name = shared_prices.publish({"1m": block})
+    yield frames, start, end, name
+    shared_prices.close_shared_prices()
+    shared_prices._view.update(stamp=None, shm=None, blocks={})
+
+
+def test_lookup_matches_frames_without_copies(matrix):
+    frames, start, end, _ = matrix
+    block = shared_prices.lookup(TICKERS, "1m", start, end)
+    assert block is not None and not block.close.flags.writeable
+
+    px = clean_prices_df(block)
+    assert np.shares_memory(px.values, block.close)
+    expected = clean_prices_df(frames).ffill()
+    pd.testing.assert_frame_equal(px, expected, check_freq=False)
+
+    # the performance pipeline keeps the view through normalize / slice
+    normalized = performance._normalize_prices(block, "1m")
+    sliced = performance._slice_prices(normalized, start, end)
+    assert np.shares_memory(sliced.values, block.close)
+
+    orders = pd.DataFrame({
+        "ticker": ["CA$H", "AAPL"],
+        "quantity": [10_000.0, 5.0],
+        "price": [1.0, 100.0],
+        "timestamp": [start, start + pd.Timedelta(minutes=30)],
+    })
+    perf = compute_portfolio_timeseries(sliced, orders)
+    assert perf["portfolio_pv"].notna().all()
+
+    # missing tickers or windows fall back to the bar store
+    assert shared_prices.lookup(TICKERS + ["TSLA"], "1m", start, end) is None
+    assert shared_prices.lookup(TICKERS, "1m", start - pd.Timedelta(days=3), end) is None
+    assert shared_prices.lookup(TICKERS, "5m", start, end) is None
+    assert (Path(config.PRICE_MATRIX_DIR) / "wanted" / "1m" / "TSLA").exists()
+
+
+READER = """
+import json, sys
+sys.path.insert(0, {backend!r})
+import pandas as pd
+from app.utils import shared_prices
+block = shared_prices.lookup({tickers!r}, "1m", pd.Timestamp({start!r}), pd.Timestamp({end!r}))
+print(json.dumps({{"rows": len(block.stamps), "last": [float(r[-1]) for r in block.close]}}))
+"""
+
+
+def test_other_processes_read_the_segment(matrix):
+    frames, start, end, name = matrix
+    code = READER.format(backend=str(BACKEND), tickers=TICKERS, start=str(start), end=str(end))
+    env = {**os.environ, "PRICE_MATRIX_DIR": config.PRICE_MATRIX_DIR}
+    for _ in range(2):  # the segment outlives a reader (no resource tracker unlink)
+        out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        seen = json.loads(out.stdout)
+        assert seen["last"] == [float(frames[t]["Close"].iloc[-1]) for t in TICKERS]
+
+
+def test_new_generations_replace_old_ones(matrix):
+    frames, start, end, first = matrix
+    shared_prices.lookup(TICKERS, "1m", start, end)
+    shifted = {t: df.assign(Close=df["Close"] + 1) for t, df in frames.items()}
+    block = shared_prices.PriceBlock.from_frames("1m", shifted, start, end, fetched=pd.Timestamp.now().timestamp())
+    shared_prices.publish({"1m": block})
+
+    latest = shared_prices.lookup(["AAPL"], "1m", start, end)
+    assert latest.close[0, -1] == frames["AAPL"]["Close"].iloc[-1] + 1
+
+
+def test_single_owner(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PRICE_MATRIX_DIR", str(tmp_path))
+    code = (
+        f"import sys; sys.path.insert(0, {str(BACKEND)!r})\n"
+        "from app.utils import shared_prices\n"
+        "print(shared_prices.acquire_ownership())\n"
+    )
+    env = {**os.environ, "PRICE_MATRIX_DIR": str(tmp_path)}
+    try:
+        assert shared_prices.acquire_ownership()
+        other = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        assert other.stdout.strip() == "False"
+    finally:
+        shared_prices.release_ownership()
+    other = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    assert other.stdout.strip() == "True"
@@ -0,0 +1,146 @@
+# tests/test_whatif.py
+"""
+What-if simulations (app.services.whatif): the simulated series equals the
+one recomputed after really placing the orders, nothing is stored, tickers
+outside the ledger are priced on the fly, and repeated simulations reuse
+the cached real series.
+
+    pytest tests/test_whatif.py
+"""
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND))
+
+os.environ.setdefault("ENV", "DEV")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:9")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "test")
+os.environ.setdefault("SUPABASE_ANON_KEY", "test")
+
+from app.db.sqlite import SqliteRepository
+from app.models import Order
+from app.services import ledger, performance, whatif
+
+
+USER_ID = "00000000-0000-4000-8000-000000000031"
+PORTFOLIO_ID = "00000000-0000-4000-8000-000000000032"
+
+INDEX = pd.date_range(end=pd.Timestamp.now(tz="UTC").normalize(), periods=250, freq="B")
+CLOSES = {
+    "AAPL": np.linspace(100, 150, len(INDEX)),
+    "MSFT": np.linspace(300, 240, len(INDEX)),
+    "NVDA": np.linspace(50, 90, len(INDEX)),
+}
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    calls = []
+
+    async def fetch_bars(tickers, start, end, interval="1d", timeout=10):
+        calls.append(sorted(tickers))
+        return {
+            t: pd.DataFrame({"Close": CLOSES[t]}, index=INDEX).loc[start:end]
+            for t in tickers if t in CLOSES
+        }
+
+    monkeypatch.setattr(performance, "fetch_bars", fetch_bars)
+    monkeypatch.setattr(whatif, "_baselines", whatif.TieredCache("whatif", ttl=60, shared=None))
+
+    repo = SqliteRepository(":memory:")
+    start = INDEX[0].isoformat()
+    asyncio.run(repo.insert_portfolio({"id": PORTFOLIO_ID, "user_id": USER_ID, "name": "whatif", "created_at": start}))
+    rows = [(Order.CASH_TICKER, 100_000, 1.0, INDEX[0])]
+    # a trade every other day, so the ledger is not trivially short
+    for i in range(1, len(INDEX), 2):
+        ticker = "AAPL" if i % 4 == 1 else "MSFT"
+        rows.append((ticker, 1 if i < 200 else -1, CLOSES[ticker][i], INDEX[i]))
+    for ticker, quantity, price, ts in rows:
+        asyncio.run(repo.insert_order({
+            "portfolio_id": PORTFOLIO_ID, "ticker": ticker, "quantity": quantity,
+            "price": float(price), "timestamp": ts.isoformat(),
+        }))
+    ledger.invalidate(PORTFOLIO_ID)
+    repo.fetches = calls
+    yield repo
+    ledger.invalidate(PORTFOLIO_ID)
+    asyncio.run(repo.close())
+
+
+def pv(repo):
+    perf = asyncio.run(performance.get_portfolio_performance(repo, USER_ID, PORTFOLIO_ID, ["ALL"]))["ALL"]
+    return perf["portfolio_pv"]
+
+
+def test_simulation_matches_placing_the_orders(repo):
+    hypothetical = [
+        {"ticker": "aapl", "quantity": 20, "timestamp": INDEX[150].isoformat()},
+        {"ticker": "MSFT", "quantity": -3, "price": 280.0, "timestamp": INDEX[180].isoformat()},
+        {"ticker": Order.CASH_TICKER, "quantity": 5_000, "timestamp": INDEX[170].isoformat()},
+    ]
+    real = pv(repo)
+    stored = len(asyncio.run(repo.get_orders(PORTFOLIO_ID)))
+    version = asyncio.run(ledger.get_ledger(repo, PORTFOLIO_ID))["version"]
+
+    out = asyncio.run(whatif.simulate_orders(repo, USER_ID, PORTFOLIO_ID, hypothetical, "all"))
+
+    # nothing written
+    assert len(asyncio.run(repo.get_orders(PORTFOLIO_ID))) == stored
+    assert asyncio.run(ledger.get_ledger(repo, PORTFOLIO_ID))["version"] == version
+
+    priced = {o["ticker"]: o for o in out["orders"]}
+    assert priced["AAPL"]["price"] == pytest.approx(CLOSES["AAPL"][150])
+    assert priced["MSFT"]["price"] == 280.0
+    assert out["start"] == out["diff"]["TIMESTAMP"][0] and pd.Timestamp(out["start"]) == INDEX[150]
+    assert len(out["diff"]["pv:TOTAL"]) == len(real.loc[INDEX[150]:]) and "pv:AAPL" in out["diff"]
+    assert out["warnings"] == []
+
+    # now place them for real and recompute from scratch
+    for o in out["orders"]:
+        asyncio.run(repo.insert_order({
+            "portfolio_id": PORTFOLIO_ID, "ticker": o["ticker"], "quantity": o["quantity"],
+            "price": o["price"], "timestamp": o["timestamp"],
+        }))
+    ledger.invalidate(PORTFOLIO_ID)
+    placed = pv(repo)
+
+    before, after = slice(None, INDEX[149]), slice(INDEX[150], None)
+    np.testing.assert_allclose(placed.loc[before], real.loc[before])
+    np.testing.assert_allclose(placed.loc[after] - real.loc[after], out["diff"]["pv:TOTAL"], atol=1e-6)
+    assert out["simulated"]["pv"] == pytest.approx(placed.iloc[-1])
+    assert out["real"]["pv"] == pytest.approx(real.iloc[-1])
+
+
+def test_new_tickers_warnings_and_cache(repo):
+    hypothetical = [{"ticker": "NVDA", "quantity": 10_000}]  # now: executes on the last bar
+    first = asyncio.run(whatif.simulate_orders(repo, USER_ID, PORTFOLIO_ID, hypothetical))
+    assert len(first["diff"]["TIMESTAMP"]) == 1 and first["orders"][0]["price"] == pytest.approx(CLOSES["NVDA"][-1])
+    assert first["simulated"]["weights"]["NVDA"] > 0.9 and "NVDA" not in first["real"]["weights"]
+    assert first["diff"]["pv:TOTAL"] == [pytest.approx(0.0, abs=1e-6)]
+    assert any("Cash goes negative" in w for w in first["warnings"])
+
+    fetches = len(repo.fetches)
+    start = time.perf_counter()
+    for q in range(1, 21):
+        out = asyncio.run(whatif.simulate_orders(repo, USER_ID, PORTFOLIO_ID, [
+            {"ticker": "AAPL", "quantity": q, "timestamp": INDEX[100].isoformat()},
+        ]))
+    elapsed = (time.perf_counter() - start) / 20
+    assert len(repo.fetches) == fetches  # real series and prices came from the cache
+    assert out["diff"]["pv:AAPL"][-1] == pytest.approx(20 * CLOSES["AAPL"][-1])
+    assert elapsed < 0.05, f"{elapsed * 1e3:.1f} ms per simulation"
+
+    for bad in ([], [{"ticker": "AAPL", "quantity": 0}], [{"ticker": "ZZZZ", "quantity": 1}],
+                [{"ticker": "AAPL", "quantity": 1, "timestamp": "soon"}]):
+        with pytest.raises(ValueError):
+            asyncio.run(whatif.simulate_orders(repo, USER_ID, PORTFOLIO_ID, bad))
+    with pytest.raises(ValueError):
+        asyncio.run(whatif.simulate_orders(repo, USER_ID, PORTFOLIO_ID, hypothetical, "2Y"))